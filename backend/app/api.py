@@ -1,11 +1,16 @@
+import json
+import os
+import time
 from fastapi import APIRouter, Query, HTTPException
-from typing import List, Optional
+from fastapi.responses import StreamingResponse
+from typing import Any, Dict, List, Optional
 # Use new specific models
 from .models import Regulation, Provision, Role, Expert # Import new models
 from .kg_manager import KnowledgeGraphManager
 # Compliance and simulation logic might need updates if they relied on old models
 from .compliance import filter_for_compliance 
 from .simulation.simulation_manager import simulate_full_expert_reasoning 
+from .simulation_jobs import RegulationContext, SimulationJobManager, provision_to_node
 
 router = APIRouter()
 # Initialize manager with all data paths
@@ -14,7 +19,21 @@ kgm = KnowledgeGraphManager(
     provisions_path="app/data/nodes.yaml",   # Use original nodes file for provisions etc.
     roles_path="app/data/roles.yaml", # Add path to roles.yaml
     experts_path="app/data/experts.yaml", # Add path to experts.yaml
+    regulation_hierarchy_path="app/data/regulations.yaml", # Nested FAR/DFARS/state tree, streamed
     # mappings_path="app/data/mappings.yaml" # We can ignore mappings for now
+    # Compiled snapshot reused by later worker starts; set UKFW_KG_SNAPSHOT="" to disable
+    snapshot_path=os.getenv("UKFW_KG_SNAPSHOT", "app/data/.cache/kg_snapshot.bin") or None,
+    # Parse the YAML sources in a process pool (worth it once the corpus is large)
+    parallel_load=os.getenv("UKFW_KG_PARALLEL_LOAD", "0") == "1",
+    # "columnar" keeps provisions in compact arrays and builds models per response
+    storage_backend=os.getenv("UKFW_KG_STORAGE", "dict"),
+)
+# Bulk /simulate/jobs runs; checkpoints let unfinished jobs resume after a restart (UKFW_SIM_JOB_DIR="" disables).
+# Resumption starts from the app's lifespan, not at import. Job state is per process: serve these routes from one worker
+simulation_jobs = SimulationJobManager(
+    kgm,
+    max_workers=int(os.getenv("UKFW_SIM_WORKERS", "8")),
+    checkpoint_dir=os.getenv("UKFW_SIM_JOB_DIR", "logs/simulation_jobs") or None,
 )
 
 # --- Refactored Endpoints --- 
@@ -41,30 +60,61 @@ def query_provisions_endpoint(
     tag: Optional[str] = None,
     role_id: Optional[str] = None,
     min_confidence: Optional[float] = Query(None, ge=0.0, le=1.0),
-    compliance_tag: Optional[str] = Query(None)
+    compliance_tag: Optional[str] = Query(None),
+    user_compliance_tags: Optional[List[str]] = Query(None)
 ):
-    """Queries provisions based on various criteria including confidence and compliance tags."""
+    """Queries provisions based on various criteria including confidence and compliance tags.
+       user_compliance_tags hides provisions restricted to compliance tags the caller lacks."""
     provisions = kgm.query_provisions(
         regulation_id=regulation_id, 
         jurisdiction=jurisdiction, 
         tag=tag, 
         role_id=role_id,
         min_confidence=min_confidence,
-        compliance_tag=compliance_tag
+        compliance_tag=compliance_tag,
+        user_compliance_tags=user_compliance_tags
     )
     # TODO: Re-implement simulation logic if needed for provisions
-    # TODO: Re-implement compliance filtering if needed (filter_for_compliance might need update)
     return provisions
 
 @router.get("/provisions/{provision_id}", response_model=Provision)
-def get_provision(provision_id: str):
+def get_provision(provision_id: str, user_compliance_tags: Optional[List[str]] = Query(None)):
     """Gets details for a specific provision."""
     provision = kgm.get_provision_by_id(provision_id)
-    if not provision:
+    # A provision the caller may not see is reported like a missing one
+    if not provision or (user_compliance_tags is not None and not kgm.compliance_masks.is_visible(provision_id, user_compliance_tags)):
         raise HTTPException(status_code=404, detail="Provision not found")
-    # TODO: Add compliance filtering back if required for single provision view
     return provision
 
+@router.get("/search", response_model=Dict[str, Any])
+def search_endpoint(q: str = Query(..., min_length=1),
+                    limit: int = Query(20, ge=1, le=200),
+                    offset: int = Query(0, ge=0),
+                    kind: Optional[List[str]] = Query(None),
+                    regulation_id: Optional[str] = None,
+                    user_compliance_tags: Optional[List[str]] = Query(None)):
+    """Full-text search over provision titles/text and regulation descriptions, ranked by BM25.
+       Supports plain terms, `prefix*` and "quoted phrases"; `kind` is provision and/or regulation."""
+    start = time.perf_counter()
+    try:
+        results = kgm.search(q, limit=limit, offset=offset, kinds=kind, regulation_id=regulation_id,
+                             user_compliance_tags=user_compliance_tags)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    results["took_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    return results
+
+@router.get("/search/semantic", response_model=Dict[str, Any])
+def semantic_search_endpoint(q: str = Query(..., min_length=1),
+                             k: int = Query(5, ge=1, le=100),
+                             method: str = Query("exact", pattern="^(exact|ivf)$"),
+                             exclude: Optional[List[str]] = Query(None)):
+    """Provisions closest in meaning to the query text (hashed TF-IDF embeddings, cosine similarity).
+       `method=ivf` uses the approximate (clustered) index instead of brute force."""
+    start = time.perf_counter()
+    results = kgm.related_provisions(q, k=k, method=method, exclude_ids=exclude)
+    return {"query": q, "results": results, "took_ms": round((time.perf_counter() - start) * 1000, 3)}
+
 # --- Endpoints for Roles and Experts (Implement Logic) ---
 @router.get("/roles/{role_id}", response_model=Role)
 def get_role(role_id: str):
@@ -85,19 +135,153 @@ def get_expert(expert_id: str):
     # or could be linked similarly if needed in the future.
     return expert
 
-# --- Simulation Endpoint (Needs Verification) ---
-# This endpoint might need modification if simulation operates on Provisions now
-@router.post("/simulate/provision/{provision_id}") # Changed path slightly for clarity
+# --- Mapping Endpoints ---
+@router.get("/mapping/provision/{provision_id}", response_model=Dict[str, Any])
+def get_provision_mapping(provision_id: str, hops: int = Query(1, ge=0, le=6)):
+    """Spiderweb links, Honeycomb crosswalks, Octopus domains, roles and experts for a provision,
+       plus the provisions reachable within `hops` steps of the mapping network."""
+    mapping = kgm.get_provision_mapping(provision_id, hops=hops)
+    if mapping is None:
+        raise HTTPException(status_code=404, detail="Provision not found")
+    return mapping
+
+@router.get("/dynamic/pathway/{prov_id}", response_model=List[Dict[str, Any]])
+def get_compliance_pathways(prov_id: str,
+                            target: Optional[str] = None,
+                            k: int = Query(1, ge=1, le=20),
+                            method: str = Query("bidirectional", pattern="^(dijkstra|astar|bidirectional)$"),
+                            edge_types: Optional[List[str]] = Query(None),
+                            axes: Optional[List[str]] = Query(None),
+                            limit: int = Query(10, ge=1, le=200)):
+    """Cheapest routes through the Spiderweb/Honeycomb/Octopus network from a provision, to `target`
+       (top-k) or to the nearest provisions. Edge cost grows with risk and falls with link weight;
+       `edge_types` and `axes` restrict which mapping nodes may be traversed."""
+    try:
+        pathways = kgm.find_pathways(prov_id, target, k=k, method=method, edge_types=edge_types, axes=axes, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if pathways is None:
+        raise HTTPException(status_code=404, detail="Provision not found")
+    return pathways
+
+# --- Compliance Endpoints ---
+@router.post("/compliance/submit/")
+def submit_provision_compliance(provision_id: str, status: float = Query(..., ge=0.0, le=1.0), value: float = 1.0):
+    """Submit a provision's compliance status: 1 (met), 0 (unmet) or a fraction; value weights its criticality."""
+    result = kgm.submit_compliance_status(provision_id, status, value)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Provision not found")
+    return result
+
+@router.get("/compliance/evaluate/{reg_id}", response_model=Dict[str, Any])
+def evaluate_regulation_compliance(reg_id: str, detail: bool = True):
+    """R_C(x) = Σ(rᵢ * cᵢ * vᵢ) over the regulation's provisions; detail=false returns just the
+       maintained totals."""
+    result = kgm.evaluate_regulation_compliance(reg_id, include_detail=detail)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Regulation not found")
+    return result
+
+@router.get("/compliance/gap/{reg_id}", response_model=Dict[str, Any])
+def detect_compliance_gaps(reg_id: str, detail: bool = True):
+    """CGD(x) = Rc_expected - Rc_actual, where expected assumes every provision is met."""
+    result = kgm.compliance_gap(reg_id, include_detail=detail)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Regulation not found")
+    return result
+
+@router.get("/compliance/jurisdiction/{jurisdiction}", response_model=Dict[str, Any])
+def get_jurisdiction_compliance(jurisdiction: str):
+    """R_C / CGD totals across every provision of a jurisdiction."""
+    result = kgm.jurisdiction_compliance(jurisdiction)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Jurisdiction not found")
+    return result
+
+@router.get("/compliance/rollup/{provision_id}", response_model=Dict[str, Any])
+def get_provision_compliance_rollup(provision_id: str):
+    """R_C / CGD totals for a provision and all provisions below it in the hierarchy."""
+    result = kgm.provision_compliance_rollup(provision_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Provision not found")
+    return result
+
+@router.get("/compliance/consistency", response_model=Dict[str, Any])
+def check_compliance_consistency():
+    """Compares the incrementally maintained aggregates with a full recompute."""
+    mismatches = kgm.check_compliance_aggregates()
+    return {"consistent": not mismatches, "mismatches": mismatches}
+
+@router.post("/compliance/score", response_model=Dict[str, Dict[str, Dict[str, float]]])
+def score_tenant_submissions(submissions: Dict[str, Dict[str, Dict[str, float]]]):
+    """Scores many organizations at once: {tenant: {provision_id: {"status", "value"}}} ->
+       {tenant: {regulation_id: {actual, expected, gap, spiderweb}}}."""
+    return kgm.compliance_scoring.evaluate_tenants(submissions)
+
+# --- Simulation Endpoints ---
+@router.post("/simulate/provision/{provision_id}", response_model=Dict[str, Any])
 def simulate_expert_reasoning_endpoint(provision_id: str, confidence_goal: float = 0.995):
-    """Runs expert reasoning simulation on a specific provision."""
+    """Runs expert reasoning simulation on a specific provision (as a KnowledgeNode, see provision_to_node)."""
     provision = kgm.get_provision_by_id(provision_id)
     if not provision:
         raise HTTPException(status_code=404, detail="Provision not found")
-    # !! IMPORTANT: Verify simulate_full_expert_reasoning works with Provision model
-    # It might expect the old KnowledgeNode structure. Adapt simulation logic if necessary.
-    updated_provision, history = simulate_full_expert_reasoning(provision, kgm, confidence_goal=confidence_goal)
-    # Return provision with updated confidence, metadata, and audit trail
-    return updated_provision # Assuming the function returns the updated object
+    node = provision_to_node(provision, kgm.get_regulation_by_id(provision.regulation_id))
+    node = simulate_full_expert_reasoning(node, RegulationContext(kgm), confidence_goal=confidence_goal)
+    # Node with updated confidence (axes.axis9), metadata and refinement history
+    return node.model_dump(mode="json")
+
+@router.post("/simulate/jobs", response_model=Dict[str, Any], status_code=202)
+def submit_simulation_job(request: Dict[str, Any]):
+    """Starts a bulk simulation over {"regulation_id"} or {"provision_ids": [...]} or {"query": {query_provisions
+       filters}}, with an optional "confidence_goal". Poll /simulate/jobs/{job_id} or stream its results."""
+    try:
+        provision_ids = simulation_jobs.select_provisions(regulation_id=request.get("regulation_id"),
+                                                          provision_ids=request.get("provision_ids"),
+                                                          query=request.get("query"))
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    job = simulation_jobs.submit(provision_ids, confidence_goal=float(request.get("confidence_goal", 0.995)), request=request)
+    return job.progress()
+
+@router.get("/simulate/jobs", response_model=List[Dict[str, Any]])
+def list_simulation_jobs():
+    return simulation_jobs.list_jobs()
+
+@router.get("/simulate/jobs/{job_id}", response_model=Dict[str, Any])
+def get_simulation_job(job_id: str):
+    """Progress of a bulk simulation, including throughput in provisions per second."""
+    job = simulation_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Simulation job not found")
+    return job.progress()
+
+@router.get("/simulate/jobs/{job_id}/results", response_model=Dict[str, Any])
+def get_simulation_job_results(job_id: str, offset: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000)):
+    """Per-provision results in completion order."""
+    results = simulation_jobs.results(job_id, offset=offset, limit=limit)
+    if results is None:
+        raise HTTPException(status_code=404, detail="Simulation job not found")
+    return {"job_id": job_id, "offset": offset, "results": results}
+
+@router.get("/simulate/jobs/{job_id}/stream")
+def stream_simulation_job_results(job_id: str):
+    """Every result as NDJSON as soon as it is ready, then a final progress line once the job ends."""
+    if simulation_jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Simulation job not found")
+
+    def ndjson_results():
+        for result in simulation_jobs.iter_results(job_id):
+            yield json.dumps({"event": "result", "result": result}) + "\n"
+        yield json.dumps({"event": "complete", "job": simulation_jobs.get(job_id).progress()}) + "\n"
+
+    return StreamingResponse(ndjson_results(), media_type="application/x-ndjson")
+
+@router.delete("/simulate/jobs/{job_id}", response_model=Dict[str, Any])
+def cancel_simulation_job(job_id: str):
+    job = simulation_jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Simulation job not found")
+    return job.progress()
 
 # --- Deprecated Endpoints (Remove or Keep with Warnings) ---
 
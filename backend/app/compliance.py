@@ -1,18 +1,181 @@
-from typing import List
-from .models import KnowledgeNode
+import threading
+from itertools import compress
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
 
-def filter_for_compliance(nodes: List[KnowledgeNode], user_compliance_tags: List[str]) -> List[KnowledgeNode]:
+import numpy as np
+
+from .models import KnowledgeNode, Provision
+
+WORD_BITS = 64
+TagList = Optional[Union[str, Sequence[str]]]
+
+
+def _as_tags(tags: TagList) -> List[str]:
+    # axis8 may be a single tag or a list; a lone string is one tag, not its characters
+    if not tags:
+        return []
+    return [tags] if isinstance(tags, str) else list(tags)
+
+
+class ComplianceTagPool:
+    """Interns compliance tags (GDPR, HIPAA, ...) to bit positions; a tag set becomes one int bitmask."""
+
+    def __init__(self):
+        self.bits: Dict[str, int] = {}
+        self.tags: List[str] = []
+        self._lock = threading.Lock() # interning a new tag; lookups of known tags take no lock
+
+    def __len__(self) -> int:
+        return len(self.tags)
+
+    def bit(self, tag: str) -> int:
+        bit = self.bits.get(tag)
+        if bit is None:
+            with self._lock:
+                bit = self.bits.get(tag)
+                if bit is None:
+                    self.tags.append(tag)
+                    bit = self.bits[tag] = len(self.tags) - 1
+        return bit
+
+    def mask(self, tags: TagList, add: bool = True) -> int:
+        """Bitmask for a tag set. With add=False unknown tags are skipped rather than interned
+           (used for user tags, which cannot match a tag no node carries)."""
+        mask = 0
+        for tag in _as_tags(tags):
+            bit = self.bit(tag) if add else self.bits.get(tag)
+            if bit is not None:
+                mask |= 1 << bit
+        return mask
+
+    def words(self, mask: int, width: int) -> np.ndarray:
+        """Splits an int mask into `width` uint64 words (bit i lands in word i // 64)."""
+        return np.array([(mask >> (WORD_BITS * w)) & (2 ** WORD_BITS - 1) for w in range(width)], dtype=np.uint64)
+
+
+def is_visible(node_mask: int, user_mask: int) -> bool:
+    """An untagged node is visible to everyone; a tagged one needs at least one shared tag."""
+    return node_mask == 0 or bool(node_mask & user_mask)
+
+
+def filter_for_compliance(nodes: List[KnowledgeNode], user_compliance_tags: List[str],
+                          mask_index: Optional["ComplianceMaskIndex"] = None) -> List[KnowledgeNode]:
     """
     Only expose nodes that are not restricted or match compliance tags (axis8).
     If axis8 is None or empty, node is visible to all. If axis8 is set, at least one tag must match.
+    Pass a mask_index built once with ComplianceMaskIndex.build_for_nodes to test the whole list
+    with one vectorized AND over precomputed masks; nodes it does not cover, and every node when
+    there is no index, are checked against a set of the user's tags built once per call.
     """
-    filtered = []
-    for node in nodes:
-        tags = node.axes.axis8
-        if not tags:
-            filtered.append(node)
+    user_tags = set(_as_tags(user_compliance_tags))
+
+    def visible(node: KnowledgeNode) -> bool:
+        tags = _as_tags(node.axes.axis8)
+        return not tags or not user_tags.isdisjoint(tags)
+
+    if mask_index is None:
+        return [node for node in nodes if visible(node)]
+    keep = mask_index.visible_mask([node.node_id for node in nodes], user_compliance_tags).tolist()
+    return [node for node, shown in zip(nodes, keep)
+            if (shown if node.node_id in mask_index.position else visible(node))]
+
+
+class ComplianceMaskIndex:
+    """
+    Per-provision compliance-tag bitmasks, precomputed from Provision.crosswalks (the axis8 tags)
+    when the graph loads, or per knowledge node from axes.axis8 (build_for_nodes). Masks are stored as an (N, words) uint64 array, so visibility of a whole
+    result set is one vectorized AND over the selected rows; the word count grows with the number
+    of distinct tags.
+    """
+
+    def __init__(self, tag_pool: Optional[ComplianceTagPool] = None):
+        self.tag_pool = tag_pool or ComplianceTagPool()
+        self.ids: List[str] = []
+        self.position: Dict[str, int] = {}
+        self.masks = np.zeros((0, 1), dtype=np.uint64)
+
+    @classmethod
+    def build(cls, provisions: Iterable[Provision], tag_pool: Optional[ComplianceTagPool] = None) -> "ComplianceMaskIndex":
+        return cls._build(((provision.id, provision.crosswalks) for provision in provisions), tag_pool)
+
+    @classmethod
+    def build_for_nodes(cls, nodes: Iterable[KnowledgeNode], tag_pool: Optional[ComplianceTagPool] = None) -> "ComplianceMaskIndex":
+        """Index over knowledge nodes' axis8 tags, for filter_for_compliance."""
+        return cls._build(((node.node_id, node.axes.axis8) for node in nodes), tag_pool)
+
+    @classmethod
+    def _build(cls, tagged: Iterable[Tuple[str, TagList]], tag_pool: Optional[ComplianceTagPool]) -> "ComplianceMaskIndex":
+        index = cls(tag_pool)
+        masks = []
+        for item_id, tags in tagged:
+            index.position[item_id] = len(index.ids)
+            index.ids.append(item_id)
+            masks.append(index.tag_pool.mask(tags))
+        index._reserve(len(masks))
+        # Fill one 64-bit word column at a time
+        low = 2 ** WORD_BITS - 1
+        for w in range(index.width):
+            shift = WORD_BITS * w
+            index.masks[:len(masks), w] = np.fromiter(((m >> shift) & low for m in masks), dtype=np.uint64, count=len(masks))
+        return index
+
+    @property
+    def width(self) -> int:
+        return self.masks.shape[1]
+
+    def update(self, provision: Provision):
+        """(Re)computes one provision's mask, e.g. after its crosswalks changed."""
+        self._set_row(provision.id, self.tag_pool.mask(provision.crosswalks))
+
+    def update_node(self, node: KnowledgeNode):
+        """(Re)computes one knowledge node's mask, e.g. after its axis8 tags changed."""
+        self._set_row(node.node_id, self.tag_pool.mask(node.axes.axis8))
+
+    def mask_of(self, provision_id: str) -> int:
+        row = self.masks[self.position[provision_id]]
+        return sum(int(word) << (WORD_BITS * w) for w, word in enumerate(row))
+
+    def is_visible(self, provision_id: str, user_compliance_tags: Optional[List[str]]) -> bool:
+        if provision_id not in self.position:
+            return True
+        return is_visible(self.mask_of(provision_id), self.tag_pool.mask(user_compliance_tags, add=False))
+
+    def visible_mask(self, provision_ids: Sequence[str], user_compliance_tags: Optional[List[str]]) -> np.ndarray:
+        """Boolean visibility for each ID (IDs without a row are unrestricted)."""
+        positions = np.fromiter((self.position.get(pid, -1) for pid in provision_ids), dtype=np.int64, count=len(provision_ids))
+        known = positions >= 0
+        rows = self.masks[positions[known]]
+        user = self.tag_pool.words(self.tag_pool.mask(user_compliance_tags, add=False), self.width)
+        visible = np.ones(len(provision_ids), dtype=bool)
+        visible[known] = ~rows.any(axis=1) | (rows & user).any(axis=1)
+        return visible
+
+    def filter(self, provision_ids: Sequence[str], user_compliance_tags: Optional[List[str]]) -> List[str]:
+        keep = self.visible_mask(provision_ids, user_compliance_tags)
+        return list(compress(provision_ids, keep.tolist()))
+
+    def visible_ids(self, user_compliance_tags: Optional[List[str]]) -> List[str]:
+        """Every indexed provision the user may see, in index order, without per-ID lookups."""
+        rows = self.masks[:len(self.ids)]
+        user = self.tag_pool.words(self.tag_pool.mask(user_compliance_tags, add=False), self.width)
+        keep = ~rows.any(axis=1) | (rows & user).any(axis=1)
+        return list(compress(self.ids, keep.tolist()))
+
+    def _reserve(self, rows: int):
+        words = max(1, -(-len(self.tag_pool) // WORD_BITS))
+        if rows > self.masks.shape[0] or words > self.width:
+            grown = np.zeros((max(rows, self.masks.shape[0]), max(words, self.width)), dtype=np.uint64)
+            grown[:self.masks.shape[0], :self.width] = self.masks
+            self.masks = grown
+
+    def _set_row(self, provision_id: str, mask: int):
+        row = self.position.get(provision_id)
+        if row is None:
+            row = self.position[provision_id] = len(self.ids)
+            self.ids.append(provision_id)
+        # Grow geometrically so repeated updates do not copy the array each time
+        if row >= self.masks.shape[0]:
+            self._reserve(max(row + 1, 2 * self.masks.shape[0]))
         else:
-            tag_list = tags if isinstance(tags, list) else [tags]
-            if any(tag in user_compliance_tags for tag in tag_list):
-                filtered.append(node)
-    return filtered
+            self._reserve(row + 1)
+        self.masks[row] = self.tag_pool.words(mask, self.width)
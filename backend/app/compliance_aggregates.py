@@ -0,0 +1,163 @@
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from .compliance_scoring import ComplianceScoringEngine, provision_field
+from .models import Provision
+
+_NO_PARENT = -1
+
+
+class ComplianceAggregates:
+    """
+    Running R_C sums maintained on every status submission, so evaluate / gap queries read a
+    stored total instead of re-reducing a regulation.
+    - per regulation and per jurisdiction: actual = Σ rᵢ·cᵢ·vᵢ and expected = Σ rᵢ·vᵢ
+    - per provision subtree (the provision plus its parent_id descendants): the same two sums,
+      so a section or part of a regulation can be rolled up too
+    apply() turns one submission into a delta and adds it to the provision's regulation, its
+    jurisdiction and every ancestor, i.e. O(hierarchy depth). check() compares all maintained
+    sums with a full recompute from the engine's arrays.
+    """
+
+    def __init__(self, engine: ComplianceScoringEngine, parent: np.ndarray, jurisdiction_ids: List[Optional[str]],
+                 jurisdiction_of: np.ndarray):
+        self.engine = engine
+        self.parent = parent
+        self.jurisdiction_ids = jurisdiction_ids
+        self.jurisdiction_index: Dict[Optional[str], int] = {jid: i for i, jid in enumerate(jurisdiction_ids)}
+        self.jurisdiction_of = jurisdiction_of
+        self.depth = _depths(parent)
+        self.recompute()
+
+    @classmethod
+    def build(cls, engine: ComplianceScoringEngine, provisions: Mapping[str, Provision]) -> "ComplianceAggregates":
+        parent = np.full(engine.num_provisions, _NO_PARENT, dtype=np.int64)
+        jurisdiction_ids: List[Optional[str]] = []
+        jurisdiction_codes: Dict[Optional[str], int] = {}
+        jurisdiction_of = np.empty(engine.num_provisions, dtype=np.int32)
+        for i, provision_id in enumerate(engine.provision_ids):
+            # Parents outside the provision set (a regulation ID, or not loaded) end the chain
+            parent_position = engine.index.get(provision_field(provisions, provision_id, "parent_id"))
+            if parent_position is not None and parent_position != i:
+                parent[i] = parent_position
+            jurisdiction = provision_field(provisions, provision_id, "jurisdiction")
+            code = jurisdiction_codes.get(jurisdiction)
+            if code is None:
+                code = jurisdiction_codes[jurisdiction] = len(jurisdiction_ids)
+                jurisdiction_ids.append(jurisdiction)
+            jurisdiction_of[i] = code
+        return cls(engine, parent, jurisdiction_ids, jurisdiction_of)
+
+    def placement(self, provision_id: str) -> Optional[Tuple[str, int, Optional[str]]]:
+        """(regulation_id, parent position or -1, jurisdiction) the sums currently file the provision
+           under; None if it is not indexed."""
+        i = self.engine.index.get(provision_id)
+        if i is None:
+            return None
+        return (self.engine.regulation_ids[self.engine.regulation_of[i]], int(self.parent[i]),
+                self.jurisdiction_ids[self.jurisdiction_of[i]])
+
+    def parent_position(self, provision_id: str, parent_id: Optional[str]) -> int:
+        """Where build() would point the provision's parent link (-1 ends the chain)."""
+        parent_position = self.engine.index.get(parent_id)
+        return parent_position if parent_position is not None and parent_position != self.engine.index.get(provision_id) else _NO_PARENT
+
+    # --- maintenance ---
+
+    def apply(self, provision_id: str, status: float, value: float) -> Dict[str, float]:
+        """Records a submission in the engine and propagates its delta; returns the delta."""
+        engine = self.engine
+        i = engine.index[provision_id]
+        risk = float(engine.risk[i])
+        old_status, old_value = float(engine.status[i]), float(engine.value[i])
+        engine.set_status(provision_id, status, value)
+        d_actual = risk * (status * value - old_status * old_value)
+        d_expected = risk * (value - old_value)
+
+        r = engine.regulation_of[i]
+        self.regulation_actual[r] += d_actual
+        self.regulation_expected[r] += d_expected
+        j = self.jurisdiction_of[i]
+        self.jurisdiction_actual[j] += d_actual
+        self.jurisdiction_expected[j] += d_expected
+        v = i
+        while v != _NO_PARENT:
+            self.subtree_actual[v] += d_actual
+            self.subtree_expected[v] += d_expected
+            v = self.parent[v]
+        return {"actual": d_actual, "expected": d_expected}
+
+    def recompute(self):
+        """Rebuilds every maintained sum from the engine's status/value arrays."""
+        self.regulation_actual, self.regulation_expected, self.jurisdiction_actual, self.jurisdiction_expected, \
+            self.subtree_actual, self.subtree_expected = self._full_sums()
+
+    def check(self, rel_tol: float = 1e-9, abs_tol: float = 1e-9) -> List[Dict[str, Any]]:
+        """
+        Compares maintained sums with a full recompute; returns one entry per mismatch
+        (empty when consistent). Tolerances absorb float drift from many small deltas.
+        """
+        fresh = self._full_sums()
+        maintained = (self.regulation_actual, self.regulation_expected, self.jurisdiction_actual,
+                      self.jurisdiction_expected, self.subtree_actual, self.subtree_expected)
+        labels = (("regulation", "actual", self.engine.regulation_ids), ("regulation", "expected", self.engine.regulation_ids),
+                  ("jurisdiction", "actual", self.jurisdiction_ids), ("jurisdiction", "expected", self.jurisdiction_ids),
+                  ("provision", "actual", self.engine.provision_ids), ("provision", "expected", self.engine.provision_ids))
+        mismatches = []
+        for (scope, measure, ids), kept, expected in zip(labels, maintained, fresh):
+            bad = ~np.isclose(kept, expected, rtol=rel_tol, atol=abs_tol)
+            for k in np.nonzero(bad)[0]:
+                mismatches.append({"scope": scope, "id": ids[k], "measure": measure,
+                                   "maintained": float(kept[k]), "recomputed": float(expected[k])})
+        return mismatches
+
+    def _full_sums(self):
+        engine = self.engine
+        weighted = engine.risk * engine.value
+        actual = weighted * engine.status
+        regulation_actual = engine.segment_sum(actual)
+        regulation_expected = engine.segment_sum(weighted)
+        jurisdictions = len(self.jurisdiction_ids)
+        jurisdiction_actual = np.bincount(self.jurisdiction_of, weights=actual, minlength=jurisdictions)
+        jurisdiction_expected = np.bincount(self.jurisdiction_of, weights=weighted, minlength=jurisdictions)
+        # Subtree sums: fold each level into its parents, deepest level first
+        subtree_actual, subtree_expected = actual.copy(), weighted.copy()
+        for level in range(int(self.depth.max(initial=0)), 0, -1):
+            members = np.nonzero(self.depth == level)[0]
+            np.add.at(subtree_actual, self.parent[members], subtree_actual[members])
+            np.add.at(subtree_expected, self.parent[members], subtree_expected[members])
+        return (regulation_actual, regulation_expected, jurisdiction_actual, jurisdiction_expected,
+                subtree_actual, subtree_expected)
+
+    # --- O(1) reads ---
+
+    def regulation(self, regulation_id: str) -> Dict[str, float]:
+        r = self.engine.regulation_index[regulation_id]
+        return _totals(self.regulation_actual[r], self.regulation_expected[r])
+
+    def jurisdiction(self, jurisdiction: str) -> Dict[str, float]:
+        j = self.jurisdiction_index[jurisdiction]
+        return _totals(self.jurisdiction_actual[j], self.jurisdiction_expected[j])
+
+    def subtree(self, provision_id: str) -> Dict[str, float]:
+        i = self.engine.index[provision_id]
+        return _totals(self.subtree_actual[i], self.subtree_expected[i])
+
+
+def _totals(actual: float, expected: float) -> Dict[str, float]:
+    return {"actual": float(actual), "expected": float(expected), "gap": float(expected - actual)}
+
+
+def _depths(parent: np.ndarray) -> np.ndarray:
+    """Distance from each provision to its root along parent links (vectorized pointer chasing)."""
+    depth = np.zeros(len(parent), dtype=np.int64)
+    current = parent.copy()
+    for _ in range(len(parent) + 1):
+        active = current != _NO_PARENT
+        if not active.any():
+            return depth
+        depth[active] += 1
+        current[active] = parent[current[active]]
+    # Still chasing after len(parent) steps means a cycle in parent_id
+    raise ValueError("parent_id links contain a cycle")
@@ -0,0 +1,191 @@
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from .models import Provision, SpiderwebNode
+
+DEFAULT_STATUS = 0.0 # provisions without a submission count as unmet
+DEFAULT_VALUE = 1.0
+
+
+def spiderweb_scores(provision_index: Mapping[str, int], spiderwebs: Iterable[SpiderwebNode]) -> np.ndarray:
+    """
+    SW(x) = Σ sᵢ·rᵢ over the spiderweb links touching each provision (either end), with weight and
+    risk defaulting to 1. Accumulated with one bincount instead of a per-provision scan of the links.
+    """
+    positions: List[int] = []
+    products: List[float] = []
+    for sw in spiderwebs:
+        s = sw.weight if sw.weight is not None else 1.0
+        r = sw.risk if sw.risk is not None else 1.0
+        for provision_id in {sw.source_provision, sw.target_provision}:
+            i = provision_index.get(provision_id)
+            if i is not None:
+                positions.append(i)
+                products.append(s * r)
+    return np.bincount(np.asarray(positions, dtype=np.int64), weights=np.asarray(products, dtype=np.float64),
+                       minlength=len(provision_index))
+
+
+class ComplianceScoringEngine:
+    """
+    Vectorized R_C / CGD / SW scoring.
+    Provisions are laid out grouped by regulation_id, so every regulation is one contiguous segment
+    and per-regulation sums are a single np.add.reduceat over the provision arrays:
+      rᵢ     = SW(x) of the provision, or 1 when it has no spiderweb links
+      R_C    = Σ rᵢ·cᵢ·vᵢ    (cᵢ: submitted met status in [0, 1], vᵢ: value / criticality)
+      expected = Σ rᵢ·vᵢ     (every provision met)
+      CGD    = expected - R_C
+    The engine keeps the manager's own submissions as status/value arrays (set_status); callers
+    can also pass arrays of shape (N,) or (T, N) to score other organizations / many tenants at once.
+    """
+
+    def __init__(self, provision_ids: List[str], regulation_ids: List[str], segment_starts: np.ndarray,
+                 sw: np.ndarray):
+        self.provision_ids = provision_ids
+        self.index: Dict[str, int] = {pid: i for i, pid in enumerate(provision_ids)}
+        self.regulation_ids = regulation_ids
+        self.regulation_index: Dict[str, int] = {rid: i for i, rid in enumerate(regulation_ids)}
+        self.segment_starts = segment_starts
+        self.segment_ends = np.append(segment_starts[1:], len(provision_ids)).astype(np.int64)
+        self.regulation_of = np.repeat(np.arange(len(regulation_ids), dtype=np.int32), self.segment_ends - segment_starts)
+        self.sw = sw
+        self.risk = np.where(sw > 0, sw, 1.0)
+        self.status = np.full(len(provision_ids), DEFAULT_STATUS)
+        self.value = np.full(len(provision_ids), DEFAULT_VALUE)
+        self._spiderweb_totals: Optional[np.ndarray] = None
+
+    @classmethod
+    def build(cls, provisions: Mapping[str, Provision], spiderwebs: Iterable[SpiderwebNode] = ()) -> "ComplianceScoringEngine":
+        # Group by regulation in first-seen order, keeping load order inside each regulation
+        groups: Dict[str, List[str]] = {}
+        for provision_id in provisions:
+            groups.setdefault(provision_field(provisions, provision_id, "regulation_id"), []).append(provision_id)
+        provision_ids = [pid for members in groups.values() for pid in members]
+        sizes = np.fromiter((len(members) for members in groups.values()), dtype=np.int64, count=len(groups))
+        segment_starts = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64) if len(groups) else np.empty(0, dtype=np.int64)
+        index = {pid: i for i, pid in enumerate(provision_ids)}
+        return cls(provision_ids, list(groups), segment_starts, spiderweb_scores(index, spiderwebs))
+
+    @property
+    def num_provisions(self) -> int:
+        return len(self.provision_ids)
+
+    # --- inputs ---
+
+    def set_status(self, provision_id: str, status: float, value: float = DEFAULT_VALUE) -> int:
+        """Records a submission in the aligned status/value arrays; returns the provision's position."""
+        i = self.index[provision_id]
+        self.status[i] = status
+        self.value[i] = value
+        return i
+
+    def load_statuses(self, compliance_status: Mapping[str, Mapping[str, Any]]):
+        self.status, self.value = self.status_arrays(compliance_status)
+
+    def status_arrays(self, compliance_status: Mapping[str, Mapping[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+        """(cᵢ, vᵢ) arrays from a {provision_id: {"status", "value"}} submission map; unknown IDs are ignored."""
+        status = np.full(self.num_provisions, DEFAULT_STATUS)
+        value = np.full(self.num_provisions, DEFAULT_VALUE)
+        for provision_id, entry in compliance_status.items():
+            i = self.index.get(provision_id)
+            if i is not None:
+                status[i] = entry.get("status", DEFAULT_STATUS)
+                value[i] = entry.get("value", DEFAULT_VALUE)
+        return status, value
+
+    # --- scoring ---
+
+    def segment_sum(self, values: np.ndarray) -> np.ndarray:
+        """Per-regulation sums of a provision-aligned array (last axis), in regulation_ids order."""
+        if self.num_provisions == 0:
+            return np.zeros(values.shape[:-1] + (0,))
+        return np.add.reduceat(values, self.segment_starts, axis=-1)
+
+    def score(self, status: Optional[np.ndarray] = None, value: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """
+        Per-regulation actual R_C, expected R_C, gap (CGD) and SW totals.
+        status/value: (N,) or (T, N) arrays aligned with provision_ids; without arguments the stored
+        submissions are scored. Results have shape (R,) or (T, R), aligned with regulation_ids.
+        """
+        if status is None:
+            status, value = self.status, self.value
+        status = np.asarray(status, dtype=np.float64)
+        weighted = self.risk if value is None else self.risk * np.asarray(value, dtype=np.float64)
+        expected = self.segment_sum(np.broadcast_to(weighted, status.shape))
+        actual = self.segment_sum(weighted * status)
+        return {
+            "actual": actual,
+            "expected": expected,
+            "gap": expected - actual,
+            "spiderweb": self.segment_sum(self.sw),
+        }
+
+    def regulation_score(self, regulation_id: str) -> Dict[str, float]:
+        """Scores one regulation from the stored submissions using only its segment of the arrays."""
+        r = self.regulation_index[regulation_id]
+        segment = slice(int(self.segment_starts[r]), int(self.segment_ends[r]))
+        weighted = self.risk[segment] * self.value[segment]
+        expected = float(weighted.sum())
+        actual = float(weighted @ self.status[segment])
+        return {"actual": actual, "expected": expected, "gap": expected - actual, "spiderweb": float(self.sw[segment].sum())}
+
+    def spiderweb_total(self, regulation_id: str) -> float:
+        """Σ SW(x) over a regulation; static between rebuilds, so precomputed."""
+        if self._spiderweb_totals is None:
+            self._spiderweb_totals = self.segment_sum(self.sw)
+        return float(self._spiderweb_totals[self.regulation_index[regulation_id]])
+
+    def evaluate(self, compliance_status: Optional[Mapping[str, Mapping[str, Any]]] = None) -> Dict[str, Dict[str, float]]:
+        """Scores every regulation; {regulation_id: {actual, expected, gap, spiderweb}}.
+           Uses the stored submissions unless a {provision_id: {"status", "value"}} map is given.
+        """
+        scores = self.score(*self.status_arrays(compliance_status)) if compliance_status is not None else self.score()
+        return {
+            regulation_id: {name: float(column[r]) for name, column in scores.items()}
+            for r, regulation_id in enumerate(self.regulation_ids)
+        }
+
+    def evaluate_tenants(self, submissions: Mapping[str, Mapping[str, Mapping[str, Any]]]) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """Scores many organizations in one pass: {tenant: {regulation_id: {actual, expected, gap, spiderweb}}}."""
+        tenants = list(submissions)
+        status = np.full((len(tenants), self.num_provisions), DEFAULT_STATUS)
+        value = np.full((len(tenants), self.num_provisions), DEFAULT_VALUE)
+        for t, tenant in enumerate(tenants):
+            status[t], value[t] = self.status_arrays(submissions[tenant])
+        scores = self.score(status, value)
+        spiderweb = scores.pop("spiderweb")
+        return {
+            tenant: {
+                regulation_id: dict({name: float(column[t, r]) for name, column in scores.items()}, spiderweb=float(spiderweb[r]))
+                for r, regulation_id in enumerate(self.regulation_ids)
+            }
+            for t, tenant in enumerate(tenants)
+        }
+
+    def provision_detail(self, regulation_id: str) -> List[Dict[str, Any]]:
+        """Per-provision rᵢ, cᵢ, vᵢ and rᵢ·cᵢ·vᵢ for one regulation (the explainable part of R_C)."""
+        r = self.regulation_index[regulation_id]
+        start, end = int(self.segment_starts[r]), int(self.segment_ends[r])
+        risk, status, value = self.risk[start:end], self.status[start:end], self.value[start:end]
+        score = risk * status * value
+        gap = risk * value - score
+        return [
+            {
+                "provision_id": self.provision_ids[start + i],
+                "compliance_status": float(status[i]),
+                "value": float(value[i]),
+                "spiderweb_risk": float(risk[i]),
+                "score": float(score[i]),
+                "gap": float(gap[i]),
+            }
+            for i in range(end - start)
+        ]
+
+
+def provision_field(provisions: Mapping[str, Provision], provision_id: str, field: str) -> Any:
+    # The columnar store reads a single column instead of building the model
+    field_value = getattr(provisions, "field_value", None)
+    if field_value is not None:
+        return field_value(provision_id, field)
+    return getattr(provisions[provision_id], field)
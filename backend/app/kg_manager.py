@@ -1,11 +1,23 @@
-import yaml
-from typing import List, Optional, Dict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, List, Optional, Dict, MutableMapping
 # Import all models needed
 from .models import (
     KnowledgeNode, Pillar, # Keep old ones temporarily if needed elsewhere?
     Regulation, Provision, Role, Expert,
     SpiderwebNode, HoneycombNode, OctopusNode, RegulatoryAxis
 )
+from .provision_index import ProvisionIndex
+from .provision_graph import PROVISION_VERTEX, ProvisionGraph
+from .pathway import PathwayFinder, edge_type_codes
+from .compliance import ComplianceMaskIndex
+from .compliance_scoring import ComplianceScoringEngine
+from .compliance_aggregates import ComplianceAggregates
+from .search_index import SearchIndex
+from .vector_index import ProvisionVectorIndex
+from .provision_store import ColumnarProvisionStore, make_provision_store
+from .kg_snapshot import SNAPSHOT_FIELDS, read_snapshot, write_snapshot
+from .regulation_stream import iter_regulation_hierarchy
+from .yaml_loader import SafeLoader, load_yaml_file
 
 class KnowledgeGraphManager:
     def __init__(self, 
@@ -13,10 +25,16 @@ class KnowledgeGraphManager:
                  provisions_path: str, 
                  roles_path: str, # Add roles path
                  experts_path: str, # Add experts path
-                 mappings_path: Optional[str] = None):
+                 mappings_path: Optional[str] = None,
+                 regulation_hierarchy_path: Optional[str] = None, # Hierarchical 4D file (regulations.yaml)
+                 snapshot_path: Optional[str] = None, # Optional compiled snapshot (see kg_snapshot.py)
+                 parallel_load: bool = False, # Parse source files concurrently in a process pool
+                 load_workers: Optional[int] = None,
+                 storage_backend: str = "dict"): # "dict" (Provision objects) or "columnar" (see provision_store.py)
         # Updated storage for specific types
+        self.storage_backend = storage_backend
         self.regulations: Dict[str, Regulation] = {}
-        self.provisions: Dict[str, Provision] = {}
+        self.provisions: MutableMapping[str, Provision] = make_provision_store(storage_backend)
         self.roles: Dict[str, Role] = {}
         self.experts: Dict[str, Expert] = {}
         self.spiderwebs: Dict[str, SpiderwebNode] = {}
@@ -24,156 +42,300 @@ class KnowledgeGraphManager:
         self.octopuses: Dict[str, OctopusNode] = {}
         # Consider a compliance status store if needed
         self.compliance_status: Dict[str, Dict] = {} # {provision_id: {"status": float, "value": float}}
-        
-        # Load all data sources
-        self.load_regulations(regulations_path)
-        self.load_roles(roles_path) # Load roles before provisions that might reference them
-        self.load_experts(experts_path) # Load experts before provisions
-        self.load_provisions_and_others(provisions_path) # Now load provisions
-        if mappings_path:
-            self.load_mappings(mappings_path)
-            
-        # Link roles/experts back to provisions
-        self._link_entities()
 
-    def load_regulations(self, file_path: str):
+        source_paths = {
+            "regulations": regulations_path,
+            "provisions": provisions_path,
+            "roles": roles_path,
+            "experts": experts_path,
+            "mappings": mappings_path,
+            "regulation_hierarchy": regulation_hierarchy_path,
+        }
+        if not (snapshot_path and self._load_snapshot(snapshot_path, source_paths)):
+            if parallel_load:
+                self._load_sources_parallel(source_paths, load_workers)
+            else:
+                # Load all data sources
+                self.load_regulations(regulations_path)
+                if regulation_hierarchy_path:
+                    self.load_regulation_hierarchy(regulation_hierarchy_path)
+                self.load_roles(roles_path) # Load roles before provisions that might reference them
+                self.load_experts(experts_path) # Load experts before provisions
+                self.load_provisions_and_others(provisions_path) # Now load provisions
+                if mappings_path:
+                    self.load_mappings(mappings_path)
+
+            # Link roles/experts back to provisions
+            self._link_entities()
+
+            if snapshot_path:
+                self._save_snapshot(snapshot_path, source_paths)
+
+        # Build secondary indexes once role names have been resolved to IDs
+        self.provision_index = ProvisionIndex.build(self.provisions.values())
+        # Compliance-tag bitmasks (from crosswalks / axis8) for visibility filtering
+        self.compliance_masks = ComplianceMaskIndex.build(self.provisions.values())
+        # Full-text index over provision titles/text and regulation descriptions (for /search)
+        self.search_index = SearchIndex.build(self.provisions.values(), self.regulations.values())
+        # Dense hashed TF-IDF vectors for semantic retrieval (planner grounding, /search/semantic)
+        self.vector_index = ProvisionVectorIndex.build(self.provisions.values())
+        self.build_provision_graph()
+        self.build_compliance_scoring()
+
+    def build_provision_graph(self):
+        """(Re)builds the CSR adjacency over provisions from the Spiderweb/Honeycomb/Octopus stores."""
+        self.provision_graph = ProvisionGraph.build(
+            self.provisions.keys(),
+            self.spiderwebs.values(),
+            self.honeycombs.values(),
+            self.octopuses.values()
+        )
+        self.pathway_finder = PathwayFinder(self.provision_graph)
+
+    def build_compliance_scoring(self):
+        """(Re)builds the regulation-grouped scoring arrays and reloads submitted statuses into them."""
+        self.compliance_scoring = ComplianceScoringEngine.build(self.provisions, self.spiderwebs.values())
+        self.compliance_scoring.load_statuses(self.compliance_status)
+        self.compliance_aggregates = ComplianceAggregates.build(self.compliance_scoring, self.provisions)
+
+    def _load_sources_parallel(self, source_paths: Dict[str, Optional[str]], max_workers: Optional[int] = None):
+        """Parses the independent YAML files concurrently in worker processes, then ingests them here
+           in the same dependency order as the sequential path. The hierarchy file is streamed in this
+           process while the workers are still parsing, so wall time is roughly that of the largest file.
+        """
+        parse_names = ("regulations", "roles", "experts", "provisions", "mappings")
+        paths = {name: source_paths[name] for name in parse_names if source_paths.get(name)}
+        with ProcessPoolExecutor(max_workers=max_workers or len(paths)) as pool:
+            futures = {name: pool.submit(load_yaml_file, path) for name, path in paths.items()}
+
+            def parsed(name: str) -> Any:
+                try:
+                    return futures[name].result()
+                except Exception as e:
+                    return e # Handed to the loader, which reports it like a local parse error
+
+            self.load_regulations(source_paths["regulations"], data=parsed("regulations"))
+            if source_paths.get("regulation_hierarchy"):
+                self.load_regulation_hierarchy(source_paths["regulation_hierarchy"])
+            self.load_roles(source_paths["roles"], data=parsed("roles"))
+            self.load_experts(source_paths["experts"], data=parsed("experts"))
+            self.load_provisions_and_others(source_paths["provisions"], data=parsed("provisions"))
+            if "mappings" in paths:
+                self.load_mappings(source_paths["mappings"], data=parsed("mappings"))
+
+    # --- Snapshot cache (skips YAML parsing and model validation on later starts) ---
+    def _load_snapshot(self, snapshot_path: str, source_paths: Dict[str, Optional[str]]) -> bool:
         try:
-            with open(file_path, 'r') as f:
-                data = yaml.safe_load(f)
-                loaded_count = 0
-                skipped_count = 0
-                for item in data.get('pillars', []): 
-                    item_id = item.get('id')
-                    # Skip items without a valid ID
-                    if not item_id or not isinstance(item_id, str):
-                        print(f"Warning: Skipping regulation entry due to missing/invalid ID: {item}")
-                        skipped_count += 1
-                        continue
-                        
-                    # Map fields from Pillar structure to Regulation model
-                    try:
-                        reg = Regulation(
-                            id=item_id,
-                            title=item.get('name', 'Unnamed Regulation'), 
-                            description=item.get('description'), # Correct field name
-                            # Assuming a field like 'domain' or 'category' maps to 'pillar'
-                            # !! Adjust 'item.get(...)' key if your YAML uses a different field name for pillar
-                            pillar=item.get('pillar') or item.get('domain') or item.get('category', 'Unknown Pillar'), 
-                            jurisdiction=item.get('jurisdiction', 'Universal'), 
-                            location_code=item.get('location_code'), # Add mapping if available
-                            effective_date=item.get('effective_date'), # Add mapping if available
-                            provisions=[] # Initialize empty provisions list
-                        )
-                        self.regulations[reg.id] = reg
-                        loaded_count += 1
-                    except Exception as validation_error:
-                        print(f"Warning: Skipping regulation entry ID '{item_id}' due to validation error: {validation_error}")
-                        skipped_count += 1
-                        
-                print(f"Regulations loaded: {loaded_count}, skipped: {skipped_count}")
+            state = read_snapshot(snapshot_path, source_paths)
+        except Exception as e:
+            print(f"Warning: Could not read knowledge graph snapshot {snapshot_path}: {e}")
+            return False
+        if state is None:
+            return False
+        for field in SNAPSHOT_FIELDS:
+            setattr(self, field, state.get(field, {}))
+        # The snapshot may have been written by a process using the other storage backend
+        if (self.storage_backend == "columnar") != isinstance(self.provisions, ColumnarProvisionStore):
+            store = make_provision_store(self.storage_backend)
+            store.update(self.provisions)
+            self.provisions = store
+        print(f"Knowledge graph loaded from snapshot {snapshot_path}: {len(self.regulations)} regulations, {len(self.provisions)} provisions")
+        return True
+
+    def _save_snapshot(self, snapshot_path: str, source_paths: Dict[str, Optional[str]]):
+        try:
+            write_snapshot(snapshot_path, {field: getattr(self, field) for field in SNAPSHOT_FIELDS}, source_paths)
+            print(f"Knowledge graph snapshot written to {snapshot_path}")
+        except Exception as e:
+            print(f"Warning: Could not write knowledge graph snapshot {snapshot_path}: {e}")
+
+    def load_regulations(self, file_path: str, data: Optional[Any] = None):
+        try:
+            if data is None:
+                data = load_yaml_file(file_path)
+            elif isinstance(data, Exception):
+                raise data # Parse error from a pipeline worker; reported below like a local one
+            loaded_count = 0
+            skipped_count = 0
+            for item in data.get('pillars', []): 
+                item_id = item.get('id')
+                # Skip items without a valid ID
+                if not item_id or not isinstance(item_id, str):
+                    print(f"Warning: Skipping regulation entry due to missing/invalid ID: {item}")
+                    skipped_count += 1
+                    continue
+                    
+                # Map fields from Pillar structure to Regulation model
+                try:
+                    reg = Regulation(
+                        id=item_id,
+                        title=item.get('name', 'Unnamed Regulation'), 
+                        description=item.get('description'), # Correct field name
+                        # Assuming a field like 'domain' or 'category' maps to 'pillar'
+                        # !! Adjust 'item.get(...)' key if your YAML uses a different field name for pillar
+                        pillar=item.get('pillar') or item.get('domain') or item.get('category', 'Unknown Pillar'), 
+                        jurisdiction=item.get('jurisdiction', 'Universal'), 
+                        location_code=item.get('location_code'), # Add mapping if available
+                        effective_date=item.get('effective_date'), # Add mapping if available
+                        provisions=[] # Initialize empty provisions list
+                    )
+                    self.regulations[reg.id] = reg
+                    loaded_count += 1
+                except Exception as validation_error:
+                    print(f"Warning: Skipping regulation entry ID '{item_id}' due to validation error: {validation_error}")
+                    skipped_count += 1
+                    
+            print(f"Regulations loaded: {loaded_count}, skipped: {skipped_count}")
         except FileNotFoundError:
             print(f"Warning: Regulations file (expecting pillars) not found at {file_path}")
         except Exception as e:
             print(f"Error loading regulations (from pillars) from {file_path}: {e}")
             
-    def load_roles(self, file_path: str):
+    def load_regulation_hierarchy(self, file_path: str):
+        """Streams the nested Pillars -> Branches -> ... -> Nodes tree (see regulation_stream.py).
+           Pillars become Regulations; every element below becomes a Provision with parent_id/hierarchy_level set.
+           The file's SpiderWeb/Honeycomb/Octopus node sections are loaded into the mapping stores.
+        """
+        regulations_count = 0
+        provisions_count = 0
+        mapping_nodes_count = 0
+        try:
+            for item in iter_regulation_hierarchy(file_path, loader=SafeLoader, include_mappings=True):
+                if isinstance(item, SpiderwebNode):
+                    self.spiderwebs[item.id] = item
+                    mapping_nodes_count += 1
+                    continue
+                if isinstance(item, HoneycombNode):
+                    self.honeycombs[item.id] = item
+                    mapping_nodes_count += 1
+                    continue
+                if isinstance(item, OctopusNode):
+                    self.octopuses[item.id] = item
+                    mapping_nodes_count += 1
+                    continue
+                if isinstance(item, Regulation):
+                    if item.id in self.regulations:
+                        print(f"Warning: Regulation ID '{item.id}' from {file_path} already loaded. Merging provisions into it.")
+                    else:
+                        self.regulations[item.id] = item
+                        regulations_count += 1
+                    continue
+                if item.id in self.provisions:
+                    print(f"Warning: Skipping duplicate provision ID '{item.id}' in {file_path}")
+                    continue
+                self.provisions[item.id] = item
+                self.regulations[item.regulation_id].provisions.append(item.id)
+                provisions_count += 1
+            print(f"Regulation hierarchy loaded: {regulations_count} regulations, {provisions_count} provisions, {mapping_nodes_count} mapping nodes")
+        except FileNotFoundError:
+            print(f"Warning: Regulation hierarchy file not found at {file_path}")
+        except Exception as e:
+            print(f"Error loading regulation hierarchy from {file_path}: {e}")
+
+    def load_roles(self, file_path: str, data: Optional[Any] = None):
         try:
-            with open(file_path, 'r') as f:
-                data = yaml.safe_load(f)
-                for item in data.get('roles', []):
-                    # Ensure provisions list is initialized if not present in YAML
-                    item['provisions'] = item.get('provisions', []) 
-                    role = Role(**item)
-                    if role.id:
-                        self.roles[role.id] = role
+            if data is None:
+                data = load_yaml_file(file_path)
+            elif isinstance(data, Exception):
+                raise data # Parse error from a pipeline worker; reported below like a local one
+            for item in data.get('roles', []):
+                # Ensure provisions list is initialized if not present in YAML
+                item['provisions'] = item.get('provisions', []) 
+                role = Role(**item)
+                if role.id:
+                    self.roles[role.id] = role
         except FileNotFoundError:
             print(f"Warning: Roles file not found at {file_path}")
         except Exception as e:
             print(f"Error loading roles from {file_path}: {e}")
 
-    def load_experts(self, file_path: str):
+    def load_experts(self, file_path: str, data: Optional[Any] = None):
         try:
-            with open(file_path, 'r') as f:
-                data = yaml.safe_load(f)
-                for item in data.get('experts', []):
-                     # Ensure provisions list is initialized if not present in YAML
-                    item['provisions'] = item.get('provisions', [])
-                    expert = Expert(**item)
-                    if expert.id:
-                        self.experts[expert.id] = expert
+            if data is None:
+                data = load_yaml_file(file_path)
+            elif isinstance(data, Exception):
+                raise data # Parse error from a pipeline worker; reported below like a local one
+            for item in data.get('experts', []):
+                 # Ensure provisions list is initialized if not present in YAML
+                item['provisions'] = item.get('provisions', [])
+                expert = Expert(**item)
+                if expert.id:
+                    self.experts[expert.id] = expert
         except FileNotFoundError:
             print(f"Warning: Experts file not found at {file_path}")
         except Exception as e:
             print(f"Error loading experts from {file_path}: {e}")
             
-    def load_provisions_and_others(self, file_path: str):
+    def load_provisions_and_others(self, file_path: str, data: Optional[Any] = None):
         try:
-            with open(file_path, 'r') as f:
-                data = yaml.safe_load(f)
-                for item in data.get('nodes', []): 
-                    axes = item.get('axes', {})
-                    metadata = item.get('metadata', {})
-                    
-                    axis7_val = axes.get('axis7')
-                    axis8_val = axes.get('axis8')
-                    axis13_dict = axes.get('axis13', {})
-                    tags_val = axis13_dict.get('tags') if isinstance(axis13_dict, dict) else axis13_dict
-                    # Extract potential roles from axis12
-                    axis12_val = axes.get('axis12')
-                    potential_roles = [axis12_val] if isinstance(axis12_val, str) else (axis12_val if isinstance(axis12_val, list) else [])
-                    # !! IMPORTANT: Need a way to map role NAMES from axis12 (e.g., "Theoretical Physicist") 
-                    # to actual Role IDs (e.g., "ROLE_TP") loaded from roles.yaml.
-                    # For now, we store the names from axis12 but this needs refinement.
-                    # Ideally, nodes.yaml would use Role IDs directly in axis12.
-                    roles_responsible_names = potential_roles # Store names for now
-
-                    octopus_refs = [axis7_val] if isinstance(axis7_val, str) else (axis7_val if isinstance(axis7_val, list) else [])
-                    crosswalks = [axis8_val] if isinstance(axis8_val, str) else (axis8_val if isinstance(axis8_val, list) else [])
-                    tags = [tags_val] if isinstance(tags_val, str) else (tags_val if isinstance(tags_val, list) else [])
-
-                    prov = Provision(
-                        id=item.get('node_id'), 
-                        regulation_id=item.get('pillar_id'), 
-                        title=item.get('label', 'Untitled Provision'), 
-                        text=item.get('description', ''), 
-                        section=axes.get('axis3'),
-                        parent_id=item.get('parent_id'),
-                        jurisdiction=item.get('jurisdiction', self.regulations.get(item.get('pillar_id')).jurisdiction if item.get('pillar_id') in self.regulations else 'Universal'),
-                        hierarchy_level=axes.get('axis4'),
-                        octopus_refs=octopus_refs, 
-                        crosswalks=crosswalks, 
-                        tags=tags,
-                        # Store the names for now - TODO: map names to IDs
-                        roles_responsible=roles_responsible_names, 
-                        spiderweb_links=[],
-                        metadata=metadata
-                    )
+            if data is None:
+                data = load_yaml_file(file_path)
+            elif isinstance(data, Exception):
+                raise data # Parse error from a pipeline worker; reported below like a local one
+            for item in data.get('nodes', []): 
+                axes = item.get('axes', {})
+                metadata = item.get('metadata', {})
+                
+                axis7_val = axes.get('axis7')
+                axis8_val = axes.get('axis8')
+                axis13_dict = axes.get('axis13', {})
+                tags_val = axis13_dict.get('tags') if isinstance(axis13_dict, dict) else axis13_dict
+                # Extract potential roles from axis12
+                axis12_val = axes.get('axis12')
+                potential_roles = [axis12_val] if isinstance(axis12_val, str) else (axis12_val if isinstance(axis12_val, list) else [])
+                # !! IMPORTANT: Need a way to map role NAMES from axis12 (e.g., "Theoretical Physicist") 
+                # to actual Role IDs (e.g., "ROLE_TP") loaded from roles.yaml.
+                # For now, we store the names from axis12 but this needs refinement.
+                # Ideally, nodes.yaml would use Role IDs directly in axis12.
+                roles_responsible_names = potential_roles # Store names for now
 
-                    # Basic validation/cleanup
-                    if prov.hierarchy_level is not None:
-                        try:
-                            prov.hierarchy_level = int(prov.hierarchy_level)
-                        except (ValueError, TypeError):
-                            print(f"Warning: Provision {prov.id} has non-integer hierarchy_level: {prov.hierarchy_level}. Setting to None.")
-                            prov.hierarchy_level = None
-                        
-                    if prov.id and prov.regulation_id:
-                        self.provisions[prov.id] = prov
-                        if prov.regulation_id in self.regulations:
-                            if not hasattr(self.regulations[prov.regulation_id], 'provisions') or self.regulations[prov.regulation_id].provisions is None:
-                                self.regulations[prov.regulation_id].provisions = []
-                            self.regulations[prov.regulation_id].provisions.append(prov.id)
-                            
-                        # --- Link Roles/Experts to this Provision --- 
-                        # Find Role IDs corresponding to the names found in axis12
-                        # This requires a lookup map (name -> ID) or filtering roles by name
-                        # For now, this step is skipped - needs name-to-ID mapping logic
-                        # role_ids_for_provision = self._map_role_names_to_ids(roles_responsible_names)
-                        # for role_id in role_ids_for_provision:
-                        #    if role_id in self.roles and prov.id not in self.roles[role_id].provisions:
-                        #        self.roles[role_id].provisions.append(prov.id)
+                octopus_refs = [axis7_val] if isinstance(axis7_val, str) else (axis7_val if isinstance(axis7_val, list) else [])
+                crosswalks = [axis8_val] if isinstance(axis8_val, str) else (axis8_val if isinstance(axis8_val, list) else [])
+                tags = [tags_val] if isinstance(tags_val, str) else (tags_val if isinstance(tags_val, list) else [])
+
+                prov = Provision(
+                    id=item.get('node_id'), 
+                    regulation_id=item.get('pillar_id'), 
+                    title=item.get('label', 'Untitled Provision'), 
+                    text=item.get('description', ''), 
+                    section=axes.get('axis3'),
+                    parent_id=item.get('parent_id'),
+                    jurisdiction=item.get('jurisdiction', self.regulations.get(item.get('pillar_id')).jurisdiction if item.get('pillar_id') in self.regulations else 'Universal'),
+                    hierarchy_level=axes.get('axis4'),
+                    octopus_refs=octopus_refs, 
+                    crosswalks=crosswalks, 
+                    tags=tags,
+                    # Store the names for now - TODO: map names to IDs
+                    roles_responsible=roles_responsible_names, 
+                    spiderweb_links=[],
+                    metadata=metadata
+                )
+
+                # Basic validation/cleanup
+                if prov.hierarchy_level is not None:
+                    try:
+                        prov.hierarchy_level = int(prov.hierarchy_level)
+                    except (ValueError, TypeError):
+                        print(f"Warning: Provision {prov.id} has non-integer hierarchy_level: {prov.hierarchy_level}. Setting to None.")
+                        prov.hierarchy_level = None
+                    
+                if prov.id and prov.regulation_id:
+                    self.provisions[prov.id] = prov
+                    if prov.regulation_id in self.regulations:
+                        if not hasattr(self.regulations[prov.regulation_id], 'provisions') or self.regulations[prov.regulation_id].provisions is None:
+                            self.regulations[prov.regulation_id].provisions = []
+                        self.regulations[prov.regulation_id].provisions.append(prov.id)
                         
-                        # TODO: Add similar logic for linking Experts based on provision fields/axes if needed
+                    # --- Link Roles/Experts to this Provision --- 
+                    # Find Role IDs corresponding to the names found in axis12
+                    # This requires a lookup map (name -> ID) or filtering roles by name
+                    # For now, this step is skipped - needs name-to-ID mapping logic
+                    # role_ids_for_provision = self._map_role_names_to_ids(roles_responsible_names)
+                    # for role_id in role_ids_for_provision:
+                    #    if role_id in self.roles and prov.id not in self.roles[role_id].provisions:
+                    #        self.roles[role_id].provisions.append(prov.id)
+                    
+                    # TODO: Add similar logic for linking Experts based on provision fields/axes if needed
 
         except FileNotFoundError:
             print(f"Warning: Provisions file (expecting nodes) not found at {file_path}")
@@ -225,27 +387,31 @@ class KnowledgeGraphManager:
             if role_ids_for_provision:
                  provision.roles_responsible = role_ids_for_provision
                  provisions_linked_count += 1
+            # Write back: the columnar backend hands out copies rather than stored objects
+            self.provisions[provision.id] = provision
             # else: provision.roles_responsible remains an empty list if no mapping occurred
             
         print(f"Entity linking complete. Provisions updated with Role IDs: {provisions_linked_count}. Roles updated with Provision IDs: {roles_updated_count}.")
         
         # TODO: Add similar logic for Experts if they need linking based on provision data
 
-    def load_mappings(self, file_path: str):
+    def load_mappings(self, file_path: str, data: Optional[Any] = None):
         # Load Spiderweb, Honeycomb, Octopus nodes - assuming keys in YAML
         try:
-            with open(file_path, 'r') as f:
-                data = yaml.safe_load(f)
-                for item in data.get('spiderwebs', []):
-                    node = SpiderwebNode(**item)
-                    self.spiderwebs[node.id] = node
-                    # Optionally link back to provisions here if needed
-                for item in data.get('honeycombs', []):
-                    node = HoneycombNode(**item)
-                    self.honeycombs[node.id] = node
-                for item in data.get('octopuses', []):
-                    node = OctopusNode(**item)
-                    self.octopuses[node.id] = node
+            if data is None:
+                data = load_yaml_file(file_path)
+            elif isinstance(data, Exception):
+                raise data # Parse error from a pipeline worker; reported below like a local one
+            for item in data.get('spiderwebs', []):
+                node = SpiderwebNode(**item)
+                self.spiderwebs[node.id] = node
+                # Optionally link back to provisions here if needed
+            for item in data.get('honeycombs', []):
+                node = HoneycombNode(**item)
+                self.honeycombs[node.id] = node
+            for item in data.get('octopuses', []):
+                node = OctopusNode(**item)
+                self.octopuses[node.id] = node
         except FileNotFoundError:
             print(f"Warning: Mappings file not found at {file_path}")
         except Exception as e:
@@ -271,6 +437,177 @@ class KnowledgeGraphManager:
     def get_all_provisions(self) -> List[Provision]:
         return list(self.provisions.values())
         
+    def get_provision_mapping(self, provision_id: str, hops: int = 1) -> Optional[Dict[str, Any]]:
+        """Links, crosswalks, domains and responsible parties of a provision (for /mapping/provision/{id}).
+           Mapping nodes are found through the provision graph, so the cost follows the provision's degree.
+        """
+        provision = self.get_provision_by_id(provision_id)
+        if provision is None and provision_id not in self.provision_graph:
+            return None
+        neighbors = self.provision_graph.neighbors(provision_id)
+        edge_ids = {kind: [] for kind in ("spiderweb", "honeycomb", "octopus")}
+        for neighbor in neighbors:
+            if neighbor["edge_id"] not in edge_ids[neighbor["edge_type"]]:
+                edge_ids[neighbor["edge_type"]].append(neighbor["edge_id"])
+        role_ids = provision.roles_responsible if provision else []
+        network = self.provision_graph.k_hop(provision_id, hops) if hops > 0 else {}
+        return {
+            "provision_id": provision_id,
+            "provision": provision,
+            "spiderwebs": [self.spiderwebs[i] for i in edge_ids["spiderweb"] if i in self.spiderwebs],
+            "honeycombs": [self.honeycombs[i] for i in edge_ids["honeycomb"] if i in self.honeycombs],
+            "octopuses": [self.octopuses[i] for i in edge_ids["octopus"] if i in self.octopuses],
+            "roles": [self.roles[r] for r in role_ids if r in self.roles],
+            "experts": [e for e in self.experts.values() if provision_id in e.provisions or e.role_id in role_ids],
+            "neighbors": neighbors,
+            "network": [{"node_id": node_id, "hops": hop} for node_id, hop in sorted(network.items(), key=lambda item: (item[1], item[0]))],
+        }
+
+    def find_pathways(self,
+                      source_id: str,
+                      target_id: Optional[str] = None,
+                      k: int = 1,
+                      method: str = "bidirectional",
+                      edge_types: Optional[List[str]] = None,
+                      axes: Optional[List[str]] = None,
+                      limit: int = 10) -> Optional[List[Dict[str, Any]]]:
+        """Cheapest compliance pathways from a provision (for /dynamic/pathway/{prov_id}).
+           With a target, up to k pathways to it in cost order; without one, pathways to the
+           `limit` closest provisions. Each node is annotated with its jurisdiction where known.
+           Returns None if the source (or target) is not in the provision graph.
+        """
+        if source_id not in self.provision_graph or (target_id is not None and target_id not in self.provision_graph):
+            return None
+        codes = edge_type_codes(edge_types)
+        if target_id is None:
+            pathways = self.pathway_finder.nearest(source_id, limit=limit, edge_types=codes, axes=axes)
+        else:
+            pathways = self.pathway_finder.k_shortest_paths(source_id, target_id, k=k, method=method, edge_types=codes, axes=axes)
+        for pathway in pathways:
+            pathway["jurisdictions"] = [
+                self.provisions[node_id].jurisdiction if node_id in self.provisions else None
+                for node_id in pathway["nodes"]
+            ]
+        return pathways
+
+    # --- Compliance scoring (R_C, CGD, SW) ---
+
+    def submit_compliance_status(self, provision_id: str, status: float, value: float = 1.0) -> Optional[Dict[str, Any]]:
+        """Records a provision's met status (0-1) and value; returns None for an unknown provision."""
+        if provision_id not in self.compliance_scoring.index:
+            return None
+        self.compliance_status[provision_id] = {"status": status, "value": value}
+        self.compliance_aggregates.apply(provision_id, status, value)
+        return {"provision_id": provision_id, "status": status, "value": value}
+
+    def evaluate_regulation_compliance(self, regulation_id: str, include_detail: bool = True) -> Optional[Dict[str, Any]]:
+        """R_C(x) = Σ rᵢ·cᵢ·vᵢ for a regulation, read from the maintained aggregates, optionally with
+           the per-provision terms."""
+        if regulation_id not in self.compliance_scoring.regulation_index:
+            return None if regulation_id not in self.regulations else {
+                "regulation_id": regulation_id, "total_score": 0.0, "expected_score": 0.0, "spiderweb_score": 0.0, "detail": []}
+        totals = self.compliance_aggregates.regulation(regulation_id)
+        return {
+            "regulation_id": regulation_id,
+            "total_score": totals["actual"],
+            "expected_score": totals["expected"],
+            "spiderweb_score": self.compliance_scoring.spiderweb_total(regulation_id),
+            "detail": self.compliance_scoring.provision_detail(regulation_id) if include_detail else [],
+        }
+
+    def compliance_gap(self, regulation_id: str, include_detail: bool = True) -> Optional[Dict[str, Any]]:
+        """CGD(x) = R_C expected (all provisions met) - R_C actual, optionally with the provisions still open."""
+        if regulation_id not in self.compliance_scoring.regulation_index:
+            return None if regulation_id not in self.regulations else {
+                "regulation_id": regulation_id, "gap": 0.0, "expected": 0.0, "actual": 0.0, "unmet": []}
+        totals = self.compliance_aggregates.regulation(regulation_id)
+        unmet = [item for item in self.compliance_scoring.provision_detail(regulation_id) if item["gap"] > 0] if include_detail else []
+        return dict(regulation_id=regulation_id, **totals, unmet=unmet)
+
+    def jurisdiction_compliance(self, jurisdiction: str) -> Optional[Dict[str, Any]]:
+        """Maintained R_C / CGD totals across all provisions of a jurisdiction."""
+        if jurisdiction not in self.compliance_aggregates.jurisdiction_index:
+            return None
+        return dict(jurisdiction=jurisdiction, **self.compliance_aggregates.jurisdiction(jurisdiction))
+
+    def provision_compliance_rollup(self, provision_id: str) -> Optional[Dict[str, Any]]:
+        """Maintained R_C / CGD totals for a provision and everything below it in the parent_id tree."""
+        if provision_id not in self.compliance_scoring.index:
+            return None
+        return dict(provision_id=provision_id, **self.compliance_aggregates.subtree(provision_id))
+
+    def check_compliance_aggregates(self) -> List[Dict[str, Any]]:
+        """Mismatches between the maintained aggregates and a full recompute (empty when consistent)."""
+        return self.compliance_aggregates.check()
+
+    def update_provision(self, provision: Provision):
+        """Adds or replaces a provision and refreshes everything derived from it:
+           - the indexes that support in-place updates (secondary, compliance-mask, full-text, vector)
+           - Regulation.provisions and the scoring arrays, whose regulation segments depend on the
+             provision set, when the ID is new or its regulation_id changed
+           - the R_C aggregates when its parent_id or jurisdiction changed
+           - the provision graph when the ID is new to it or its mapping refs changed
+           Changes are detected against the derived structures themselves, so a provision edited in
+           place and passed back is refreshed too."""
+        previous = self.provisions.get(provision.id)
+        self.provisions[provision.id] = provision
+        self.provision_index.update(provision)
+        self.compliance_masks.update(provision)
+        self.search_index.update_provision(provision)
+        self.vector_index.update(provision)
+
+        placement = self.compliance_aggregates.placement(provision.id)
+        old_regulation_id = placement[0] if placement is not None else None
+        if old_regulation_id != provision.regulation_id:
+            old_regulation = self.regulations.get(old_regulation_id)
+            if old_regulation is not None and provision.id in old_regulation.provisions:
+                old_regulation.provisions.remove(provision.id)
+            regulation = self.regulations.get(provision.regulation_id)
+            if regulation is not None and provision.id not in regulation.provisions:
+                regulation.provisions.append(provision.id)
+
+        refs_changed = previous is not None and previous is not provision and any(
+            getattr(previous, field) != getattr(provision, field) for field in ("spiderweb_links", "octopus_refs"))
+        in_graph = self.provision_graph.vertex_kind[self.provision_graph.vertex_index[provision.id]] == PROVISION_VERTEX \
+            if provision.id in self.provision_graph else False
+        if not in_graph or refs_changed:
+            self.build_provision_graph()
+
+        if placement is None or old_regulation_id != provision.regulation_id:
+            self.build_compliance_scoring()
+        elif placement[1:] != (self.compliance_aggregates.parent_position(provision.id, provision.parent_id), provision.jurisdiction):
+            self.compliance_aggregates = ComplianceAggregates.build(self.compliance_scoring, self.provisions)
+
+    def search(self,
+               query: str,
+               limit: int = 20,
+               offset: int = 0,
+               kinds: Optional[List[str]] = None,
+               regulation_id: Optional[str] = None,
+               user_compliance_tags: Optional[List[str]] = None
+              ) -> Dict[str, Any]:
+        """BM25-ranked full-text search over provisions and regulations (see search_index.py).
+           With user_compliance_tags, restricted provisions are hidden before ranking and paging."""
+        visibility = None
+        if user_compliance_tags is not None:
+            visibility = lambda ids: self.compliance_masks.visible_mask(ids, user_compliance_tags)
+        return self.search_index.search(query, limit=limit, offset=offset, kinds=kinds,
+                                        regulation_id=regulation_id, visibility=visibility)
+
+    def related_provisions(self,
+                           query: str,
+                           k: int = 5,
+                           method: str = "exact",
+                           exclude_ids: Optional[List[str]] = None
+                          ) -> List[Dict[str, Any]]:
+        """Provisions most similar to free text (cosine over the vector index), best first.
+           method is "exact" (brute force) or "ivf" (approximate)."""
+        hits = self.vector_index.search(query, k=k, method=method, exclude_ids=exclude_ids)
+        for hit in hits:
+            provision = self.provisions[hit["id"]]
+            hit.update(title=provision.title, regulation_id=provision.regulation_id)
+        return hits
+
     # --- Updated Query Method ---
         
     def query_provisions(self, 
@@ -279,48 +616,38 @@ class KnowledgeGraphManager:
                            tag: Optional[str] = None,
                            role_id: Optional[str] = None,
                            min_confidence: Optional[float] = None,
-                           compliance_tag: Optional[str] = None
+                           compliance_tag: Optional[str] = None,
+                           user_compliance_tags: Optional[List[str]] = None
                           ) -> List[Provision]:
-        """Query provisions based on various criteria including confidence and compliance tags."""
-        matches = list(self.provisions.values())
-        if regulation_id:
-            matches = [p for p in matches if p.regulation_id == regulation_id]
-        if jurisdiction:
-            matches = [p for p in matches if p.jurisdiction == jurisdiction]
-        if tag:
-            matches = [p for p in matches if p.tags and tag in p.tags]
-        if role_id:
-            matches = [p for p in matches if p.roles_responsible and role_id in p.roles_responsible]
-        if min_confidence is not None:
-            matches = [
-                p for p in matches 
-                if p.metadata and isinstance(p.metadata.get('confidence'), (int, float)) 
-                and p.metadata['confidence'] >= min_confidence
-            ]
-        if compliance_tag:
-            matches = [p for p in matches if p.crosswalks and compliance_tag in p.crosswalks]
-            
-        return matches
+        """Query provisions based on various criteria including confidence and compliance tags.
+           Uses the secondary indexes in self.provision_index instead of scanning every provision.
+           With user_compliance_tags, provisions restricted to other compliance tags are left out
+           (one vectorized bitmask check over the matches).
+        """
+        matching_ids = self.provision_index.query(
+            regulation_id=regulation_id,
+            jurisdiction=jurisdiction,
+            tag=tag,
+            role_id=role_id,
+            min_confidence=min_confidence,
+            compliance_tag=compliance_tag
+        )
+        if user_compliance_tags is not None:
+            if matching_ids is None:
+                matching_ids = self.compliance_masks.visible_ids(user_compliance_tags)
+            else:
+                matching_ids = self.compliance_masks.filter(matching_ids, user_compliance_tags)
+        if matching_ids is None:
+            return list(self.provisions.values())
+        return [self.provisions[pid] for pid in matching_ids if pid in self.provisions]
 
     # --- Kept old methods temporarily if needed, otherwise remove --- 
     def get_node_by_id(self, node_id: str) -> Optional[KnowledgeNode]:
         print("Warning: get_node_by_id is deprecated, use get_provision_by_id etc.")
         provision = self.get_provision_by_id(node_id)
         if provision:
-            return KnowledgeNode(
-                node_id=provision.id,
-                pillar_id=provision.regulation_id,
-                label=provision.title,
-                description=provision.text,
-                axes={
-                    'axis3': provision.section, # Add reverse mapping for section
-                    'axis4': provision.hierarchy_level,
-                    'axis7': provision.octopus_refs,
-                    'axis8': provision.crosswalks, 
-                    'axis13': {'tags': provision.tags}, # Reconstruct axis13 structure
-                }, 
-                metadata=NodeMetadata(**provision.metadata) if provision.metadata else NodeMetadata(), # Map metadata back
-            )
+            from .simulation_jobs import provision_to_node
+            return provision_to_node(provision, self.get_regulation_by_id(provision.regulation_id))
         return None
 
     def get_pillar_by_id(self, pillar_id: str) -> Optional[Pillar]:
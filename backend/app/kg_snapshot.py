@@ -0,0 +1,133 @@
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import struct
+import tempfile
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+# Binary snapshot of a fully linked KnowledgeGraphManager.
+# Layout: MAGIC | uint32 header length | JSON header | pickle payload (protocol 5)
+# The header records a hash of every YAML source file and of the code that defines and builds the
+# pickled objects; any change to either invalidates the snapshot.
+# Snapshots are local build artifacts written by this process - never load one from an untrusted location.
+MAGIC = b"UKFWKG\x00\x01"
+SNAPSHOT_VERSION = 2 # 2: mapping nodes from the regulation hierarchy file
+_HEADER_LEN = struct.Struct("<I")
+
+# Manager attributes captured in a snapshot (runtime state such as compliance_status is excluded)
+SNAPSHOT_FIELDS = (
+    "regulations",
+    "provisions",
+    "roles",
+    "experts",
+    "spiderwebs",
+    "honeycombs",
+    "octopuses",
+)
+
+# Modules whose classes are pickled or which shape the loaded state, relative to this package
+CODE_FILES = (
+    "models.py",
+    "provision_store.py",
+    "kg_manager.py",
+    "kg_snapshot.py",
+    "yaml_loader.py",
+    "regulation_stream.py",
+)
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+_code_fingerprint: Optional[str] = None
+
+
+def hash_file(file_path: Optional[str]) -> Optional[str]:
+    """sha256 of a source file, or None if the path is unset or missing."""
+    if not file_path:
+        return None
+    digest = hashlib.sha256()
+    try:
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+
+def source_fingerprint(source_paths: Dict[str, Optional[str]]) -> Dict[str, Optional[str]]:
+    return {name: hash_file(path) for name, path in sorted(source_paths.items())}
+
+
+def code_fingerprint() -> str:
+    """sha256 over CODE_FILES, computed once per process."""
+    global _code_fingerprint
+    if _code_fingerprint is None:
+        digest = hashlib.sha256()
+        for name in CODE_FILES:
+            digest.update(f"{name}:{hash_file(os.path.join(_PACKAGE_DIR, name))}\n".encode('utf-8'))
+        _code_fingerprint = digest.hexdigest()
+    return _code_fingerprint
+
+
+def write_snapshot(snapshot_path: str, state: Dict[str, Any], source_paths: Dict[str, Optional[str]]):
+    """Atomically writes state to snapshot_path (temp file + rename), so concurrent workers never read a partial file."""
+    header = json.dumps({
+        "version": SNAPSHOT_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "code": code_fingerprint(),
+        "sources": source_fingerprint(source_paths),
+    }).encode('utf-8')
+    payload = pickle.dumps(state, protocol=5)
+
+    directory = os.path.dirname(os.path.abspath(snapshot_path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".kg_snapshot_", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(MAGIC)
+            f.write(_HEADER_LEN.pack(len(header)))
+            f.write(header)
+            f.write(payload)
+        os.replace(tmp_path, snapshot_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def read_snapshot(snapshot_path: str, source_paths: Dict[str, Optional[str]]) -> Optional[Dict[str, Any]]:
+    """
+    Returns the stored state if the snapshot exists and matches the current source files, else None.
+    The file is mapped read-only and unpickled straight from the mapping, which avoids reading it into
+    an intermediate bytes copy. The unpickled objects are still private to each process: every worker
+    that reads the snapshot builds its own copy of the graph on its own heap.
+    """
+    try:
+        f = open(snapshot_path, 'rb')
+    except FileNotFoundError:
+        return None
+    with f:
+        if os.fstat(f.fileno()).st_size < len(MAGIC) + _HEADER_LEN.size:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm[:len(MAGIC)] != MAGIC:
+                return None
+            offset = len(MAGIC)
+            (header_len,) = _HEADER_LEN.unpack_from(mm, offset)
+            offset += _HEADER_LEN.size
+            header = json.loads(mm[offset:offset + header_len])
+            offset += header_len
+            if header.get("version") != SNAPSHOT_VERSION or header.get("code") != code_fingerprint():
+                return None
+            if header.get("sources") != source_fingerprint(source_paths):
+                return None
+            view = memoryview(mm)
+            try:
+                payload = view[offset:]
+                try:
+                    return pickle.loads(payload)
+                finally:
+                    payload.release()
+            finally:
+                view.release()
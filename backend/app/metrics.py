@@ -0,0 +1,271 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Served by GET /metrics
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+TOKEN_BUCKETS = (16, 64, 256, 512, 1024, 2048, 4096, 8192, 16384)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], Any] = {}
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            series = sorted(self._series.items())
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in series:
+            lines.extend(self._sample_lines(key, value))
+        return lines
+
+    def _sample_lines(self, key: Tuple[str, ...], value: Any) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        with self._lock:
+            return self._series.get(self._key(labels), 0.0)
+
+    def _sample_lines(self, key, value):
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: Any):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0] # per-bucket counts, sum, count
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self, **labels: Any) -> Tuple[int, float]:
+        """(count, sum) of one series."""
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return (series[2], series[1]) if series else (0, 0.0)
+
+    def _sample_lines(self, key, value):
+        counts, total, count = value
+        lines, cumulative = [], 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            le = 'le="' + _number(bound) + '"'
+            lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+        le = 'le="+Inf"'
+        lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {count}")
+        lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+        lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """The process's metrics, rendered in the Prometheus text exposition format."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def _register(self, metric: _Metric) -> Any:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self._metrics for line in metric.collect()) + "\n"
+
+    def reset(self):
+        for metric in self._metrics:
+            metric.reset()
+
+
+REGISTRY = MetricsRegistry()
+
+LLM_REQUEST_SECONDS = REGISTRY.histogram(
+    "ukfw_llm_request_duration_seconds", "LLM call latency, including the SDK's own retries.", ("outcome",))
+LLM_REQUESTS = REGISTRY.counter(
+    "ukfw_llm_requests_total", "LLM calls by outcome: ok, error or cache_hit.", ("outcome",))
+LLM_TOKENS = REGISTRY.histogram(
+    "ukfw_llm_tokens", "Tokens per LLM call, as reported by the API.", ("kind",), TOKEN_BUCKETS)
+LLM_RETRIES = REGISTRY.counter(
+    "ukfw_llm_retries_total", "HTTP attempts beyond the first made by the LLM SDK's retry logic.")
+STAGE_SECONDS = REGISTRY.histogram(
+    "ukfw_reasoning_stage_duration_seconds", "Quad-persona stage latency (planner, expert archetypes, synthesizer, pipeline).", ("stage",))
+STAGE_ERRORS = REGISTRY.counter(
+    "ukfw_reasoning_stage_errors_total", "Quad-persona stages that ended in an error.", ("stage",))
+REASONING_JOB_RETRIES = REGISTRY.counter(
+    "ukfw_reasoning_job_retries_total", "Reasoning jobs requeued after an LLM error.")
+
+
+class LLMCall:
+    """One call through get_gpt_response*: latency, token usage, HTTP attempts and cache hit."""
+
+    def __init__(self):
+        self.latency_ms: Optional[float] = None
+        self.prompt_tokens: Optional[int] = None
+        self.completion_tokens: Optional[int] = None
+        self.attempts = 0 # HTTP requests sent, counted by the LLM clients' request hooks
+        self.cache_hit = False
+        self.error = False
+
+    @property
+    def retries(self) -> int:
+        return max(0, self.attempts - 1)
+
+    @property
+    def outcome(self) -> str:
+        return "cache_hit" if self.cache_hit else "error" if self.error else "ok"
+
+    def set_usage(self, usage: Any):
+        if usage is not None:
+            self.prompt_tokens = getattr(usage, "prompt_tokens", None)
+            self.completion_tokens = getattr(usage, "completion_tokens", None)
+
+
+class StageTimer:
+    """A pipeline stage's duration and the LLM calls made inside it."""
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.calls: List[LLMCall] = []
+        self.duration_ms: Optional[float] = None
+        self.failed = False
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "stage": self.stage,
+            "duration_ms": self.duration_ms,
+            "llm_calls": len(self.calls),
+            "llm_ms": round(sum(call.latency_ms or 0.0 for call in self.calls), 3),
+            "prompt_tokens": sum(call.prompt_tokens or 0 for call in self.calls),
+            "completion_tokens": sum(call.completion_tokens or 0 for call in self.calls),
+            "retries": sum(call.retries for call in self.calls),
+            "cache_hits": sum(1 for call in self.calls if call.cache_hit),
+            "failed": self.failed,
+        }
+
+
+_current_call: ContextVar[Optional[LLMCall]] = ContextVar("ukfw_llm_call", default=None)
+_stage_calls: ContextVar[Optional[List[LLMCall]]] = ContextVar("ukfw_stage_calls", default=None)
+
+
+def _reset(var: ContextVar, token):
+    try:
+        var.reset(token)
+    except ValueError:
+        pass # exited in another context, e.g. an abandoned async generator closed by the GC
+
+
+@contextmanager
+def llm_call() -> Iterator[LLMCall]:
+    """Times one LLM call, records it in the metrics and in the enclosing stage_timer, if any."""
+    call = LLMCall()
+    token = _current_call.set(call)
+    start = time.perf_counter()
+    try:
+        yield call
+    except BaseException:
+        call.error = True
+        raise
+    finally:
+        _reset(_current_call, token)
+        call.latency_ms = round((time.perf_counter() - start) * 1000, 3)
+        LLM_REQUEST_SECONDS.observe(call.latency_ms / 1000, outcome=call.outcome)
+        LLM_REQUESTS.inc(outcome=call.outcome)
+        if call.retries:
+            LLM_RETRIES.inc(call.retries)
+        if call.prompt_tokens is not None:
+            LLM_TOKENS.observe(call.prompt_tokens, kind="prompt")
+        if call.completion_tokens is not None:
+            LLM_TOKENS.observe(call.completion_tokens, kind="completion")
+        calls = _stage_calls.get()
+        if calls is not None:
+            calls.append(call)
+
+
+def count_http_attempt(request: Any = None):
+    """httpx request hook: counts the HTTP attempts of the current llm_call()."""
+    call = _current_call.get()
+    if call is not None:
+        call.attempts += 1
+
+
+def observe_stage(stage: str, seconds: float, failed: bool = False):
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    if failed:
+        STAGE_ERRORS.inc(stage=stage)
+
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[StageTimer]:
+    """Times a pipeline stage; set .failed on the yielded timer if it produced an error step."""
+    timer = StageTimer(stage)
+    token = _stage_calls.set(timer.calls)
+    start = time.perf_counter()
+    try:
+        yield timer
+    except BaseException:
+        timer.failed = True
+        raise
+    finally:
+        _reset(_stage_calls, token)
+        seconds = time.perf_counter() - start
+        timer.duration_ms = round(seconds * 1000, 3)
+        observe_stage(stage, seconds, timer.failed)
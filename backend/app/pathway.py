@@ -0,0 +1,407 @@
+import heapq
+import itertools
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from .provision_graph import EDGE_TYPE_NAMES, HUB_VERTEX, ProvisionGraph
+
+DEFAULT_RISK_PENALTY = 1.0
+MIN_WEIGHT = 0.05 # floor for edge weights so a near-zero link does not get an unbounded cost
+DEFAULT_LANDMARKS = 8
+METHODS = ("dijkstra", "astar", "bidirectional")
+
+INF = float("inf")
+
+# (cost, vertex positions, edge positions); edges[i] connects vertices[i] -> vertices[i + 1]
+_Path = Tuple[float, Tuple[int, ...], Tuple[int, ...]]
+
+
+def edge_costs(graph: ProvisionGraph, risk_penalty: float = DEFAULT_RISK_PENALTY, min_weight: float = MIN_WEIGHT) -> np.ndarray:
+    """
+    Traversal cost of every CSR edge: (1 + risk_penalty * risk) / max(weight, min_weight).
+    Strong links (weight near 1) are cheap, risky links get more expensive, and an unset risk
+    counts as 0. Costs are strictly positive, which Dijkstra and the landmark bounds rely on.
+    """
+    risk = np.nan_to_num(graph.risk.astype(np.float64), nan=0.0)
+    weight = np.maximum(graph.weight.astype(np.float64), min_weight)
+    return (1.0 + risk_penalty * np.maximum(risk, 0.0)) / weight
+
+
+def edge_type_codes(names: Optional[Iterable[str]]) -> Optional[List[int]]:
+    """Maps edge type names ("spiderweb", "honeycomb", "octopus") to ProvisionGraph codes."""
+    if names is None:
+        return None
+    codes = []
+    for name in names:
+        if name not in EDGE_TYPE_NAMES:
+            raise ValueError(f"Unknown edge type: {name!r} (expected one of {', '.join(EDGE_TYPE_NAMES)})")
+        codes.append(EDGE_TYPE_NAMES.index(name))
+    return codes
+
+
+class PathwayFinder:
+    """
+    Cheapest compliance pathways between two vertices of a ProvisionGraph.
+    - dijkstra: plain single-direction search that stops once the target is settled.
+    - bidirectional: Dijkstra from both ends; the graph stores every edge in both directions with
+      the same cost, so the backward search reuses the forward CSR arrays.
+    - astar: A* with landmark (ALT) lower bounds. Landmark distances are computed on the
+      unrestricted graph the first time A* runs; they stay admissible under edge type / axis
+      restrictions because removing edges can only make distances longer.
+    Bidirectional is the default: on the small-world mapping network (cross-jurisdiction links and
+    Octopus shortcuts) landmark bounds are loose and it settles far fewer vertices than A*.
+    k_shortest_paths uses Yen's algorithm on top of the same search. Restrictions are applied by
+    giving excluded edges an infinite cost; the masked cost arrays are cached per restriction.
+    """
+
+    def __init__(self,
+                 graph: ProvisionGraph,
+                 risk_penalty: float = DEFAULT_RISK_PENALTY,
+                 max_cached_filters: int = 16): # masked cost arrays kept for repeated restrictions
+        self.graph = graph
+        self.risk_penalty = risk_penalty
+        self.cost = edge_costs(graph, risk_penalty)
+        self.max_cached_filters = max_cached_filters
+        self._filtered: "OrderedDict[Tuple, np.ndarray]" = OrderedDict()
+        self._landmarks: Optional[np.ndarray] = None # (num_vertices, num_landmarks) distances
+
+    # --- public API ---
+
+    def shortest_path(self, source: str, target: str, method: str = "bidirectional",
+                      edge_types: Optional[Sequence[int]] = None,
+                      axes: Optional[Iterable[Any]] = None) -> Optional[Dict[str, Any]]:
+        """Cheapest pathway from source to target, or None if either is unknown or unreachable."""
+        s, t = self._vertex(source), self._vertex(target)
+        if s is None or t is None:
+            return None
+        path = self._search(s, t, self.costs_for(edge_types, axes), method)
+        return self._describe(path) if path else None
+
+    def k_shortest_paths(self, source: str, target: str, k: int = 3, method: str = "bidirectional",
+                         edge_types: Optional[Sequence[int]] = None,
+                         axes: Optional[Iterable[Any]] = None) -> List[Dict[str, Any]]:
+        """Up to k loopless pathways in increasing cost order (Yen's algorithm)."""
+        s, t = self._vertex(source), self._vertex(target)
+        if s is None or t is None or k <= 0:
+            return []
+        cost = self.costs_for(edge_types, axes)
+        return [self._describe(path) for path in self._yen(s, t, cost, k, method)]
+
+    def nearest(self, source: str, limit: int = 10, max_cost: Optional[float] = None,
+                edge_types: Optional[Sequence[int]] = None,
+                axes: Optional[Iterable[Any]] = None) -> List[Dict[str, Any]]:
+        """Cheapest pathways from source to the `limit` closest provisions (octopus hubs are passed through, not returned)."""
+        s = self._vertex(source)
+        if s is None or limit <= 0:
+            return []
+        cost = self.costs_for(edge_types, axes)
+        kind = self.graph.vertex_kind
+        dist, parent = self._dijkstra_tree(s, cost, max_cost=max_cost,
+                                           stop=lambda v, found: found >= limit,
+                                           counts=lambda v: v != s and kind[v] != HUB_VERTEX)
+        reached = sorted((d, v) for v, d in dist.items() if v != s and kind[v] != HUB_VERTEX)[:limit]
+        return [self._describe(self._unwind(s, v, d, parent)) for d, v in reached]
+
+    def costs_for(self, edge_types: Optional[Sequence[int]] = None, axes: Optional[Iterable[Any]] = None) -> np.ndarray:
+        """Edge cost array with excluded edges set to infinity."""
+        if edge_types is None and axes is None:
+            return self.cost
+        key = (tuple(sorted(edge_types)) if edge_types is not None else None,
+               tuple(sorted(str(a) for a in axes)) if axes is not None else None)
+        cost = self._filtered.get(key)
+        if cost is None:
+            keep = self.graph.edge_filter(edge_types, axes)
+            cost = np.where(keep, self.cost, INF)
+            self._filtered[key] = cost
+            if len(self._filtered) > self.max_cached_filters:
+                self._filtered.popitem(last=False)
+        else:
+            self._filtered.move_to_end(key)
+        return cost
+
+    def prepare_landmarks(self, count: int = DEFAULT_LANDMARKS, seed: int = 0):
+        """
+        Picks landmarks by farthest-point selection and stores their distances to every vertex.
+        Costs one full-graph distance computation per landmark; called lazily by the first A* query.
+        """
+        n = self.graph.num_vertices
+        if n == 0:
+            self._landmarks = np.zeros((0, 0))
+            return
+        rng = np.random.default_rng(seed)
+        columns = []
+        closest = np.full(n, INF)
+        candidate = int(rng.integers(n))
+        for _ in range(min(count, n)):
+            d = self._distances_from(candidate, self.cost)
+            columns.append(d)
+            closest = np.minimum(closest, d)
+            # Next landmark: the reachable vertex farthest from all chosen ones
+            finite = np.where(np.isinf(closest), -1.0, closest)
+            candidate = int(np.argmax(finite))
+            if finite[candidate] <= 0:
+                break
+        self._landmarks = np.ascontiguousarray(np.stack(columns, axis=1))
+
+    # --- search dispatch ---
+
+    def _vertex(self, vertex_id: str) -> Optional[int]:
+        return self.graph.vertex_index.get(vertex_id)
+
+    def _search(self, s: int, t: int, cost: np.ndarray, method: str,
+                banned_vertices: Optional[Set[int]] = None,
+                banned_edges: Optional[Set[Tuple[int, int]]] = None) -> Optional[_Path]:
+        if method == "dijkstra":
+            return self._astar(s, t, cost, None, banned_vertices, banned_edges)
+        if method == "astar":
+            if self._landmarks is None:
+                self.prepare_landmarks()
+            return self._astar(s, t, cost, self._landmark_heuristic(t), banned_vertices, banned_edges)
+        if method == "bidirectional":
+            return self._bidirectional(s, t, cost, banned_vertices, banned_edges)
+        raise ValueError(f"Unknown pathway method: {method!r} (expected one of {', '.join(METHODS)})")
+
+    def _landmark_heuristic(self, t: int):
+        """Vectorized ALT lower bound: max over landmarks L of |d(L, t) - d(L, v)| for an array of vertices."""
+        landmarks = self._landmarks
+        to_target = landmarks[t]
+
+        def bounds(vertices: np.ndarray) -> np.ndarray:
+            with np.errstate(invalid="ignore"):
+                diff = np.abs(landmarks[vertices] - to_target)
+            # inf - inf (neither side reaches the landmark) says nothing; inf vs finite means
+            # v and t lie in different components, so t is unreachable from v
+            return np.nan_to_num(diff, nan=0.0, posinf=INF).max(axis=1, initial=0.0)
+        return bounds
+
+    # --- unidirectional Dijkstra / A* ---
+
+    def _astar(self, s: int, t: int, cost: np.ndarray, heuristic,
+               banned_vertices: Optional[Set[int]] = None,
+               banned_edges: Optional[Set[Tuple[int, int]]] = None) -> Optional[_Path]:
+        """Dijkstra when heuristic is None. The landmark heuristic is consistent, so a vertex is final once popped."""
+        indptr, indices, edge_ref = self.graph.indptr, self.graph.indices, self.graph.edge_ref
+        banned_vertices = banned_vertices or set()
+        dist: Dict[int, float] = {s: 0.0}
+        parent: Dict[int, Tuple[int, int]] = {}
+        closed: Set[int] = set()
+        heap = [(float(heuristic(np.array([s]))[0]) if heuristic else 0.0, 0.0, s)]
+        while heap:
+            _, d, u = heapq.heappop(heap)
+            if u in closed:
+                continue
+            if u == t:
+                return self._unwind(s, t, d, parent)
+            closed.add(u)
+            start, end = int(indptr[u]), int(indptr[u + 1])
+            neighbors = indices[start:end]
+            refs = edge_ref[start:end].tolist() if banned_edges else None
+            # Bounds for the whole neighbor slice in one numpy call
+            bounds = heuristic(neighbors).tolist() if heuristic else None
+            for i, (w, c) in enumerate(zip(neighbors.tolist(), cost[start:end].tolist())):
+                if c == INF or w in closed or w in banned_vertices:
+                    continue
+                if banned_edges and (u, refs[i]) in banned_edges:
+                    continue
+                nd = d + c
+                if nd < dist.get(w, INF):
+                    hw = bounds[i] if bounds else 0.0
+                    if hw == INF:
+                        continue
+                    dist[w] = nd
+                    parent[w] = (u, start + i)
+                    heapq.heappush(heap, (nd + hw, nd, w))
+        return None
+
+    def _dijkstra_tree(self, s: int, cost: np.ndarray, max_cost: Optional[float] = None,
+                       stop=None, counts=None) -> Tuple[Dict[int, float], Dict[int, Tuple[int, int]]]:
+        """Single-source Dijkstra returning settled distances and parents; stop(v, found) ends it early."""
+        indptr, indices = self.graph.indptr, self.graph.indices
+        limit = INF if max_cost is None else max_cost
+        dist: Dict[int, float] = {}
+        tentative: Dict[int, float] = {s: 0.0}
+        parent: Dict[int, Tuple[int, int]] = {}
+        heap = [(0.0, s)]
+        found = 0
+        while heap:
+            d, u = heapq.heappop(heap)
+            if u in dist:
+                continue
+            dist[u] = d
+            if counts is not None and counts(u):
+                found += 1
+            if stop is not None and stop(u, found):
+                break
+            start, end = int(indptr[u]), int(indptr[u + 1])
+            for i, (w, c) in enumerate(zip(indices[start:end].tolist(), cost[start:end].tolist())):
+                nd = d + c
+                if w in dist or nd > limit or nd >= tentative.get(w, INF):
+                    continue
+                tentative[w] = nd
+                parent[w] = (u, start + i)
+                heapq.heappush(heap, (nd, w))
+        return dist, parent
+
+    def _distances_from(self, s: int, cost: np.ndarray) -> np.ndarray:
+        """
+        Distances from s to every vertex (inf if unreachable) for the landmark table. Uses
+        label-correcting rounds over the CSR arrays: each round relaxes all out-edges of the
+        vertices improved in the previous one, entirely in numpy.
+        """
+        indptr, indices = self.graph.indptr, self.graph.indices
+        dist = np.full(self.graph.num_vertices, INF)
+        dist[s] = 0.0
+        frontier = np.array([s], dtype=np.int64)
+        while frontier.size:
+            edges = self.graph._frontier_edges(frontier)
+            if edges.size == 0:
+                break
+            lengths = indptr[frontier + 1] - indptr[frontier]
+            candidate = np.repeat(dist[frontier], lengths) + cost[edges]
+            targets = indices[edges]
+            improved = candidate < dist[targets]
+            targets, candidate = targets[improved], candidate[improved]
+            np.minimum.at(dist, targets, candidate)
+            frontier = np.unique(targets).astype(np.int64)
+        return dist
+
+    # --- bidirectional Dijkstra ---
+
+    def _bidirectional(self, s: int, t: int, cost: np.ndarray,
+                       banned_vertices: Optional[Set[int]] = None,
+                       banned_edges: Optional[Set[Tuple[int, int]]] = None) -> Optional[_Path]:
+        if s == t:
+            return (0.0, (s,), ())
+        indptr, indices, edge_ref = self.graph.indptr, self.graph.indices, self.graph.edge_ref
+        banned_vertices = banned_vertices or set()
+        # index 0 searches forward from s, index 1 backward from t
+        dist: Tuple[Dict[int, float], Dict[int, float]] = ({s: 0.0}, {t: 0.0})
+        parent: Tuple[Dict[int, Tuple[int, int]], Dict[int, Tuple[int, int]]] = ({}, {})
+        closed: Tuple[Set[int], Set[int]] = (set(), set())
+        heaps = ([(0.0, s)], [(0.0, t)])
+        best = INF
+        meet: Optional[Tuple[int, int, int]] = None # (u in forward tree, w in backward tree, edge u -> w)
+
+        while heaps[0] and heaps[1]:
+            if heaps[0][0][0] + heaps[1][0][0] >= best:
+                break
+            side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+            d, u = heapq.heappop(heaps[side])
+            if u in closed[side]:
+                continue
+            closed[side].add(u)
+            mine, other = dist[side], dist[1 - side]
+            start, end = int(indptr[u]), int(indptr[u + 1])
+            refs = edge_ref[start:end].tolist() if banned_edges else None
+            for i, (w, c) in enumerate(zip(indices[start:end].tolist(), cost[start:end].tolist())):
+                if c == INF or w in closed[side] or w in banned_vertices:
+                    continue
+                # Banned edges are keyed by the vertex they leave in the s -> t direction
+                if banned_edges:
+                    tail = u if side == 0 else w
+                    if (tail, refs[i]) in banned_edges:
+                        continue
+                nd = d + c
+                if nd < mine.get(w, INF):
+                    mine[w] = nd
+                    parent[side][w] = (u, start + i)
+                    heapq.heappush(heaps[side], (nd, w))
+                through = other.get(w)
+                if through is not None and nd + through < best:
+                    best = nd + through
+                    meet = (u, w, start + i) if side == 0 else (w, u, self._twin(u, w, start + i))
+        if meet is None:
+            return None
+
+        u, w, e = meet
+        _, head, head_edges = self._unwind(s, u, dist[0][u], parent[0])
+        vertices, edges = list(head), list(head_edges) + [e]
+        v = w
+        while v != t:
+            nxt, back_edge = parent[1][v]
+            vertices.append(v)
+            edges.append(self._twin(nxt, v, back_edge))
+            v = nxt
+        vertices.append(t)
+        # Recomputed from the edges: a parent pointer may have improved after the meeting point was recorded
+        return (float(sum(cost[e] for e in edges)), tuple(vertices), tuple(edges))
+
+    def _twin(self, u: int, w: int, e: int) -> int:
+        """Position of the reverse of edge e (u -> w), i.e. the w -> u edge from the same mapping node."""
+        ref = self.graph.edge_ref[e]
+        start, end = int(self.graph.indptr[w]), int(self.graph.indptr[w + 1])
+        candidates = np.nonzero((self.graph.indices[start:end] == u) & (self.graph.edge_ref[start:end] == ref))[0]
+        return start + int(candidates[0]) if candidates.size else e
+
+    # --- Yen's k shortest loopless paths ---
+
+    def _yen(self, s: int, t: int, cost: np.ndarray, k: int, method: str) -> List[_Path]:
+        first = self._search(s, t, cost, method)
+        if first is None:
+            return []
+        edge_ref = self.graph.edge_ref
+        key = lambda path: (path[1], tuple(int(edge_ref[e]) for e in path[2]))
+        accepted: List[_Path] = [first]
+        seen = {key(first)}
+        candidates: List[Tuple[float, int, _Path]] = []
+        tiebreak = itertools.count()
+        while len(accepted) < k:
+            _, vertices, edges = accepted[-1]
+            for i in range(len(vertices) - 1):
+                spur = vertices[i]
+                root_vertices, root_edges = vertices[:i + 1], edges[:i]
+                root_refs = tuple(int(edge_ref[e]) for e in root_edges)
+                banned_edges = {
+                    (spur, int(edge_ref[p[2][i]])) for p in accepted
+                    if len(p[2]) > i and p[1][:i + 1] == root_vertices
+                    and tuple(int(edge_ref[e]) for e in p[2][:i]) == root_refs
+                }
+                spur_path = self._search(spur, t, cost, method, set(root_vertices[:-1]), banned_edges)
+                if spur_path is None:
+                    continue
+                root_cost = float(sum(cost[e] for e in root_edges))
+                candidate = (root_cost + spur_path[0], root_vertices[:-1] + spur_path[1], root_edges + spur_path[2])
+                if key(candidate) not in seen:
+                    seen.add(key(candidate))
+                    heapq.heappush(candidates, (candidate[0], next(tiebreak), candidate))
+            if not candidates:
+                break
+            accepted.append(heapq.heappop(candidates)[2])
+        return accepted
+
+    # --- results ---
+
+    @staticmethod
+    def _unwind(s: int, t: int, total: float, parent: Dict[int, Tuple[int, int]]) -> _Path:
+        vertices, edges = [t], []
+        v = t
+        while v != s:
+            v, e = parent[v]
+            vertices.append(v)
+            edges.append(e)
+        return (total, tuple(reversed(vertices)), tuple(reversed(edges)))
+
+    def _describe(self, path: _Path) -> Dict[str, Any]:
+        total, vertices, edges = path
+        g = self.graph
+        hops = []
+        for (a, b), e in zip(zip(vertices, vertices[1:]), edges):
+            risk = float(g.risk[e])
+            hops.append({
+                "from": g.vertex_ids[a],
+                "to": g.vertex_ids[b],
+                "edge_id": g.edge_ids[int(g.edge_ref[e])],
+                "edge_type": EDGE_TYPE_NAMES[int(g.edge_type[e])],
+                "weight": float(g.weight[e]),
+                "risk": None if np.isnan(risk) else risk,
+                "cost": float(self.cost[e]),
+            })
+        return {
+            "cost": float(total),
+            "hops": len(edges),
+            "nodes": [g.vertex_ids[v] for v in vertices],
+            "node_kinds": [("provision", "external", "octopus")[int(g.vertex_kind[v])] for v in vertices],
+            "edges": hops,
+        }
@@ -0,0 +1,250 @@
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from .models import HoneycombNode, OctopusNode, RegulatoryAxis, SpiderwebNode
+
+# Edge types
+SPIDERWEB = 0
+HONEYCOMB = 1
+OCTOPUS = 2
+EDGE_TYPE_NAMES = ("spiderweb", "honeycomb", "octopus")
+
+# Vertex kinds
+PROVISION_VERTEX = 0
+EXTERNAL_VERTEX = 1 # referenced by a mapping node but not loaded as a provision
+HUB_VERTEX = 2      # an OctopusNode; its member provisions hang off it
+
+AXIS_BITS = {axis: 1 << i for i, axis in enumerate(RegulatoryAxis)}
+
+
+def axes_mask(axes: Optional[Iterable[Any]]) -> int:
+    """Bitmask over RegulatoryAxis for a list of axes (enum members or their string values)."""
+    mask = 0
+    for axis in axes or ():
+        mask |= AXIS_BITS[RegulatoryAxis(axis)]
+    return mask
+
+
+class ProvisionGraph:
+    """
+    Compressed-sparse-row graph over provision IDs, built once from the Spiderweb, Honeycomb and
+    Octopus stores.
+    - Spiderweb and honeycomb nodes are edges between two provisions, stored in both directions
+      (forward marks the source -> target direction).
+    - Each OctopusNode is a hub vertex with membership edges to and from its linked provisions.
+    Per-edge arrays run parallel to `indices`: edge_type, weight, risk (NaN when unset),
+    axes (RegulatoryAxis bitmask), edge_ref (index into edge_ids) and forward.
+    Neighbors of v are indices[indptr[v]:indptr[v + 1]], so lookups cost O(degree).
+    """
+
+    def __init__(self, vertex_ids: List[str], vertex_kind: np.ndarray, indptr: np.ndarray, indices: np.ndarray,
+                 edge_type: np.ndarray, weight: np.ndarray, risk: np.ndarray, axes: np.ndarray,
+                 edge_ref: np.ndarray, forward: np.ndarray, edge_ids: List[str]):
+        self.vertex_ids = vertex_ids
+        self.vertex_index: Dict[str, int] = {vid: i for i, vid in enumerate(vertex_ids)}
+        self.vertex_kind = vertex_kind
+        self.indptr = indptr
+        self.indices = indices
+        self.edge_type = edge_type
+        self.weight = weight
+        self.risk = risk
+        self.axes = axes
+        self.edge_ref = edge_ref
+        self.forward = forward
+        self.edge_ids = edge_ids
+
+    @classmethod
+    def build(cls,
+              provision_ids: Iterable[str],
+              spiderwebs: Iterable[SpiderwebNode] = (),
+              honeycombs: Iterable[HoneycombNode] = (),
+              octopuses: Iterable[OctopusNode] = ()) -> "ProvisionGraph":
+        vertex_ids: List[str] = list(provision_ids)
+        vertex_index = {vid: i for i, vid in enumerate(vertex_ids)}
+        kinds: List[int] = [PROVISION_VERTEX] * len(vertex_ids)
+
+        def vertex(vid: str, kind: int) -> int:
+            v = vertex_index.get(vid)
+            if v is None:
+                v = vertex_index[vid] = len(vertex_ids)
+                vertex_ids.append(vid)
+                kinds.append(kind)
+            return v
+
+        src: List[int] = []
+        dst: List[int] = []
+        etype: List[int] = []
+        weights: List[float] = []
+        risks: List[float] = []
+        masks: List[int] = []
+        refs: List[int] = []
+        edge_ids: List[str] = []
+
+        def add_edge(a: int, b: int, kind: int, w: float, r: float, mask: int, ref: int):
+            src.append(a)
+            dst.append(b)
+            etype.append(kind)
+            weights.append(w)
+            risks.append(r)
+            masks.append(mask)
+            refs.append(ref)
+
+        for node in spiderwebs:
+            ref = len(edge_ids)
+            edge_ids.append(node.id)
+            add_edge(vertex(node.source_provision, EXTERNAL_VERTEX), vertex(node.target_provision, EXTERNAL_VERTEX),
+                     SPIDERWEB, node.weight if node.weight is not None else 1.0,
+                     node.risk if node.risk is not None else np.nan, axes_mask(node.axes_involved), ref)
+        for node in honeycombs:
+            ref = len(edge_ids)
+            edge_ids.append(node.id)
+            add_edge(vertex(node.source_provision, EXTERNAL_VERTEX), vertex(node.target_provision, EXTERNAL_VERTEX),
+                     HONEYCOMB, node.weight if node.weight is not None else 1.0, np.nan, axes_mask(node.axes_involved), ref)
+        for node in octopuses:
+            ref = len(edge_ids)
+            edge_ids.append(node.id)
+            hub = vertex(node.id, HUB_VERTEX)
+            kinds[hub] = HUB_VERTEX
+            mask = axes_mask(node.axes_involved)
+            for provision_id in node.linked_provisions:
+                add_edge(hub, vertex(provision_id, EXTERNAL_VERTEX), OCTOPUS, 1.0, np.nan, mask, ref)
+
+        return cls.from_edges(vertex_ids, kinds, src, dst, etype, weights, risks, masks, refs, edge_ids)
+
+    @classmethod
+    def from_edges(cls, vertex_ids: List[str], vertex_kind: Sequence[int], src: Sequence[int], dst: Sequence[int],
+                   edge_type: Sequence[int], weight: Sequence[float], risk: Sequence[float], axes: Sequence[int],
+                   edge_ref: Sequence[int], edge_ids: List[str]) -> "ProvisionGraph":
+        """Builds the CSR arrays from one entry per edge (source -> target); the reverse direction is added here."""
+        m = len(src)
+        n = len(vertex_ids)
+        both = lambda values, dtype: np.concatenate([np.asarray(values, dtype=dtype)] * 2) if m else np.empty(0, dtype=dtype)
+        src_arr = np.concatenate([np.asarray(src, dtype=np.int64), np.asarray(dst, dtype=np.int64)]) if m else np.empty(0, dtype=np.int64)
+        dst_arr = np.concatenate([np.asarray(dst, dtype=np.int32), np.asarray(src, dtype=np.int32)]) if m else np.empty(0, dtype=np.int32)
+        forward = np.zeros(2 * m, dtype=bool)
+        forward[:m] = True
+        # Stable sort by source vertex keeps each vertex's edges in insertion order (forward edges first)
+        order = np.argsort(src_arr, kind="stable")
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src_arr, minlength=n), out=indptr[1:])
+        return cls(
+            vertex_ids=vertex_ids,
+            vertex_kind=np.asarray(vertex_kind, dtype=np.int8),
+            indptr=indptr,
+            indices=dst_arr[order],
+            edge_type=both(edge_type, np.int8)[order],
+            weight=both(weight, np.float32)[order],
+            risk=both(risk, np.float32)[order],
+            axes=both(axes, np.uint16)[order],
+            edge_ref=both(edge_ref, np.int32)[order],
+            forward=forward[order],
+            edge_ids=edge_ids,
+        )
+
+    # --- basic accessors ---
+
+    @property
+    def num_vertices(self) -> int:
+        return len(self.vertex_ids)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.indices)
+
+    def __contains__(self, vertex_id: str) -> bool:
+        return vertex_id in self.vertex_index
+
+    def degree(self, vertex_id: str) -> int:
+        v = self.vertex_index.get(vertex_id)
+        return 0 if v is None else int(self.indptr[v + 1] - self.indptr[v])
+
+    def edge_filter(self, edge_types: Optional[Sequence[int]] = None, axes: Optional[Iterable[Any]] = None) -> Optional[np.ndarray]:
+        """Boolean mask over all edges for the given types / axes (None = no restriction).
+           An edge passes the axes filter if it involves at least one of the requested axes.
+        """
+        keep = None
+        if edge_types is not None:
+            keep = np.isin(self.edge_type, np.asarray(list(edge_types), dtype=np.int8))
+        if axes is not None:
+            by_axes = (self.axes & np.uint16(axes_mask(axes))) != 0
+            keep = by_axes if keep is None else keep & by_axes
+        return keep
+
+    # --- queries ---
+
+    def neighbors(self, vertex_id: str, edge_types: Optional[Sequence[int]] = None,
+                  axes: Optional[Iterable[Any]] = None) -> List[Dict[str, Any]]:
+        """Direct neighbors of a vertex with the attributes of the connecting edge."""
+        v = self.vertex_index.get(vertex_id)
+        if v is None:
+            return []
+        start, end = int(self.indptr[v]), int(self.indptr[v + 1])
+        type_set = set(edge_types) if edge_types is not None else None
+        mask = axes_mask(axes) if axes is not None else None
+        result = []
+        for e in range(start, end):
+            if type_set is not None and int(self.edge_type[e]) not in type_set:
+                continue
+            if mask is not None and not int(self.axes[e]) & mask:
+                continue
+            risk = float(self.risk[e])
+            target = int(self.indices[e])
+            result.append({
+                "node_id": self.vertex_ids[target],
+                "node_kind": ("provision", "external", "octopus")[int(self.vertex_kind[target])],
+                "edge_type": EDGE_TYPE_NAMES[int(self.edge_type[e])],
+                "edge_id": self.edge_ids[int(self.edge_ref[e])],
+                "direction": "outgoing" if self.forward[e] else "incoming",
+                "weight": float(self.weight[e]),
+                "risk": None if np.isnan(risk) else risk,
+            })
+        return result
+
+    def k_hop(self, vertex_id: str, k: int, edge_types: Optional[Sequence[int]] = None,
+              axes: Optional[Iterable[Any]] = None, include_hubs: bool = False) -> Dict[str, int]:
+        """
+        Breadth-first expansion up to k hops; returns {vertex_id: hop distance} excluding the start.
+        Octopus hubs count as a hop (provision -> hub -> provision is 2 hops) and are left out of
+        the result unless include_hubs is set. Each level is expanded with vectorized CSR slicing.
+        """
+        start = self.vertex_index.get(vertex_id)
+        if start is None or k <= 0:
+            return {}
+        type_codes = np.asarray(list(edge_types), dtype=np.int8) if edge_types is not None else None
+        mask = np.uint16(axes_mask(axes)) if axes is not None else None
+        # Work stays proportional to the reached subgraph: edges are filtered per frontier and
+        # visited is a sorted array of the vertices seen so far, not an array over the whole graph.
+        visited = np.array([start], dtype=np.int64)
+        frontier = visited
+        levels = []
+        for hop in range(1, k + 1):
+            edges = self._frontier_edges(frontier)
+            if type_codes is not None:
+                edges = edges[np.isin(self.edge_type[edges], type_codes)]
+            if mask is not None:
+                edges = edges[(self.axes[edges] & mask) != 0]
+            targets = np.setdiff1d(self.indices[edges], visited)
+            if targets.size == 0:
+                break
+            levels.append((hop, targets))
+            visited = np.union1d(visited, targets)
+            frontier = targets.astype(np.int64)
+
+        result = {}
+        for hop, reached in levels:
+            if not include_hubs:
+                reached = reached[self.vertex_kind[reached] != HUB_VERTEX]
+            result.update((self.vertex_ids[v], hop) for v in reached.tolist())
+        return result
+
+    def _frontier_edges(self, frontier: np.ndarray) -> np.ndarray:
+        """Edge positions of all vertices in the frontier, without a Python loop over vertices."""
+        starts = self.indptr[frontier]
+        lengths = self.indptr[frontier + 1] - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return np.empty(0, dtype=np.int64)
+        # For each output slot: its vertex's start plus the offset within that vertex's run
+        run_offsets = np.repeat(np.cumsum(lengths) - lengths, lengths)
+        return np.repeat(starts, lengths) + (np.arange(total) - run_offsets)
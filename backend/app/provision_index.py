@@ -0,0 +1,169 @@
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .models import Provision
+
+
+class ProvisionIndex:
+    """
+    Secondary indexes over provisions, used by KnowledgeGraphManager.query_provisions.
+    - Hash indexes: regulation_id, jurisdiction, tag, role_id and crosswalk -> set of provision IDs.
+    - Sorted confidence index: (metadata['confidence'], provision_id) pairs, searched with bisect.
+    Queries intersect candidate sets smallest-first, so the cost follows the result size
+    rather than the corpus size. Results keep the provision insertion order.
+    """
+
+    def __init__(self):
+        self.by_regulation: Dict[str, Set[str]] = {}
+        self.by_jurisdiction: Dict[str, Set[str]] = {}
+        self.by_tag: Dict[str, Set[str]] = {}
+        self.by_role: Dict[str, Set[str]] = {}
+        self.by_crosswalk: Dict[str, Set[str]] = {}
+        self.confidence_sorted: List[Tuple[float, str]] = []
+        self.confidence: Dict[str, float] = {}
+        self._order: Dict[str, int] = {}
+        self._next_ordinal = 0
+        # Keys each provision was indexed under, so it can be removed/updated later
+        self._indexed_keys: Dict[str, Dict[str, List[str]]] = {}
+
+    @classmethod
+    def build(cls, provisions: Iterable[Provision]) -> "ProvisionIndex":
+        index = cls()
+        for provision in provisions:
+            index.add(provision, _defer_sort=True)
+        index.confidence_sorted.sort()
+        return index
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __contains__(self, provision_id: str) -> bool:
+        return provision_id in self._order
+
+    def _hash_indexes(self) -> Dict[str, Dict[str, Set[str]]]:
+        return {
+            "regulation": self.by_regulation,
+            "jurisdiction": self.by_jurisdiction,
+            "tag": self.by_tag,
+            "role": self.by_role,
+            "crosswalk": self.by_crosswalk,
+        }
+
+    @staticmethod
+    def _keys_for(provision: Provision) -> Dict[str, List[str]]:
+        return {
+            "regulation": [provision.regulation_id] if provision.regulation_id else [],
+            "jurisdiction": [provision.jurisdiction] if provision.jurisdiction else [],
+            "tag": list(provision.tags or []),
+            "role": list(provision.roles_responsible or []),
+            "crosswalk": list(provision.crosswalks or []),
+        }
+
+    @staticmethod
+    def _confidence_for(provision: Provision) -> Optional[float]:
+        # Same rule as the original linear filter: only numeric metadata['confidence'] counts
+        value = provision.metadata.get('confidence') if provision.metadata else None
+        return value if isinstance(value, (int, float)) else None
+
+    def add(self, provision: Provision, _defer_sort: bool = False):
+        """Indexes a provision. Re-adding an already indexed ID updates it in place."""
+        if provision.id in self._order:
+            self.remove(provision.id, keep_order=True)
+        else:
+            self._order[provision.id] = self._next_ordinal
+            self._next_ordinal += 1
+
+        keys = self._keys_for(provision)
+        indexes = self._hash_indexes()
+        for name, values in keys.items():
+            for value in values:
+                indexes[name].setdefault(value, set()).add(provision.id)
+        self._indexed_keys[provision.id] = keys
+
+        confidence = self._confidence_for(provision)
+        if confidence is not None:
+            self.confidence[provision.id] = confidence
+            if _defer_sort:
+                # build() sorts once at the end instead of paying an insort per provision
+                self.confidence_sorted.append((confidence, provision.id))
+            else:
+                insort(self.confidence_sorted, (confidence, provision.id))
+
+    def update(self, provision: Provision):
+        self.add(provision)
+
+    def remove(self, provision_id: str, keep_order: bool = False):
+        keys = self._indexed_keys.pop(provision_id, None)
+        if keys is None:
+            return
+        indexes = self._hash_indexes()
+        for name, values in keys.items():
+            index = indexes[name]
+            for value in values:
+                ids = index.get(value)
+                if ids is not None:
+                    ids.discard(provision_id)
+                    if not ids:
+                        del index[value]
+        confidence = self.confidence.pop(provision_id, None)
+        if confidence is not None:
+            pos = bisect_left(self.confidence_sorted, (confidence, provision_id))
+            if pos < len(self.confidence_sorted) and self.confidence_sorted[pos] == (confidence, provision_id):
+                del self.confidence_sorted[pos]
+        if not keep_order:
+            self._order.pop(provision_id, None)
+
+    def _confidence_start(self, min_confidence: float) -> int:
+        # Position of the first entry with confidence >= min_confidence
+        return bisect_left(self.confidence_sorted, (min_confidence, ""))
+
+    def query(self,
+              regulation_id: Optional[str] = None,
+              jurisdiction: Optional[str] = None,
+              tag: Optional[str] = None,
+              role_id: Optional[str] = None,
+              min_confidence: Optional[float] = None,
+              compliance_tag: Optional[str] = None
+             ) -> Optional[List[str]]:
+        """
+        Returns matching provision IDs in insertion order, or None when no filter is set
+        (the caller should then return every provision).
+        """
+        candidate_sets: List[Set[str]] = []
+        for value, index in (
+            (regulation_id, self.by_regulation),
+            (jurisdiction, self.by_jurisdiction),
+            (tag, self.by_tag),
+            (role_id, self.by_role),
+            (compliance_tag, self.by_crosswalk),
+        ):
+            if value:
+                ids = index.get(value)
+                if not ids:
+                    return []
+                candidate_sets.append(ids)
+
+        confidence_start = None
+        if min_confidence is not None:
+            confidence_start = self._confidence_start(min_confidence)
+            confidence_count = len(self.confidence_sorted) - confidence_start
+            if confidence_count == 0:
+                return []
+            # Only materialize the confidence range if it is smaller than every hash candidate set
+            if not candidate_sets or confidence_count < min(len(s) for s in candidate_sets):
+                candidate_sets.append({pid for _, pid in self.confidence_sorted[confidence_start:]})
+                confidence_start = None
+
+        if not candidate_sets:
+            return None
+
+        candidate_sets.sort(key=len)
+        result = set(candidate_sets[0])
+        for ids in candidate_sets[1:]:
+            result.intersection_update(ids)
+            if not result:
+                return []
+        if confidence_start is not None:
+            result = {pid for pid in result if self.confidence.get(pid, float('-inf')) >= min_confidence}
+
+        return sorted(result, key=self._order.__getitem__)
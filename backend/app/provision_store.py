@@ -0,0 +1,270 @@
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, MutableMapping, Optional, Tuple
+
+from .models import Provision
+
+LIST_FIELDS = ("roles_responsible", "crosswalks", "spiderweb_links", "octopus_refs", "tags")
+# Short, highly repetitive fields stored as codes into the shared string pool
+INTERNED_FIELDS = ("regulation_id", "section", "jurisdiction", "parent_id")
+
+_NONE = -1
+_NO_LEVEL = -(2 ** 31)
+# A list-values array is compacted once it has at least this many unreachable codes and they
+# outnumber the live ones
+COMPACT_MIN_DEAD = 1024
+
+
+class StringPool:
+    """Interns strings to dense integer codes so each distinct value is stored once."""
+
+    def __init__(self):
+        self.strings: List[str] = []
+        self.codes: Dict[str, int] = {}
+
+    def code(self, value: Optional[str]) -> int:
+        if value is None:
+            return _NONE
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.strings)
+            value = str(value)
+            self.strings.append(value)
+            self.codes[value] = code
+        return code
+
+    def value(self, code: int) -> Optional[str]:
+        return None if code == _NONE else self.strings[code]
+
+    def intern(self, value: Any) -> Any:
+        """Returns the pooled copy of a string (other values unchanged)."""
+        return self.strings[self.code(value)] if isinstance(value, str) else value
+
+
+class ColumnarProvisionStore(MutableMapping[str, Provision]):
+    """
+    Provision storage laid out as columns instead of one Pydantic object per provision.
+    - Repetitive strings (regulation, jurisdiction, section, parent, list entries) are interned.
+    - hierarchy_level is an int array.
+    - The five list fields are adjacency lists: per-row (start, length) into an int array of
+      string codes.
+    - metadata dicts are split into an interned key tuple ("shape") and a value tuple.
+    Provision models are built on demand in __getitem__, so memory scales with the columns rather
+    than with per-object overhead. Drop-in for the Dict[str, Provision] used by KnowledgeGraphManager;
+    note that mutating a returned Provision does not change the store - assign it back instead.
+    Updates keep memory bounded: rows freed by deletes are reused, a list that still fits its run
+    is rewritten in place, and a list-values array is compacted once most of it is unreachable.
+    """
+
+    def __init__(self, provisions: Optional[Iterable[Provision]] = None):
+        self._pool = StringPool()
+        self._row: Dict[str, int] = {}
+        self._ids: List[str] = []
+        self._titles: List[str] = []
+        self._texts: List[str] = []
+        self._interned: Dict[str, array] = {field: array("i") for field in INTERNED_FIELDS}
+        self._levels = array("i")
+        self._list_start: Dict[str, array] = {field: array("I") for field in LIST_FIELDS}
+        self._list_len: Dict[str, array] = {field: array("I") for field in LIST_FIELDS}
+        self._list_values: Dict[str, array] = {field: array("i") for field in LIST_FIELDS}
+        self._dead_values: Dict[str, int] = {field: 0 for field in LIST_FIELDS} # unreachable codes per array
+        self._free_rows: List[int] = []
+        self._metadata_shapes: List[Tuple[str, ...]] = []
+        self._metadata_shape_codes: Dict[Tuple[str, ...], int] = {}
+        self._metadata_shape = array("i")
+        self._metadata_values: List[Optional[Tuple[Any, ...]]] = []
+        for provision in provisions or ():
+            self[provision.id] = provision
+
+    @classmethod
+    def from_provisions(cls, provisions: Iterable[Provision]) -> "ColumnarProvisionStore":
+        return cls(provisions)
+
+    # --- Mapping interface ---
+
+    def __len__(self) -> int:
+        return len(self._row)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._row)
+
+    def __contains__(self, provision_id: object) -> bool:
+        return provision_id in self._row
+
+    def __getitem__(self, provision_id: str) -> Provision:
+        return self._build(self._row[provision_id])
+
+    def __setitem__(self, provision_id: str, provision: Provision):
+        row = self._row.get(provision_id)
+        if row is not None:
+            self._write_row(row, provision)
+        elif self._free_rows:
+            row = self._free_rows.pop()
+            self._ids[row] = self._pool.intern(provision_id)
+            self._row[self._ids[row]] = row
+            self._write_row(row, provision)
+        else:
+            row = len(self._ids)
+            self._row[self._pool.intern(provision_id)] = row
+            self._append_row(provision)
+
+    def __delitem__(self, provision_id: str):
+        row = self._row.pop(provision_id)
+        # Release what the row holds; the slot is reused by the next new provision
+        self._titles[row] = self._texts[row] = ""
+        self._metadata_shape[row], self._metadata_values[row] = _NONE, None
+        for field in LIST_FIELDS:
+            self._drop_values(field, self._list_len[field][row])
+            self._list_len[field][row] = 0
+        self._free_rows.append(row)
+
+    # --- column access without building models ---
+
+    def field_value(self, provision_id: str, field: str) -> Any:
+        """Reads one field of a provision straight from its column."""
+        row = self._row[provision_id]
+        if field == "id":
+            return self._ids[row]
+        if field == "title":
+            return self._titles[row]
+        if field == "text":
+            return self._texts[row]
+        if field == "hierarchy_level":
+            level = self._levels[row]
+            return None if level == _NO_LEVEL else level
+        if field in self._interned:
+            return self._pool.value(self._interned[field][row])
+        if field in self._list_start:
+            return self._list(field, row)
+        if field == "metadata":
+            return self._metadata(row)
+        raise KeyError(field)
+
+    # --- row encoding ---
+
+    def _append_row(self, provision: Provision):
+        pool = self._pool
+        self._ids.append(pool.intern(provision.id))
+        self._titles.append(provision.title)
+        self._texts.append(provision.text)
+        for field in INTERNED_FIELDS:
+            self._interned[field].append(pool.code(getattr(provision, field)))
+        self._levels.append(_NO_LEVEL if provision.hierarchy_level is None else provision.hierarchy_level)
+        for field in LIST_FIELDS:
+            start, length = self._append_list(field, getattr(provision, field))
+            self._list_start[field].append(start)
+            self._list_len[field].append(length)
+        shape, values = self._encode_metadata(provision.metadata)
+        self._metadata_shape.append(shape)
+        self._metadata_values.append(values)
+
+    def _write_row(self, row: int, provision: Provision):
+        pool = self._pool
+        self._titles[row] = provision.title
+        self._texts[row] = provision.text
+        for field in INTERNED_FIELDS:
+            self._interned[field][row] = pool.code(getattr(provision, field))
+        self._levels[row] = _NO_LEVEL if provision.hierarchy_level is None else provision.hierarchy_level
+        for field in LIST_FIELDS:
+            items = getattr(provision, field)
+            if list(items) != self._list(field, row):
+                self._write_list(field, row, items)
+        self._metadata_shape[row], self._metadata_values[row] = self._encode_metadata(provision.metadata)
+
+    def _append_list(self, field: str, items: List[str]) -> Tuple[int, int]:
+        values = self._list_values[field]
+        start = len(values)
+        values.extend(self._pool.code(item) for item in items)
+        return start, len(values) - start
+
+    def _write_list(self, field: str, row: int, items: List[str]):
+        old_length = self._list_len[field][row]
+        if len(items) <= old_length:
+            # Fits the row's current run: overwrite it, the tail becomes unreachable
+            start = self._list_start[field][row]
+            self._list_values[field][start:start + len(items)] = array("i", (self._pool.code(item) for item in items))
+            self._list_len[field][row] = len(items)
+            self._drop_values(field, old_length - len(items))
+        else:
+            self._list_start[field][row], self._list_len[field][row] = self._append_list(field, items)
+            self._drop_values(field, old_length)
+
+    def _drop_values(self, field: str, count: int):
+        self._dead_values[field] += count
+        dead = self._dead_values[field]
+        if dead >= COMPACT_MIN_DEAD and 2 * dead > len(self._list_values[field]):
+            self._compact(field)
+
+    def _compact(self, field: str):
+        """Rewrites the list-values array with only the runs live rows point at."""
+        values, starts, lengths = self._list_values[field], self._list_start[field], self._list_len[field]
+        compacted = array("i")
+        for row in self._row.values():
+            start = starts[row]
+            starts[row] = len(compacted)
+            compacted.extend(values[start:start + lengths[row]])
+        self._list_values[field] = compacted
+        self._dead_values[field] = 0
+
+    def _list(self, field: str, row: int) -> List[str]:
+        start = self._list_start[field][row]
+        strings = self._pool.strings
+        return [strings[code] for code in self._list_values[field][start:start + self._list_len[field][row]]]
+
+    def _encode_metadata(self, metadata: Optional[Dict]) -> Tuple[int, Optional[Tuple[Any, ...]]]:
+        if metadata is None:
+            return _NONE, None
+        shape = tuple(self._pool.intern(key) for key in metadata)
+        code = self._metadata_shape_codes.get(shape)
+        if code is None:
+            code = len(self._metadata_shapes)
+            self._metadata_shapes.append(shape)
+            self._metadata_shape_codes[shape] = code
+        return code, tuple(self._encode_value(value) for value in metadata.values())
+
+    def _encode_value(self, value: Any) -> Any:
+        if isinstance(value, str):
+            return self._pool.intern(value)
+        if isinstance(value, list):
+            return _FrozenList(self._encode_value(item) for item in value)
+        return value
+
+    def _metadata(self, row: int) -> Optional[Dict]:
+        shape = self._metadata_shape[row]
+        if shape == _NONE:
+            return None
+        return {key: _thaw(value) for key, value in zip(self._metadata_shapes[shape], self._metadata_values[row])}
+
+    def _build(self, row: int) -> Provision:
+        pool = self._pool
+        level = self._levels[row]
+        fields = {field: pool.value(self._interned[field][row]) for field in INTERNED_FIELDS}
+        fields.update({field: self._list(field, row) for field in LIST_FIELDS})
+        # Values were validated when the provision was stored
+        return Provision.model_construct(
+            id=self._ids[row],
+            title=self._titles[row],
+            text=self._texts[row],
+            hierarchy_level=None if level == _NO_LEVEL else level,
+            metadata=self._metadata(row),
+            **fields
+        )
+
+
+class _FrozenList(tuple):
+    """Tuple stand-in for a list inside metadata; turned back into a list when read."""
+    __slots__ = ()
+
+
+def _thaw(value: Any) -> Any:
+    if isinstance(value, _FrozenList):
+        return [_thaw(item) for item in value]
+    return value
+
+
+def make_provision_store(backend: str) -> MutableMapping[str, Provision]:
+    """Empty provision storage for a KnowledgeGraphManager storage_backend ('dict' or 'columnar')."""
+    if backend == "dict":
+        return {}
+    if backend == "columnar":
+        return ColumnarProvisionStore()
+    raise ValueError(f"Unknown provision storage backend: {backend!r} (expected 'dict' or 'columnar')")
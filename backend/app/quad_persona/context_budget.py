@@ -0,0 +1,123 @@
+import math
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Prompt-history budgets, in (estimated) tokens
+EXPERT_HISTORY_BUDGET = 1500
+SYNTHESIZER_HISTORY_BUDGET = 4000
+SUMMARY_TOKENS = 120
+CHARS_PER_TOKEN = 4
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """~4 characters per token, the usual rule of thumb for English with GPT tokenizers.
+       Pass a real tokenizer's counter to HistoryContext when exact counts matter."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+def summarize(text: str, max_tokens: int, count_tokens: Callable[[str], int] = estimate_tokens) -> str:
+    """
+    Extractive summary: the entry's header line (e.g. "Name (profile) Output:") followed by
+    leading sentences of the body while they fit in max_tokens; a first sentence that is
+    already too long is cut. Costs no LLM call.
+    """
+    if count_tokens(text) <= max_tokens:
+        return text
+    lines = text.strip().split("\n", 1)
+    header, body = (lines[0], lines[1]) if len(lines) == 2 else ("", lines[0])
+    kept: List[str] = []
+    used = count_tokens(header)
+    for sentence in _SENTENCE_END.split(body.strip()):
+        cost = count_tokens(sentence) + 1
+        if used + cost > max_tokens:
+            break
+        kept.append(sentence)
+        used += cost
+    if not kept:
+        kept.append(body[:max(0, max_tokens - used) * CHARS_PER_TOKEN].rstrip())
+    summary = " ".join(kept) + " [...]"
+    return f"{header}\n{summary}\n" if header else f"{summary}\n"
+
+
+def _omission_marker(omitted: int) -> str:
+    return f"[{omitted} earlier step(s) omitted to fit the context budget]\n"
+
+
+class HistoryContext:
+    """
+    Reasoning history of one pipeline run, with token counts and a precomputed summary per entry.
+    The full entries are kept (they are also in the trace as step outputs); window() hands a
+    prompt a slice that fits a token budget:
+      1. every entry as its summary, dropping the oldest unpinned ones (plus the cost of the
+         omission marker that replaces them) if even that does not fit
+      2. then, newest first, entries upgraded back to their full text while the budget allows
+    so recent steps arrive verbatim, older ones condensed, and prompt size stays bounded no
+    matter how long the plan is. Pinned entries (the planner's plan) are never dropped.
+    """
+
+    def __init__(self, summary_tokens: int = SUMMARY_TOKENS, count_tokens: Callable[[str], int] = estimate_tokens):
+        self.summary_tokens = summary_tokens
+        self.count_tokens = count_tokens
+        self.entries: List[str] = []
+        self.summaries: List[str] = []
+        self.tokens: List[int] = []
+        self.summary_token_counts: List[int] = []
+        self.pinned: List[bool] = []
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(self, text: str, pinned: bool = False):
+        summary = summarize(text, self.summary_tokens, self.count_tokens)
+        self.pinned.append(pinned)
+        self.entries.append(text)
+        self.summaries.append(summary)
+        self.tokens.append(self.count_tokens(text))
+        self.summary_token_counts.append(self.count_tokens(summary))
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(self.tokens)
+
+    def window(self, budget: Optional[int]) -> Tuple[List[str], Dict[str, int]]:
+        """(history slice in chronological order, stats). budget=None returns the full history."""
+        n = len(self.entries)
+        if budget is None:
+            return list(self.entries), self._stats(n, 0, 0, self.total_tokens)
+        # Oldest unpinned summaries go first when even the condensed history is over budget;
+        # the marker standing in for them is paid for before the budget check
+        kept = [True] * n
+        cost, omitted, marker_cost, first_omitted = sum(self.summary_token_counts), 0, 0, None
+        for i in range(n):
+            if cost + marker_cost <= budget:
+                break
+            if self.pinned[i]:
+                continue
+            kept[i] = False
+            cost -= self.summary_token_counts[i]
+            omitted += 1
+            marker_cost = self.count_tokens(_omission_marker(omitted))
+            first_omitted = i if first_omitted is None else first_omitted
+        cost += marker_cost
+        full = [False] * n
+        for i in range(n - 1, -1, -1):
+            if not kept[i]:
+                continue
+            upgraded = cost - self.summary_token_counts[i] + self.tokens[i]
+            if upgraded > budget:
+                break
+            full[i], cost = True, upgraded
+        chosen = []
+        for i in range(n):
+            if i == first_omitted:
+                chosen.append(_omission_marker(omitted))
+            if kept[i]:
+                chosen.append(self.entries[i] if full[i] else self.summaries[i])
+        verbatim = sum(full)
+        return chosen, self._stats(verbatim, n - omitted - verbatim, omitted, cost)
+
+    def _stats(self, verbatim: int, summarized: int, omitted: int, sent_tokens: int) -> Dict[str, int]:
+        return {"history_tokens": self.total_tokens, "sent_tokens": sent_tokens,
+                "verbatim": verbatim, "summarized": summarized, "omitted": omitted}
@@ -0,0 +1,208 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL_SECONDS = 3600.0
+# Calls sampled hotter than this are expected to vary, so they are never served from cache
+DEFAULT_MAX_TEMPERATURE = 0.7
+
+
+def make_cache_key(model: str, system_message: str, prompt: str, **params: Any) -> str:
+    """Content address of one chat completion: sha256 over model, messages and sampling params."""
+    payload = json.dumps(
+        {"model": model, "system": system_message, "prompt": prompt, "params": params},
+        sort_keys=True, ensure_ascii=False, separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Two-tier cache for LLM response text.
+    - Memory tier: LRU (OrderedDict) bounded by max_entries.
+    - Disk tier (optional): SQLite file that survives restarts; hits are promoted to memory.
+    Entries older than ttl_seconds are treated as misses in both tiers.
+    Safe to share between threads and asyncio tasks. Coroutines use aget/aset, which serve the
+    memory tier inline and run the SQLite tier in a worker thread, off the event loop.
+    """
+
+    def __init__(self,
+                 max_entries: int = DEFAULT_MAX_ENTRIES,
+                 ttl_seconds: Optional[float] = DEFAULT_TTL_SECONDS,
+                 db_path: Optional[str] = None,
+                 max_temperature: float = DEFAULT_MAX_TEMPERATURE):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_temperature = max_temperature
+        self.db_path = db_path
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock() # memory tier and counters
+        self._db_lock = threading.Lock() # the SQLite connection; never held by the event loop thread while it waits on disk
+        self._db: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.skips = 0
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    @classmethod
+    def from_env(cls) -> Optional["LLMResponseCache"]:
+        """Builds the cache from LLM_CACHE_* settings; returns None when LLM_CACHE_ENABLED=0."""
+        if os.getenv("LLM_CACHE_ENABLED", "1") == "0":
+            return None
+        ttl = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(DEFAULT_TTL_SECONDS)))
+        return cls(
+            max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", str(DEFAULT_MAX_ENTRIES))),
+            ttl_seconds=ttl if ttl > 0 else None,
+            db_path=os.getenv("LLM_CACHE_DB") or None,
+            max_temperature=float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", str(DEFAULT_MAX_TEMPERATURE))),
+        )
+
+    def accepts(self, temperature: float, persona_opt_out: bool = False) -> bool:
+        """Whether a call with these settings may be served from / stored in the cache."""
+        if persona_opt_out or temperature > self.max_temperature:
+            with self._lock:
+                self.skips += 1
+            return False
+        return True
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        value = self._memory_get(key, now)
+        return value if value is not None else self._disk_get(key, now)
+
+    async def aget(self, key: str) -> Optional[str]:
+        now = time.time()
+        value = self._memory_get(key, now)
+        if value is not None or self._db is None:
+            return value if value is not None else self._disk_get(key, now)
+        return await asyncio.to_thread(self._disk_get, key, now)
+
+    def set(self, key: str, value: str):
+        created_at = time.time()
+        with self._lock:
+            self._remember(key, created_at, value)
+        self._disk_set(key, value, created_at)
+
+    async def aset(self, key: str, value: str):
+        created_at = time.time()
+        with self._lock:
+            self._remember(key, created_at, value)
+        if self._db is not None:
+            await asyncio.to_thread(self._disk_set, key, value, created_at)
+
+    def _memory_get(self, key: str, now: float) -> Optional[str]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            if self._expired(entry[0], now):
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def _disk_get(self, key: str, now: float) -> Optional[str]:
+        # Called after a memory miss; counts the lookup's final outcome
+        row = None
+        with self._db_lock:
+            if self._db is not None:
+                row = self._db.execute("SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+                if row is not None and self._expired(row[1], now):
+                    self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self._db.commit()
+                    row = None
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            value, created_at = row
+            self._remember(key, created_at, value)
+            self.hits += 1
+            self.disk_hits += 1
+            return value
+
+    def _disk_set(self, key: str, value: str, created_at: float):
+        with self._db_lock:
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, created_at) VALUES (?, ?, ?)",
+                    (key, value, created_at)
+                )
+                self._db.commit()
+
+    def _remember(self, key: str, created_at: float, value: str):
+        # Caller holds the lock
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def clear(self):
+        with self._db_lock:
+            if self._db is not None:
+                self._db.execute("DELETE FROM llm_cache")
+                self._db.commit()
+        with self._lock:
+            self._memory.clear()
+            self.hits = self.disk_hits = self.misses = self.skips = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "skips": self.skips,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+            }
+
+    def close(self):
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+def persona_cache_opt_out(profile: Any) -> bool:
+    """A persona opts out with simulation_parameters={"llm_cache": False}."""
+    params = getattr(profile, "simulation_parameters", None) or {}
+    return params.get("llm_cache", True) is False
+
+
+_UNSET = object()
+_shared_cache: Any = _UNSET
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """Process-wide cache, created on first use from environment settings (None if disabled)."""
+    global _shared_cache
+    if _shared_cache is _UNSET:
+        _shared_cache = LLMResponseCache.from_env()
+    return _shared_cache
+
+
+def set_llm_cache(cache: Optional[LLMResponseCache]):
+    """Replaces the shared cache; pass None to disable caching."""
+    global _shared_cache
+    _shared_cache = cache
@@ -0,0 +1,187 @@
+import asyncio
+import os
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+import httpx
+from openai import AsyncAzureOpenAI, AsyncOpenAI, DefaultAsyncHttpxClient
+
+from ..metrics import count_http_attempt
+
+DEFAULT_MODEL = "gpt-4.1"
+
+
+def _connection_limits(max_connections: int, max_keepalive: int) -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive,
+        keepalive_expiry=5.0,
+    )
+
+
+async def _count_http_attempt(request):
+    count_http_attempt(request)
+
+
+class AsyncLLMClient:
+    """
+    Shared asyncio chat-completion client for the Quad-Persona pipeline.
+    - One pooled HTTP client (keep-alive connections are reused across requests).
+    - A semaphore bounds the number of in-flight LLM calls per process.
+    - Every call has its own timeout.
+    Talks to Azure OpenAI by default; pass base_url (or set LLM_BASE_URL) to use any
+    OpenAI-compatible endpoint, e.g. a local mock server in tests.
+    """
+
+    def __init__(self,
+                 model: str = DEFAULT_MODEL,
+                 base_url: Optional[str] = None,
+                 api_key: Optional[str] = None,
+                 max_concurrency: int = 64,
+                 max_connections: int = 100,
+                 max_keepalive: int = 20,
+                 timeout: float = 60.0,
+                 max_retries: int = 2):
+        self.model = model
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        # The request hook counts HTTP attempts, so app.metrics sees the SDK's retries
+        http_client = DefaultAsyncHttpxClient(limits=_connection_limits(max_connections, max_keepalive),
+                                              event_hooks={"request": [_count_http_attempt]})
+        if base_url:
+            self._client = AsyncOpenAI(
+                base_url=base_url,
+                api_key=api_key or os.getenv("LLM_API_KEY") or "not-needed",
+                http_client=http_client,
+                max_retries=max_retries,
+            )
+        else:
+            self._client = AsyncAzureOpenAI(
+                api_key=api_key or os.getenv("AZURE_OPENAI_API_KEY"),
+                api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2025-03-01-preview"),
+                azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+                http_client=http_client,
+                max_retries=max_retries,
+            )
+
+    @classmethod
+    def from_env(cls) -> "AsyncLLMClient":
+        return cls(
+            model=os.getenv("LLM_MODEL", DEFAULT_MODEL),
+            base_url=os.getenv("LLM_BASE_URL") or None,
+            max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "64")),
+            max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "100")),
+            timeout=float(os.getenv("LLM_TIMEOUT_SECONDS", "60")),
+        )
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so the client can be constructed outside a running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def chat(self,
+                   prompt: str,
+                   system_message: str,
+                   temperature: float = 0.7,
+                   max_tokens: int = 2048,
+                   top_p: float = 0.95,
+                   timeout: Optional[float] = None) -> Any:
+        """Runs one chat completion and returns the raw SDK response.
+           Raises asyncio.TimeoutError if the call exceeds the timeout (time queued for a
+           concurrency slot is not counted).
+        """
+        messages: List[Dict[str, str]] = [
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": prompt}
+        ]
+        call_timeout = timeout if timeout is not None else self.timeout
+        async with self.semaphore:
+            return await asyncio.wait_for(
+                self._client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    top_p=top_p,
+                    frequency_penalty=0,
+                    presence_penalty=0,
+                    timeout=call_timeout,
+                ),
+                timeout=call_timeout,
+            )
+
+    async def chat_stream(self,
+                          prompt: str,
+                          system_message: str,
+                          temperature: float = 0.7,
+                          max_tokens: int = 2048,
+                          top_p: float = 0.95,
+                          timeout: Optional[float] = None,
+                          on_usage: Optional[Callable[[Any], None]] = None) -> AsyncIterator[str]:
+        """Streams one chat completion, yielding content deltas as they arrive.
+           The timeout applies to opening the stream and to each wait for the next chunk.
+           Token usage arrives in the stream's final chunk and is passed to on_usage.
+        """
+        messages: List[Dict[str, str]] = [
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": prompt}
+        ]
+        call_timeout = timeout if timeout is not None else self.timeout
+        async with self.semaphore:
+            stream = await asyncio.wait_for(
+                self._client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    top_p=top_p,
+                    frequency_penalty=0,
+                    presence_penalty=0,
+                    timeout=call_timeout,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                ),
+                timeout=call_timeout,
+            )
+            chunks = stream.__aiter__()
+            try:
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout=call_timeout)
+                    except StopAsyncIteration:
+                        break
+                    if on_usage is not None and getattr(chunk, "usage", None) is not None:
+                        on_usage(chunk.usage)
+                    if chunk.choices and chunk.choices[0].delta and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            finally:
+                await stream.close()
+
+    async def aclose(self):
+        await self._client.close()
+
+
+_shared_client: Optional[AsyncLLMClient] = None
+
+
+def get_async_llm_client() -> AsyncLLMClient:
+    """Process-wide client, created on first use from environment settings."""
+    global _shared_client
+    if _shared_client is None:
+        _shared_client = AsyncLLMClient.from_env()
+    return _shared_client
+
+
+def set_async_llm_client(client: Optional[AsyncLLMClient]):
+    """Replaces the shared client (used by tests and app startup)."""
+    global _shared_client
+    _shared_client = client
+
+
+async def close_async_llm_client():
+    global _shared_client
+    if _shared_client is not None:
+        await _shared_client.aclose()
+        _shared_client = None
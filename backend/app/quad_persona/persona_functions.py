@@ -1,185 +1,247 @@
 from .schema.data_models import PersonaProfile, ReasoningStep
-from typing import Tuple, List, Dict, Optional
+from typing import Tuple, List, Dict, Optional, Any, AsyncIterator, Union
 import os
-from openai import AzureOpenAI
+from openai import AzureOpenAI, DefaultHttpxClient
 from datetime import datetime
 import uuid
 import random
 import json # For parsing the planner's output
+import logging
 from ..models import Provision # Adjusted import for Provision
-
-# Initialize Azure OpenAI client
-client = AzureOpenAI(
-    api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-    api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2025-03-01-preview"),
-    azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT")
-)
-
-def get_gpt_response(prompt: str, system_message: str) -> str:
-    """Get a response from Azure OpenAI GPT-4.1"""
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4.1",
-            messages=[
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=2048,
-            top_p=0.95,
-            frequency_penalty=0,
-            presence_penalty=0
+from ..metrics import count_http_attempt, llm_call
+from .llm_client import get_async_llm_client
+from .llm_cache import LLMResponseCache, get_llm_cache, make_cache_key, persona_cache_opt_out
+from .prompt_templates import compiled_template, persona_config
+
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = "gpt-4.1"
+# Start of the text returned in place of a response when the LLM call fails
+LLM_ERROR_PREFIX = "Error: Could not get response from LLM."
+
+# Azure OpenAI client, created on first use so importing this module does not require credentials
+_client: Optional[AzureOpenAI] = None
+
+def _get_client() -> AzureOpenAI:
+    global _client
+    if _client is None:
+        _client = AzureOpenAI(
+            api_key=os.getenv("AZURE_OPENAI_API_KEY"),
+            api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2025-03-01-preview"),
+            azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+            http_client=DefaultHttpxClient(event_hooks={"request": [count_http_attempt]}) # retry counts for app.metrics
         )
-        return response.choices[0].message.content.strip() if response.choices and response.choices[0].message else "No response from API."
-    except Exception as e:
-        print(f"Error calling OpenAI API: {e}")
-        return f"Error: Could not get response from LLM. Details: {str(e)}"
-
-def simulate_knowledge_expert(query: str, history: List[str], profile: PersonaProfile) -> ReasoningStep:
-    """Simulate a Knowledge Expert analyzing the query, using a provided PersonaProfile."""
-    start_time = datetime.utcnow()
-
-    system_message = f"""You are {profile.name}, a {profile.persona_archetype} and {profile.job_title_exemplar}.
-    Your expertise lies in {', '.join(profile.domain_expertise)}.
-    Your key responsibilities include: {', '.join(profile.key_responsibilities_or_tasks)}.
-    Your behavioral traits are: {', '.join(profile.behavioral_traits)}.
-    Analyze the query from first principles and theoretical foundations.
-    Previous analysis steps for context (if any):
-    {''.join(history)}
-    Focus on identifying key concepts, core principles, and theoretical underpinnings related to the query: '{query}'"""
-
-    response_text = get_gpt_response(query, system_message)
-
-    end_time = datetime.utcnow()
-    step_id = f"ks_{uuid.uuid4()}"
-
-    # Use the passed-in profile information
+    return _client
+
+def _response_text(response: Any) -> str:
+    return response.choices[0].message.content.strip() if response.choices and response.choices[0].message else "No response from API."
+
+DEFAULT_TEMPERATURE = 0.7
+MAX_TOKENS = 2048
+TOP_P = 0.95
+
+def _persona_llm_settings(profile: PersonaProfile) -> Tuple[float, bool]:
+    """(temperature, cache opt-out) for a persona; see PersonaProfile.simulation_parameters."""
+    params = profile.simulation_parameters or {}
+    return params.get("llm_temperature_override", DEFAULT_TEMPERATURE), persona_cache_opt_out(profile)
+
+def _cache_key(model: str, prompt: str, system_message: str, temperature: float, cache_opt_out: bool) -> Tuple[Optional[LLMResponseCache], Optional[str]]:
+    """Returns (cache, key); both are None when the call must not be cached."""
+    cache = get_llm_cache()
+    if cache is None or not cache.accepts(temperature, cache_opt_out):
+        return None, None
+    return cache, make_cache_key(model, system_message, prompt, temperature=temperature, max_tokens=MAX_TOKENS, top_p=TOP_P)
+
+def _cache_lookup(model: str, prompt: str, system_message: str, temperature: float, cache_opt_out: bool) -> Tuple[Optional[LLMResponseCache], Optional[str], Optional[str]]:
+    """Returns (cache, key, cached_text); cache and key are None when the call must not be cached."""
+    cache, key = _cache_key(model, prompt, system_message, temperature, cache_opt_out)
+    return cache, key, cache.get(key) if cache is not None else None
+
+async def _cache_lookup_async(model: str, prompt: str, system_message: str, temperature: float, cache_opt_out: bool) -> Tuple[Optional[LLMResponseCache], Optional[str], Optional[str]]:
+    """_cache_lookup for coroutines: the disk tier is read off the event loop."""
+    cache, key = _cache_key(model, prompt, system_message, temperature, cache_opt_out)
+    return cache, key, await cache.aget(key) if cache is not None else None
+
+def get_gpt_response(prompt: str, system_message: str, temperature: float = DEFAULT_TEMPERATURE, cache_opt_out: bool = False) -> str:
+    """Get a response from Azure OpenAI GPT-4.1 (served from the LLM response cache when possible)"""
+    with llm_call() as call:
+        cache, key, cached = _cache_lookup(MODEL_NAME, prompt, system_message, temperature, cache_opt_out)
+        if cached is not None:
+            call.cache_hit = True
+            return cached
+        try:
+            response = _get_client().chat.completions.create(
+                model=MODEL_NAME,
+                messages=[
+                    {"role": "system", "content": system_message},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=temperature,
+                max_tokens=MAX_TOKENS,
+                top_p=TOP_P,
+                frequency_penalty=0,
+                presence_penalty=0
+            )
+            call.set_usage(getattr(response, "usage", None))
+            text = _response_text(response)
+            if cache is not None and response.choices:
+                cache.set(key, text)
+            return text
+        except Exception as e:
+            call.error = True
+            logger.error(f"Error calling OpenAI API: {e}")
+            return f"{LLM_ERROR_PREFIX} Details: {str(e)}"
+
+async def get_gpt_response_async(prompt: str, system_message: str, temperature: float = DEFAULT_TEMPERATURE, cache_opt_out: bool = False) -> str:
+    """Async variant of get_gpt_response using the shared pooled client (see llm_client.py)."""
+    client = get_async_llm_client()
+    with llm_call() as call:
+        cache, key, cached = await _cache_lookup_async(client.model, prompt, system_message, temperature, cache_opt_out)
+        if cached is not None:
+            call.cache_hit = True
+            return cached
+        try:
+            response = await client.chat(prompt, system_message, temperature=temperature, max_tokens=MAX_TOKENS, top_p=TOP_P)
+            call.set_usage(getattr(response, "usage", None))
+            text = _response_text(response)
+            if cache is not None and response.choices:
+                await cache.aset(key, text)
+            return text
+        except Exception as e:
+            call.error = True
+            logger.error(f"Error calling OpenAI API: {e!r}")
+            return f"{LLM_ERROR_PREFIX} Details: {str(e) or type(e).__name__}"
+
+async def stream_gpt_response_async(prompt: str, system_message: str, temperature: float = DEFAULT_TEMPERATURE, cache_opt_out: bool = False) -> AsyncIterator[str]:
+    """Streaming variant of get_gpt_response_async: yields text deltas as the LLM produces them.
+       A cached response is yielded in one piece; on failure the usual error string is yielded.
+       Token usage is read from the stream's final chunk.
+    """
+    client = get_async_llm_client()
+    with llm_call() as call:
+        cache, key, cached = await _cache_lookup_async(client.model, prompt, system_message, temperature, cache_opt_out)
+        if cached is not None:
+            call.cache_hit = True
+            yield cached
+            return
+        parts: List[str] = []
+        try:
+            async for delta in client.chat_stream(prompt, system_message, temperature=temperature, max_tokens=MAX_TOKENS, top_p=TOP_P, on_usage=call.set_usage):
+                parts.append(delta)
+                yield delta
+        except Exception as e:
+            call.error = True
+            logger.error(f"Error calling OpenAI API: {e!r}")
+            yield f"{' ' if parts else ''}{LLM_ERROR_PREFIX} Details: {str(e) or type(e).__name__}"
+            return
+        if cache is not None and parts:
+            await cache.aset(key, "".join(parts).strip())
+
+# --- Expert prompts ---
+
+# System messages render the archetype's template with the profile's fields already bound (see prompt_templates.py)
+
+def _expert_system_message(archetype: str, query: str, history: List[str], profile: PersonaProfile) -> str:
+    return compiled_template(archetype, profile).render(history=''.join(history), query=query)
+
+def _knowledge_expert_system_message(query: str, history: List[str], profile: PersonaProfile) -> str:
+    return _expert_system_message("KnowledgeExpert", query, history, profile)
+
+def _sector_expert_system_message(query: str, history: List[str], profile: PersonaProfile) -> str:
+    return _expert_system_message("SectorExpert", query, history, profile)
+
+def _regulatory_expert_system_message(query: str, history: List[str], profile: PersonaProfile) -> str:
+    return _expert_system_message("RegulatoryExpert", query, history, profile)
+
+def _compliance_expert_system_message(query: str, history: List[str], profile: PersonaProfile) -> str:
+    return _expert_system_message("ComplianceExpert", query, history, profile)
+
+# Per-archetype prompt builder, step ID prefix, step description and placeholder confidence range
+EXPERT_CONFIGS: Dict[str, Dict[str, Any]] = {
+    "KnowledgeExpert": {
+        "system_message": _knowledge_expert_system_message,
+        "step_prefix": "ks",
+        "description": "providing foundational knowledge analysis.",
+        "confidence_range": (0.7, 0.95),
+    },
+    "SectorExpert": {
+        "system_message": _sector_expert_system_message,
+        "step_prefix": "se",
+        "description": "providing sector-specific application analysis.",
+        "confidence_range": (0.65, 0.9),
+    },
+    "RegulatoryExpert": {
+        "system_message": _regulatory_expert_system_message,
+        "step_prefix": "re",
+        "description": "providing regulatory and policy analysis.",
+        "confidence_range": (0.7, 0.95),
+    },
+    "ComplianceExpert": {
+        "system_message": _compliance_expert_system_message,
+        "step_prefix": "ce",
+        "description": "providing compliance and risk analysis.",
+        "confidence_range": (0.75, 0.98),
+    },
+}
+
+def _expert_step(archetype: str, query: str, history: List[str], profile: PersonaProfile,
+                 response_text: str, start_time: datetime) -> ReasoningStep:
+    config = EXPERT_CONFIGS[archetype]
     return ReasoningStep(
-        step_id=step_id,
-        description=f"{profile.name} ({profile.persona_archetype}) providing foundational knowledge analysis.",
-        model_used="gpt-4.1",
+        step_id=f"{config['step_prefix']}_{uuid.uuid4()}",
+        description=f"{profile.name} ({profile.persona_archetype}) {config['description']}",
+        model_used=MODEL_NAME,
         persona_profile_id=profile.profile_id,
         persona_display_name=profile.name,
-        input_context={"query": query, "history": history, "persona_config": profile.model_dump(exclude_none=True)},
+        input_context={"query": query, "history": history, "persona_config": persona_config(profile)},
         output_generated=response_text,
-        confidence_score=random.uniform(0.7, 0.95), # Placeholder
+        confidence_score=random.uniform(*config["confidence_range"]), # Placeholder
         knowledge_references=profile.source_data_references, # Use from profile
         start_time=start_time,
-        end_time=end_time,
+        end_time=datetime.utcnow(),
         issues_identified=[], # Placeholder
         associated_axes=profile.ukg_axes,
         status="completed"
     )
 
-def simulate_sector_expert(query: str, history: List[str], profile: PersonaProfile) -> ReasoningStep:
-    """Simulate a Sector Expert analyzing the query, using a provided PersonaProfile."""
+def simulate_expert(archetype: str, query: str, history: List[str], profile: PersonaProfile) -> ReasoningStep:
+    """Simulate one of the four expert archetypes (see EXPERT_CONFIGS) using a provided PersonaProfile."""
     start_time = datetime.utcnow()
-    
-    system_message = f"""You are {profile.name}, a {profile.persona_archetype} and {profile.job_title_exemplar}.
-    Your expertise lies in {', '.join(profile.domain_expertise)} within industry sectors like {', '.join(profile.industry_sectors if profile.industry_sectors else ['various'])}.
-    Your key responsibilities include: {', '.join(profile.key_responsibilities_or_tasks)}.
-    Your behavioral traits are: {', '.join(profile.behavioral_traits)}.
-    Analyze the query considering its practical application in relevant industry sectors.
-    Previous analysis steps for context:
-    {''.join(history)}
-    Focus on real-world implications, industry best practices, and sector-specific challenges for the query: '{query}'"""
-
-    response_text = get_gpt_response(query, system_message)
+    system_message = EXPERT_CONFIGS[archetype]["system_message"](query, history, profile)
+    response_text = get_gpt_response(query, system_message, *_persona_llm_settings(profile))
+    return _expert_step(archetype, query, history, profile, response_text, start_time)
 
-    end_time = datetime.utcnow()
-    step_id = f"se_{uuid.uuid4()}"
+async def simulate_expert_async(archetype: str, query: str, history: List[str], profile: PersonaProfile) -> ReasoningStep:
+    """Async variant of simulate_expert."""
+    start_time = datetime.utcnow()
+    system_message = EXPERT_CONFIGS[archetype]["system_message"](query, history, profile)
+    response_text = await get_gpt_response_async(query, system_message, *_persona_llm_settings(profile))
+    return _expert_step(archetype, query, history, profile, response_text, start_time)
 
-    return ReasoningStep(
-        step_id=step_id,
-        description=f"{profile.name} ({profile.persona_archetype}) providing sector-specific application analysis.",
-        model_used="gpt-4.1",
-        persona_profile_id=profile.profile_id,
-        persona_display_name=profile.name,
-        input_context={"query": query, "history": history, "persona_config": profile.model_dump(exclude_none=True)},
-        output_generated=response_text,
-        confidence_score=random.uniform(0.65, 0.9), # Placeholder
-        knowledge_references=profile.source_data_references,
-        start_time=start_time,
-        end_time=end_time,
-        issues_identified=[],
-        associated_axes=profile.ukg_axes,
-        status="completed"
-    )
+def simulate_knowledge_expert(query: str, history: List[str], profile: PersonaProfile) -> ReasoningStep:
+    """Simulate a Knowledge Expert analyzing the query, using a provided PersonaProfile."""
+    return simulate_expert("KnowledgeExpert", query, history, profile)
+
+def simulate_sector_expert(query: str, history: List[str], profile: PersonaProfile) -> ReasoningStep:
+    """Simulate a Sector Expert analyzing the query, using a provided PersonaProfile."""
+    return simulate_expert("SectorExpert", query, history, profile)
 
 def simulate_regulatory_expert(query: str, history: List[str], profile: PersonaProfile) -> ReasoningStep:
     """Simulate a Regulatory Expert analyzing the query, using a provided PersonaProfile."""
-    start_time = datetime.utcnow()
-    
-    system_message = f"""You are {profile.name}, a {profile.persona_archetype} and {profile.job_title_exemplar}.
-    Your expertise lies in {', '.join(profile.domain_expertise)} related to regulations and policies.
-    Your key responsibilities include: {', '.join(profile.key_responsibilities_or_tasks)}.
-    Your behavioral traits are: {', '.join(profile.behavioral_traits)}.
-    Analyze the query from a regulatory and policy perspective.
-    Previous analysis steps for context:
-    {''.join(history)}
-    Focus on applicable laws, regulations, standards, and potential policy implications for the query: '{query}'"""
-    
-    response_text = get_gpt_response(query, system_message)
-
-    end_time = datetime.utcnow()
-    step_id = f"re_{uuid.uuid4()}"
-
-    return ReasoningStep(
-        step_id=step_id,
-        description=f"{profile.name} ({profile.persona_archetype}) providing regulatory and policy analysis.",
-        model_used="gpt-4.1",
-        persona_profile_id=profile.profile_id,
-        persona_display_name=profile.name,
-        input_context={"query": query, "history": history, "persona_config": profile.model_dump(exclude_none=True)},
-        output_generated=response_text,
-        confidence_score=random.uniform(0.7, 0.95),
-        knowledge_references=profile.source_data_references,
-        start_time=start_time,
-        end_time=end_time,
-        issues_identified=[],
-        associated_axes=profile.ukg_axes,
-        status="completed"
-    )
+    return simulate_expert("RegulatoryExpert", query, history, profile)
 
 def simulate_compliance_expert(query: str, history: List[str], profile: PersonaProfile) -> ReasoningStep:
     """Simulate a Compliance Expert analyzing the query, using a provided PersonaProfile."""
-    start_time = datetime.utcnow()
-
-    system_message = f"""You are {profile.name}, a {profile.persona_archetype} and {profile.job_title_exemplar}.
-    Your expertise lies in {', '.join(profile.domain_expertise)} related to compliance and risk management.
-    Your key responsibilities include: {', '.join(profile.key_responsibilities_or_tasks)}.
-    Your behavioral traits are: {', '.join(profile.behavioral_traits)}.
-    Analyze the query for compliance requirements, potential risks, and mitigation strategies.
-    Previous analysis steps for context:
-    {''.join(history)}
-    Focus on identifying compliance obligations, risks, control gaps, and ensuring adherence to standards for the query: '{query}'"""
-
-    response_text = get_gpt_response(query, system_message)
-
-    end_time = datetime.utcnow()
-    step_id = f"ce_{uuid.uuid4()}"
+    return simulate_expert("ComplianceExpert", query, history, profile)
 
-    return ReasoningStep(
-        step_id=step_id,
-        description=f"{profile.name} ({profile.persona_archetype}) providing compliance and risk analysis.",
-        model_used="gpt-4.1",
-        persona_profile_id=profile.profile_id,
-        persona_display_name=profile.name,
-        input_context={"query": query, "history": history, "persona_config": profile.model_dump(exclude_none=True)},
-        output_generated=response_text,
-        confidence_score=random.uniform(0.75, 0.98),
-        knowledge_references=profile.source_data_references,
-        start_time=start_time,
-        end_time=end_time,
-        issues_identified=[],
-        associated_axes=profile.ukg_axes,
-        status="completed"
-    )
+# --- Planner Expert ---
 
-def simulate_planner_expert(query: str, profile: PersonaProfile, provision_context: Optional[Provision] = None) -> ReasoningStep:
-    """Simulate a Planner Expert analyzing the query and generating a reasoning plan, optionally using specific provision context."""
-    start_time = datetime.utcnow()
+RELATED_EXCERPT_CHARS = 300
 
+def _planner_prompts(query: str, profile: PersonaProfile, provision_context: Optional[Provision] = None,
+                     related_provisions: Optional[List[Provision]] = None) -> Tuple[str, str]:
+    """Returns (system_message, user_prompt) for the planner. related_provisions are the
+       provisions retrieved for the query (see ProvisionVectorIndex), listed as grounding."""
     provision_details_for_prompt_lines = []
     if provision_context:
         provision_details_for_prompt_lines.append(
@@ -187,7 +249,7 @@ def simulate_planner_expert(query: str, profile: PersonaProfile, provision_conte
         )
         provision_details_for_prompt_lines.append(f"Provision ID: {provision_context.id}")
         provision_details_for_prompt_lines.append(f"Provision Title: \"{provision_context.title}\"")
-        
+
         provision_text_excerpt = provision_context.text
         if len(provision_text_excerpt) > 1000:
             provision_text_excerpt = provision_text_excerpt[:1000] + "..."
@@ -204,51 +266,32 @@ def simulate_planner_expert(query: str, profile: PersonaProfile, provision_conte
         if provision_context.roles_responsible:
             provision_details_for_prompt_lines.append(f"Responsible Role IDs: {', '.join(provision_context.roles_responsible)}")
         provision_details_for_prompt_lines.append("") # Add a final newline for separation
-    
+
+    if related_provisions:
+        provision_details_for_prompt_lines.append(
+            "\nProvisions retrieved from the knowledge graph as possibly relevant to the query (use them where they apply, ignore them otherwise):"
+        )
+        for related in related_provisions:
+            excerpt = related.text if len(related.text) <= RELATED_EXCERPT_CHARS else related.text[:RELATED_EXCERPT_CHARS] + "..."
+            provision_details_for_prompt_lines.append(f"- {related.id} \"{related.title}\": {excerpt}")
+        provision_details_for_prompt_lines.append("")
+
     provision_details_for_prompt_str = "\n".join(provision_details_for_prompt_lines)
 
-    # Doubled curly braces for literal JSON braces in f-string
-    system_message = f"""You are {profile.name}, a {profile.persona_archetype} ({profile.job_title_exemplar}).
-Your expertise: {', '.join(profile.domain_expertise)}.
-Your key responsibilities: {', '.join(profile.key_responsibilities_or_tasks)}.
-Your goal is to analyze the user's query and create a strategic reasoning plan.
-
-The user's query is: "{query}"
-{provision_details_for_prompt_str}
-Based on this query {'AND the detailed provision context provided above, ' if provision_context else ''}determine the optimal sequence of the following expert persona archetypes to involve: 
-KnowledgeExpert, SectorExpert, RegulatoryExpert, ComplianceExpert.
-You may choose to use all, some, or none, and in any order you deem best.
-For each chosen persona, briefly specify a 'focus' or sub-task for them related to the main query (and the specific provision if provided).
-
-Output your plan STRICTLY as a JSON object with the following structure:
-{{  // Doubled braces
-  "reasoning_sequence": [
-    {{ "archetype": "<Archetype_Name>", "focus": "<Specific focus or sub-task for this archetype based on the query (and provision if specified)>" }},
-    // ... more steps if needed ...
-  ],
-  "overall_strategy_rationale": "<Brief rationale for your chosen sequence and focus areas, considering the provision if provided.>"
-}}
-
-Example for a query about 'new drone regulations for agriculture' (without specific provision context):
-{{ // Doubled braces
-  "reasoning_sequence": [
-    {{ "archetype": "KnowledgeExpert", "focus": "Define key terms: drone, agriculture, current regulatory landscape overview." }},
-    {{ "archetype": "RegulatoryExpert", "focus": "Detail the new drone regulations specifically for agriculture, citing relevant sections." }},
-    {{ "archetype": "SectorExpert", "focus": "Analyze the practical impact of these new regulations on agricultural operations and drone usage." }},
-    {{ "archetype": "ComplianceExpert", "focus": "Outline compliance steps and potential challenges for agricultural businesses regarding these new drone regulations." }}
-  ],
-  "overall_strategy_rationale": "Sequential approach: define terms, detail regulations, analyze impact, then outline compliance."
-}}
-If specific provision context IS provided, your plan and rationale MUST heavily focus on that provision. For instance, if the query is "Impact analysis" and a specific provision about data storage is given, the plan should be about analyzing the impact of THAT data storage provision.
-Ensure the output is ONLY the JSON object, with no other text before or after.
-"""
-
-    llm_user_prompt = query 
+    system_message = compiled_template("PlannerExpert", profile).render(
+        query=query,
+        provision_details=provision_details_for_prompt_str,
+        provision_clause='AND the detailed provision context provided above, ' if provision_context else '',
+    )
+
+    llm_user_prompt = query
     if provision_context:
         llm_user_prompt = f"{query}\n(Context: Provision '{provision_context.title}')"
+    return system_message, llm_user_prompt
 
-    response_text = get_gpt_response(llm_user_prompt, system_message)
-
+def _planner_step(query: str, profile: PersonaProfile, provision_context: Optional[Provision],
+                  response_text: str, start_time: datetime,
+                  related_provisions: Optional[List[Provision]] = None) -> ReasoningStep:
     end_time = datetime.utcnow()
     step_id = f"planner_{uuid.uuid4()}"
 
@@ -260,23 +303,25 @@ Ensure the output is ONLY the JSON object, with no other text before or after.
             raise ValueError("Parsed JSON does not match expected plan structure.")
     except json.JSONDecodeError as e:
         parsing_error = f"Failed to parse planner output as JSON: {e}. Raw output: {response_text}"
-        print(parsing_error)
+        logger.warning(parsing_error)
     except ValueError as e:
         parsing_error = f"Planner output JSON structure invalid: {e}. Raw output: {response_text}"
-        print(parsing_error)
+        logger.warning(parsing_error)
 
-    input_ctx = {"query": query, "persona_config": profile.model_dump(exclude_none=True)}
+    input_ctx = {"query": query, "persona_config": persona_config(profile)}
     if provision_context:
         input_ctx["provision_context"] = provision_context.model_dump(exclude_none=True)
+    if related_provisions:
+        input_ctx["related_provision_ids"] = [related.id for related in related_provisions]
 
     return ReasoningStep(
         step_id=step_id,
         description=f"{profile.name} ({profile.persona_archetype}) generating a strategic reasoning plan {('for provision ' + provision_context.id) if provision_context else ''}.",
-        model_used="gpt-4.1", 
+        model_used=MODEL_NAME,
         persona_profile_id=profile.profile_id,
         persona_display_name=profile.name,
         input_context=input_ctx,
-        output_generated=response_text, 
+        output_generated=response_text,
         confidence_score=random.uniform(0.8, 0.98) if parsed_plan and not parsing_error else 0.3,
         knowledge_references=profile.source_data_references,
         start_time=start_time,
@@ -287,11 +332,31 @@ Ensure the output is ONLY the JSON object, with no other text before or after.
         custom_step_data={"parsed_plan": parsed_plan} if parsed_plan else {"parsing_error_detail": parsing_error}
     )
 
-# --- New Synthesizer Expert Simulation ---
-def simulate_synthesizer_expert(original_query: str, history: List[str], profile: PersonaProfile) -> ReasoningStep:
-    """Simulate a Synthesizer Expert consolidating all prior steps into a final answer."""
+def simulate_planner_expert(query: str, profile: PersonaProfile, provision_context: Optional[Provision] = None,
+                            related_provisions: Optional[List[Provision]] = None) -> ReasoningStep:
+    """Simulate a Planner Expert analyzing the query and generating a reasoning plan, optionally using specific provision context
+       and provisions retrieved as related to the query."""
+    start_time = datetime.utcnow()
+    system_message, llm_user_prompt = _planner_prompts(query, profile, provision_context, related_provisions)
+    response_text = get_gpt_response(llm_user_prompt, system_message, *_persona_llm_settings(profile))
+    return _planner_step(query, profile, provision_context, response_text, start_time, related_provisions)
+
+async def simulate_planner_expert_async(query: str, profile: PersonaProfile, provision_context: Optional[Provision] = None,
+                                        related_provisions: Optional[List[Provision]] = None) -> ReasoningStep:
+    """Async variant of simulate_planner_expert."""
     start_time = datetime.utcnow()
+    system_message, llm_user_prompt = _planner_prompts(query, profile, provision_context, related_provisions)
+    response_text = await get_gpt_response_async(llm_user_prompt, system_message, *_persona_llm_settings(profile))
+    return _planner_step(query, profile, provision_context, response_text, start_time, related_provisions)
+
+# --- New Synthesizer Expert Simulation ---
 
+def _synthesizer_prompts(original_query: str, history: List[str], profile: PersonaProfile,
+                         num_expert_steps: Optional[int] = None) -> Tuple[str, str]:
+    """Returns (system_message, user_prompt) for the synthesizer.
+       num_expert_steps is the number of expert outputs in the full history; the pipeline passes it
+       because a budgeted history window may summarize or omit entries.
+    """
     # Construct the full context for the synthesizer
     full_context = f"Original User Query: \"{original_query}\"\n\n"
     full_context += "Reasoning History (Planner + Experts):\n"
@@ -299,38 +364,57 @@ def simulate_synthesizer_expert(original_query: str, history: List[str], profile
     full_context += '\n---\n'.join(history)
     full_context += "\n========================================\n"
 
-    # Calculate number of expert steps (assuming history[0] is the planner step if it succeeded)
-    num_expert_steps = len(history) -1 if history else 0 
-    
-    system_message = f"""You are {profile.name}, a {profile.persona_archetype} ({profile.job_title_exemplar}).
-    Your expertise: {', '.join(profile.domain_expertise)}.
-    Your goal is to synthesize the information provided in the Reasoning History to generate a final, comprehensive, and coherent response that directly addresses the Original User Query.
-
-    Review the entire history, including the planner's rationale and the outputs from the subsequent {num_expert_steps} expert steps. Identify key findings, consensus points, and any remaining conflicts or uncertainties noted by the experts.
-
-    Generate a final summary response. Start by directly addressing the user's original query. Then, integrate the key insights from the expert steps in a logical flow. Do NOT simply list the expert outputs; synthesize them. If significant uncertainties or conflicting expert views remain, briefly mention them.
-    Focus on clarity, conciseness, and directly answering the original request.
-    """
+    if num_expert_steps is None:
+        # Unbudgeted history: history[0] is the planner step if it succeeded
+        num_expert_steps = len(history) -1 if history else 0
 
+    system_message = compiled_template("SynthesizerExpert", profile).render(num_expert_steps=num_expert_steps)
     # The prompt is the full context constructed above
-    response_text = get_gpt_response(full_context, system_message)
-
-    end_time = datetime.utcnow()
-    step_id = f"synth_{uuid.uuid4()}"
+    return system_message, full_context
 
+def _synthesizer_step(original_query: str, history: List[str], profile: PersonaProfile,
+                      response_text: str, start_time: datetime) -> ReasoningStep:
     return ReasoningStep(
-        step_id=step_id,
+        step_id=f"synth_{uuid.uuid4()}",
         description=f"{profile.name} ({profile.persona_archetype}) synthesizing final response.",
-        model_used="gpt-4.1", # Or configured model
+        model_used=MODEL_NAME, # Or configured model
         persona_profile_id=profile.profile_id,
         persona_display_name=profile.name,
-        input_context={"original_query": original_query, "full_history": history, "persona_config": profile.model_dump(exclude_none=True)},
+        input_context={"original_query": original_query, "full_history": history, "persona_config": persona_config(profile)},
         output_generated=response_text,
         confidence_score=random.uniform(0.85, 0.99), # Synthesizer should aim for high confidence in its summary
         knowledge_references=profile.source_data_references,
         start_time=start_time,
-        end_time=end_time,
+        end_time=datetime.utcnow(),
         issues_identified=[], # Issues should ideally be resolved or noted in the summary
         associated_axes=profile.ukg_axes,
         status="completed"
     )
+
+def simulate_synthesizer_expert(original_query: str, history: List[str], profile: PersonaProfile,
+                                num_expert_steps: Optional[int] = None) -> ReasoningStep:
+    """Simulate a Synthesizer Expert consolidating all prior steps into a final answer."""
+    start_time = datetime.utcnow()
+    system_message, full_context = _synthesizer_prompts(original_query, history, profile, num_expert_steps)
+    response_text = get_gpt_response(full_context, system_message, *_persona_llm_settings(profile))
+    return _synthesizer_step(original_query, history, profile, response_text, start_time)
+
+async def simulate_synthesizer_expert_async(original_query: str, history: List[str], profile: PersonaProfile,
+                                            num_expert_steps: Optional[int] = None) -> ReasoningStep:
+    """Async variant of simulate_synthesizer_expert."""
+    start_time = datetime.utcnow()
+    system_message, full_context = _synthesizer_prompts(original_query, history, profile, num_expert_steps)
+    response_text = await get_gpt_response_async(full_context, system_message, *_persona_llm_settings(profile))
+    return _synthesizer_step(original_query, history, profile, response_text, start_time)
+
+async def stream_synthesizer_expert(original_query: str, history: List[str], profile: PersonaProfile,
+                                    num_expert_steps: Optional[int] = None) -> AsyncIterator[Union[str, ReasoningStep]]:
+    """Streaming variant of simulate_synthesizer_expert_async: yields text deltas, then the completed ReasoningStep."""
+    start_time = datetime.utcnow()
+    system_message, full_context = _synthesizer_prompts(original_query, history, profile, num_expert_steps)
+    parts: List[str] = []
+    async for delta in stream_gpt_response_async(full_context, system_message, *_persona_llm_settings(profile)):
+        parts.append(delta)
+        yield delta
+    response_text = "".join(parts).strip() or "No response from API."
+    yield _synthesizer_step(original_query, history, profile, response_text, start_time)
@@ -0,0 +1,392 @@
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from ..metrics import StageTimer, observe_stage, stage_timer
+from ..models import Provision
+from .context_budget import EXPERT_HISTORY_BUDGET, SYNTHESIZER_HISTORY_BUDGET, HistoryContext
+from .persona_functions import (
+    EXPERT_CONFIGS,
+    LLM_ERROR_PREFIX,
+    simulate_expert_async,
+    simulate_planner_expert_async,
+    simulate_synthesizer_expert_async,
+    stream_synthesizer_expert
+)
+from .schema.data_models import ReasoningStep, ReasoningTrace
+from .ukg_interface import (
+    get_dynamic_persona_profile,
+    get_planner_persona_profile,
+    get_synthesizer_persona_profile
+)
+
+logger = logging.getLogger(__name__)
+# Configured (file handler) by app.main
+conversation_logger = logging.getLogger("conversation_logger")
+
+# Provisions retrieved from the KGM's vector index and listed in the planner prompt (0 disables)
+PLANNER_GROUNDING_K = 3
+
+
+def _error_step(step_id: str, error_msg: str, display_name: str, input_context: dict, profile_id: str = "N/A") -> ReasoningStep:
+    return ReasoningStep(
+        step_id=step_id,
+        description=error_msg,
+        persona_display_name=display_name,
+        status="error",
+        start_time=datetime.utcnow(),
+        end_time=datetime.utcnow(),
+        model_used="N/A",
+        persona_profile_id=profile_id,
+        input_context=input_context,
+        output_generated=error_msg,
+        associated_axes=[],
+        issues_identified=[error_msg]
+    )
+
+
+def _step_failed(step: ReasoningStep) -> bool:
+    return step.status != "completed" or LLM_ERROR_PREFIX in (step.output_generated or "")
+
+
+def _attach_timing(step: ReasoningStep, stage: StageTimer, **extra: Any):
+    """Records the stage's timing (see app/metrics.py) in the step's custom_step_data."""
+    step.custom_step_data = {**(step.custom_step_data or {}), **extra, "timing": stage.as_dict()}
+
+
+def _timing_breakdown(total_ms: float, phases: Dict[str, float], stages: List[Dict[str, Any]], resumed_steps: int) -> Dict[str, Any]:
+    """ReasoningTrace.timing_breakdown: wall time per phase, LLM totals and the timing of each step run."""
+    breakdown: Dict[str, Any] = {"total_ms": round(total_ms, 3)}
+    breakdown.update({f"{phase}_ms": round(ms, 3) for phase, ms in phases.items()})
+    breakdown["other_ms"] = round(max(0.0, total_ms - sum(phases.values())), 3)
+    for key in ("llm_calls", "llm_ms", "prompt_tokens", "completion_tokens", "retries", "cache_hits"):
+        breakdown[key] = round(sum(stage[key] for stage in stages), 3)
+    breakdown["resumed_steps"] = resumed_steps
+    breakdown["stages"] = stages
+    return breakdown
+
+
+def normalize_plan_groups(reasoning_sequence: List[Any]) -> List[List[Dict[str, Any]]]:
+    """
+    Turns the planner's reasoning_sequence into execution groups.
+    A plain {"archetype", "focus"} entry is a group of one; {"parallel": [...]} (or a bare list)
+    is a group whose experts do not depend on each other and may run concurrently.
+    """
+    groups = []
+    for entry in reasoning_sequence or []:
+        if isinstance(entry, dict) and "parallel" in entry:
+            members = entry.get("parallel") or []
+        elif isinstance(entry, list):
+            members = entry
+        else:
+            members = [entry]
+        group = [member for member in members if isinstance(member, dict)]
+        if group:
+            groups.append(group)
+    return groups
+
+
+async def _run_expert(archetype: str, expert_query: str, history: List[str], provision_id: Optional[str]) -> Tuple[ReasoningStep, Optional[str]]:
+    """Runs one expert; returns (step, None) or (error step, error message)."""
+    current_profile = None
+    try:
+        current_profile = get_dynamic_persona_profile(expert_query, archetype)
+        with stage_timer(archetype) as stage:
+            step = await simulate_expert_async(archetype, query=expert_query, history=history, profile=current_profile)
+            stage.failed = _step_failed(step)
+        _attach_timing(step, stage)
+        return step, None
+    except Exception as e:
+        error_msg = f"Exception during {archetype} execution: {str(e)}"
+        logger.exception(error_msg)
+        error_step_input_context = {"query": expert_query, "archetype": archetype}
+        if provision_id:
+            error_step_input_context["provision_id_context"] = provision_id
+        return _error_step(
+            f"error_{archetype.lower()}_{uuid.uuid4()}", error_msg, f"{archetype} System Error",
+            error_step_input_context, current_profile.profile_id if current_profile else "N/A"
+        ), error_msg
+
+
+def _retrieve_related_provisions(query: str, provision_object: Optional[Provision], provision_id: Optional[str],
+                                 kgm) -> List[Provision]:
+    """Top PLANNER_GROUNDING_K provisions similar to the query (and the named provision's title),
+       for grounding the planner prompt. Retrieval is local, so it adds no LLM call."""
+    if kgm is None or PLANNER_GROUNDING_K <= 0 or not hasattr(kgm, "related_provisions"):
+        return []
+    retrieval_query = f"{query}\n{provision_object.title}" if provision_object else query
+    try:
+        hits = kgm.related_provisions(retrieval_query, k=PLANNER_GROUNDING_K,
+                                      exclude_ids=[provision_id] if provision_id else None)
+    except Exception:
+        logger.exception("Related provision retrieval failed; planning without it.")
+        return []
+    related = [kgm.get_provision_by_id(hit["id"]) for hit in hits]
+    logger.info(f"Grounding planner with related provisions: {[hit['id'] for hit in hits]}")
+    return [provision for provision in related if provision is not None]
+
+
+async def run_quad_persona_pipeline(query: str, provision_id: Optional[str] = None, kgm=None) -> ReasoningTrace:
+    """
+    Asyncio planner -> experts -> synthesizer flow behind /reason/quad.
+    LLM calls go through the shared pooled AsyncLLMClient, so one worker can hold many
+    reasoning tasks in flight while they wait on the LLM.
+    """
+    trace = None
+    async for event in iter_quad_persona_events(query, provision_id=provision_id, kgm=kgm):
+        if event["event"] == "trace":
+            trace = event["trace"]
+    return trace
+
+
+async def iter_quad_persona_events(query: str, provision_id: Optional[str] = None, kgm=None,
+                                   stream_tokens: bool = False, task_id: Optional[str] = None,
+                                   completed_steps: Optional[List[ReasoningStep]] = None) -> AsyncIterator[Dict[str, Any]]:
+    """
+    The quad-persona pipeline as a stream of events, in order:
+      {"event": "task_start", "task_id", "query", "provision_id"}
+      {"event": "step", "step": ReasoningStep}           - each step as soon as it completes
+      {"event": "token", "stage", "delta": str}          - synthesizer output (only with stream_tokens)
+      {"event": "trace", "trace": ReasoningTrace}        - always last
+    completed_steps resumes an interrupted run: the steps a previous run of the same query
+    emitted, in order (planner first, then experts in plan order). They are reused instead of
+    calling the LLM again, are not re-emitted, and still appear in the trace.
+    """
+    provision_object: Optional[Provision] = None
+    task_id = task_id or f"task_{uuid.uuid4()}"
+    resumed = list(completed_steps or [])
+    resumed_count = len(resumed)
+    pipeline_start = time.perf_counter()
+    phases = {"planner": 0.0, "experts": 0.0, "synthesizer": 0.0}
+    request_timestamp = datetime.utcnow()
+    all_steps: List[ReasoningStep] = []
+    # Full history stays here (and in the steps of the trace); prompts get budgeted windows of it
+    context = HistoryContext()
+    sent_history_tokens = 0
+    history_expert_steps = 0 # expert outputs in the history, whether or not a window includes them
+    overall_confidence_scores: List[float] = []
+    errors_encountered: List[str] = []
+    planner_rationale = "Planner did not run or failed critically."
+    planned_sequence = []
+    expert_steps_count = 0
+    final_synth_summary = "Synthesis step did not run or failed."
+
+    logger.info(f"Starting Quad Persona Reasoning for task_id: {task_id}")
+    conversation_logger.info(f"TASK_START: {task_id} - Query: {query}{f' - Provision ID: {provision_id}' if provision_id else ''}")
+    yield {"event": "task_start", "task_id": task_id, "query": query, "provision_id": provision_id}
+
+    # Fetch provision if ID is provided
+    if provision_id and kgm is not None:
+        logger.info(f"Provision ID '{provision_id}' provided, attempting to fetch from KGM.")
+        try:
+            provision_object = kgm.get_provision_by_id(provision_id)
+            if provision_object:
+                logger.info(f"Successfully fetched provision '{provision_id}': {provision_object.title}")
+            else:
+                logger.warning(f"Provision ID '{provision_id}' not found in KGM. Proceeding without specific provision context.")
+        except Exception as e:
+            logger.error(f"Error fetching provision '{provision_id}' from KGM: {e}", exc_info=True)
+            errors_encountered.append(f"Error fetching provision {provision_id}: {str(e)}. Proceeding without it.")
+
+    related_provisions = _retrieve_related_provisions(query, provision_object, provision_id, kgm)
+
+    # Planner Step
+    logger.info("Executing PlannerExpert...")
+    try:
+        planner_profile = get_planner_persona_profile()
+        if resumed:
+            planner_step = resumed.pop(0)
+            all_steps.append(planner_step)
+            logger.info(f"Resuming task {task_id} from its stored planner step and {len(resumed)} expert steps.")
+        else:
+            with stage_timer("planner") as stage:
+                planner_step = await simulate_planner_expert_async(query=query, profile=planner_profile, provision_context=provision_object,
+                                                                   related_provisions=related_provisions)
+                stage.failed = _step_failed(planner_step)
+            _attach_timing(planner_step, stage)
+            phases["planner"] = stage.duration_ms
+            all_steps.append(planner_step)
+            yield {"event": "step", "step": planner_step}
+
+        conversation_logger.info(f"PLANNER_INPUT: {task_id} - Query: {query}{f' - Provision ID: {provision_id}' if provision_id else ''}")
+        conversation_logger.info(f"PLANNER_OUTPUT: {task_id} - {planner_step.output_generated}")
+
+        if planner_step.status == "error":
+            # A stored "Planner System Error" step from the run being resumed
+            errors_encountered.append(planner_step.output_generated)
+            planner_rationale = "Planner critically failed."
+        elif (
+            planner_step.status != "completed"
+            or not planner_step.custom_step_data
+            or "parsed_plan" not in planner_step.custom_step_data
+        ):
+            error_msg = f"Planner step failed or produced invalid plan. Status: {planner_step.status}. Issues: {planner_step.issues_identified}"
+            logger.error(error_msg)
+            errors_encountered.append(error_msg)
+            planner_rationale = "Planner failed to generate a valid plan."
+            conversation_logger.error(f"PLANNER_ERROR: {task_id} - {error_msg}")
+        else:
+            parsed_plan = planner_step.custom_step_data["parsed_plan"]
+            planned_sequence = parsed_plan.get("reasoning_sequence", [])
+            planner_rationale = parsed_plan.get("overall_strategy_rationale", "No rationale provided by planner.")
+            # The plan stays in every window: later experts and the synthesizer are told to follow it
+            context.add(f"Planner ({planner_profile.name}) Rationale: {planner_rationale}\nOutput:\n{planner_step.output_generated}\n", pinned=True)
+            if planner_step.confidence_score is not None:
+                overall_confidence_scores.append(planner_step.confidence_score)
+            conversation_logger.info(f"PLANNER_RATIONALE: {task_id} - {planner_rationale}")
+
+    except Exception as e:
+        error_msg = f"Exception during PlannerExpert execution: {str(e)}"
+        logger.exception(error_msg)
+        errors_encountered.append(error_msg)
+        planner_step_input_context = {"query": query}
+        if provision_id:
+            planner_step_input_context["provision_id"] = provision_id
+        all_steps.append(_error_step(f"error_planner_{uuid.uuid4()}", error_msg, "Planner System Error", planner_step_input_context))
+        yield {"event": "step", "step": all_steps[-1]}
+        planner_rationale = "Planner critically failed."
+        conversation_logger.error(f"PLANNER_EXCEPTION: {task_id} - {error_msg}")
+
+    # Execute planned expert sequence: groups run one after another, experts inside a
+    # parallel group run concurrently and are merged into history in plan order
+    plan_groups = normalize_plan_groups(planned_sequence)
+    expert_steps_count = sum(len(group) for group in plan_groups)
+    for group in plan_groups:
+        runnable = []
+        for step_info in group:
+            archetype = step_info.get("archetype")
+            focus = step_info.get("focus", "Address the overall query based on your expertise.")
+
+            if archetype not in EXPERT_CONFIGS:
+                error_msg = f"Invalid archetype specified by planner: {archetype}. Skipping."
+                logger.warning(error_msg)
+                errors_encountered.append(error_msg)
+                conversation_logger.warning(f"EXPERT_INVALID: {task_id} - {error_msg}")
+                continue
+
+            logger.info(f"Executing {archetype} with focus: {focus}")
+            current_query_for_expert = f"Original Query: {query}{f' (related to Provision ID: {provision_id})' if provision_id else ''}\nPlanner's Plan & Rationale (consider this primary instructions): {planner_rationale}\nYour Specific Focus: {focus}"
+            conversation_logger.info(f"EXPERT_INPUT: {task_id} - Archetype: {archetype} - Query: {current_query_for_expert}")
+            runnable.append((archetype, current_query_for_expert))
+
+        # Every expert in the group sees the same budgeted window of the history before the group started
+        history_snapshot, history_stats = context.window(EXPERT_HISTORY_BUDGET)
+        reused = [resumed.pop(0) if resumed else None for _ in runnable]
+        fresh = [i for i, step in enumerate(reused) if step is None]
+        group_start = time.perf_counter()
+        ran = await asyncio.gather(*(
+            _run_expert(runnable[i][0], runnable[i][1], history_snapshot, provision_id)
+            for i in fresh
+        ))
+        phases["experts"] += (time.perf_counter() - group_start) * 1000
+        results = [(step, None) for step in reused]
+        for i, outcome in zip(fresh, ran):
+            results[i] = outcome
+
+        for (archetype, _), (expert_step, error_msg), reused_step in zip(runnable, results, reused):
+            all_steps.append(expert_step)
+            if reused_step is None:
+                expert_step.custom_step_data = {**(expert_step.custom_step_data or {}), "history_context": history_stats}
+                sent_history_tokens += history_stats["sent_tokens"]
+                yield {"event": "step", "step": expert_step}
+            if error_msg:
+                errors_encountered.append(error_msg)
+                conversation_logger.error(f"EXPERT_EXCEPTION: {task_id} - Archetype: {archetype} - {error_msg}")
+                continue
+
+            conversation_logger.info(f"EXPERT_OUTPUT: {task_id} - Archetype: {archetype} - Output: {expert_step.output_generated}")
+
+            if expert_step.output_generated:
+                context.add(f"{expert_step.persona_display_name} ({expert_step.persona_profile_id}) Output:\n{expert_step.output_generated}\nConfidence: {expert_step.confidence_score}\n")
+                history_expert_steps += 1
+            if expert_step.confidence_score is not None:
+                overall_confidence_scores.append(expert_step.confidence_score)
+
+    # Synthesizer Step
+    if planner_rationale != "Planner critically failed.":
+        logger.info("Executing SynthesizerExpert...")
+        history, history_stats = context.window(SYNTHESIZER_HISTORY_BUDGET)
+        synthesizer_input = f"Original Query: {query}{f' (related to Provision ID: {provision_id})' if provision_id else ''}\nExpert History (Planner + Experts):\n{''.join(history)}"
+        conversation_logger.info(f"SYNTHESIZER_INPUT: {task_id} - {synthesizer_input}")
+
+        try:
+            synthesizer_profile = get_synthesizer_persona_profile()
+            with stage_timer("synthesizer") as stage:
+                if stream_tokens:
+                    synthesizer_step = None
+                    async for item in stream_synthesizer_expert(original_query=query, history=history, profile=synthesizer_profile,
+                                                                     num_expert_steps=history_expert_steps):
+                        if isinstance(item, ReasoningStep):
+                            synthesizer_step = item
+                        else:
+                            yield {"event": "token", "stage": "synthesizer", "delta": item}
+                else:
+                    synthesizer_step = await simulate_synthesizer_expert_async(original_query=query, history=history, profile=synthesizer_profile,
+                                                                                num_expert_steps=history_expert_steps)
+                stage.failed = _step_failed(synthesizer_step)
+            _attach_timing(synthesizer_step, stage, history_context=history_stats)
+            phases["synthesizer"] = stage.duration_ms
+            sent_history_tokens += history_stats["sent_tokens"]
+            all_steps.append(synthesizer_step)
+            yield {"event": "step", "step": synthesizer_step}
+
+            conversation_logger.info(f"SYNTHESIZER_OUTPUT: {task_id} - {synthesizer_step.output_generated}")
+
+            if synthesizer_step.status == "completed" and synthesizer_step.output_generated:
+                final_synth_summary = synthesizer_step.output_generated
+            else:
+                error_msg = f"Synthesizer step failed or produced no output. Status: {synthesizer_step.status}"
+                logger.error(error_msg)
+                errors_encountered.append(error_msg)
+                conversation_logger.error(f"SYNTHESIZER_ERROR: {task_id} - {error_msg}")
+
+            if synthesizer_step.confidence_score is not None:
+                overall_confidence_scores.append(synthesizer_step.confidence_score)
+
+        except Exception as e:
+            error_msg = f"Exception during SynthesizerExpert execution: {str(e)}"
+            logger.exception(error_msg)
+            errors_encountered.append(error_msg)
+            conversation_logger.error(f"SYNTHESIZER_EXCEPTION: {task_id} - {error_msg}")
+
+    avg_confidence = sum(overall_confidence_scores) / len(overall_confidence_scores) if overall_confidence_scores else 0.0
+    total_seconds = time.perf_counter() - pipeline_start
+    observe_stage("pipeline", total_seconds, failed=bool(errors_encountered))
+    stage_timings = [{"step_id": step.step_id, **step.custom_step_data["timing"]}
+                     for step in all_steps[resumed_count:] if "timing" in (step.custom_step_data or {})]
+
+    logger.info(f"Completed Quad Persona Reasoning for task_id: {task_id} with confidence: {avg_confidence}")
+    conversation_logger.info(f"TASK_COMPLETE: {task_id} - Final Summary: {final_synth_summary}")
+    conversation_logger.info(f"TASK_METRICS: {task_id} - Confidence: {avg_confidence}, Steps: {len(all_steps)}, Errors: {len(errors_encountered)}")
+
+    original_query_context = {"query": query}
+    if provision_id:
+        original_query_context["provision_id"] = provision_id
+        if provision_object: # Also add title if provision was fetched
+            original_query_context["provision_title"] = provision_object.title
+
+    trace = ReasoningTrace(
+        task_id=task_id,
+        request_timestamp=request_timestamp,
+        original_query=original_query_context,
+        steps=all_steps,
+        final_response_summary=final_synth_summary,
+        overall_confidence_score=avg_confidence,
+        personas_involved_ids=list(set(s.persona_profile_id for s in all_steps if s.persona_profile_id)),
+        reasoning_models_used=list(set(s.model_used for s in all_steps if s.model_used)),
+        ukg_axes_queried=list(set(axis for s in all_steps for axis in s.associated_axes)),
+        audit_trail_notes=[
+            f"Planner Rationale: {planner_rationale}",
+            f"Executed {expert_steps_count} expert steps.",
+            "Synthesis step performed.",
+            f"History context: {sent_history_tokens} estimated tokens sent to experts and synthesizer "
+            f"(full history {context.total_tokens} tokens over {len(context)} entries)."
+        ] + ([f"Errors encountered: {len(errors_encountered)}."] if errors_encountered else []),
+        errors_encountered=errors_encountered,
+        total_refinement_iterations=0,
+        timing_breakdown=_timing_breakdown(total_seconds * 1000, phases, stage_timings, resumed_count)
+    )
+    yield {"event": "trace", "trace": trace}
@@ -0,0 +1,176 @@
+import string
+from typing import Any, Dict, Optional, Tuple
+
+from .lru import LRUCache
+from .schema.data_models import PersonaProfile
+
+# Compiled (profile-bound) templates and persona_config dumps kept per profile object
+COMPILED_CACHE_SIZE = 1024
+
+
+class PromptTemplate:
+    """
+    A str.format-style template parsed once into literal chunks and field names.
+    bind() fills some fields and returns a template over the rest, so the profile-dependent
+    part of a system message is rendered once per profile; render() fills the remaining
+    fields by concatenation, without re-parsing.
+    """
+
+    def __init__(self, text: str = "", literals: Optional[Tuple[str, ...]] = None, fields: Optional[Tuple[str, ...]] = None):
+        if literals is None:
+            literals, fields = [""], []
+            for literal, field, spec, conversion in string.Formatter().parse(text):
+                literals[-1] += literal
+                if field is None:
+                    continue
+                if spec or conversion or not field.isidentifier():
+                    raise ValueError(f"Unsupported template field '{field}': only plain {{name}} fields are allowed.")
+                fields.append(field)
+                literals.append("")
+        self.literals = tuple(literals)
+        self.fields = tuple(fields)
+
+    def bind(self, **values: Any) -> "PromptTemplate":
+        literals, fields = [self.literals[0]], []
+        for field, literal in zip(self.fields, self.literals[1:]):
+            if field in values:
+                literals[-1] += f"{values[field]}{literal}"
+            else:
+                fields.append(field)
+                literals.append(literal)
+        return PromptTemplate(literals=tuple(literals), fields=tuple(fields))
+
+    def render(self, **values: Any) -> str:
+        parts = [self.literals[0]]
+        for field, literal in zip(self.fields, self.literals[1:]):
+            parts.append(f"{values[field]}")
+            parts.append(literal)
+        return "".join(parts)
+
+
+EXPERT_TEMPLATES: Dict[str, PromptTemplate] = {
+    "KnowledgeExpert": PromptTemplate("""You are {name}, a {archetype} and {job_title}.
+    Your expertise lies in {domains}.
+    Your key responsibilities include: {responsibilities}.
+    Your behavioral traits are: {traits}.
+    Analyze the query from first principles and theoretical foundations.
+    Previous analysis steps for context (if any):
+    {history}
+    Focus on identifying key concepts, core principles, and theoretical underpinnings related to the query: '{query}'"""),
+    "SectorExpert": PromptTemplate("""You are {name}, a {archetype} and {job_title}.
+    Your expertise lies in {domains} within industry sectors like {sectors}.
+    Your key responsibilities include: {responsibilities}.
+    Your behavioral traits are: {traits}.
+    Analyze the query considering its practical application in relevant industry sectors.
+    Previous analysis steps for context:
+    {history}
+    Focus on real-world implications, industry best practices, and sector-specific challenges for the query: '{query}'"""),
+    "RegulatoryExpert": PromptTemplate("""You are {name}, a {archetype} and {job_title}.
+    Your expertise lies in {domains} related to regulations and policies.
+    Your key responsibilities include: {responsibilities}.
+    Your behavioral traits are: {traits}.
+    Analyze the query from a regulatory and policy perspective.
+    Previous analysis steps for context:
+    {history}
+    Focus on applicable laws, regulations, standards, and potential policy implications for the query: '{query}'"""),
+    "ComplianceExpert": PromptTemplate("""You are {name}, a {archetype} and {job_title}.
+    Your expertise lies in {domains} related to compliance and risk management.
+    Your key responsibilities include: {responsibilities}.
+    Your behavioral traits are: {traits}.
+    Analyze the query for compliance requirements, potential risks, and mitigation strategies.
+    Previous analysis steps for context:
+    {history}
+    Focus on identifying compliance obligations, risks, control gaps, and ensuring adherence to standards for the query: '{query}'"""),
+}
+
+# Doubled curly braces for literal JSON braces
+PLANNER_TEMPLATE = PromptTemplate("""You are {name}, a {archetype} ({job_title}).
+Your expertise: {domains}.
+Your key responsibilities: {responsibilities}.
+Your goal is to analyze the user's query and create a strategic reasoning plan.
+
+The user's query is: "{query}"
+{provision_details}
+Based on this query {provision_clause}determine the optimal sequence of the following expert persona archetypes to involve: 
+KnowledgeExpert, SectorExpert, RegulatoryExpert, ComplianceExpert.
+You may choose to use all, some, or none, and in any order you deem best.
+For each chosen persona, briefly specify a 'focus' or sub-task for them related to the main query (and the specific provision if provided).
+Experts whose tasks do not depend on each other's output may be grouped so they run at the same time: put them in a {{ "parallel": [ ... ] }} entry instead of listing them one by one. Experts listed after a group see the output of every expert in it.
+
+Output your plan STRICTLY as a JSON object with the following structure:
+{{  // Doubled braces
+  "reasoning_sequence": [
+    {{ "archetype": "<Archetype_Name>", "focus": "<Specific focus or sub-task for this archetype based on the query (and provision if specified)>" }},
+    {{ "parallel": [ {{ "archetype": "<Archetype_Name>", "focus": "<...>" }}, {{ "archetype": "<Archetype_Name>", "focus": "<...>" }} ] }},
+    // ... more steps or parallel groups if needed ...
+  ],
+  "overall_strategy_rationale": "<Brief rationale for your chosen sequence and focus areas, considering the provision if provided.>"
+}}
+
+Example for a query about 'new drone regulations for agriculture' (without specific provision context):
+{{ // Doubled braces
+  "reasoning_sequence": [
+    {{ "archetype": "KnowledgeExpert", "focus": "Define key terms: drone, agriculture, current regulatory landscape overview." }},
+    {{ "archetype": "RegulatoryExpert", "focus": "Detail the new drone regulations specifically for agriculture, citing relevant sections." }},
+    {{ "archetype": "SectorExpert", "focus": "Analyze the practical impact of these new regulations on agricultural operations and drone usage." }},
+    {{ "archetype": "ComplianceExpert", "focus": "Outline compliance steps and potential challenges for agricultural businesses regarding these new drone regulations." }}
+  ],
+  "overall_strategy_rationale": "Sequential approach: define terms, detail regulations, analyze impact, then outline compliance."
+}}
+If specific provision context IS provided, your plan and rationale MUST heavily focus on that provision. For instance, if the query is "Impact analysis" and a specific provision about data storage is given, the plan should be about analyzing the impact of THAT data storage provision.
+Ensure the output is ONLY the JSON object, with no other text before or after.
+""")
+
+SYNTHESIZER_TEMPLATE = PromptTemplate("""You are {name}, a {archetype} ({job_title}).
+    Your expertise: {domains}.
+    Your goal is to synthesize the information provided in the Reasoning History to generate a final, comprehensive, and coherent response that directly addresses the Original User Query.
+
+    Review the entire history, including the planner's rationale and the outputs from the subsequent {num_expert_steps} expert steps. Identify key findings, consensus points, and any remaining conflicts or uncertainties noted by the experts.
+
+    Generate a final summary response. Start by directly addressing the user's original query. Then, integrate the key insights from the expert steps in a logical flow. Do NOT simply list the expert outputs; synthesize them. If significant uncertainties or conflicting expert views remain, briefly mention them.
+    Focus on clarity, conciseness, and directly answering the original request.
+    """)
+
+_compiled = LRUCache(COMPILED_CACHE_SIZE)
+
+
+def profile_fields(profile: PersonaProfile) -> Dict[str, str]:
+    """The profile-dependent template fields."""
+    return {
+        "name": profile.name,
+        "archetype": profile.persona_archetype,
+        "job_title": f"{profile.job_title_exemplar}",
+        "domains": ", ".join(profile.domain_expertise),
+        "sectors": ", ".join(profile.industry_sectors or ["various"]),
+        "responsibilities": ", ".join(profile.key_responsibilities_or_tasks),
+        "traits": ", ".join(profile.behavioral_traits),
+    }
+
+
+def _for_profile(kind: str, profile: PersonaProfile, build) -> Any:
+    # Keyed by object identity: profiles from ukg_interface are cached objects, so the key repeats.
+    # The entry holds the profile itself, which keeps its id from being reused while cached.
+    key = (kind, id(profile))
+    entry = _compiled.get(key)
+    if entry is None or entry[0] is not profile:
+        entry = (profile, build())
+        _compiled.put(key, entry)
+    return entry[1]
+
+
+def compiled_template(template_name: str, profile: PersonaProfile) -> PromptTemplate:
+    """
+    The named template (an EXPERT_TEMPLATES archetype, "PlannerExpert" or "SynthesizerExpert")
+    with the profile's fields bound. Profiles are treated as read-only once used here.
+    """
+    template = EXPERT_TEMPLATES.get(template_name) or {"PlannerExpert": PLANNER_TEMPLATE, "SynthesizerExpert": SYNTHESIZER_TEMPLATE}[template_name]
+    return _for_profile(template_name, profile, lambda: template.bind(**profile_fields(profile)))
+
+
+def persona_config(profile: PersonaProfile) -> Dict[str, Any]:
+    """profile.model_dump(exclude_none=True), dumped once per profile (steps record it as input_context)."""
+    return _for_profile("persona_config", profile, lambda: profile.model_dump(exclude_none=True))
+
+
+def clear_compiled_templates():
+    _compiled.clear()
@@ -96,6 +96,7 @@ class ReasoningTrace(BaseModel):
     ukg_axes_queried: List[str] = Field(default_factory=list, description="List of unique UKG axes touched upon or queried during reasoning.")
     audit_trail_notes: List[str] = Field(default_factory=list, description="High-level notes on the reasoning process, refinement decisions, etc.")
     errors_encountered: List[str] = Field(default_factory=list)
+    timing_breakdown: Dict[str, Any] = Field(default_factory=dict, description="Wall time per phase (planner, experts, synthesizer), LLM latency, token, retry and cache hit totals, and the timing of each stage run.")
 
     class Config:
         json_schema_extra = {
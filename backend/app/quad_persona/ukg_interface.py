@@ -1,4 +1,6 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
+import hashlib
+import logging
 import random # For simulating dynamic elements
 
 # Import the necessary data models
@@ -8,6 +10,26 @@ from .schema.data_models import (
     CertificationLicense, 
     Publication
 )
+from .lru import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Dynamic profiles kept in memory; the least recently used is evicted first
+PROFILE_CACHE_SIZE = 256
+# Leading characters of the query a dynamic profile is derived from
+QUERY_FEATURE_CHARS = 30
+
+_profile_cache = LRUCache(PROFILE_CACHE_SIZE)
+# Static profiles, built on first use
+_planner_profile: Optional[PersonaProfile] = None
+_synthesizer_profile: Optional[PersonaProfile] = None
+
+def query_features(query: str) -> str:
+    """The part of the query a dynamic profile depends on (its source reference quotes it)."""
+    return query[:QUERY_FEATURE_CHARS]
+
+def clear_persona_profile_cache():
+    _profile_cache.clear()
 
 # --- Placeholder Functions ---
 
@@ -16,18 +38,27 @@ def get_dynamic_persona_profile(query: str, archetype: str) -> PersonaProfile:
     Placeholder function to simulate fetching a dynamic PersonaProfile.
     In a real implementation, this would query a UKG or database based on 
     the query context and the requested archetype.
+    Profiles are cached per (archetype, query_features(query)) and shared between callers,
+    so they must be treated as read-only.
     """
-    print(f"[UKG Interface Placeholder] Fetching profile for archetype: {archetype} based on query: '{query[:50]}...'" )
+    key = (archetype, query_features(query))
+    return _profile_cache.get_or_create(key, lambda: _build_dynamic_persona_profile(*key))
+
+def _build_dynamic_persona_profile(archetype: str, features: str) -> PersonaProfile:
+    logger.debug(f"[UKG Interface Placeholder] Building profile for archetype: {archetype} based on query: '{features}...'")
 
     # --- Basic Mock Logic ---
     # Simulate finding slightly different profiles based on query keywords or archetype
-    # This is highly simplified for demonstration.
-    
-    profile_id = f"dyn-{archetype.lower()}-{random.randint(100, 999)}"
+    # This is highly simplified for demonstration. The variations are seeded from the cache
+    # key, so a profile (and its ID) is the same whether or not it was served from cache.
+    digest = hashlib.sha1(f"{archetype}|{features}".encode("utf-8")).hexdigest()
+    rng = random.Random(digest)
+
+    profile_id = f"dyn-{archetype.lower()}-{digest[:10]}"
     name = f"Dynamic {archetype}"
     job_title = f"Lead {archetype} Analyst"
     ukg_axes = [f"AXIS_{archetype.upper()}_DYN"]
-    domains = [f"{archetype} Domain {random.randint(1, 5)} elicited by query"]
+    domains = [f"{archetype} Domain {rng.randint(1, 5)} elicited by query"]
     education_details = [{"degree": "PhD", "field_of_study": f"{archetype} Studies"}]
     cert_names = [f"{archetype} Certified Pro"]
     tasks = [f"Dynamic Task for {archetype} based on query context"]
@@ -71,14 +102,14 @@ def get_dynamic_persona_profile(query: str, archetype: str) -> PersonaProfile:
         education=[EducationRequirement(**edu) for edu in education_details],
         certifications_licenses=[CertificationLicense(name=cert) for cert in cert_names],
         key_responsibilities_or_tasks=tasks,
-        behavioral_traits=random.sample(["analytical", "pragmatic", "meticulous", "collaborative"], 2), # Simulate dynamic traits
+        behavioral_traits=rng.sample(["analytical", "pragmatic", "meticulous", "collaborative"], 2), # Simulate dynamic traits
         professional_training=["Dynamic Training Module Based on Query"],
         publications_or_research=[Publication(title=f"Dynamic Paper on {archetype}", authors=[name])],
         source_data_references=[
             {
                 "type": "simulated_ukg_node", 
-                "id": f"ukg_node_{archetype.lower()}_{random.randint(1000,9999)}",
-                "description": f"Simulated UKG Node for {archetype} related to query: {query[:30]}..."
+                "id": f"ukg_node_{archetype.lower()}_{rng.randint(1000,9999)}",
+                "description": f"Simulated UKG Node for {archetype} related to query: {features}..."
             }
         ] 
         # Add other fields with default/sample values if necessary
@@ -90,7 +121,11 @@ def get_dynamic_persona_profile(query: str, archetype: str) -> PersonaProfile:
 def get_planner_persona_profile() -> PersonaProfile:
     """
     Returns a pre-defined PersonaProfile for the Planner/Orchestrator.
+    Built once; the same (read-only) object is returned on every call.
     """
+    global _planner_profile
+    if _planner_profile is not None:
+        return _planner_profile
     archetype = "PlannerExpert"
     profile_id = f"static-planner-001"
     name = "Orchestrator Prime"
@@ -130,13 +165,18 @@ def get_planner_persona_profile() -> PersonaProfile:
         ]
         # Other fields can use defaults or be None
     )
+    _planner_profile = profile
     return profile
 
 # --- New Synthesizer Persona Profile Function ---
 def get_synthesizer_persona_profile() -> PersonaProfile:
     """
     Returns a pre-defined PersonaProfile for the Synthesizer.
+    Built once; the same (read-only) object is returned on every call.
     """
+    global _synthesizer_profile
+    if _synthesizer_profile is not None:
+        return _synthesizer_profile
     archetype = "SynthesizerExpert"
     profile_id = f"static-synthesizer-001"
     name = "Consolidator Unit"
@@ -171,6 +211,7 @@ def get_synthesizer_persona_profile() -> PersonaProfile:
             {"type": "internal_model_config", "id": "synthesizer_persona_v1_definition"}
         ]
     )
+    _synthesizer_profile = profile
     return profile
 
 # Example of how this might be used (will be called from main.py)
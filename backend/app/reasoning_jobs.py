@@ -0,0 +1,320 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from .metrics import REASONING_JOB_RETRIES
+from .quad_persona.persona_functions import LLM_ERROR_PREFIX
+from .quad_persona.pipeline import iter_quad_persona_events
+from .quad_persona.schema.data_models import ReasoningStep, ReasoningTrace
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("completed", "cancelled", "failed")
+# Statuses a worker may pick up (retrying jobs once their backoff has elapsed)
+RUNNABLE_STATUSES = ("queued", "retrying")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reasoning_jobs (
+    job_id TEXT PRIMARY KEY,
+    query TEXT NOT NULL,
+    provision_id TEXT,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    last_error TEXT,
+    trace TEXT,
+    owner TEXT,
+    lease_expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS reasoning_jobs_runnable ON reasoning_jobs (status, next_attempt_at, created_at);
+CREATE TABLE IF NOT EXISTS reasoning_job_steps (
+    job_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    step TEXT NOT NULL,
+    PRIMARY KEY (job_id, position)
+);
+"""
+# Added after the first release; ALTERed into existing databases
+LEASE_COLUMNS = {"owner": "TEXT", "lease_expires_at": "REAL"}
+
+
+def is_llm_error(step: ReasoningStep) -> bool:
+    """True for a step whose output is the error text returned in place of an LLM response."""
+    return LLM_ERROR_PREFIX in (step.output_generated or "")
+
+
+class ReasoningJobQueue:
+    """
+    Quad-persona reasoning as background jobs, so no HTTP connection is held for the length of
+    the pipeline. Jobs and every ReasoningStep they complete are stored in SQLite as they happen.
+    `workers` asyncio tasks on the server's event loop (the pipeline's LLM calls share its pooled
+    client) take queued jobs oldest first. A step that failed on the LLM stops the run; the job
+    is retried after retry_backoff * 2^(attempt - 1) seconds (at most max_backoff), resuming
+    from the steps already stored, and fails after max_attempts runs.
+
+    Several processes (e.g. uvicorn workers) may share one database. A job is claimed with a
+    conditional UPDATE, so only one worker gets it, and the claimer holds a lease of
+    lease_seconds that it renews while the job runs. Steps and the final status are only
+    written while the lease is still held. A job whose lease expired (its process died) is
+    queued again by whichever worker looks for work next and resumes from its stored steps;
+    a run that finds its lease lost (taken over, or cancelled from another process) stops.
+    """
+
+    def __init__(self, db_path: str, kgm=None,
+                 workers: int = 4,
+                 max_attempts: int = 3,
+                 retry_backoff: float = 2.0,
+                 max_backoff: float = 60.0,
+                 poll_interval: float = 1.0,
+                 lease_seconds: float = 30.0,
+                 trace_sink: Optional[Callable[[ReasoningTrace], Any]] = None): # e.g. TraceStore.submit
+        self.kgm = kgm
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.trace_sink = trace_sink
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self._migrate()
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self._running: Dict[str, asyncio.Task] = {}
+
+    # --- request path ---
+
+    def submit(self, query: str, provision_id: Optional[str] = None) -> Dict[str, Any]:
+        job_id = f"task_{uuid.uuid4()}" # also the task_id of the job's trace
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO reasoning_jobs (job_id, query, provision_id, status, created_at) VALUES (?, ?, ?, 'queued', ?)",
+                (job_id, query, provision_id, time.time()))
+        self._notify()
+        return self.get(job_id)
+
+    def get(self, job_id: str, include_steps: bool = True) -> Optional[Dict[str, Any]]:
+        """The job's state, its completed steps and, once completed, the trace summary."""
+        with self._lock:
+            row = self._db.execute("SELECT * FROM reasoning_jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            steps = [json.loads(step) for (step,) in self._db.execute(
+                "SELECT step FROM reasoning_job_steps WHERE job_id = ? ORDER BY position", (job_id,))]
+        job = {key: row[key] for key in row.keys() if key != "trace"}
+        job["steps_completed"] = len(steps)
+        if include_steps:
+            job["steps"] = steps
+        job["trace"] = json.loads(row["trace"]) if row["trace"] else None
+        return job
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Queued jobs never start; a running job is stopped, keeping the steps it completed."""
+        with self._lock:
+            cursor = self._db.execute(
+                f"UPDATE reasoning_jobs SET status = 'cancelled', finished_at = ? WHERE job_id = ? "
+                f"AND status NOT IN ({', '.join('?' for _ in TERMINAL_STATUSES)})",
+                (time.time(), job_id, *TERMINAL_STATUSES))
+        if cursor.rowcount:
+            task = self._running.get(job_id)
+            if task is not None and self._loop is not None:
+                self._loop.call_soon_threadsafe(task.cancel)
+        return self.get(job_id, include_steps=False)
+
+    # --- lifecycle ---
+
+    def _migrate(self):
+        columns = {row["name"] for row in self._db.execute("PRAGMA table_info(reasoning_jobs)")}
+        for name, sql_type in LEASE_COLUMNS.items():
+            if name in columns:
+                continue
+            try:
+                self._db.execute(f"ALTER TABLE reasoning_jobs ADD COLUMN {name} {sql_type}")
+            except sqlite3.OperationalError as e:
+                if "duplicate column" not in str(e): # another process migrated first
+                    raise
+
+    async def start(self):
+        """Starts the workers on the running loop. Interrupted jobs are picked up once their lease expires."""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker(), name=f"reasoning-job-{i}") for i in range(self.workers)]
+
+    async def close(self):
+        """
+        Stops the workers. Jobs this queue was running are handed back as 'queued', keeping their
+        steps, so the next start() (or another process) resumes them without waiting out the lease.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        with self._lock:
+            self._db.execute("UPDATE reasoning_jobs SET status = 'queued', owner = NULL, lease_expires_at = NULL "
+                             "WHERE status = 'running' AND owner = ?", (self.owner,))
+            self._db.close()
+
+    # --- workers ---
+
+    def _notify(self):
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _claim(self) -> Optional[sqlite3.Row]:
+        runnable = ", ".join("?" for _ in RUNNABLE_STATUSES)
+        with self._lock:
+            now = time.time()
+            # Jobs whose worker stopped renewing its lease (the process died) become runnable again
+            expired = self._db.execute(
+                "UPDATE reasoning_jobs SET status = 'queued', owner = NULL, lease_expires_at = NULL "
+                "WHERE status = 'running' AND (lease_expires_at IS NULL OR lease_expires_at < ?)", (now,)).rowcount
+            if expired:
+                logger.info(f"Requeued {expired} reasoning jobs whose worker lease expired")
+            while True:
+                row = self._db.execute(
+                    f"SELECT job_id FROM reasoning_jobs WHERE status IN ({runnable}) "
+                    "AND next_attempt_at <= ? ORDER BY created_at LIMIT 1",
+                    (*RUNNABLE_STATUSES, now)).fetchone()
+                if row is None:
+                    return None
+                # Only succeeds if no other process claimed the job since the SELECT
+                claimed = self._db.execute(
+                    "UPDATE reasoning_jobs SET status = 'running', owner = ?, lease_expires_at = ?, started_at = COALESCE(started_at, ?) "
+                    f"WHERE job_id = ? AND status IN ({runnable}) AND next_attempt_at <= ?",
+                    (self.owner, now + self.lease_seconds, now, row["job_id"], *RUNNABLE_STATUSES, now)).rowcount
+                if claimed:
+                    return self._db.execute("SELECT * FROM reasoning_jobs WHERE job_id = ?", (row["job_id"],)).fetchone()
+
+    def _renew_lease(self, job_id: str) -> bool:
+        with self._lock:
+            return self._db.execute(
+                "UPDATE reasoning_jobs SET lease_expires_at = ? WHERE job_id = ? AND status = 'running' AND owner = ?",
+                (time.time() + self.lease_seconds, job_id, self.owner)).rowcount > 0
+
+    def _owns(self, job_id: str) -> bool:
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM reasoning_jobs WHERE job_id = ? AND status = 'running' AND owner = ?",
+                                    (job_id, self.owner)).fetchone() is not None
+
+    async def _heartbeat(self, job_id: str, run: asyncio.Task):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if not self._renew_lease(job_id):
+                # Cancelled (possibly by another process) or taken over after a stall
+                run.cancel()
+                return
+
+    async def _worker(self):
+        while True:
+            # Cleared before looking, so a submit() landing after the query still wakes us
+            self._wakeup.clear()
+            job = self._claim()
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            run = asyncio.create_task(self._run(job))
+            heartbeat = asyncio.create_task(self._heartbeat(job["job_id"], run))
+            self._running[job["job_id"]] = run
+            try:
+                await run
+            except asyncio.CancelledError:
+                if not run.cancelled() or self._owns(job["job_id"]):
+                    raise # the worker itself is being stopped
+                logger.info(f"Reasoning job {job['job_id']} stopped while running: now {self._status(job['job_id'])}")
+            finally:
+                heartbeat.cancel()
+                self._running.pop(job["job_id"], None)
+
+    async def _run(self, job: sqlite3.Row):
+        job_id = job["job_id"]
+        steps = self._load_steps(job_id)
+        trace = None
+        llm_error = None
+        events = iter_quad_persona_events(job["query"], provision_id=job["provision_id"], kgm=self.kgm,
+                                          task_id=job_id, completed_steps=steps)
+        try:
+            async for event in events:
+                if event["event"] == "step":
+                    step = event["step"]
+                    if is_llm_error(step):
+                        # Steps are stored in pipeline order, so a resume can reuse them positionally;
+                        # the run stops at the first step that has to be redone
+                        llm_error = step.output_generated
+                        break
+                    if not self._store_step(job_id, len(steps), step):
+                        logger.warning(f"Reasoning job {job_id} lost its lease; stopping this run")
+                        return
+                    steps.append(step)
+                elif event["event"] == "trace":
+                    trace = event["trace"]
+        except Exception as e:
+            logger.error(f"Reasoning job {job_id} failed: {e}", exc_info=True)
+            llm_error = f"{type(e).__name__}: {e}"
+        finally:
+            await events.aclose()
+
+        if llm_error is not None:
+            self._retry_or_fail(job, llm_error)
+            return
+        with self._lock:
+            completed = self._db.execute(
+                "UPDATE reasoning_jobs SET status = 'completed', finished_at = ?, trace = ?, lease_expires_at = NULL "
+                "WHERE job_id = ? AND status = 'running' AND owner = ?",
+                (time.time(), trace.model_dump_json(exclude={"steps"}), job_id, self.owner)).rowcount
+        if completed and self.trace_sink is not None:
+            self.trace_sink(trace)
+
+    def _retry_or_fail(self, job: sqlite3.Row, error: str):
+        attempts = job["attempts"] + 1
+        now = time.time()
+        if attempts >= self.max_attempts:
+            status, next_attempt_at, finished_at = "failed", 0, now
+            logger.error(f"Reasoning job {job['job_id']} failed after {attempts} attempts: {error}")
+        else:
+            delay = min(self.max_backoff, self.retry_backoff * 2 ** (attempts - 1))
+            status, next_attempt_at, finished_at = "retrying", now + delay, None
+            REASONING_JOB_RETRIES.inc()
+            logger.warning(f"Reasoning job {job['job_id']} attempt {attempts} hit an LLM error; retrying in {delay:.1f} s: {error}")
+        with self._lock:
+            self._db.execute("UPDATE reasoning_jobs SET status = ?, attempts = ?, next_attempt_at = ?, finished_at = ?, last_error = ?, "
+                             "owner = NULL, lease_expires_at = NULL WHERE job_id = ? AND status = 'running' AND owner = ?",
+                             (status, attempts, next_attempt_at, finished_at, error, job["job_id"], self.owner))
+
+    def _status(self, job_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute("SELECT status FROM reasoning_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return row["status"] if row else None
+
+    def _load_steps(self, job_id: str) -> List[ReasoningStep]:
+        with self._lock:
+            rows = self._db.execute("SELECT step FROM reasoning_job_steps WHERE job_id = ? ORDER BY position", (job_id,)).fetchall()
+        return [ReasoningStep.model_validate_json(step) for (step,) in rows]
+
+    def _store_step(self, job_id: str, position: int, step: ReasoningStep) -> bool:
+        """Stores the step if this queue still holds the job's lease; False when it does not."""
+        with self._lock:
+            return self._db.execute(
+                "INSERT OR REPLACE INTO reasoning_job_steps (job_id, position, step) SELECT ?, ?, ? "
+                "WHERE EXISTS (SELECT 1 FROM reasoning_jobs WHERE job_id = ? AND status = 'running' AND owner = ?)",
+                (job_id, position, step.model_dump_json(), job_id, self.owner)).rowcount > 0
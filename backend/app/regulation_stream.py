@@ -0,0 +1,301 @@
+import yaml
+from typing import Any, Dict, Iterator, Optional, Union
+
+from .models import Regulation, Provision, SpiderwebNode, HoneycombNode, OctopusNode, RegulatoryAxis
+
+# Streaming reader for the hierarchical 4D regulation file (app/data/regulations.yaml):
+#   Pillars -> BaseLevel / TreeLevels -> Branches -> LargeBranches -> MediumBranches -> SmallBranches -> Nodes
+# The file is consumed as a YAML event stream, so only the element currently being read is held
+# in memory. Each Pillar becomes a Regulation; every element below it becomes a Provision whose
+# parent_id/hierarchy_level follow the tree (BaseLevel/TreeLevels = 1, Branches = 2, ...).
+
+PILLARS_KEY = "Pillars"
+# Keys whose values are nested hierarchy elements (a mapping or a sequence of mappings)
+CHILD_KEYS = ("BaseLevel", "TreeLevels", "Branches", "LargeBranches", "MediumBranches", "SmallBranches", "Nodes")
+
+# Mapping-node sections next to Pillars (loaded only with include_mappings=True)
+MAPPING_NODE_KEYS = ("SpiderWeb_Nodes", "Honeycomb_Nodes", "Octopus_Nodes")
+
+_NULL_SCALARS = {"", "~", "null", "Null", "NULL"}
+
+
+class _EventStream:
+    """Thin wrapper over yaml.parse() with one-event lookahead."""
+
+    def __init__(self, events):
+        self._events = iter(events)
+        self._peeked = None
+
+    def peek(self):
+        if self._peeked is None:
+            self._peeked = next(self._events)
+        return self._peeked
+
+    def next(self):
+        event = self.peek()
+        self._peeked = None
+        return event
+
+
+def _scalar(event: yaml.ScalarEvent) -> Optional[str]:
+    # Plain null-like scalars become None; everything else is kept as a string
+    if event.style is None and event.value in _NULL_SCALARS:
+        return None
+    return event.value
+
+
+def _read_value(events: _EventStream) -> Any:
+    """Builds a plain Python value for the next node (used for small leaf fields such as Roles)."""
+    event = events.next()
+    if isinstance(event, yaml.ScalarEvent):
+        return _scalar(event)
+    if isinstance(event, yaml.SequenceStartEvent):
+        items = []
+        while not isinstance(events.peek(), yaml.SequenceEndEvent):
+            items.append(_read_value(events))
+        events.next()
+        return items
+    if isinstance(event, yaml.MappingStartEvent):
+        mapping = {}
+        while not isinstance(events.peek(), yaml.MappingEndEvent):
+            key = _read_value(events)
+            mapping[key] = _read_value(events)
+        events.next()
+        return mapping
+    return None # AliasEvent: anchors are not used in the regulation files
+
+
+def _skip_value(events: _EventStream):
+    depth = 0
+    while True:
+        event = events.next()
+        if isinstance(event, (yaml.SequenceStartEvent, yaml.MappingStartEvent)):
+            depth += 1
+        elif isinstance(event, (yaml.SequenceEndEvent, yaml.MappingEndEvent)):
+            depth -= 1
+        if depth == 0:
+            return
+
+
+def _element_id(fields: Dict[str, Any]) -> Optional[str]:
+    # Kind-specific IDs (MegaBranchID, NodeID, ...) are unique; UnifiedID repeats across TreeLevels
+    for key, value in fields.items():
+        if key.endswith("ID") and key != "UnifiedID" and value:
+            return str(value)
+    unified = fields.get("UnifiedID")
+    return str(unified) if unified else None
+
+
+def _element_name(fields: Dict[str, Any]) -> Optional[str]:
+    for key, value in fields.items():
+        if key.endswith("Name") and key != "SAMName" and value:
+            return str(value)
+    return fields.get("SAMName")
+
+
+def _make_regulation(fields: Dict[str, Any], default_jurisdiction: str) -> Optional[Regulation]:
+    reg_id = fields.get("UnifiedID") or fields.get("PillarID")
+    if not reg_id:
+        return None
+    return Regulation(
+        id=str(reg_id),
+        title=fields.get("PillarName") or fields.get("SAMName") or "Unnamed Regulation",
+        description=fields.get("Description"),
+        jurisdiction=fields.get("Jurisdiction") or default_jurisdiction,
+        pillar=str(fields.get("PillarID") or reg_id),
+        effective_date=fields.get("EffectiveDate"),
+        provisions=[]
+    )
+
+
+def _make_provision(fields: Dict[str, Any], regulation: Regulation, parent_id: Optional[str], level: int) -> Optional[Provision]:
+    provision_id = _element_id(fields)
+    if not provision_id:
+        return None
+    metadata = {
+        key: value for key, value in fields.items()
+        if key in ("UnifiedID", "SAMName", "RegulatoryReference", "AssociatedCodes", "Roles", "OwnerAgency")
+        and value is not None
+    }
+    return Provision(
+        id=provision_id,
+        regulation_id=regulation.id,
+        section=fields.get("OriginalNumber") or None,
+        title=_element_name(fields) or "Untitled Provision",
+        text=fields.get("Description") or "",
+        hierarchy_level=level,
+        parent_id=parent_id,
+        jurisdiction=regulation.jurisdiction,
+        metadata=metadata
+    )
+
+
+def _walk_children(events: _EventStream, regulation: Regulation, parent_id: Optional[str], level: int) -> Iterator[Provision]:
+    event = events.peek()
+    if isinstance(event, yaml.MappingStartEvent):
+        yield from _walk_element(events, regulation, parent_id, level)
+    elif isinstance(event, yaml.SequenceStartEvent):
+        events.next()
+        while not isinstance(events.peek(), yaml.SequenceEndEvent):
+            if isinstance(events.peek(), yaml.MappingStartEvent):
+                yield from _walk_element(events, regulation, parent_id, level)
+            else:
+                _skip_value(events)
+        events.next()
+    else:
+        _skip_value(events)
+
+
+def _walk_element(events: _EventStream, regulation: Regulation, parent_id: Optional[str], level: int) -> Iterator[Provision]:
+    """Yields the element at the cursor (pre-order, as soon as its first child list starts) and then its subtree."""
+    events.next() # MappingStart
+    fields: Dict[str, Any] = {}
+    emitted = False
+    element_id = None
+    while not isinstance(events.peek(), yaml.MappingEndEvent):
+        key = _read_value(events)
+        if key in CHILD_KEYS:
+            if not emitted:
+                emitted = True
+                provision = _make_provision(fields, regulation, parent_id, level)
+                if provision:
+                    element_id = provision.id
+                    yield provision
+                else:
+                    print(f"Warning: Skipping regulation hierarchy element without ID under {parent_id or regulation.id}")
+            yield from _walk_children(events, regulation, element_id or parent_id, level + 1)
+        else:
+            fields[key] = _read_value(events)
+    events.next() # MappingEnd
+    if not emitted:
+        provision = _make_provision(fields, regulation, parent_id, level)
+        if provision:
+            yield provision
+        else:
+            print(f"Warning: Skipping regulation hierarchy element without ID under {parent_id or regulation.id}")
+
+
+def _walk_pillar(events: _EventStream, default_jurisdiction: str) -> Iterator[Union[Regulation, Provision]]:
+    events.next() # MappingStart
+    fields: Dict[str, Any] = {}
+    regulation: Optional[Regulation] = None
+    while not isinstance(events.peek(), yaml.MappingEndEvent):
+        key = _read_value(events)
+        if key in CHILD_KEYS:
+            if regulation is None:
+                regulation = _make_regulation(fields, default_jurisdiction)
+                if regulation is None:
+                    print(f"Warning: Skipping regulation pillar without ID: {fields.get('PillarName')}")
+                    _skip_value(events)
+                    continue
+                yield regulation
+            yield from _walk_children(events, regulation, None, 1)
+        else:
+            fields[key] = _read_value(events)
+    events.next() # MappingEnd
+    if regulation is None:
+        regulation = _make_regulation(fields, default_jurisdiction)
+        if regulation:
+            yield regulation
+
+
+def _float_or_none(value: Any) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _make_mapping_node(key: str, fields: Dict[str, Any]) -> Union[SpiderwebNode, HoneycombNode, OctopusNode, None]:
+    node_id = fields.get("NodeID") or fields.get("UnifiedID")
+    source = fields.get("Source")
+    if not node_id or not source:
+        return None
+    note = fields.get("Description")
+    if key == "SpiderWeb_Nodes":
+        if not fields.get("Target"):
+            return None
+        weight = _float_or_none(fields.get("Weight"))
+        return SpiderwebNode(
+            id=str(node_id),
+            source_provision=str(source),
+            target_provision=str(fields["Target"]),
+            relationship_type=fields.get("RelationshipType") or fields.get("SAMName") or "related",
+            weight=1.0 if weight is None else weight,
+            risk=_float_or_none(fields.get("Risk")),
+            note=note,
+            axes_involved=[RegulatoryAxis.SPIDERWEB, RegulatoryAxis.PROVISION]
+        )
+    if key == "Honeycomb_Nodes":
+        if not fields.get("Target"):
+            return None
+        return HoneycombNode(
+            id=str(node_id),
+            source_provision=str(source),
+            target_provision=str(fields["Target"]),
+            xwalk_type=fields.get("ConnectionType") or "Crosswalk",
+            weight=_float_or_none(fields.get("Weight")),
+            note=note,
+            axes_involved=[RegulatoryAxis.HONEYCOMB, RegulatoryAxis.PROVISION]
+        )
+    references = fields.get("References") or []
+    return OctopusNode(
+        id=str(node_id),
+        domain=fields.get("SAMName") or str(source),
+        regulatory_bodies=[str(source)],
+        linked_provisions=[str(r) for r in (references if isinstance(references, list) else [references]) if r],
+        experts=[],
+        axes_involved=[RegulatoryAxis.OCTOPUS]
+    )
+
+
+def _walk_mapping(events: _EventStream, default_jurisdiction: str, include_mappings: bool = False) -> Iterator[Any]:
+    """Searches a mapping for the Pillars sequence (it sits under the 4D_Database_Solution root key)."""
+    events.next() # MappingStart
+    while not isinstance(events.peek(), yaml.MappingEndEvent):
+        key = _read_value(events)
+        event = events.peek()
+        if key == PILLARS_KEY and isinstance(event, yaml.SequenceStartEvent):
+            events.next()
+            while not isinstance(events.peek(), yaml.SequenceEndEvent):
+                if isinstance(events.peek(), yaml.MappingStartEvent):
+                    yield from _walk_pillar(events, default_jurisdiction)
+                else:
+                    _skip_value(events)
+            events.next()
+        elif include_mappings and key in MAPPING_NODE_KEYS and isinstance(event, yaml.SequenceStartEvent):
+            for fields in _read_value(events):
+                node = _make_mapping_node(key, fields) if isinstance(fields, dict) else None
+                if node:
+                    yield node
+                else:
+                    print(f"Warning: Skipping {key} entry without NodeID/Source")
+        elif isinstance(event, yaml.MappingStartEvent):
+            yield from _walk_mapping(events, default_jurisdiction, include_mappings)
+        else:
+            _skip_value(events) # Metadata, SpiderWeb_Nodes, ... are not part of the hierarchy
+    events.next() # MappingEnd
+
+
+def iter_regulation_hierarchy(file_path: str,
+                              default_jurisdiction: str = 'Universal',
+                              loader=yaml.SafeLoader,
+                              include_mappings: bool = False
+                             ) -> Iterator[Any]:
+    """
+    Streams Regulation and Provision objects from a hierarchical regulation YAML file.
+    Each Regulation is yielded before any of its provisions, and each provision before its children.
+    With include_mappings, SpiderwebNode/HoneycombNode/OctopusNode objects from the SpiderWeb_Nodes,
+    Honeycomb_Nodes and Octopus_Nodes sections are yielded as well, in file order.
+    """
+    with open(file_path, 'r') as f:
+        events = _EventStream(yaml.parse(f, Loader=loader))
+        while True:
+            try:
+                event = events.peek()
+            except StopIteration:
+                return
+            if isinstance(event, yaml.MappingStartEvent):
+                yield from _walk_mapping(events, default_jurisdiction, include_mappings)
+            else:
+                events.next()
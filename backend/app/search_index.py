@@ -0,0 +1,348 @@
+import gc
+import math
+import re
+from collections import defaultdict
+from itertools import chain
+from bisect import bisect_left, insort
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .models import Provision, Regulation
+
+PROVISION = "provision"
+REGULATION = "regulation"
+KINDS = (PROVISION, REGULATION)
+
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:\.[a-z0-9]+)*")
+QUERY_RE = re.compile(r'"([^"]*)"?|(\S+)')
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has in is it its of on or shall that the this to was were which will with".split()
+)
+# Position gap between the title and the body, so a phrase cannot match across the two fields
+FIELD_GAP = 64
+MAX_PREFIX_EXPANSIONS = 64
+# Phrase matching packs (slot, position) into one int64 key: slot * POSITION_STRIDE + position
+POSITION_STRIDE = 1 << 32
+
+
+def tokenize(text: Optional[str]) -> List[Tuple[int, str]]:
+    """(position, token) pairs; stopwords are dropped but still take up a position, so
+       "terms of the contract" only matches those words in that order and spacing."""
+    if not text:
+        return []
+    return [(pos, token) for pos, token in enumerate(TOKEN_RE.findall(text.lower())) if token not in STOPWORDS]
+
+
+def parse_query(query: str) -> Tuple[List[str], List[str], List[List[Tuple[int, str]]]]:
+    """Splits a query into plain terms, prefix stems (`contract*`) and quoted phrases."""
+    terms: List[str] = []
+    prefixes: List[str] = []
+    phrases: List[List[Tuple[int, str]]] = []
+    for phrase, word in QUERY_RE.findall(query):
+        if phrase:
+            tokens = tokenize(phrase)
+            if len(tokens) > 1:
+                phrases.append(tokens)
+            terms.extend(token for _, token in tokens)
+            continue
+        tokens = [token for _, token in tokenize(word)]
+        if word.endswith("*") and tokens:
+            # "subcontract*" -> prefix "subcontract"; only the last token of a word is a stem
+            prefixes.append(tokens.pop())
+        terms.extend(tokens)
+    return terms, prefixes, phrases
+
+
+class SearchIndex:
+    """
+    In-process inverted index for full-text search over Provision.title / Provision.text and
+    Regulation.title / Regulation.description.
+    - Positional postings: term -> {document slot: (weighted tf, positions)}; title tokens
+      count `title_weight` times towards tf.
+    - Ranking: Okapi BM25, accumulated with numpy over per-term (slots, tf) arrays. The arrays
+      are built with the index and patched in place when a document changes.
+    - Prefix queries expand against a sorted vocabulary with bisect; quoted phrases must match,
+      checked by intersecting packed (slot, position) keys of their terms. A term's keys are
+      built on its first phrase query and patched on updates like the tf arrays.
+    Documents can be added, updated and removed one at a time; a removed document leaves a
+    dead slot behind instead of renumbering the others.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, title_weight: float = 2.0):
+        self.k1 = k1
+        self.b = b
+        self.title_weight = title_weight
+        self.postings: Dict[str, Dict[int, Tuple[float, List[int]]]] = {}
+        self.vocabulary: List[str] = []  # sorted, for prefix expansion
+        self.slot: Dict[Tuple[str, str], int] = {}
+        self.keys: List[Tuple[str, str]] = []
+        self.titles: List[str] = []
+        self.regulation_of: List[Optional[str]] = []
+        self.total_length = 0.0
+        self.num_documents = 0
+        # Per-slot columns, grown geometrically: BM25 length, liveness, kind and regulation codes
+        self.length = np.zeros(0, dtype=np.float64)
+        self.alive = np.zeros(0, dtype=bool)
+        self.kind = np.zeros(0, dtype=np.int8)
+        self.regulation = np.zeros(0, dtype=np.int64)
+        self._regulation_codes: Dict[Optional[str], int] = {}
+        # Terms each slot was indexed under, so it can be removed/updated later
+        self._indexed_terms: List[Optional[List[str]]] = []
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._position_keys: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def build(cls, provisions: Iterable[Provision], regulations: Iterable[Regulation] = (), **options) -> "SearchIndex":
+        index = cls(**options)
+        # Millions of small postings lists would trigger repeated full GC passes; none of them form cycles
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for regulation in regulations:
+                index.add_regulation(regulation, _defer_sort=True)
+            for provision in provisions:
+                index.add_provision(provision, _defer_sort=True)
+        finally:
+            if gc_enabled:
+                gc.enable()
+        index.vocabulary = sorted(index.postings)
+        for term in index.postings:
+            index._term_arrays(term)
+        return index
+
+    def __len__(self) -> int:
+        return self.num_documents
+
+    def __contains__(self, key: Tuple[str, str]) -> bool:
+        slot = self.slot.get(key)
+        return slot is not None and bool(self.alive[slot])
+
+    # --- maintenance ---
+
+    def add_provision(self, provision: Provision, _defer_sort: bool = False):
+        """Indexes a provision. Re-adding an already indexed ID updates it in place."""
+        self._add((PROVISION, provision.id), provision.title, provision.text, provision.regulation_id, _defer_sort)
+
+    def add_regulation(self, regulation: Regulation, _defer_sort: bool = False):
+        self._add((REGULATION, regulation.id), regulation.title, regulation.description, regulation.id, _defer_sort)
+
+    update_provision = add_provision
+    update_regulation = add_regulation
+
+    def remove(self, kind: str, doc_id: str):
+        slot = self.slot.get((kind, doc_id))
+        if slot is not None and self.alive[slot]:
+            self._clear(slot)
+            self.alive[slot] = False
+            self.num_documents -= 1
+
+    def _add(self, key: Tuple[str, str], title: Optional[str], body: Optional[str], regulation_id: Optional[str],
+             defer_sort: bool):
+        slot = self.slot.get(key)
+        if slot is None:
+            slot = self.slot[key] = len(self.keys)
+            self.keys.append(key)
+            self.titles.append("")
+            self.regulation_of.append(None)
+            self._indexed_terms.append(None)
+            if slot >= len(self.length):
+                self._reserve(max(slot + 1, 2 * len(self.length), 1024))
+            self.kind[slot] = KINDS.index(key[0])
+        else:
+            self._clear(slot)
+        if not self.alive[slot]:
+            self.alive[slot] = True
+            self.num_documents += 1
+        self.titles[slot] = title or ""
+        self.regulation_of[slot] = regulation_id
+        code = self._regulation_codes.setdefault(regulation_id, len(self._regulation_codes))
+        self.regulation[slot] = code
+
+        title_tokens = tokenize(title)
+        offset = (title_tokens[-1][0] + 1 if title_tokens else 0) + FIELD_GAP
+        positions: Dict[str, List[int]] = defaultdict(list)
+        for pos, token in title_tokens:
+            positions[token].append(pos)
+        title_counts = {token: len(p) for token, p in positions.items()}
+        for pos, token in tokenize(body):
+            positions[token].append(pos + offset)
+
+        extra = self.title_weight - 1.0
+        length = 0.0
+        for token, token_positions in positions.items():
+            tf = len(token_positions) + extra * title_counts.get(token, 0)
+            length += tf
+            postings = self.postings.get(token)
+            if postings is None:
+                postings = self.postings[token] = {}
+                if not defer_sort:
+                    insort(self.vocabulary, token)
+            postings[slot] = (tf, token_positions)
+            if not defer_sort:
+                self._patch(token, slot, tf, token_positions)
+        self.length[slot] = length
+        self.total_length += length
+        self._indexed_terms[slot] = list(positions)
+
+    def _clear(self, slot: int):
+        for token in self._indexed_terms[slot] or ():
+            postings = self.postings[token]
+            del postings[slot]
+            if postings:
+                self._patch(token, slot, 0.0)
+            else:
+                del self.postings[token]
+                self._arrays.pop(token, None)
+                self._position_keys.pop(token, None)
+                pos = bisect_left(self.vocabulary, token)
+                if pos < len(self.vocabulary) and self.vocabulary[pos] == token:
+                    del self.vocabulary[pos]
+        self._indexed_terms[slot] = None
+        self.total_length -= self.length[slot]
+        self.length[slot] = 0.0
+
+    def _patch(self, term: str, slot: int, tf: float, positions: Sequence[int] = ()):
+        """Brings the term's cached arrays up to date for one slot instead of rebuilding them.
+           (slots, tf): a tf of 0 marks a removed posting (it scores nothing), a new slot past
+           the end is appended, anything else drops the cache. Position keys: the slot's key
+           range is replaced by `positions`."""
+        keys = self._position_keys.get(term)
+        if keys is not None:
+            lo, hi = np.searchsorted(keys, [slot * POSITION_STRIDE, (slot + 1) * POSITION_STRIDE])
+            added = slot * POSITION_STRIDE + np.asarray(positions, dtype=np.int64)
+            self._position_keys[term] = np.concatenate((keys[:lo], added, keys[hi:]))
+        cached = self._arrays.get(term)
+        if cached is None:
+            return
+        slots, tfs = cached
+        pos = int(np.searchsorted(slots, slot))
+        if pos < len(slots) and slots[pos] == slot:
+            tfs[pos] = tf
+        elif pos == len(slots) and tf:
+            self._arrays[term] = (np.append(slots, slot), np.append(tfs, tf))
+        else:
+            del self._arrays[term]
+
+    def _reserve(self, rows: int):
+        for name in ("length", "alive", "kind", "regulation"):
+            column = getattr(self, name)
+            grown = np.zeros(rows, dtype=column.dtype)
+            grown[:len(column)] = column
+            setattr(self, name, grown)
+
+    # --- lookup ---
+
+    def expand_prefix(self, stem: str, limit: int = MAX_PREFIX_EXPANSIONS) -> List[str]:
+        """Vocabulary terms starting with `stem`, the `limit` with the most documents."""
+        start = bisect_left(self.vocabulary, stem)
+        end = bisect_left(self.vocabulary, stem + "\uffff", start)
+        matches = self.vocabulary[start:end]
+        if len(matches) > limit:
+            matches = sorted(matches, key=lambda term: -len(self.postings[term]))[:limit]
+        return matches
+
+    def phrase_slots(self, phrase: Sequence[Tuple[int, str]]) -> np.ndarray:
+        """Sorted slots containing the (position, token) phrase with the same relative spacing."""
+        if any(token not in self.postings for _, token in phrase):
+            return np.zeros(0, dtype=np.int64)
+        # Shift each term's keys back by its offset in the phrase: a match leaves the same key for every term
+        keys = None
+        for pos, token in sorted(phrase, key=lambda entry: len(self.postings[entry[1]])):
+            shifted = self._term_position_keys(token) - (pos - phrase[0][0])
+            keys = shifted if keys is None else np.intersect1d(keys, shifted, assume_unique=True)
+        return np.unique(keys // POSITION_STRIDE)
+
+    def search(self,
+               query: str,
+               limit: int = 20,
+               offset: int = 0,
+               kinds: Optional[Sequence[str]] = None,
+               regulation_id: Optional[str] = None,
+               visibility: Optional[Callable[[List[str]], np.ndarray]] = None
+              ) -> Dict[str, Any]:
+        """
+        BM25-ranked documents for a query of plain terms, `prefix*` stems and "quoted phrases".
+        Terms are OR-ed for ranking; every phrase must match. `kinds` and `regulation_id`
+        narrow the result set, and `visibility` (provision IDs -> boolean mask) hides
+        provisions the caller may not see. Returns the total hit count and one page of hits.
+        """
+        for kind in kinds or ():
+            if kind not in KINDS:
+                raise ValueError(f"Unknown document kind '{kind}', expected one of {', '.join(KINDS)}")
+        terms, prefixes, phrases = parse_query(query)
+        scored = list(dict.fromkeys(terms))
+        for stem in prefixes:
+            scored.extend(term for term in self.expand_prefix(stem) if term not in scored)
+        size = len(self.keys)
+        scores = np.zeros(size, dtype=np.float64)
+        if self.num_documents:
+            average = max(self.total_length / self.num_documents, 1e-9)
+            norm = self.k1 * (1 - self.b + self.b * self.length[:size] / average)
+            for term in scored:
+                if term in self.postings:
+                    slots, tf = self._term_arrays(term)
+                    scores[slots] += self.idf(len(self.postings[term])) * tf * (self.k1 + 1) / (tf + norm[slots])
+
+        candidates = np.nonzero(scores > 0)[0]
+        for phrase in phrases:
+            candidates = np.intersect1d(candidates, self.phrase_slots(phrase), assume_unique=True)
+        candidates = candidates[self._filter_mask(candidates, kinds, regulation_id, visibility)]
+
+        total = len(candidates)
+        # Best first; ties by slot (i.e. insertion order) so paging is stable
+        wanted = min(total, offset + limit)
+        if wanted < total:
+            top = np.argpartition(-scores[candidates], wanted - 1)[:wanted]
+            candidates = candidates[top]
+        ranked = candidates[np.lexsort((candidates, -scores[candidates]))][offset:offset + limit]
+        return {
+            "query": query,
+            "total": total,
+            "results": [self._hit(int(slot), float(scores[slot])) for slot in ranked],
+        }
+
+    def idf(self, document_frequency: int) -> float:
+        n = self.num_documents
+        return math.log(1.0 + (n - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    def _hit(self, slot: int, score: float) -> Dict[str, Any]:
+        kind, doc_id = self.keys[slot]
+        return {"id": doc_id, "kind": kind, "title": self.titles[slot],
+                "regulation_id": self.regulation_of[slot], "score": score}
+
+    def _filter_mask(self, candidates: np.ndarray, kinds: Optional[Sequence[str]], regulation_id: Optional[str],
+                     visibility: Optional[Callable[[List[str]], np.ndarray]]) -> np.ndarray:
+        keep = self.alive[candidates]
+        kind = self.kind[candidates]
+        if kinds:
+            keep &= np.isin(kind, [KINDS.index(k) for k in kinds])
+        if regulation_id is not None:
+            keep &= self.regulation[candidates] == self._regulation_codes.get(regulation_id, -1)
+        if visibility is not None:
+            provisions = np.nonzero(keep & (kind == KINDS.index(PROVISION)))[0]
+            if len(provisions):
+                keep[provisions] = visibility([self.keys[slot][1] for slot in candidates[provisions]])
+        return keep
+
+    def _term_arrays(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        cached = self._arrays.get(term)
+        if cached is None:
+            postings = self.postings[term]
+            slots = np.fromiter(postings.keys(), dtype=np.int64, count=len(postings))
+            tf = np.fromiter((tf for tf, _ in postings.values()), dtype=np.float64, count=len(postings))
+            # Updates re-insert dict keys out of order; _patch needs the slots sorted
+            order = np.argsort(slots, kind="stable")
+            cached = self._arrays[term] = (slots[order], tf[order])
+        return cached
+
+    def _term_position_keys(self, term: str) -> np.ndarray:
+        """Sorted slot * POSITION_STRIDE + position keys of every occurrence of the term (built on demand)."""
+        keys = self._position_keys.get(term)
+        if keys is None:
+            postings = self.postings[term]
+            counts = np.fromiter((len(p) for _, p in postings.values()), dtype=np.int64, count=len(postings))
+            slots = np.repeat(np.fromiter(postings.keys(), dtype=np.int64, count=len(postings)), counts)
+            positions = np.fromiter(chain.from_iterable(p for _, p in postings.values()), dtype=np.int64, count=int(counts.sum()))
+            keys = self._position_keys[term] = np.sort(slots * POSITION_STRIDE + positions)
+        return keys
@@ -0,0 +1,106 @@
+import hashlib
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .knowledge_algorithms import KNOWLEDGE_ALGORITHMS
+from .scheduler import ScheduledPass, call_algorithm, planned_algorithms
+from .tree_of_thought import record_history
+
+# Deterministic algorithms that read only the node's structure, never axis9 (which refinement rewrites)
+PURE_ALGORITHMS = frozenset({"structural_validation", "taxonomy_integrity", "compliance_check"})
+DEFAULT_MAX_WORKERS = 8
+
+
+def node_version(node) -> str:
+    """Fingerprint of the node without axis9 and metadata, the only fields refinement itself writes."""
+    if hasattr(node, "model_dump_json"):
+        state = node.model_dump_json(exclude={"metadata": True, "axes": {"axis9"}})
+    else:
+        # Plain objects: the attributes the pure algorithms read
+        axes = getattr(node, "axes", None)
+        state = repr([getattr(node, name, None) for name in ("node_id", "label", "links", "pillar_id")]
+                     + [getattr(axes, "axis8", None)])
+    return hashlib.sha1(state.encode()).hexdigest()
+
+
+class AlgorithmMemo:
+    """
+    Results of pure algorithms keyed by (algorithm, node version). Safe to share between threads
+    and batches, but results also depend on the context, so use one memo per context.
+    """
+
+    def __init__(self):
+        self._results: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def run(self, algorithm: str, node, context, version: Optional[str] = None) -> Dict[str, Any]:
+        key = (algorithm, version or node_version(node))
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None:
+                self.hits += 1
+                return dict(result)
+        result = KNOWLEDGE_ALGORITHMS[algorithm](node, context)
+        with self._lock:
+            self.misses += 1
+            self._results[key] = result
+        return dict(result)
+
+
+def _memoized(memo: AlgorithmMemo, version: str):
+    def run(algorithm: str, node, context) -> Dict[str, Any]:
+        if algorithm in PURE_ALGORITHMS:
+            return memo.run(algorithm, node, context, version)
+        return call_algorithm(algorithm, node, context)
+    return run
+
+
+def batch_tree_of_thought_refinement(nodes: Iterable, context, max_depth: int = 3, confidence_goal: float = 0.995,
+                                     max_workers: int = DEFAULT_MAX_WORKERS, memo: Optional[AlgorithmMemo] = None,
+                                     executor: Optional[Executor] = None, short_circuit: bool = True) -> List[Tuple[Any, List[dict]]]:
+    """
+    tree_of_thought_refinement over many nodes, run depth by depth across the whole batch:
+      - every node's cheap algorithms run first (see ScheduledPass); pure ones go through the memo,
+        so deeper passes over an unchanged node cost nothing
+      - the expensive (LLM) algorithms of every node whose pass has not already failed are then
+        submitted to one thread pool together
+    Histories are the same as tree_of_thought_refinement's. Returns [(node, history)] in input order.
+    """
+    nodes = list(nodes)
+    memo = memo if memo is not None else AlgorithmMemo()
+    histories: List[List[dict]] = [[] for _ in nodes]
+    confidences = [getattr(node.axes, "axis9", 0.0) or 0.0 for node in nodes]
+    pool = executor or ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tot-refine")
+    try:
+        active = list(range(len(nodes)))
+        for depth in range(max_depth + 1):
+            if not active:
+                break
+            passes = {}
+            for i in active:
+                node = nodes[i]
+                passes[i] = ScheduledPass(node, planned_algorithms(node), confidences[i], confidence_goal, short_circuit)
+                passes[i].run_cheap(context, _memoized(memo, node_version(node)))
+            futures = [(i, position, pool.submit(call_algorithm, algo, nodes[i], context))
+                       for i in active for position, algo in passes[i].pending_expensive()]
+            for i, position, future in futures:
+                passes[i].record(position, future.result())
+            for i in active:
+                histories[i].append({"depth": depth, "node_id": getattr(nodes[i], "node_id", None),
+                                     "starting_confidence": confidences[i], "actions": passes[i].actions,
+                                     "skipped": passes[i].skipped})
+                confidences[i] = passes[i].confidence
+            active = [i for i in active if confidences[i] < confidence_goal]
+    finally:
+        if executor is None:
+            pool.shutdown(wait=True)
+
+    for node, history in zip(nodes, histories):
+        record_history(node, history)
+    return list(zip(nodes, histories))
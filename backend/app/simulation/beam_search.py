@@ -0,0 +1,117 @@
+import copy
+from typing import List, Optional, Tuple
+
+from .batch_refinement import PURE_ALGORITHMS, AlgorithmMemo, node_version
+from .expert_roles import EXPERT_ROLE_LIBRARY, get_roles_for_node
+from .knowledge_algorithms import KNOWLEDGE_ALGORITHMS, algorithm_spec
+from .scheduler import ScheduledPass, call_algorithm, get_executor
+from .tree_of_thought import record_history
+
+DEFAULT_BEAM_WIDTH = 3
+
+
+class Candidate:
+    """One line of reasoning in the beam: the roles consulted so far, in order, and the confidence of its latest pass."""
+    __slots__ = ("path", "confidence", "evidence", "results")
+
+    def __init__(self, path: Tuple[str, ...], confidence: float, evidence: float = 0.0, results: int = 0):
+        self.path = path
+        self.confidence = confidence
+        self.evidence = evidence # sum of validation results along the path
+        self.results = results
+
+    @property
+    def mean_validation(self) -> float:
+        return self.evidence / self.results if self.results else 0.0
+
+    def rank(self) -> Tuple[float, float]:
+        return (-self.confidence, -self.mean_validation)
+
+
+def _child_node(node, confidence: float):
+    """Shallow copy of node with its own axes, so a candidate's algorithms see that candidate's axis9."""
+    child = copy.copy(node)
+    child.axes = copy.copy(node.axes)
+    child.axes.axis9 = confidence
+    return child
+
+
+def beam_tree_of_thought_refinement(node, context, beam_width: int = DEFAULT_BEAM_WIDTH, max_depth: int = 3,
+                                    confidence_goal: float = 0.995, short_circuit: bool = True,
+                                    memo: Optional[AlgorithmMemo] = None) -> Tuple[object, List[dict]]:
+    """
+    Tree-of-thought beam search over expert reasoning paths. Depth by depth, every candidate in the
+    beam is extended by one pass of each of the node's roles (see ScheduledPass; a deterministic role
+    is not repeated back to back), and the beam_width children with the highest confidence (then
+    mean validation) are kept. A child is scored by its own pass: the minimum of that role's
+    results, with the node presented to the role at the parent's confidence. A later pass can
+    therefore raise a path's score, which a running minimum over the whole path never could.
+    Stops when the best candidate reaches confidence_goal, after max_depth + 1 depths, or when no
+    candidate can be extended.
+
+    Unlike tree_of_thought_refinement, which takes the minimum over every expert, this keeps the
+    strongest line of reasoning, so the node ends at the best candidate's confidence. Every child
+    works on its own shallow copy of the node (see _child_node). Work is bounded by
+    beam_width x roles passes per depth; pure algorithms are memoized across candidates, and the
+    expensive algorithms of all children of a depth run concurrently. History holds one entry per
+    depth listing every child and whether it was kept.
+    """
+    roles = [role for role in get_roles_for_node(node)
+             if any(algo in KNOWLEDGE_ALGORITHMS for algo in EXPERT_ROLE_LIBRARY.get(role, {}).get("algorithms", []))]
+    # Consulting a deterministic role twice in a row cannot change anything; an LLM role resamples
+    deterministic = {role for role in roles if all(algorithm_spec(algo).deterministic for algo in EXPERT_ROLE_LIBRARY[role]["algorithms"]
+                                                  if algo in KNOWLEDGE_ALGORITHMS)}
+    memo = memo if memo is not None else AlgorithmMemo()
+    version = node_version(node)
+
+    def run(algorithm: str, node, context) -> dict:
+        if algorithm in PURE_ALGORITHMS:
+            return memo.run(algorithm, node, context, version)
+        return call_algorithm(algorithm, node, context)
+
+    beam = [Candidate((), getattr(node.axes, "axis9", 0.0) or 0.0)]
+    history: List[dict] = []
+    for depth in range(max_depth + 1):
+        children = []
+        for parent in beam:
+            for role in roles:
+                if parent.path and parent.path[-1] == role and role in deterministic:
+                    continue
+                planned = [(role, algo) for algo in EXPERT_ROLE_LIBRARY[role]["algorithms"] if algo in KNOWLEDGE_ALGORITHMS]
+                # The pass starts from full confidence: its score is the minimum of this role's results alone
+                scheduled = ScheduledPass(_child_node(node, parent.confidence), planned, 1.0, confidence_goal, short_circuit)
+                scheduled.run_cheap(context, run)
+                children.append((parent, role, scheduled))
+        if not children:
+            break
+
+        # Every child's expensive algorithms at once, each on its child's node; results are recorded
+        # after all of them have returned so no worker sees axis9 change under it
+        pool = get_executor()
+        futures = [(scheduled, position, pool.submit(call_algorithm, algo, scheduled.node, context))
+                   for _, _, scheduled in children for position, algo in scheduled.pending_expensive()]
+        results = [(scheduled, position, future.result()) for scheduled, position, future in futures]
+        for scheduled, position, result in results:
+            scheduled.record(position, result)
+
+        ranked = []
+        for parent, role, scheduled in children:
+            validations = [action["result"]["validation"] for action in scheduled.actions]
+            candidate = Candidate(parent.path + (role,), scheduled.confidence,
+                                  parent.evidence + sum(validations), parent.results + len(validations))
+            ranked.append((candidate, scheduled))
+        ranked.sort(key=lambda item: item[0].rank())
+        beam = [candidate for candidate, _ in ranked[:beam_width]]
+        history.append({
+            "depth": depth,
+            "node_id": getattr(node, "node_id", None),
+            "candidates": [{"path": list(candidate.path), "confidence": candidate.confidence,
+                            "actions": scheduled.actions, "skipped": scheduled.skipped, "kept": rank < beam_width}
+                           for rank, (candidate, scheduled) in enumerate(ranked)],
+        })
+        if beam[0].confidence >= confidence_goal:
+            break
+
+    node.axes.axis9 = beam[0].confidence
+    record_history(node, history)
+    return node, history
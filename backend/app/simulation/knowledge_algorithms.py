@@ -1,3 +1,4 @@
+import json
 import os
 import openai
 
@@ -9,6 +10,15 @@ AZURE_OPENAI_API_KEY = os.getenv("AZURE_OPENAI_API_KEY")
 AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
 AZURE_OPENAI_DEPLOYMENT_NAME = os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME", "gpt-4.1")
 
+try:
+    from ..quad_persona.llm_cache import get_llm_cache, make_cache_key
+except ImportError: # imported as the top-level `simulation` package (demo/tests run from backend/app)
+    from quad_persona.llm_cache import get_llm_cache, make_cache_key
+
+GPT_REASONING_SYSTEM_MESSAGE = "You are a domain expert for knowledge graph validation."
+GPT_REASONING_TEMPERATURE = 0.2
+GPT_REASONING_MAX_TOKENS = 512
+
 def structural_validation(node, context):
     score = 1.0 if getattr(node, 'label', None) and getattr(node, 'links', None) else 0.9
     return {"validation": score, "explanation": "Basic structure verified."}
@@ -44,6 +54,16 @@ def gpt_4_1_expert_reasoning(node, context, prompt_template=None):
         f"Respond with a JSON: {{'validation': float, 'explanation': str}}"
     )
 
+    # Identical node/context prompts are answered from the shared LLM response cache
+    cache = get_llm_cache()
+    key = None
+    if cache is not None and cache.accepts(GPT_REASONING_TEMPERATURE):
+        key = make_cache_key(AZURE_OPENAI_DEPLOYMENT_NAME, GPT_REASONING_SYSTEM_MESSAGE, prompt,
+                             temperature=GPT_REASONING_TEMPERATURE, max_tokens=GPT_REASONING_MAX_TOKENS)
+        cached = cache.get(key)
+        if cached is not None:
+            return json.loads(cached)
+
     try:
         response = openai.chat.completions.create(
             api_key=AZURE_OPENAI_API_KEY,
@@ -53,16 +73,17 @@ def gpt_4_1_expert_reasoning(node, context, prompt_template=None):
             deployment_id=AZURE_OPENAI_DEPLOYMENT_NAME,
             model="gpt-4-1",  # Optional, for clarity
             messages=[
-                {"role": "system", "content": "You are a domain expert for knowledge graph validation."},
+                {"role": "system", "content": GPT_REASONING_SYSTEM_MESSAGE},
                 {"role": "user", "content": prompt}
             ],
-            temperature=0.2,
-            max_tokens=512,
+            temperature=GPT_REASONING_TEMPERATURE,
+            max_tokens=GPT_REASONING_MAX_TOKENS,
         )
         # Parse response
         content = response.choices[0].message["content"]
-        import json
         result = json.loads(content)
+        if key is not None:
+            cache.set(key, json.dumps(result))
         return result
     except Exception as e:
         return {"validation": 0.0, "explanation": f"GPT-4.1 error: {str(e)}"}
@@ -75,3 +96,40 @@ KNOWLEDGE_ALGORITHMS = {
     "gpt_4_1_expert_reasoning": gpt_4_1_expert_reasoning,
     # etc.
 }
+
+
+class AlgorithmSpec:
+    """Scheduling metadata of a knowledge algorithm."""
+
+    def __init__(self, name: str,
+                 cost: float = 1.0,         # relative cost units (1 = an in-process check)
+                 latency_ms: float = 0.1,   # expected wall time per call
+                 deterministic: bool = True # same node and context -> same result, no external calls
+                 ):
+        self.name = name
+        self.cost = cost
+        self.latency_ms = latency_ms
+        self.deterministic = deterministic
+
+    def __repr__(self) -> str:
+        return f"AlgorithmSpec({self.name!r}, cost={self.cost}, latency_ms={self.latency_ms}, deterministic={self.deterministic})"
+
+
+ALGORITHM_SPECS = {
+    "structural_validation": AlgorithmSpec("structural_validation"),
+    "taxonomy_integrity": AlgorithmSpec("taxonomy_integrity"),
+    "compliance_check": AlgorithmSpec("compliance_check"),
+    "confidence_validator": AlgorithmSpec("confidence_validator"),
+    "gpt_4_1_expert_reasoning": AlgorithmSpec("gpt_4_1_expert_reasoning", cost=100.0, latency_ms=3000.0, deterministic=False),
+}
+
+
+def register_algorithm(name: str, func, cost: float = 1.0, latency_ms: float = 0.1, deterministic: bool = True):
+    """Adds (or replaces) an algorithm together with its scheduling metadata."""
+    KNOWLEDGE_ALGORITHMS[name] = func
+    ALGORITHM_SPECS[name] = AlgorithmSpec(name, cost=cost, latency_ms=latency_ms, deterministic=deterministic)
+
+
+def algorithm_spec(name: str) -> AlgorithmSpec:
+    """Registered metadata; algorithms put straight into KNOWLEDGE_ALGORITHMS count as cheap but non-deterministic."""
+    return ALGORITHM_SPECS.get(name) or AlgorithmSpec(name, deterministic=False)
@@ -0,0 +1,101 @@
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Callable, List, Optional, Set, Tuple
+
+from .expert_roles import EXPERT_ROLE_LIBRARY, get_roles_for_node
+from .knowledge_algorithms import KNOWLEDGE_ALGORITHMS, algorithm_spec
+
+# Algorithms expected to take at least this long (LLM calls) run after the cheap ones, concurrently
+EXPENSIVE_LATENCY_MS = 100.0
+DEFAULT_MAX_WORKERS = 8
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Shared pool for the expensive algorithms of single-node refinements."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=DEFAULT_MAX_WORKERS, thread_name_prefix="tot-algorithms")
+        return _executor
+
+
+def planned_algorithms(node) -> List[Tuple[str, str]]:
+    """(role, algorithm) pairs the node's roles call for, in declaration order."""
+    return [(role, algo) for role in get_roles_for_node(node)
+            for algo in EXPERT_ROLE_LIBRARY.get(role, {}).get("algorithms", []) if algo in KNOWLEDGE_ALGORITHMS]
+
+
+def call_algorithm(algorithm: str, node, context) -> dict:
+    return KNOWLEDGE_ALGORITHMS[algorithm](node, context)
+
+
+class ScheduledPass:
+    """
+    One refinement pass over a node. Its (role, algorithm) pairs are split into cheap ones, run in
+    order (deterministic first, then by cost), and expensive ones (expected latency at least
+    EXPENSIVE_LATENCY_MS), run afterwards and concurrently. A pass lowers confidence to the minimum of
+    its results, so once one result falls below the goal the pass has failed whatever the others
+    return and, with short_circuit, the rest are skipped.
+    """
+
+    def __init__(self, node, planned: List[Tuple[str, str]], confidence: float, confidence_goal: float,
+                 short_circuit: bool = True):
+        self.node = node
+        self.confidence = confidence
+        self.confidence_goal = confidence_goal
+        self.short_circuit = short_circuit
+        specs = {algo: algorithm_spec(algo) for _, algo in planned}
+        cheap = [pair for pair in planned if specs[pair[1]].latency_ms < EXPENSIVE_LATENCY_MS]
+        expensive = [pair for pair in planned if specs[pair[1]].latency_ms >= EXPENSIVE_LATENCY_MS]
+        cheap.sort(key=lambda pair: (not specs[pair[1]].deterministic, specs[pair[1]].cost, specs[pair[1]].latency_ms))
+        expensive.sort(key=lambda pair: (specs[pair[1]].cost, specs[pair[1]].latency_ms))
+        self.order = cheap + expensive
+        self.cheap_count = len(cheap)
+        self.actions: List[dict] = []
+        self._done: Set[int] = set()
+        self.failed = False
+
+    @property
+    def done(self) -> bool:
+        return self.failed and self.short_circuit
+
+    def record(self, position: int, result: dict):
+        role, algo = self.order[position]
+        self._done.add(position)
+        self.actions.append({"role": role, "algorithm": algo, "result": result})
+        self.confidence = min(self.confidence, result["validation"])
+        self.node.axes.axis9 = self.confidence
+        self.failed = self.failed or result["validation"] < self.confidence_goal
+
+    def run_cheap(self, context, run: Callable[[str, object, object], dict] = call_algorithm):
+        for position in range(self.cheap_count):
+            if self.done:
+                return
+            self.record(position, run(self.order[position][1], self.node, context))
+
+    def pending_expensive(self) -> List[Tuple[int, str]]:
+        """(position, algorithm) of the expensive algorithms still to run; empty once the pass has failed."""
+        if self.done:
+            return []
+        return [(position, self.order[position][1]) for position in range(self.cheap_count, len(self.order))]
+
+    def run_expensive(self, context, executor: Optional[Executor] = None, run: Callable[[str, object, object], dict] = call_algorithm):
+        pending = self.pending_expensive()
+        if not pending:
+            return
+        if len(pending) == 1:
+            position, algo = pending[0]
+            self.record(position, run(algo, self.node, context))
+            return
+        pool = executor or get_executor()
+        futures = [(position, pool.submit(run, algo, self.node, context)) for position, algo in pending]
+        for position, future in futures:
+            self.record(position, future.result())
+
+    @property
+    def skipped(self) -> List[dict]:
+        return [{"role": role, "algorithm": algo} for position, (role, algo) in enumerate(self.order)
+                if position not in self._done]
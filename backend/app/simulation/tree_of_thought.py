@@ -1,51 +1,47 @@
-from .knowledge_algorithms import KNOWLEDGE_ALGORITHMS
-from .expert_roles import EXPERT_ROLE_LIBRARY, get_roles_for_node
+from .scheduler import ScheduledPass, planned_algorithms
 
-def tree_of_thought_refinement(node, context, history=None, depth=0, max_depth=3, confidence_goal=0.995):
+def record_history(node, history):
+    """Appends refinement history entries to node.metadata (a dict, or NodeMetadata with extra fields)."""
+    metadata = getattr(node, "metadata", None)
+    if metadata is None:
+        node.metadata = metadata = {}
+    if isinstance(metadata, dict):
+        metadata.setdefault("refinement_history", []).extend(history)
+    else: # NodeMetadata allows extra fields
+        metadata.refinement_history = (getattr(metadata, "refinement_history", None) or []) + list(history)
+
+def tree_of_thought_refinement(node, context, history=None, depth=0, max_depth=3, confidence_goal=0.995, short_circuit=True):
     """
-    Recursive reasoning (ToT/AoT) for nodes: applies expert algorithms, escalates as needed.
+    Iterative reasoning (ToT/AoT) for nodes: applies expert algorithms pass after pass, from depth up
+    to max_depth, until confidence reaches the goal. Each pass appends one entry to history, and the
+    entries are added to node.metadata["refinement_history"] once, at the end.
     Returns node with updated confidence & audit.
     """
     if history is None:
         history = []
+    first_entry = len(history)
 
-    current_conf = getattr(node.axes, 'axis9', 0.0)
-    history.append({
-        "depth": depth,
-        "node_id": getattr(node, 'node_id', None),
-        "starting_confidence": current_conf,
-        "actions": []
-    })
+    for depth in range(depth, max(depth, max_depth) + 1):
+        current_conf = getattr(node.axes, 'axis9', 0.0)
+        history.append({
+            "depth": depth,
+            "node_id": getattr(node, 'node_id', None),
+            "starting_confidence": current_conf,
+            "actions": []
+        })
 
-    # Decide which roles ("experts") to apply at this layer
-    roles = get_roles_for_node(node)
-    for role in roles:
-        expert_config = EXPERT_ROLE_LIBRARY.get(role, {})
-        algos = expert_config.get("algorithms", [])
-        for algo in algos:
-            func = KNOWLEDGE_ALGORITHMS.get(algo)
-            if func:
-                result = func(node, context)
-                history[-1]["actions"].append({
-                    "role": role,
-                    "algorithm": algo,
-                    "result": result
-                })
-                current_conf = min(current_conf, result["validation"])
-                node.axes.axis9 = current_conf
+        # Decide which roles ("experts") to apply at this layer; the scheduler runs their algorithms
+        # cheapest first and stops once the pass has fallen below the goal
+        scheduled = ScheduledPass(node, planned_algorithms(node), current_conf, confidence_goal, short_circuit=short_circuit)
+        scheduled.run_cheap(context)
+        scheduled.run_expensive(context)
+        history[-1]["actions"] = scheduled.actions
+        history[-1]["skipped"] = scheduled.skipped
+        current_conf = scheduled.confidence
 
-    # Check: do we need refinement (recursive step)?
-    if current_conf < confidence_goal and depth < max_depth:
-        node, history = tree_of_thought_refinement(
-            node,
-            context,
-            history=history,
-            depth=depth+1,
-            max_depth=max_depth,
-            confidence_goal=confidence_goal
-        )
+        # Check: do we need another refinement pass?
+        if current_conf >= confidence_goal:
+            break
 
-    if not hasattr(node, "metadata"):
-        node.metadata = {}
-    node.metadata.setdefault("refinement_history", []).extend(history)
+    record_history(node, history[first_entry:])
     return node, history
@@ -1,16 +1,30 @@
+def _metadata_get(metadata, key, default=None):
+    if isinstance(metadata, dict):
+        return metadata.get(key, default)
+    return getattr(metadata, key, default)
+
+def _metadata_set(metadata, key, value):
+    # dict metadata, or NodeMetadata (extra fields allowed)
+    if isinstance(metadata, dict):
+        metadata[key] = value
+    else:
+        setattr(metadata, key, value)
+
 def autonomous_layer3_agent(node, context):
     """
     Simulate external, autonomous validation.
     - Could query a public DB, academic API, or LLM.
     - Here, simply boost confidence if node meets certain test.
     """
-    if getattr(node.axes, 'axis9', 0) < 0.8 and "trusted_source" in (getattr(node.metadata, 'provenance', []) or []):
+    if getattr(node.axes, 'axis9', 0) < 0.8 and "trusted_source" in (_metadata_get(node.metadata, 'provenance') or []):
         node.axes.axis9 = min(1.0, (node.axes.axis9 or 0) + 0.2)
-        node.metadata.setdefault("external_validations", []).append({
+        validations = _metadata_get(node.metadata, "external_validations") or []
+        validations.append({
             "validator": "Layer3Agent",
             "result": node.axes.axis9
         })
-        node.metadata["validated"] = True
+        _metadata_set(node.metadata, "external_validations", validations)
+        _metadata_set(node.metadata, "validated", True)
     elif getattr(node.axes, 'axis9', 0) < 0.8:
-        node.metadata["research_needed"] = True
+        _metadata_set(node.metadata, "research_needed", True)
     return node
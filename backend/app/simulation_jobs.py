@@ -0,0 +1,393 @@
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+    msvcrt = None
+except ImportError: # Windows
+    import msvcrt
+    fcntl = None
+
+from .models import KnowledgeNode, KnowledgeNodeLink, NodeMetadata, Provision, Regulation
+from .simulation.simulation_manager import simulate_full_expert_reasoning
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("completed", "cancelled", "failed")
+# Confidence a provision starts refinement with when its metadata does not declare one
+DEFAULT_PROVISION_CONFIDENCE = 1.0
+
+
+def _try_lock(fd: int) -> bool:
+    """Non-blocking exclusive lock on an open file (flock, or msvcrt on Windows); the OS drops it if the process dies."""
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+def _unlock(fd: int):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET) # msvcrt locks from the current position
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+def provision_to_node(provision: Provision, regulation: Optional[Regulation] = None) -> KnowledgeNode:
+    """
+    Provision -> KnowledgeNode for the simulation algorithms, which read the 13-axis node shape:
+    the regulation is the node's pillar (axis1), crosswalks are its compliance tags (axis8),
+    metadata["confidence"] its starting confidence (axis9) and Spiderweb links its links.
+    """
+    metadata = dict(provision.metadata or {})
+    confidence = metadata.get("confidence")
+    return KnowledgeNode(
+        node_id=provision.id,
+        label=provision.title,
+        description=provision.text,
+        pillar_id=provision.regulation_id,
+        axes={
+            "axis1": regulation.pillar if regulation else provision.regulation_id,
+            "axis3": provision.section,
+            "axis4": provision.hierarchy_level,
+            "axis7": ",".join(provision.octopus_refs) or None,
+            "axis8": provision.crosswalks,
+            "axis9": DEFAULT_PROVISION_CONFIDENCE if confidence is None else confidence,
+            "axis11": provision.jurisdiction,
+            "axis13": {"tags": provision.tags},
+        },
+        metadata=NodeMetadata(**metadata),
+        simulation_roles=metadata.get("simulation_roles") or [],
+        links=[KnowledgeNodeLink(target_node_id=target, relationship_type="spiderweb") for target in provision.spiderweb_links],
+    )
+
+
+class RegulationContext:
+    """The KGM as a simulation context: regulations stand in for the pillars taxonomy_integrity checks."""
+
+    def __init__(self, kgm):
+        self._kgm = kgm
+        self.pillars = {regulation.id: regulation for regulation in kgm.get_all_regulations()}
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._kgm, name)
+
+
+class SimulationJob:
+    """State of one bulk simulation; guarded by its `changed` condition."""
+
+    def __init__(self, job_id: str, provision_ids: List[str], confidence_goal: float, request: Optional[Dict[str, Any]] = None):
+        self.job_id = job_id
+        self.provision_ids = provision_ids
+        self.confidence_goal = confidence_goal
+        self.request = request or {}
+        self.status = "queued"
+        self.results: List[Dict[str, Any]] = []
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.resumed_results = 0 # results restored from a checkpoint, excluded from throughput
+        self.changed = threading.Condition()
+        self.checkpoint_lock = threading.Lock()
+        self.lock_fd: Optional[int] = None # open, locked .lock file while this process runs the job
+
+    def progress(self) -> Dict[str, Any]:
+        done = len(self.results)
+        elapsed = ((self.finished_at or time.time()) - self.started_at) if self.started_at else 0.0
+        processed = done - self.resumed_results
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "total": len(self.provision_ids),
+            "completed": done,
+            "errors": sum(1 for r in self.results if r["status"] == "error"),
+            "elapsed_s": round(elapsed, 3),
+            "provisions_per_second": round(processed / elapsed, 2) if elapsed > 0 else 0.0,
+            "request": self.request,
+        }
+
+    def to_checkpoint(self, status: Optional[str] = None) -> Dict[str, Any]:
+        return {"job_id": self.job_id, "provision_ids": self.provision_ids, "confidence_goal": self.confidence_goal,
+                "request": self.request, "status": status or self.status, "results": self.results, "created_at": self.created_at}
+
+
+class SimulationJobManager:
+    """
+    Bulk simulate_full_expert_reasoning runs. submit() returns at once; provisions are refined on a
+    shared thread pool (the refinement's LLM calls are I/O-bound, and the KGM is not cheap to ship
+    to worker processes). With checkpoint_dir, each job's results are saved every checkpoint_every
+    provisions and on completion, and start() resumes the jobs that were still running when the
+    process stopped from their checkpoint, skipping the provisions already done.
+
+    A process runs a checkpointed job only while it holds an exclusive OS lock on the job's lock
+    file; the kernel drops it if the process dies. So workers sharing checkpoint_dir never run
+    the same job twice, and a crashed worker's jobs are resumed by the next start(). Job state
+    is otherwise kept in memory: a job is only visible on the worker that runs it, so serve
+    /simulate/jobs from a single worker process.
+    """
+
+    def __init__(self, kgm,
+                 max_workers: int = 8,
+                 checkpoint_dir: Optional[str] = None,
+                 checkpoint_every: int = 50):
+        self.kgm = kgm
+        self.checkpoint_dir = checkpoint_dir
+        self.checkpoint_every = checkpoint_every
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="simulation-job")
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, SimulationJob] = {}
+        self._context: Optional[RegulationContext] = None
+        if checkpoint_dir:
+            os.makedirs(checkpoint_dir, exist_ok=True)
+
+    def start(self):
+        """Resumes unfinished checkpointed jobs no other process holds. Called from the app's startup."""
+        if self.checkpoint_dir:
+            self._resume_checkpoints()
+
+    # --- request path ---
+
+    def select_provisions(self, regulation_id: Optional[str] = None, provision_ids: Optional[List[str]] = None,
+                          query: Optional[Dict[str, Any]] = None) -> List[str]:
+        """Provision ids from an explicit list, a regulation, or query_provisions filters (ValueError if none given)."""
+        if provision_ids:
+            return [pid for pid in dict.fromkeys(provision_ids) if self.kgm.get_provision_by_id(pid) is not None]
+        if regulation_id:
+            return [p.id for p in self.kgm.query_provisions(regulation_id=regulation_id)]
+        if query:
+            return [p.id for p in self.kgm.query_provisions(**query)]
+        raise ValueError("Give a regulation_id, provision_ids or a provision query.")
+
+    def submit(self, provision_ids: List[str], confidence_goal: float = 0.995, request: Optional[Dict[str, Any]] = None) -> SimulationJob:
+        job = SimulationJob(f"simjob_{uuid.uuid4()}", list(provision_ids), confidence_goal, request)
+        with self._lock:
+            self._jobs[job.job_id] = job
+        self._claim(job) # a fresh job id, so never held elsewhere
+        self._start(job, job.provision_ids)
+        return job
+
+    def get(self, job_id: str) -> Optional[SimulationJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job.progress() for job in sorted(jobs, key=lambda j: j.created_at)]
+
+    def results(self, job_id: str, offset: int = 0, limit: int = 100) -> Optional[List[Dict[str, Any]]]:
+        job = self.get(job_id)
+        if job is None:
+            return None
+        with job.changed:
+            return job.results[offset:offset + limit]
+
+    def iter_results(self, job_id: str, timeout: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """Yields every result of the job in completion order, waiting for new ones until it finishes."""
+        job = self.get(job_id)
+        if job is None:
+            return
+        sent = 0
+        while True:
+            with job.changed:
+                while sent == len(job.results) and job.status not in TERMINAL_STATUSES:
+                    if not job.changed.wait(timeout):
+                        return
+                batch = job.results[sent:]
+                finished = job.status in TERMINAL_STATUSES
+            yield from batch
+            sent += len(batch)
+            if finished and sent == len(job.results):
+                return
+
+    def cancel(self, job_id: str) -> Optional[SimulationJob]:
+        """Provisions not yet started are skipped; ones already running finish."""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        with job.changed:
+            if job.status not in TERMINAL_STATUSES:
+                job.status = "cancelled"
+                job.finished_at = time.time()
+                job.changed.notify_all()
+        self._checkpoint(job)
+        self._release(job)
+        return job
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> bool:
+        job = self.get(job_id)
+        if job is None:
+            return False
+        with job.changed:
+            return job.changed.wait_for(lambda: job.status in TERMINAL_STATUSES, timeout)
+
+    def close(self):
+        """Stops the pool and hands back the lock of every job still running, for the next start() to resume."""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            self._release(job, finished=False)
+
+    # --- workers ---
+
+    def _start(self, job: SimulationJob, provision_ids: List[str]):
+        if not provision_ids:
+            with job.changed:
+                job.status = "completed"
+                job.started_at = job.finished_at = time.time()
+                job.changed.notify_all()
+            self._checkpoint(job)
+            self._release(job)
+            return
+        for pid in provision_ids:
+            self._pool.submit(self._run_one, job, pid)
+
+    def _simulation_context(self) -> RegulationContext:
+        if self._context is None:
+            self._context = RegulationContext(self.kgm)
+        return self._context
+
+    def _run_one(self, job: SimulationJob, provision_id: str):
+        with job.changed:
+            if job.status in TERMINAL_STATUSES:
+                return
+            if job.status == "queued":
+                job.status = "running"
+                job.started_at = time.time()
+        result: Dict[str, Any] = {"provision_id": provision_id}
+        try:
+            provision = self.kgm.get_provision_by_id(provision_id)
+            if provision is None:
+                raise KeyError(f"Provision {provision_id} not found")
+            node = provision_to_node(provision, self.kgm.get_regulation_by_id(provision.regulation_id))
+            start = time.perf_counter()
+            node = simulate_full_expert_reasoning(node, self._simulation_context(), confidence_goal=job.confidence_goal)
+            result.update({
+                "status": "ok",
+                "confidence": node.axes.axis9,
+                "passes": len(getattr(node.metadata, "refinement_history", None) or []),
+                "research_needed": bool(getattr(node.metadata, "research_needed", False)),
+                "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+            })
+        except Exception as e:
+            logger.error(f"Simulation job {job.job_id}: provision {provision_id} failed: {e}", exc_info=True)
+            result.update({"status": "error", "error": str(e)})
+
+        with job.changed:
+            if job.status == "cancelled":
+                return
+            job.results.append(result)
+            done = len(job.results)
+            finished = done == len(job.provision_ids)
+            if finished:
+                job.finished_at = time.time()
+            job.changed.notify_all()
+        if finished:
+            # Only report completion once the final checkpoint is on disk
+            self._checkpoint(job, status="completed")
+            with job.changed:
+                job.status = "completed"
+                job.changed.notify_all()
+            self._release(job)
+        elif done % self.checkpoint_every == 0:
+            self._checkpoint(job)
+
+    # --- checkpoints ---
+
+    def _checkpoint_path(self, job_id: str) -> str:
+        return os.path.join(self.checkpoint_dir, f"{job_id}.json")
+
+    def _checkpoint(self, job: SimulationJob, status: Optional[str] = None):
+        if not self.checkpoint_dir:
+            return
+        path = self._checkpoint_path(job.job_id)
+        # The snapshot is taken under the write lock, so a slower writer never replaces a newer
+        # checkpoint with an older one; write-then-rename keeps the previous file if we crash mid-write
+        with job.checkpoint_lock:
+            if job.lock_fd is None:
+                return # handed back by close(); another process may own the file now
+            with job.changed:
+                data = json.dumps(job.to_checkpoint(status), default=str)
+            temporary = f"{path}.tmp"
+            with open(temporary, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(temporary, path)
+
+    def _claim(self, job: SimulationJob) -> bool:
+        """Takes the job's lock file; False if another process holds it."""
+        if not self.checkpoint_dir:
+            return True
+        fd = os.open(f"{self._checkpoint_path(job.job_id)}.lock", os.O_RDWR | os.O_CREAT, 0o644)
+        if not _try_lock(fd):
+            os.close(fd)
+            return False
+        job.lock_fd = fd
+        return True
+
+    def _release(self, job: SimulationJob, finished: bool = True):
+        with job.checkpoint_lock:
+            fd, job.lock_fd = job.lock_fd, None
+        if fd is None:
+            return
+        _unlock(fd)
+        os.close(fd)
+        if finished:
+            # Whoever takes the lock meanwhile re-reads a terminal checkpoint and lets go
+            try:
+                os.unlink(f"{self._checkpoint_path(job.job_id)}.lock")
+            except OSError: # gone, or still open in another process on Windows
+                pass
+
+    def _read_checkpoint(self, name: str) -> Optional[SimulationJob]:
+        try:
+            with open(os.path.join(self.checkpoint_dir, name), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Skipping unreadable simulation checkpoint {name}: {e}")
+            return None
+        job = SimulationJob(data["job_id"], data["provision_ids"], data["confidence_goal"], data.get("request"))
+        job.created_at = data.get("created_at", job.created_at)
+        job.results = data.get("results", [])
+        job.resumed_results = len(job.results)
+        job.status = data.get("status", "queued")
+        return job
+
+    def _resume_checkpoints(self):
+        for name in sorted(os.listdir(self.checkpoint_dir)):
+            if not name.endswith(".json"):
+                continue
+            job = self._read_checkpoint(name)
+            if job is None:
+                continue
+            if job.status not in TERMINAL_STATUSES:
+                if not self._claim(job):
+                    logger.info(f"Simulation job {job.job_id} is running in another process")
+                    continue
+                # Re-read under the lock: the previous holder may have finished it meanwhile
+                claimed = self._read_checkpoint(name)
+                if claimed is None or claimed.status in TERMINAL_STATUSES:
+                    self._release(job, finished=False)
+                if claimed is None:
+                    continue
+                claimed.lock_fd, job = job.lock_fd, claimed
+            with self._lock:
+                self._jobs[job.job_id] = job
+            if job.status in TERMINAL_STATUSES:
+                continue
+            done = {r["provision_id"] for r in job.results}
+            remaining = [pid for pid in job.provision_ids if pid not in done]
+            logger.info(f"Resuming simulation job {job.job_id}: {len(remaining)} of {len(job.provision_ids)} provisions left")
+            job.status = "queued"
+            self._start(job, remaining)
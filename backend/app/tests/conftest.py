@@ -0,0 +1,160 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from backend.app.quad_persona.llm_cache import LLMResponseCache, set_llm_cache
+
+PLAN = {
+    "reasoning_sequence": [
+        {"archetype": "KnowledgeExpert", "focus": "Define the key terms."},
+        {"archetype": "ComplianceExpert", "focus": "List the compliance obligations."},
+    ],
+    "overall_strategy_rationale": "Define terms, then outline compliance."
+}
+
+def default_responder(body):
+    system = body["messages"][0]["content"]
+    if "strategic reasoning plan" in system:
+        return json.dumps(PLAN)
+    if "synthesize the information" in system:
+        return "Synthesized answer."
+    return f"Analysis from {system.split(',')[0]}"
+
+class Axes:
+    def __init__(self, axis8=None, axis9=1.0):
+        self.axis8 = axis8
+        self.axis9 = axis9
+
+class Node:
+    """The node attributes the refinement algorithms read, without building a KnowledgeNode."""
+
+    def __init__(self, roles=("LLM Expert", "Knowledge Expert"), tags=("GDPR",), node_id="n1", label="Node",
+                 pillar_id="pillar1", links=("n2",)):
+        self.node_id = node_id
+        self.label = label
+        self.links = list(links)
+        self.pillar_id = pillar_id
+        self.axes = Axes(list(tags))
+        self.simulation_roles = list(roles)
+        self.metadata = {}
+
+class Context:
+    pillars = {"pillar1": "desc"}
+
+def mock_llm(validation=0.97, delay=0.0, calls=None, record=lambda node: node.node_id):
+    """Stand-in for gpt_4_1_expert_reasoning; appends record(node) to calls (if given) per call."""
+    lock = threading.Lock()
+    def reasoning(node, context, prompt_template=None):
+        time.sleep(delay)
+        if calls is not None:
+            with lock:
+                calls.append(record(node))
+        return {"validation": validation, "explanation": "Mocked"}
+    return reasoning
+
+class MockLLMServer:
+    """Local OpenAI-compatible /chat/completions endpoint for exercising the LLM clients without network access."""
+
+    def __init__(self):
+        self.requests = []
+        self.delay = 0.0
+        self.chunk_delay = 0.0 # pause between streamed chunks
+        self.fail_next = 0 # answer this many upcoming requests with HTTP 500
+        self.responder = default_responder
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1" # keep-alive, so connection pooling is exercised
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with server._lock:
+                    server.requests.append(body)
+                    fail = server.fail_next > 0
+                    server.fail_next -= fail
+                if fail:
+                    self._error(500)
+                    return
+                if server.delay:
+                    time.sleep(server.delay)
+                content = server.responder(body)
+                if body.get("stream"):
+                    self._stream(body, content)
+                    return
+                payload = json.dumps({
+                    "id": "chatcmpl-mock",
+                    "object": "chat.completion",
+                    "created": 0,
+                    "model": body.get("model", "mock"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _error(self, status):
+                payload = json.dumps({"error": {"message": "mock failure", "type": "server_error"}}).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _stream(self, body, content):
+                # Server-sent events, one word per chunk, like the real streaming API
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+                words = content.split(" ")
+                for i, word in enumerate(words):
+                    delta = word if i == 0 else " " + word
+                    self._event({"choices": [{"index": 0, "delta": {"role": "assistant", "content": delta}, "finish_reason": None}]}, body)
+                    if server.chunk_delay:
+                        time.sleep(server.chunk_delay)
+                self._event({"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}, body)
+                if (body.get("stream_options") or {}).get("include_usage"):
+                    self._event({"choices": [], "usage": {"prompt_tokens": 10, "completion_tokens": len(words), "total_tokens": 10 + len(words)}}, body)
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+            def _event(self, data, body):
+                data.update({"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": 0, "model": body.get("model", "mock")})
+                self.wfile.write(f"data: {json.dumps(data)}\n\n".encode())
+                self.wfile.flush()
+
+        class Server(ThreadingHTTPServer):
+            request_queue_size = 256 # many clients connect at once in concurrency tests
+
+        self.httpd = Server(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}/v1"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+@pytest.fixture
+def mock_llm_server():
+    server = MockLLMServer()
+    yield server
+    server.close()
+
+@pytest.fixture(autouse=True)
+def llm_cache():
+    """Fresh in-memory LLM response cache per test, so cached answers never leak between tests."""
+    cache = LLMResponseCache()
+    set_llm_cache(cache)
+    yield cache
+    set_llm_cache(None)
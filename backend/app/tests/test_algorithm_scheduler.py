@@ -0,0 +1,52 @@
+import threading
+import time
+from backend.app.simulation import knowledge_algorithms
+from backend.app.simulation.knowledge_algorithms import AlgorithmSpec, algorithm_spec, register_algorithm
+from backend.app.simulation.scheduler import ScheduledPass
+from backend.app.simulation.tree_of_thought import tree_of_thought_refinement
+from backend.app.tests.conftest import Context, Node, mock_llm
+
+def thread_of_call(node):
+    return threading.get_ident()
+
+def test_specs_registry_and_unregistered_defaults(monkeypatch):
+    assert algorithm_spec("gpt_4_1_expert_reasoning").latency_ms > algorithm_spec("structural_validation").latency_ms
+    assert not algorithm_spec("gpt_4_1_expert_reasoning").deterministic
+    assert not algorithm_spec("never_registered").deterministic
+    monkeypatch.setattr(knowledge_algorithms, "KNOWLEDGE_ALGORITHMS", dict(knowledge_algorithms.KNOWLEDGE_ALGORITHMS))
+    monkeypatch.setattr(knowledge_algorithms, "ALGORITHM_SPECS", dict(knowledge_algorithms.ALGORITHM_SPECS))
+    register_algorithm("sector_rules", lambda node, context: {"validation": 1.0}, cost=5.0, latency_ms=2.0)
+    assert knowledge_algorithms.KNOWLEDGE_ALGORITHMS["sector_rules"](None, None) == {"validation": 1.0}
+    assert algorithm_spec("sector_rules").cost == 5.0
+
+def test_cheap_checks_run_first_and_short_circuit_the_llm(monkeypatch):
+    calls = []
+    monkeypatch.setitem(knowledge_algorithms.KNOWLEDGE_ALGORITHMS, "gpt_4_1_expert_reasoning", mock_llm(0.99, calls=calls, record=thread_of_call))
+    node, history = tree_of_thought_refinement(Node(label=None), Context(), max_depth=2)
+    # structural_validation fails (no label) before the LLM is ever called, at every depth
+    assert calls == []
+    assert [[a["algorithm"] for a in h["actions"]] for h in history] == [["structural_validation"]] * 3
+    assert {s["algorithm"] for s in history[0]["skipped"]} == {"taxonomy_integrity", "gpt_4_1_expert_reasoning"}
+    assert node.axes.axis9 == 0.9
+
+    node, history = tree_of_thought_refinement(Node(label=None), Context(), max_depth=2, short_circuit=False)
+    assert len(calls) == 3 and all(h["skipped"] == [] for h in history)
+    assert [a["algorithm"] for a in history[0]["actions"]] == ["structural_validation", "taxonomy_integrity", "gpt_4_1_expert_reasoning"]
+
+    node, history = tree_of_thought_refinement(Node(), Context(), confidence_goal=0.95)
+    assert len(calls) == 4 and len(history) == 1 and node.axes.axis9 == 0.99
+
+def test_expensive_algorithms_run_concurrently(monkeypatch):
+    calls = []
+    monkeypatch.setitem(knowledge_algorithms.KNOWLEDGE_ALGORITHMS, "gpt_4_1_expert_reasoning", mock_llm(0.99, delay=0.2, calls=calls, record=thread_of_call))
+    monkeypatch.setitem(knowledge_algorithms.KNOWLEDGE_ALGORITHMS, "second_opinion", mock_llm(0.98, delay=0.2, calls=calls, record=thread_of_call))
+    monkeypatch.setitem(knowledge_algorithms.ALGORITHM_SPECS, "second_opinion",
+                        AlgorithmSpec("second_opinion", cost=50.0, latency_ms=3000.0, deterministic=False))
+    planned = [("LLM Expert", "gpt_4_1_expert_reasoning"), ("Reviewer", "second_opinion"), ("Knowledge Expert", "structural_validation")]
+    scheduled = ScheduledPass(Node(), planned, 1.0, 0.9)
+    assert [algo for _, algo in scheduled.order] == ["structural_validation", "second_opinion", "gpt_4_1_expert_reasoning"]
+    start = time.perf_counter()
+    scheduled.run_cheap(Context())
+    scheduled.run_expensive(Context())
+    assert time.perf_counter() - start < 0.35
+    assert len(set(calls)) == 2 and scheduled.confidence == 0.98 and scheduled.skipped == []
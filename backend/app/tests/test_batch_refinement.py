@@ -0,0 +1,55 @@
+import copy
+import time
+from backend.app.models import KnowledgeNode, KnowledgeNodeLink
+from backend.app.simulation import knowledge_algorithms
+from backend.app.simulation.batch_refinement import AlgorithmMemo, batch_tree_of_thought_refinement, node_version
+from backend.app.simulation.tree_of_thought import tree_of_thought_refinement
+from backend.app.tests.conftest import Context, Node, mock_llm
+
+def numbered_node(i):
+    return Node(["Knowledge Expert", "Regulatory Expert", "LLM Expert"], tags=["GDPR"] if i % 4 else ["SOX"], node_id=f"n{i}",
+                label=f"Node {i}" if i % 3 else None, pillar_id="pillar1" if i % 2 else "unknown", links=["n0"])
+
+def test_batch_matches_sequential_refinement_and_memoizes_pure_algorithms(monkeypatch):
+    calls = []
+    monkeypatch.setitem(knowledge_algorithms.KNOWLEDGE_ALGORITHMS, "gpt_4_1_expert_reasoning", mock_llm(0.95, calls=calls))
+    nodes = [numbered_node(i) for i in range(12)]
+    expected = [tree_of_thought_refinement(copy.deepcopy(node), Context())[1] for node in nodes]
+    calls.clear()
+    memo = AlgorithmMemo()
+    results = batch_tree_of_thought_refinement(nodes, Context(), memo=memo, max_workers=4)
+    assert [node.node_id for node, _ in results] == [node.node_id for node in nodes]
+    assert [history for _, history in results] == expected
+    assert all(len(history) == 4 for _, history in results)
+    assert [node.axes.axis9 for node in nodes] == [min(a["result"]["validation"] for h in e for a in h["actions"]) for e in expected]
+    # Pure algorithms are computed at depth 0 and reused at depths 1-3
+    pure = [a for _, history in results for h in history for a in h["actions"] if a["algorithm"] != "gpt_4_1_expert_reasoning"]
+    assert memo.misses == len(pure) // 4 and memo.hits == 3 * memo.misses
+    assert len(calls) == sum(a["algorithm"] == "gpt_4_1_expert_reasoning" for _, history in results for h in history for a in h["actions"])
+    assert all(node.metadata["refinement_history"] == history for node, history in results)
+
+def test_llm_algorithms_run_concurrently_and_stop_at_goal(monkeypatch):
+    calls = []
+    monkeypatch.setitem(knowledge_algorithms.KNOWLEDGE_ALGORITHMS, "gpt_4_1_expert_reasoning", mock_llm(0.95, delay=0.05, calls=calls))
+    nodes = [numbered_node(i) for i in range(20)]
+    for node in nodes:
+        node.simulation_roles = ["LLM Expert"]
+    start = time.perf_counter()
+    results = batch_tree_of_thought_refinement(nodes, Context(), confidence_goal=0.9, max_workers=20)
+    # 20 sequential calls would take a second; one round on the pool takes one delay
+    assert time.perf_counter() - start < 0.5
+    assert len(calls) == 20 and all(len(history) == 1 for _, history in results)
+
+def test_knowledge_nodes_are_versioned_without_refinement_fields():
+    node = KnowledgeNode(node_id="FAR.1", label="Scope", description="Scope of part.", pillar_id="pillar1",
+                         links=[KnowledgeNodeLink(target_node_id="FAR.2", relationship_type="next")], axes={"axis1": "FAR", "axis8": ["GDPR"], "axis9": 1.0, "axis11": "US"},
+                         simulation_roles=["Knowledge Expert", "Regulatory Expert"])
+    version = node_version(node)
+    node.axes.axis9 = 0.1
+    node.metadata.refinement_history = [{"depth": 0}]
+    assert node_version(node) == version
+    node.label = "Renamed"
+    assert node_version(node) != version
+    [(refined, history)] = batch_tree_of_thought_refinement([node], Context(), max_depth=1)
+    assert refined.metadata.refinement_history[1:] == history
+    assert [len(step["actions"]) for step in history] == [3, 3]
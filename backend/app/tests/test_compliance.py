@@ -0,0 +1,70 @@
+import random
+from backend.app.compliance import ComplianceMaskIndex, filter_for_compliance
+from backend.app.kg_manager import KnowledgeGraphManager
+from backend.app.models import AxisCoordinate, KnowledgeNode, Provision
+
+def reference_filter(nodes, user_compliance_tags):
+    # The original per-node scan
+    filtered = []
+    for node in nodes:
+        tags = node.axes.axis8
+        if not tags:
+            filtered.append(node)
+        else:
+            tag_list = tags if isinstance(tags, list) else [tags]
+            if any(tag in user_compliance_tags for tag in tag_list):
+                filtered.append(node)
+    return filtered
+
+TAGS = ["GDPR", "HIPAA", "SOX", "FERPA", "None"] + [f"T{i}" for i in range(80)] # > 64 tags spans two mask words
+
+def random_tags(rng):
+    return rng.choice([None, [], rng.choice(TAGS), rng.sample(TAGS, rng.randint(1, 3))])
+
+def test_filter_matches_original_scan():
+    rng = random.Random(11)
+    nodes = [KnowledgeNode(node_id=f"N{i}", label="l", description="d", pillar_id="P",
+                           axes=AxisCoordinate(axis1="a", axis11="b", axis8=random_tags(rng))) for i in range(400)]
+    index = ComplianceMaskIndex.build_for_nodes(nodes[:300])
+    assert index.width == 2
+    for _ in range(30):
+        user = rng.sample(TAGS, rng.randint(0, 4)) + rng.choice([[], ["UNKNOWN"]])
+        # The last 100 nodes are not in the index and fall back to their own tags
+        assert filter_for_compliance(nodes, user, index) == reference_filter(nodes, user)
+        assert filter_for_compliance(nodes, user) == reference_filter(nodes, user)
+    retagged = nodes[0].model_copy(update={"axes": nodes[0].axes.model_copy(update={"axis8": ["BRAND_NEW"]})})
+    index.update_node(retagged)
+    assert filter_for_compliance([retagged], ["BRAND_NEW"], index) == [retagged]
+    assert filter_for_compliance([retagged], ["GDPR"], index) == []
+
+def test_mask_index_over_crosswalks():
+    rng = random.Random(3)
+    provisions = [Provision(id=f"P{i}", regulation_id="R", title="t", text="x", jurisdiction="US",
+                            crosswalks=rng.sample(TAGS, rng.randint(0, 3))) for i in range(300)]
+    index = ComplianceMaskIndex.build(provisions)
+    assert index.width == 2
+    ids = [p.id for p in provisions]
+    for _ in range(20):
+        user = rng.sample(TAGS, rng.randint(0, 5))
+        expected = [p.id for p in provisions if not p.crosswalks or any(t in user for t in p.crosswalks)]
+        assert index.filter(ids, user) == expected
+        assert [pid for pid in ids if index.is_visible(pid, user)] == expected
+    # Updates re-mask a provision; unknown IDs are unrestricted
+    index.update(provisions[0].model_copy(update={"crosswalks": ["BRAND_NEW"]}))
+    assert index.filter([provisions[0].id, "NOT-INDEXED"], ["GDPR"]) == ["NOT-INDEXED"]
+    assert index.filter([provisions[0].id], ["BRAND_NEW"]) == [provisions[0].id]
+
+def test_kgm_query_hides_restricted_provisions():
+    kgm = KnowledgeGraphManager(
+        "backend/app/data/pillars.yaml",
+        "backend/app/data/nodes.yaml",
+        "backend/app/data/roles.yaml",
+        "backend/app/data/experts.yaml",
+    )
+    everything = kgm.query_provisions()
+    restricted = {p.id for p in everything if p.crosswalks}
+    assert restricted
+    public = kgm.query_provisions(user_compliance_tags=[])
+    assert {p.id for p in public} == {p.id for p in everything} - restricted
+    gdpr = kgm.query_provisions(user_compliance_tags=["GDPR"])
+    assert {p.id for p in gdpr} == {p.id for p in everything if not p.crosswalks or "GDPR" in p.crosswalks}
@@ -0,0 +1,135 @@
+import random
+import pytest
+from backend.app.compliance_aggregates import ComplianceAggregates
+from backend.app.compliance_scoring import ComplianceScoringEngine
+from backend.app.kg_manager import KnowledgeGraphManager
+from backend.app.models import Provision, RegulatoryAxis, SpiderwebNode
+
+def hierarchy(seed=6, n=400):
+    """Provisions in a few regulations; each one's parent is an earlier provision of the same regulation (or the regulation itself)."""
+    rng = random.Random(seed)
+    provisions = {}
+    by_reg = {}
+    for i in range(n):
+        reg = rng.choice(["FAR", "DFARS", "CA_PCC"])
+        siblings = by_reg.setdefault(reg, [])
+        parent = rng.choice(siblings) if siblings and rng.random() < 0.9 else reg
+        pid = f"{reg}.{i}"
+        provisions[pid] = Provision(id=pid, regulation_id=reg, title="t", text="x", parent_id=parent,
+                                    jurisdiction="US-CA" if reg == "CA_PCC" else rng.choice(["US-Federal", "Universal"]))
+        siblings.append(pid)
+    ids = list(provisions)
+    spiderwebs = [SpiderwebNode(id=f"SW{i}", source_provision=rng.choice(ids), target_provision=rng.choice(ids),
+                                relationship_type="rel", weight=rng.random(), risk=rng.random(),
+                                axes_involved=[RegulatoryAxis.SPIDERWEB]) for i in range(150)]
+    return provisions, spiderwebs
+
+def test_incremental_updates_match_full_recompute():
+    provisions, spiderwebs = hierarchy()
+    engine = ComplianceScoringEngine.build(provisions, spiderwebs)
+    aggregates = ComplianceAggregates.build(engine, provisions)
+    rng = random.Random(0)
+    ids = list(provisions)
+    for _ in range(2000):
+        aggregates.apply(rng.choice(ids), rng.choice([0.0, 0.25, 1.0]), rng.choice([0.5, 1.0, 3.0]))
+    assert aggregates.check() == []
+
+    scores = engine.score()
+    for r, reg_id in enumerate(engine.regulation_ids):
+        totals = aggregates.regulation(reg_id)
+        assert totals["actual"] == pytest.approx(scores["actual"][r]) and totals["gap"] == pytest.approx(scores["gap"][r])
+    contribution = engine.risk * engine.value * engine.status
+    for jurisdiction in ("US-CA", "US-Federal", "Universal"):
+        members = [engine.index[p] for p, v in provisions.items() if v.jurisdiction == jurisdiction]
+        assert aggregates.jurisdiction(jurisdiction)["actual"] == pytest.approx(contribution[members].sum())
+
+    # Subtree of a provision = itself plus everything whose parent chain reaches it
+    def ancestors(pid):
+        while pid in provisions:
+            yield pid
+            pid = provisions[pid].parent_id
+    for pid in rng.sample(ids, 30):
+        members = [engine.index[p] for p in ids if pid in ancestors(p)]
+        assert aggregates.subtree(pid)["actual"] == pytest.approx(contribution[members].sum())
+
+def test_checker_reports_drift_and_recompute_repairs_it():
+    provisions, spiderwebs = hierarchy(n=50)
+    engine = ComplianceScoringEngine.build(provisions, spiderwebs)
+    aggregates = ComplianceAggregates.build(engine, provisions)
+    pid = next(iter(provisions))
+    engine.set_status(pid, 1.0, 2.0) # bypasses apply(), so the maintained sums are now stale
+    mismatches = aggregates.check()
+    assert {(m["scope"], m["measure"]) for m in mismatches} >= {("regulation", "actual"), ("regulation", "expected"), ("provision", "actual")}
+    assert any(m["scope"] == "provision" and m["id"] == pid for m in mismatches)
+    aggregates.recompute()
+    assert aggregates.check() == []
+
+def test_parent_cycle_is_rejected():
+    provisions = {pid: Provision(id=pid, regulation_id="R", title="t", text="x", jurisdiction="US", parent_id=parent)
+                  for pid, parent in [("A", "B"), ("B", "C"), ("C", "A")]}
+    with pytest.raises(ValueError):
+        ComplianceAggregates.build(ComplianceScoringEngine.build(provisions), provisions)
+
+def test_kgm_rollups_follow_submissions():
+    kgm = KnowledgeGraphManager(
+        "backend/app/data/pillars.yaml",
+        "backend/app/data/nodes.yaml",
+        "backend/app/data/roles.yaml",
+        "backend/app/data/experts.yaml",
+        regulation_hierarchy_path="backend/app/data/regulations.yaml",
+    )
+    leaf = "FAR.1.1.1.1.1.1.1"
+    root = leaf
+    while kgm.provisions[root].parent_id in kgm.provisions:
+        root = kgm.provisions[root].parent_id
+    jurisdiction = kgm.provisions[leaf].jurisdiction
+    before = kgm.provision_compliance_rollup(root)["actual"], kgm.jurisdiction_compliance(jurisdiction)["actual"]
+    kgm.submit_compliance_status(leaf, 1.0, 1.0)
+    risk = kgm.compliance_scoring.risk[kgm.compliance_scoring.index[leaf]]
+    assert kgm.provision_compliance_rollup(root)["actual"] == pytest.approx(before[0] + risk)
+    assert kgm.jurisdiction_compliance(jurisdiction)["actual"] == pytest.approx(before[1] + risk)
+    assert kgm.compliance_gap("FAR", include_detail=False)["unmet"] == []
+    assert kgm.check_compliance_aggregates() == []
+
+def test_update_provision_refiles_scoring_aggregates_and_graph():
+    kgm = KnowledgeGraphManager(
+        "backend/app/data/pillars.yaml",
+        "backend/app/data/nodes.yaml",
+        "backend/app/data/roles.yaml",
+        "backend/app/data/experts.yaml",
+        regulation_hierarchy_path="backend/app/data/regulations.yaml",
+    )
+    moved_id = "FAR.1.1.1.1.1.1.1"
+    old_parent = kgm.provisions[moved_id].parent_id
+    kgm.submit_compliance_status(moved_id, 1.0, 2.0)
+    far_before = kgm.evaluate_regulation_compliance("FAR", include_detail=False)["total_score"]
+
+    # Moved in place to another regulation and jurisdiction, under no parent
+    moved = kgm.provisions[moved_id]
+    moved.regulation_id, moved.jurisdiction, moved.parent_id = "NEWREG", "US-TX", None
+    kgm.update_provision(moved)
+    assert [p.id for p in kgm.query_provisions(regulation_id="NEWREG")] == [moved_id]
+    assert moved_id not in {item["provision_id"] for item in kgm.compliance_scoring.provision_detail("FAR")}
+    assert [item["provision_id"] for item in kgm.compliance_scoring.provision_detail("NEWREG")] == [moved_id]
+    assert moved_id not in kgm.regulations["FAR"].provisions
+    risk = kgm.compliance_scoring.risk[kgm.compliance_scoring.index[moved_id]]
+    # The submitted status moved with it
+    assert kgm.evaluate_regulation_compliance("FAR", include_detail=False)["total_score"] == pytest.approx(far_before - 2.0 * risk)
+    assert kgm.jurisdiction_compliance("US-TX")["actual"] == pytest.approx(2.0 * risk)
+    assert kgm.provision_compliance_rollup(old_parent)["expected"] == pytest.approx(
+        sum(kgm.provision_compliance_rollup(c)["expected"] for c, p in kgm.provisions.items() if p.parent_id == old_parent)
+        + kgm.compliance_scoring.risk[kgm.compliance_scoring.index[old_parent]] * kgm.compliance_scoring.value[kgm.compliance_scoring.index[old_parent]])
+    assert kgm.check_compliance_aggregates() == []
+
+    # Only the parent changes: re-parented under a FAR provision, aggregates follow
+    moved = moved.model_copy(update={"regulation_id": "FAR", "parent_id": old_parent, "jurisdiction": kgm.provisions[old_parent].jurisdiction})
+    kgm.update_provision(moved)
+    assert kgm.evaluate_regulation_compliance("FAR", include_detail=False)["total_score"] == pytest.approx(far_before)
+    assert kgm.compliance_aggregates.placement(moved_id)[1] == kgm.compliance_scoring.index[old_parent]
+    assert kgm.check_compliance_aggregates() == []
+
+    # A new ID joins the graph as a provision, not an external endpoint
+    assert kgm.get_provision_mapping("FAR.NEW") is None
+    kgm.update_provision(Provision(id="FAR.NEW", regulation_id="FAR", title="t", text="x", jurisdiction="US-Federal", parent_id=old_parent))
+    assert "FAR.NEW" in kgm.provision_graph and kgm.get_provision_mapping("FAR.NEW")["provision"].id == "FAR.NEW"
+    assert "FAR.NEW" in kgm.regulations["FAR"].provisions and kgm.check_compliance_aggregates() == []
@@ -0,0 +1,87 @@
+import random
+import numpy as np
+import pytest
+from backend.app.compliance_scoring import ComplianceScoringEngine
+from backend.app.kg_manager import KnowledgeGraphManager
+from backend.app.models import Provision, RegulatoryAxis, SpiderwebNode
+from backend.app.provision_store import ColumnarProvisionStore
+
+def synthetic(seed=2, n=300, links=200):
+    rng = random.Random(seed)
+    regs = ["FAR", "DFARS", "CA_PCC", "NY_STF"]
+    provisions = {}
+    for i in range(n):
+        reg = rng.choice(regs)
+        provisions[f"{reg}-{i}"] = Provision(id=f"{reg}-{i}", regulation_id=reg, title="t", text="x", jurisdiction="US")
+    ids = list(provisions)
+    spiderwebs = [SpiderwebNode(id=f"SW{i}", source_provision=rng.choice(ids), target_provision=rng.choice(ids + ["EXT"]),
+                                relationship_type="rel", weight=rng.random(), risk=rng.choice([None, rng.random()]),
+                                axes_involved=[RegulatoryAxis.SPIDERWEB]) for i in range(links)]
+    statuses = {pid: {"status": rng.choice([0, 1, 0.5]), "value": rng.choice([1.0, 2.0, 0.5])} for pid in rng.sample(ids, n // 2)}
+    return provisions, spiderwebs, statuses
+
+def reference_scores(provisions, spiderwebs, statuses):
+    """The per-provision loop from the mapping spec: SW(x) = Σ s·r, R_C = Σ r·c·v, CGD = expected - actual."""
+    scores = {}
+    for pid, provision in provisions.items():
+        sw = sum((e.weight if e.weight is not None else 1.0) * (e.risk if e.risk is not None else 1.0)
+                 for e in spiderwebs if pid in (e.source_provision, e.target_provision))
+        r = sw or 1.0
+        comp = statuses.get(pid, {"status": 0, "value": 1.0})
+        reg = scores.setdefault(provision.regulation_id, {"actual": 0.0, "expected": 0.0, "spiderweb": 0.0})
+        reg["actual"] += r * comp["status"] * comp["value"]
+        reg["expected"] += r * comp["value"]
+        reg["spiderweb"] += sw
+    for reg in scores.values():
+        reg["gap"] = reg["expected"] - reg["actual"]
+    return scores
+
+def assert_scores_close(actual, expected):
+    assert actual.keys() == expected.keys()
+    for reg_id in expected:
+        assert actual[reg_id] == pytest.approx(expected[reg_id]), reg_id
+
+def test_segment_scores_match_reference_loop():
+    provisions, spiderwebs, statuses = synthetic()
+    engine = ComplianceScoringEngine.build(provisions, spiderwebs)
+    expected = reference_scores(provisions, spiderwebs, statuses)
+    assert_scores_close(engine.evaluate(statuses), expected)
+    engine.load_statuses(statuses)
+    for reg_id, reg_scores in expected.items():
+        assert engine.regulation_score(reg_id) == pytest.approx(reg_scores)
+        detail = engine.provision_detail(reg_id)
+        assert {d["provision_id"] for d in detail} == {p for p, v in provisions.items() if v.regulation_id == reg_id}
+        assert sum(d["score"] for d in detail) == pytest.approx(reg_scores["actual"])
+
+def test_tenant_batch_matches_single_evaluations():
+    provisions, spiderwebs, _ = synthetic()
+    engine = ComplianceScoringEngine.build(ColumnarProvisionStore(provisions.values()), spiderwebs)
+    tenants = {f"org{t}": synthetic(seed=10 + t)[2] for t in range(5)}
+    batch = engine.evaluate_tenants(tenants)
+    for tenant, statuses in tenants.items():
+        assert_scores_close(batch[tenant], engine.evaluate(statuses))
+    # Raw (T, N) arrays give the same per-regulation matrix
+    arrays = [engine.status_arrays(statuses) for statuses in tenants.values()]
+    matrix = engine.score(np.stack([a[0] for a in arrays]), np.stack([a[1] for a in arrays]))
+    assert matrix["gap"].shape == (5, len(engine.regulation_ids))
+
+def test_kgm_submit_evaluate_and_gap():
+    kgm = KnowledgeGraphManager(
+        "backend/app/data/pillars.yaml",
+        "backend/app/data/nodes.yaml",
+        "backend/app/data/roles.yaml",
+        "backend/app/data/experts.yaml",
+        regulation_hierarchy_path="backend/app/data/regulations.yaml",
+    )
+    reg_id = kgm.provisions["FAR.1.1.1.1.1.1.1"].regulation_id
+    before = kgm.compliance_gap(reg_id)
+    assert before["actual"] == 0 and before["gap"] == before["expected"] > 0
+    assert kgm.submit_compliance_status("FAR.1.1.1.1.1.1.1", 1.0, 2.0)
+    assert kgm.submit_compliance_status("NO-SUCH-PROVISION", 1.0) is None
+    evaluation = kgm.evaluate_regulation_compliance(reg_id)
+    item = next(d for d in evaluation["detail"] if d["provision_id"] == "FAR.1.1.1.1.1.1.1")
+    assert evaluation["total_score"] == pytest.approx(item["score"]) and item["score"] == pytest.approx(2.0 * item["spiderweb_risk"])
+    after = kgm.compliance_gap(reg_id)
+    assert after["gap"] == pytest.approx(after["expected"] - item["score"])
+    assert "FAR.1.1.1.1.1.1.1" not in {d["provision_id"] for d in after["unmet"]}
+    assert kgm.compliance_gap("NO-SUCH-REGULATION") is None
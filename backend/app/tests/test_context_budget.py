@@ -0,0 +1,83 @@
+import json
+from backend.app.quad_persona.context_budget import HistoryContext, estimate_tokens, summarize
+from backend.app.quad_persona.pipeline import run_quad_persona_pipeline
+from backend.app.tests.conftest import default_responder
+from backend.app.tests.test_quad_persona_pipeline import run_with_client
+
+def entry(name, sentences=40):
+    body = " ".join(f"{name} finding number {i} is relevant." for i in range(sentences))
+    return f"{name} (profile_{name}) Output:\n{body}\nConfidence: 0.8\n"
+
+def test_summarize_keeps_header_and_leading_sentences():
+    text = entry("Alpha")
+    summary = summarize(text, 30)
+    assert summary.startswith("Alpha (profile_Alpha) Output:\nAlpha finding number 0 is relevant.")
+    assert summary.endswith(" [...]\n") and estimate_tokens(summary) <= 30 + 2
+    assert summarize("short entry\n", 30) == "short entry\n"
+    # A single over-long sentence is cut rather than dropped
+    assert summarize("Header:\n" + "x" * 1000, 20).startswith("Header:\nxxx")
+
+def test_window_fits_budget_newest_verbatim_and_chronological():
+    context = HistoryContext(summary_tokens=40)
+    names = [f"Step{i}" for i in range(8)]
+    for name in names:
+        context.add(entry(name))
+    full, stats = context.window(None)
+    assert full == context.entries and stats["sent_tokens"] == context.total_tokens
+
+    window, stats = context.window(800)
+    assert stats["sent_tokens"] <= 800 < stats["history_tokens"]
+    assert stats["verbatim"] >= 1 and stats["summarized"] >= 1 and stats["omitted"] == 0
+    assert window[-1] == context.entries[-1] and window[0] == context.summaries[0]
+    assert [w.split(" ", 1)[0] for w in window] == names
+
+    window, stats = context.window(100)
+    assert stats["omitted"] > 0 and stats["sent_tokens"] <= 100
+    assert window[0].startswith(f"[{stats['omitted']} earlier step(s) omitted")
+    assert window[-1].startswith("Step7")
+
+def test_window_pays_for_omission_marker_and_keeps_pinned_plan():
+    context = HistoryContext(summary_tokens=40)
+    for i in range(8):
+        context.add(entry(f"Step{i}"), pinned=i == 0)
+    for budget in (20, 60, 100, 250):
+        window, stats = context.window(budget)
+        assert stats["sent_tokens"] == sum(estimate_tokens(w) for w in window)
+        assert stats["omitted"] > 0
+        assert window[0].startswith("Step0") and window[1].startswith(f"[{stats['omitted']} earlier step(s) omitted")
+        # Only the pinned summary (40 tokens) may push the window over a budget it cannot fit in
+        assert stats["sent_tokens"] <= max(budget, context.summary_token_counts[0] + estimate_tokens(window[1]))
+    unpinned = HistoryContext(summary_tokens=40)
+    for i in range(8):
+        unpinned.add(entry(f"Step{i}"))
+    window, stats = unpinned.window(20)
+    assert window == ["[8 earlier step(s) omitted to fit the context budget]\n"] and stats["sent_tokens"] <= 20
+
+def test_pipeline_sends_budgeted_history_and_records_stats(mock_llm_server):
+    plan = {"reasoning_sequence": [{"archetype": a, "focus": "Go deep."} for a in
+                                   ["KnowledgeExpert", "SectorExpert", "RegulatoryExpert", "ComplianceExpert"] * 2],
+            "overall_strategy_rationale": "Eight sequential steps."}
+    long_output = " ".join(f"Detailed observation {i} about the regulation." for i in range(300))
+    def responder(body):
+        system = body["messages"][0]["content"]
+        if "strategic reasoning plan" in system:
+            return json.dumps(plan)
+        if "synthesize the information" in system:
+            return default_responder(body)
+        return long_output
+    mock_llm_server.responder = responder
+    trace = run_with_client(mock_llm_server, lambda: run_quad_persona_pipeline("budget please"))
+    assert trace.errors_encountered == []
+    stats = [s.custom_step_data["history_context"] for s in trace.steps[1:]]
+    assert len(stats) == 9
+    assert stats[-1]["history_tokens"] > 4 * stats[-1]["sent_tokens"]
+    assert all(s["sent_tokens"] <= 4000 for s in stats)
+    # The full expert outputs are still in the trace
+    assert all(s.output_generated == long_output for s in trace.steps[1:9])
+    last_expert_prompt = "".join(m["content"] for m in mock_llm_server.requests[8]["messages"])
+    assert len(last_expert_prompt) < 8 * len(long_output) / 2
+    assert any(note.startswith("History context:") for note in trace.audit_trail_notes)
+    # The plan is never dropped from a window, and the synthesizer is told the real step count
+    assert all(req["messages"][0]["content"].count("Eight sequential steps.") + req["messages"][1]["content"].count("Eight sequential steps.") >= 1
+               for req in mock_llm_server.requests[1:])
+    assert "the subsequent 8 expert steps" in mock_llm_server.requests[-1]["messages"][0]["content"]
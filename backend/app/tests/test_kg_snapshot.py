@@ -0,0 +1,61 @@
+import shutil
+import pytest
+from backend.app.kg_manager import KnowledgeGraphManager
+from backend.app import kg_snapshot
+
+DATA_FILES = ["pillars.yaml", "nodes.yaml", "roles.yaml", "experts.yaml"]
+
+@pytest.fixture
+def data_dir(tmp_path):
+    for name in DATA_FILES:
+        shutil.copy(f"backend/app/data/{name}", tmp_path / name)
+    return tmp_path
+
+def make_kgm(data_dir, snapshot_path):
+    return KnowledgeGraphManager(
+        str(data_dir / "pillars.yaml"),
+        str(data_dir / "nodes.yaml"),
+        str(data_dir / "roles.yaml"),
+        str(data_dir / "experts.yaml"),
+        snapshot_path=str(snapshot_path),
+    )
+
+def test_snapshot_roundtrip(data_dir, tmp_path, monkeypatch):
+    snapshot = tmp_path / "cache" / "kg.bin"
+    fresh = make_kgm(data_dir, snapshot)
+    assert snapshot.exists()
+
+    # Second start must not touch the YAML loaders at all
+    def fail(*args, **kwargs):
+        raise AssertionError("YAML loader called despite valid snapshot")
+    monkeypatch.setattr(KnowledgeGraphManager, "load_provisions_and_others", fail)
+    cached = make_kgm(data_dir, snapshot)
+
+    assert cached.provisions == fresh.provisions
+    assert cached.roles == fresh.roles
+    assert [p.id for p in cached.query_provisions(role_id="ROLE_KE")] == ["USID:PL16:0002"]
+
+def test_snapshot_invalidated_by_source_change(data_dir, tmp_path):
+    snapshot = tmp_path / "kg.bin"
+    make_kgm(data_dir, snapshot)
+    sources = {"provisions": str(data_dir / "nodes.yaml")}
+    kg_snapshot.write_snapshot(str(snapshot), {"provisions": {}}, sources)
+    assert kg_snapshot.read_snapshot(str(snapshot), sources) == {"provisions": {}}
+
+    with open(data_dir / "nodes.yaml", "a") as f:
+        f.write("\n# edited\n")
+    assert kg_snapshot.read_snapshot(str(snapshot), sources) is None
+
+def test_corrupt_snapshot_is_ignored(data_dir, tmp_path):
+    snapshot = tmp_path / "kg.bin"
+    snapshot.write_bytes(b"not a snapshot")
+    kgm = make_kgm(data_dir, snapshot)
+    assert len(kgm.provisions) == 2
+
+def test_snapshot_invalidated_by_code_change(tmp_path, monkeypatch):
+    snapshot = tmp_path / "kg.bin"
+    kg_snapshot.write_snapshot(str(snapshot), {"provisions": {}}, {})
+    assert kg_snapshot.read_snapshot(str(snapshot), {}) == {"provisions": {}}
+    # e.g. models.py edited since the snapshot was written
+    monkeypatch.setattr(kg_snapshot, "_code_fingerprint", "0" * 64)
+    assert kg_snapshot.read_snapshot(str(snapshot), {}) is None
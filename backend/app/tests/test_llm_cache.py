@@ -0,0 +1,80 @@
+import asyncio
+import threading
+import time
+from backend.app.quad_persona.llm_cache import LLMResponseCache, make_cache_key
+from backend.app.quad_persona.pipeline import run_quad_persona_pipeline
+from backend.app.tests.test_quad_persona_pipeline import run_with_client
+
+def test_key_covers_model_messages_and_params():
+    base = make_cache_key("gpt-4.1", "sys", "prompt", temperature=0.7, top_p=0.95)
+    assert base == make_cache_key("gpt-4.1", "sys", "prompt", top_p=0.95, temperature=0.7)
+    assert base != make_cache_key("gpt-4o", "sys", "prompt", temperature=0.7, top_p=0.95)
+    assert base != make_cache_key("gpt-4.1", "sys2", "prompt", temperature=0.7, top_p=0.95)
+    assert base != make_cache_key("gpt-4.1", "sys", "prompt", temperature=0.2, top_p=0.95)
+
+def test_lru_eviction_and_ttl():
+    cache = LLMResponseCache(max_entries=2, ttl_seconds=0.05)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"  # a becomes most recent
+    cache.set("c", "3")           # evicts b
+    assert cache.get("b") is None
+    assert cache.get("c") == "3"
+    time.sleep(0.06)
+    assert cache.get("a") is None
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 2
+
+def test_disk_tier_survives_restart(tmp_path):
+    db = str(tmp_path / "cache.sqlite")
+    first = LLMResponseCache(db_path=db)
+    first.set("k", "answer")
+    first.close()
+    second = LLMResponseCache(db_path=db)
+    assert second.get("k") == "answer"
+    assert second.stats()["disk_hits"] == 1
+    second.close()
+
+def test_async_disk_tier_runs_off_the_event_loop(tmp_path, monkeypatch):
+    db = str(tmp_path / "cache.sqlite")
+    first = LLMResponseCache(db_path=db)
+    disk_threads = []
+    for name in ("_disk_get", "_disk_set"):
+        method = getattr(first, name)
+        def record(*args, _method=method):
+            disk_threads.append(threading.current_thread())
+            return _method(*args)
+        monkeypatch.setattr(first, name, record)
+
+    async def roundtrip():
+        await first.aset("k", "answer")
+        assert await first.aget("k") == "answer" # memory tier, no disk read
+        assert await first.aget("missing") is None
+    asyncio.run(roundtrip())
+    assert len(disk_threads) == 2 and threading.main_thread() not in disk_threads
+    first.close()
+
+    second = LLMResponseCache(db_path=db)
+    assert asyncio.run(second.aget("k")) == "answer"
+    assert second.stats()["disk_hits"] == 1 and second.stats()["misses"] == 0
+    second.close()
+
+def test_high_temperature_and_persona_opt_out_skip_cache():
+    cache = LLMResponseCache(max_temperature=0.7)
+    assert cache.accepts(0.7)
+    assert not cache.accepts(0.9)
+    assert not cache.accepts(0.2, persona_opt_out=True)
+    assert cache.stats()["skips"] == 2
+
+def test_repeated_pipeline_is_served_from_cache(mock_llm_server, llm_cache):
+    run_with_client(mock_llm_server, lambda: run_quad_persona_pipeline("Cache me"))
+    first_calls = len(mock_llm_server.requests)
+    trace = run_with_client(mock_llm_server, lambda: run_quad_persona_pipeline("Cache me"))
+    assert trace.final_response_summary == "Synthesized answer."
+    # The planner profile is static, so its prompt repeats verbatim and is not re-sent
+    assert len(mock_llm_server.requests) < 2 * first_calls
+    assert llm_cache.stats()["hits"] >= 1
+
+def test_errors_are_not_cached(mock_llm_server, llm_cache):
+    mock_llm_server.delay = 0.5
+    run_with_client(mock_llm_server, lambda: run_quad_persona_pipeline("slow"), timeout=0.05)
+    assert llm_cache.stats()["memory_entries"] == 0
@@ -0,0 +1,80 @@
+import asyncio
+import pytest
+from backend.app import metrics
+from backend.app.metrics import MetricsRegistry
+from backend.app.quad_persona.llm_client import AsyncLLMClient, set_async_llm_client
+from backend.app.quad_persona.pipeline import iter_quad_persona_events, run_quad_persona_pipeline
+from backend.app.tests.test_quad_persona_pipeline import run_with_client
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    metrics.REGISTRY.reset()
+    yield
+    metrics.REGISTRY.reset()
+
+def test_prometheus_text_format():
+    registry = MetricsRegistry()
+    requests = registry.counter("demo_requests_total", "Requests.", ("outcome",))
+    latency = registry.histogram("demo_seconds", "Latency.", ("stage",), buckets=(0.1, 1.0))
+    requests.inc(outcome='say "hi"\n')
+    for value in (0.05, 0.5, 3.0):
+        latency.observe(value, stage="planner")
+    text = registry.render()
+    assert "# TYPE demo_requests_total counter" in text
+    assert 'demo_requests_total{outcome="say \\"hi\\"\\n"} 1' in text
+    assert 'demo_seconds_bucket{stage="planner",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{stage="planner",le="1"} 2' in text
+    assert 'demo_seconds_bucket{stage="planner",le="+Inf"} 3' in text
+    assert 'demo_seconds_sum{stage="planner"} 3.55' in text and 'demo_seconds_count{stage="planner"} 3' in text
+    with pytest.raises(ValueError):
+        latency.observe(1.0)
+
+def test_trace_timing_breakdown_and_stage_metrics(mock_llm_server):
+    trace = run_with_client(mock_llm_server, lambda: run_quad_persona_pipeline("What applies to drones?"))
+    timing = trace.timing_breakdown
+    assert [stage["stage"] for stage in timing["stages"]] == ["planner", "KnowledgeExpert", "ComplianceExpert", "synthesizer"]
+    assert [stage["step_id"] for stage in timing["stages"]] == [step.step_id for step in trace.steps]
+    # The mock endpoint reports 10 prompt and 5 completion tokens per call
+    assert timing["llm_calls"] == 4 and timing["prompt_tokens"] == 40 and timing["completion_tokens"] == 20
+    assert timing["retries"] == 0 and timing["cache_hits"] == 0 and timing["resumed_steps"] == 0
+    assert timing["total_ms"] >= timing["planner_ms"] + timing["experts_ms"] + timing["synthesizer_ms"]
+    assert trace.steps[1].custom_step_data["timing"]["llm_calls"] == 1
+    assert metrics.STAGE_SECONDS.snapshot(stage="KnowledgeExpert")[0] == 1
+    assert metrics.STAGE_SECONDS.snapshot(stage="pipeline")[0] == 1
+    assert metrics.LLM_REQUESTS.value(outcome="ok") == 4
+    assert metrics.LLM_TOKENS.snapshot(kind="prompt") == (4, 40.0)
+
+def test_retries_errors_and_cache_hits_are_counted(mock_llm_server):
+    async def with_sdk_retries():
+        client = AsyncLLMClient(base_url=mock_llm_server.base_url, api_key="test", max_retries=1)
+        set_async_llm_client(client)
+        try:
+            return await run_quad_persona_pipeline("retry once")
+        finally:
+            set_async_llm_client(None)
+            await client.aclose()
+    mock_llm_server.fail_next = 1
+    trace = asyncio.run(with_sdk_retries())
+    assert trace.timing_breakdown["stages"][0]["retries"] == 1 and metrics.LLM_RETRIES.value() == 1
+    assert len(mock_llm_server.requests) == 5
+
+    # Same query again: identical prompts, so every step is served by the LLM response cache
+    trace = run_with_client(mock_llm_server, lambda: run_quad_persona_pipeline("retry once"))
+    assert trace.timing_breakdown["cache_hits"] >= 2 and metrics.LLM_REQUESTS.value(outcome="cache_hit") >= 2
+
+    mock_llm_server.fail_next = 100
+    trace = run_with_client(mock_llm_server, lambda: run_quad_persona_pipeline("always failing"))
+    assert trace.timing_breakdown["stages"][0]["failed"]
+    assert metrics.STAGE_ERRORS.value(stage="planner") == 1 and metrics.LLM_REQUESTS.value(outcome="error") == 2
+    assert 'ukfw_reasoning_stage_errors_total{stage="planner"} 1' in metrics.REGISTRY.render()
+
+def test_streamed_synthesizer_is_timed(mock_llm_server):
+    async def collect():
+        return [event async for event in iter_quad_persona_events("Stream it", stream_tokens=True)]
+    trace = run_with_client(mock_llm_server, collect)[-1]["trace"]
+    synthesizer = trace.timing_breakdown["stages"][-1]
+    # "Synthesized answer." is streamed as two chunks; the mock reports one completion token per chunk
+    assert synthesizer["stage"] == "synthesizer" and synthesizer["llm_calls"] == 1
+    assert synthesizer["prompt_tokens"] == 10 and synthesizer["completion_tokens"] == 2
+    assert metrics.LLM_TOKENS.snapshot(kind="completion") == (4, 17.0)
+    assert trace.timing_breakdown["synthesizer_ms"] == synthesizer["duration_ms"]
@@ -0,0 +1,30 @@
+from backend.app.kg_manager import KnowledgeGraphManager
+from backend.app import yaml_loader
+
+PATHS = dict(
+    regulations_path="backend/app/data/pillars.yaml",
+    provisions_path="backend/app/data/nodes.yaml",
+    roles_path="backend/app/data/roles.yaml",
+    experts_path="backend/app/data/experts.yaml",
+    regulation_hierarchy_path="backend/app/data/regulations.yaml",
+)
+
+def test_parallel_load_matches_sequential():
+    sequential = KnowledgeGraphManager(**PATHS)
+    parallel = KnowledgeGraphManager(**PATHS, parallel_load=True, load_workers=2)
+    assert parallel.regulations == sequential.regulations
+    assert parallel.provisions == sequential.provisions
+    assert parallel.roles == sequential.roles
+    assert parallel.experts == sequential.experts
+
+def test_parallel_load_reports_missing_file(capsys):
+    kgm = KnowledgeGraphManager(**{**PATHS, "roles_path": "backend/app/data/missing_roles.yaml"}, parallel_load=True)
+    assert "Roles file not found" in capsys.readouterr().out
+    assert kgm.roles == {}
+    assert len(kgm.provisions) > 0
+
+def test_c_loader_matches_pure_python_loader():
+    import yaml
+    with open("backend/app/data/nodes.yaml") as f:
+        expected = yaml.load(f, Loader=yaml.SafeLoader)
+    assert yaml_loader.load_yaml_file("backend/app/data/nodes.yaml") == expected
@@ -0,0 +1,136 @@
+import math
+import random
+import pytest
+from backend.app.kg_manager import KnowledgeGraphManager
+from backend.app.models import RegulatoryAxis, SpiderwebNode
+from backend.app.pathway import METHODS, PathwayFinder
+from backend.app.provision_graph import SPIDERWEB, ProvisionGraph
+from backend.app.tests.test_provision_graph import synthetic
+
+def reference_edges(graph, finder, keep=None):
+    """(u, v, cost) for every CSR edge, read without going through the search code."""
+    edges = []
+    for u in range(graph.num_vertices):
+        for e in range(int(graph.indptr[u]), int(graph.indptr[u + 1])):
+            if keep is None or keep[e]:
+                edges.append((graph.vertex_ids[u], graph.vertex_ids[int(graph.indices[e])], float(finder.cost[e])))
+    return edges
+
+def bellman_ford(edges, source):
+    dist = {source: 0.0}
+    for _ in range(len(edges)):
+        changed = False
+        for u, v, c in edges:
+            if u in dist and dist[u] + c < dist.get(v, math.inf) - 1e-12:
+                dist[v] = dist[u] + c
+                changed = True
+        if not changed:
+            break
+    return dist
+
+def simple_path_costs(edges, source, target):
+    adj = {}
+    for u, v, c in edges:
+        adj.setdefault(u, []).append((v, c))
+    costs = []
+    def walk(v, seen, total):
+        if v == target:
+            costs.append(total)
+            return
+        for w, c in adj.get(v, []):
+            if w not in seen:
+                walk(w, seen | {w}, total + c)
+    walk(source, {source}, 0.0)
+    return sorted(costs)
+
+def assert_valid_path(finder, path, source, target):
+    assert path["nodes"][0] == source and path["nodes"][-1] == target
+    assert len(set(path["nodes"])) == len(path["nodes"])
+    assert path["hops"] == len(path["edges"]) == len(path["nodes"]) - 1
+    for hop, a, b in zip(path["edges"], path["nodes"], path["nodes"][1:]):
+        assert (hop["from"], hop["to"]) == (a, b)
+        assert b in {n["node_id"] for n in finder.graph.neighbors(a) if n["edge_id"] == hop["edge_id"]}
+    assert path["cost"] == pytest.approx(sum(hop["cost"] for hop in path["edges"]))
+
+def test_shortest_paths_match_bellman_ford():
+    ids, spiderwebs, honeycombs, octopuses = synthetic(seed=5, n=150, edges=260)
+    graph = ProvisionGraph.build(ids, spiderwebs, honeycombs, octopuses)
+    finder = PathwayFinder(graph)
+    edges = reference_edges(graph, finder)
+    rng = random.Random(1)
+    for source in rng.sample(ids, 8):
+        expected = bellman_ford(edges, source)
+        for target in rng.sample(ids, 10) + ["EXT1"]:
+            for method in METHODS:
+                path = finder.shortest_path(source, target, method=method)
+                if target not in expected:
+                    assert path is None
+                    continue
+                assert path["cost"] == pytest.approx(expected[target]), (source, target, method)
+                assert_valid_path(finder, path, source, target)
+
+def test_restrictions_by_edge_type_and_axis():
+    ids, spiderwebs, honeycombs, octopuses = synthetic(seed=8, n=120, edges=300)
+    graph = ProvisionGraph.build(ids, spiderwebs, honeycombs, octopuses)
+    finder = PathwayFinder(graph)
+    edges = reference_edges(graph, finder, keep=graph.edge_filter([SPIDERWEB], [RegulatoryAxis.JURISDICTION]))
+    for source in ids[:6]:
+        expected = bellman_ford(edges, source)
+        for target in ids[10:30]:
+            for method in METHODS:
+                path = finder.shortest_path(source, target, method=method, edge_types=[SPIDERWEB], axes=[RegulatoryAxis.JURISDICTION])
+                assert (path is None) == (target not in expected)
+                if path:
+                    assert path["cost"] == pytest.approx(expected[target])
+                    assert {hop["edge_type"] for hop in path["edges"]} == {"spiderweb"}
+
+def test_k_shortest_paths_match_enumeration():
+    rng = random.Random(4)
+    ids = [f"P{i}" for i in range(9)]
+    spiderwebs = [SpiderwebNode(id=f"SW{i}", source_provision=a, target_provision=b, relationship_type="rel",
+                                weight=round(rng.uniform(0.2, 1.0), 2), risk=rng.choice([None, 0.1, 0.5]),
+                                axes_involved=[RegulatoryAxis.SPIDERWEB])
+                  for i, (a, b) in enumerate((a, b) for a in ids for b in ids if a < b and rng.random() < 0.4)]
+    finder = PathwayFinder(ProvisionGraph.build(ids, spiderwebs))
+    edges = reference_edges(finder.graph, finder)
+    for source, target in [("P0", "P8"), ("P3", "P5"), ("P1", "P7")]:
+        expected = simple_path_costs(edges, source, target)[:6]
+        for method in METHODS:
+            paths = finder.k_shortest_paths(source, target, k=6, method=method)
+            assert [p["cost"] for p in paths] == pytest.approx(expected), (source, target, method)
+            for path in paths:
+                assert_valid_path(finder, path, source, target)
+            assert len({tuple(p["nodes"]) for p in paths}) == len(paths)
+
+def test_cost_prefers_strong_low_risk_links():
+    def link(i, a, b, weight, risk):
+        return SpiderwebNode(id=f"SW{i}", source_provision=a, target_provision=b, relationship_type="rel",
+                             weight=weight, risk=risk, axes_involved=[RegulatoryAxis.SPIDERWEB])
+    finder = PathwayFinder(ProvisionGraph.build(["A", "B", "C", "D"], [
+        link(1, "A", "B", 0.9, 0.9), link(2, "B", "D", 0.9, 0.9), # strong but risky
+        link(3, "A", "C", 0.9, 0.0), link(4, "C", "D", 0.9, None), # strong and safe
+    ]))
+    assert finder.shortest_path("A", "D")["nodes"] == ["A", "C", "D"]
+    assert finder.shortest_path("A", "A")["cost"] == 0
+    nearest = finder.nearest("A", limit=2)
+    assert [p["nodes"][-1] for p in nearest] == ["C", "B"]
+
+def test_kgm_pathways_over_loaded_mappings():
+    kgm = KnowledgeGraphManager(
+        "backend/app/data/pillars.yaml",
+        "backend/app/data/nodes.yaml",
+        "backend/app/data/roles.yaml",
+        "backend/app/data/experts.yaml",
+        regulation_hierarchy_path="backend/app/data/regulations.yaml",
+    )
+    source = next(e.source_provision for e in kgm.spiderwebs.values())
+    pathways = kgm.find_pathways(source)
+    assert pathways and all(p["nodes"][0] == source for p in pathways)
+    target = pathways[-1]["nodes"][-1]
+    top = kgm.find_pathways(source, target, k=3)
+    assert top[0]["cost"] <= pathways[-1]["cost"] + 1e-9
+    assert [p["cost"] for p in top] == sorted(p["cost"] for p in top)
+    assert len(top[0]["jurisdictions"]) == len(top[0]["nodes"])
+    assert kgm.find_pathways("NO-SUCH-PROVISION") is None
+    with pytest.raises(ValueError):
+        kgm.find_pathways(source, edge_types=["cobweb"])
@@ -0,0 +1,61 @@
+from datetime import datetime
+import pytest
+from backend.app.quad_persona import ukg_interface
+from backend.app.quad_persona.persona_functions import _planner_prompts, _sector_expert_system_message, _expert_step
+from backend.app.quad_persona.prompt_templates import PromptTemplate, compiled_template, persona_config
+from backend.app.quad_persona.ukg_interface import (
+    get_dynamic_persona_profile,
+    get_planner_persona_profile,
+    get_synthesizer_persona_profile,
+)
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    ukg_interface.clear_persona_profile_cache()
+    yield
+    ukg_interface.clear_persona_profile_cache()
+
+def test_dynamic_profiles_are_cached_and_deterministic():
+    first = get_dynamic_persona_profile("Original Query: farm drones", "SectorExpert")
+    assert get_dynamic_persona_profile("Original Query: farm drones", "SectorExpert") is first
+    assert get_dynamic_persona_profile("Original Query: harbour drones", "SectorExpert") is not first
+    assert get_dynamic_persona_profile("Original Query: farm drones", "KnowledgeExpert").profile_id != first.profile_id
+    # Rebuilt after the cache is dropped, the profile is the same
+    ukg_interface.clear_persona_profile_cache()
+    rebuilt = get_dynamic_persona_profile("Original Query: farm drones", "SectorExpert")
+    assert rebuilt is not first and rebuilt == first
+
+def test_profile_cache_evicts_least_recently_used(monkeypatch):
+    cache = ukg_interface.LRUCache(2)
+    monkeypatch.setattr(ukg_interface, "_profile_cache", cache)
+    a = get_dynamic_persona_profile("query a", "KnowledgeExpert")
+    get_dynamic_persona_profile("query b", "KnowledgeExpert")
+    assert get_dynamic_persona_profile("query a", "KnowledgeExpert") is a
+    get_dynamic_persona_profile("query c", "KnowledgeExpert") # evicts b, the least recently used
+    assert len(cache) == 2 and cache.hits == 1
+    assert get_dynamic_persona_profile("query a", "KnowledgeExpert") is a
+    assert cache.get(("KnowledgeExpert", "query b")) is None
+
+def test_static_profiles_are_built_once():
+    assert get_planner_persona_profile() is get_planner_persona_profile()
+    assert get_synthesizer_persona_profile() is get_synthesizer_persona_profile()
+
+def test_prompt_template_bind_and_render():
+    template = PromptTemplate("Hi {name} {{literal}}: {query} / {history}")
+    bound = template.bind(name="Ann")
+    assert bound.fields == ("query", "history")
+    assert bound.render(query="{q}", history="h") == "Hi Ann {literal}: {q} / h"
+    with pytest.raises(ValueError):
+        PromptTemplate("{value:>10}")
+
+def test_compiled_templates_are_reused_per_profile():
+    profile = get_dynamic_persona_profile("Original Query: drones", "SectorExpert")
+    assert compiled_template("SectorExpert", profile) is compiled_template("SectorExpert", profile)
+    message = _sector_expert_system_message("drones?", ["planner output\n"], profile)
+    assert message.startswith(f"You are {profile.name}, a SectorExpert and {profile.job_title_exemplar}.")
+    assert "within industry sectors like various." in message and "planner output" in message and message.endswith("for the query: 'drones?'")
+    # Literal JSON braces survive binding the planner's profile fields
+    system_message, _ = _planner_prompts("drones?", get_planner_persona_profile())
+    assert '{ "parallel": [ ... ] }' in system_message and "{{" not in system_message
+    step = _expert_step("SectorExpert", "drones?", [], profile, "text", datetime.utcnow())
+    assert step.input_context["persona_config"] == profile.model_dump(exclude_none=True) == persona_config(profile)
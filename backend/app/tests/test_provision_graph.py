@@ -0,0 +1,101 @@
+import random
+from collections import deque
+from backend.app.kg_manager import KnowledgeGraphManager
+from backend.app.models import HoneycombNode, OctopusNode, RegulatoryAxis, SpiderwebNode
+from backend.app.provision_graph import HONEYCOMB, SPIDERWEB, ProvisionGraph
+
+def synthetic(seed=3, n=200, edges=600):
+    rng = random.Random(seed)
+    ids = [f"P{i}" for i in range(n)]
+    spiderwebs = [SpiderwebNode(id=f"SW{i}", source_provision=rng.choice(ids), target_provision=rng.choice(ids + ["EXT1"]),
+                                relationship_type="rel", weight=rng.random(), risk=rng.choice([None, rng.random()]),
+                                axes_involved=[rng.choice([RegulatoryAxis.SPIDERWEB, RegulatoryAxis.JURISDICTION])])
+                  for i in range(edges)]
+    honeycombs = [HoneycombNode(id=f"HC{i}", source_provision=rng.choice(ids), target_provision=rng.choice(ids),
+                                xwalk_type="Horizontal", axes_involved=[RegulatoryAxis.HONEYCOMB]) for i in range(edges // 3)]
+    octopuses = [OctopusNode(id=f"ON{i}", domain="d", regulatory_bodies=["b"], linked_provisions=rng.sample(ids, 5),
+                             experts=[], axes_involved=[RegulatoryAxis.OCTOPUS]) for i in range(10)]
+    return ids, spiderwebs, honeycombs, octopuses
+
+def reference_adjacency(spiderwebs, honeycombs, octopuses, types=None):
+    adj = {}
+    def add(a, b, t):
+        if types is None or t in types:
+            adj.setdefault(a, []).append(b)
+            adj.setdefault(b, []).append(a)
+    for e in spiderwebs:
+        add(e.source_provision, e.target_provision, "spiderweb")
+    for e in honeycombs:
+        add(e.source_provision, e.target_provision, "honeycomb")
+    for o in octopuses:
+        for p in o.linked_provisions:
+            add(o.id, p, "octopus")
+    return adj
+
+def reference_k_hop(adj, start, k, hubs):
+    dist = {start: 0}
+    queue = deque([start])
+    while queue:
+        v = queue.popleft()
+        if dist[v] == k:
+            continue
+        for w in adj.get(v, []):
+            if w not in dist:
+                dist[w] = dist[v] + 1
+                queue.append(w)
+    return {v: d for v, d in dist.items() if d > 0 and v not in hubs}
+
+def test_neighbors_and_k_hop_match_edge_scan():
+    ids, spiderwebs, honeycombs, octopuses = synthetic()
+    graph = ProvisionGraph.build(ids, spiderwebs, honeycombs, octopuses)
+    adj = reference_adjacency(spiderwebs, honeycombs, octopuses)
+    hubs = {o.id for o in octopuses}
+    assert graph.num_edges == 2 * (len(spiderwebs) + len(honeycombs) + 50)
+    for vid in ids + ["EXT1", "ON3"]:
+        assert sorted(n["node_id"] for n in graph.neighbors(vid)) == sorted(adj.get(vid, []))
+    for vid in ids[:20]:
+        for k in (1, 2, 3):
+            assert graph.k_hop(vid, k) == reference_k_hop(adj, vid, k, hubs)
+
+def test_filters_by_edge_type_and_axes():
+    ids, spiderwebs, honeycombs, octopuses = synthetic()
+    graph = ProvisionGraph.build(ids, spiderwebs, honeycombs, octopuses)
+    adj = reference_adjacency(spiderwebs, honeycombs, octopuses, types={"spiderweb", "honeycomb"})
+    for vid in ids[:20]:
+        assert graph.k_hop(vid, 2, edge_types=[SPIDERWEB, HONEYCOMB]) == reference_k_hop(adj, vid, 2, set())
+    jurisdiction = [e for e in spiderwebs if e.axes_involved == [RegulatoryAxis.JURISDICTION]]
+    adj = reference_adjacency(jurisdiction, [], [])
+    for vid in ids[:20]:
+        assert graph.k_hop(vid, 3, axes=[RegulatoryAxis.JURISDICTION]) == reference_k_hop(adj, vid, 3, set())
+    for n in graph.neighbors("P0", axes=[RegulatoryAxis.JURISDICTION]):
+        assert n["edge_type"] == "spiderweb"
+        edge = next(e for e in spiderwebs if e.id == n["edge_id"])
+        assert edge.axes_involved == [RegulatoryAxis.JURISDICTION]
+    assert all(n["edge_type"] == "honeycomb" for n in graph.neighbors("P1", edge_types=[HONEYCOMB]))
+
+def test_edge_attributes_and_direction():
+    sw = SpiderwebNode(id="SW", source_provision="A", target_provision="B", relationship_type="supplements",
+                       weight=0.7, risk=0.2, axes_involved=[RegulatoryAxis.SPIDERWEB])
+    graph = ProvisionGraph.build(["A"], [sw])
+    (out,) = graph.neighbors("A")
+    assert out["node_id"] == "B" and out["node_kind"] == "external" and out["direction"] == "outgoing"
+    assert abs(out["weight"] - 0.7) < 1e-6 and abs(out["risk"] - 0.2) < 1e-6
+    assert graph.neighbors("B")[0]["direction"] == "incoming"
+
+def test_kgm_mapping_from_regulation_file():
+    kgm = KnowledgeGraphManager(
+        "backend/app/data/pillars.yaml",
+        "backend/app/data/nodes.yaml",
+        "backend/app/data/roles.yaml",
+        "backend/app/data/experts.yaml",
+        regulation_hierarchy_path="backend/app/data/regulations.yaml",
+    )
+    assert len(kgm.spiderwebs) == 10 and len(kgm.honeycombs) == 11 and len(kgm.octopuses) == 10
+    mapping = kgm.get_provision_mapping("FAR.1.1.1.1.1.1.1", hops=2)
+    assert mapping["provision"].id == "FAR.1.1.1.1.1.1.1"
+    assert "SW-FAR-DFARS-ENV-001" in [s.id for s in mapping["spiderwebs"]]
+    assert "ON-SBA-001" in [o.id for o in mapping["octopuses"]]
+    hops = {n["node_id"]: n["hops"] for n in mapping["network"]}
+    assert hops["DFARS.2.1.2.1.1.1.1"] == 1
+    assert hops["SAR.CA.1.2.3.4"] == 2  # via the SBA octopus hub
+    assert kgm.get_provision_mapping("NOPE") is None
@@ -0,0 +1,84 @@
+import random
+import pytest
+from backend.app.models import Provision
+from backend.app.provision_index import ProvisionIndex
+from backend.app.kg_manager import KnowledgeGraphManager
+
+def linear_query(provisions, regulation_id=None, jurisdiction=None, tag=None, role_id=None, min_confidence=None, compliance_tag=None):
+    # Reference implementation: the original one-scan-per-filter query
+    matches = list(provisions)
+    if regulation_id:
+        matches = [p for p in matches if p.regulation_id == regulation_id]
+    if jurisdiction:
+        matches = [p for p in matches if p.jurisdiction == jurisdiction]
+    if tag:
+        matches = [p for p in matches if p.tags and tag in p.tags]
+    if role_id:
+        matches = [p for p in matches if p.roles_responsible and role_id in p.roles_responsible]
+    if min_confidence is not None:
+        matches = [p for p in matches if p.metadata and isinstance(p.metadata.get('confidence'), (int, float)) and p.metadata['confidence'] >= min_confidence]
+    if compliance_tag:
+        matches = [p for p in matches if p.crosswalks and compliance_tag in p.crosswalks]
+    return [p.id for p in matches]
+
+def make_provisions(n, seed=7):
+    rng = random.Random(seed)
+    provisions = []
+    for i in range(n):
+        metadata = {"confidence": round(rng.random(), 2)} if rng.random() > 0.2 else {}
+        provisions.append(Provision(
+            id=f"P{i}",
+            regulation_id=rng.choice(["FAR", "DFARS", "GDPR"]),
+            title=f"Provision {i}",
+            text="",
+            jurisdiction=rng.choice(["US", "EU", "CA"]),
+            tags=rng.sample(["a", "b", "c", "d"], rng.randint(0, 2)),
+            roles_responsible=rng.sample(["ROLE_TP", "ROLE_KE"], rng.randint(0, 2)),
+            crosswalks=rng.sample(["GDPR", "HIPAA"], rng.randint(0, 1)),
+            metadata=metadata or None,
+        ))
+    return provisions
+
+@pytest.mark.parametrize("filters", [
+    {},
+    {"regulation_id": "FAR"},
+    {"regulation_id": "FAR", "jurisdiction": "US"},
+    {"tag": "a", "role_id": "ROLE_KE"},
+    {"min_confidence": 0.5},
+    {"min_confidence": 0.95, "regulation_id": "DFARS"},
+    {"min_confidence": 0.1, "tag": "b", "compliance_tag": "GDPR"},
+    {"regulation_id": "UNKNOWN"},
+    {"min_confidence": 1.5},
+])
+def test_index_matches_linear_scan(filters):
+    provisions = make_provisions(500)
+    index = ProvisionIndex.build(provisions)
+    expected = linear_query(provisions, **filters)
+    result = index.query(**filters)
+    if not filters:
+        assert result is None
+    else:
+        assert result == expected
+
+def test_index_update_and_remove():
+    provisions = make_provisions(50)
+    index = ProvisionIndex.build(provisions)
+    changed = provisions[3].model_copy(update={"regulation_id": "NEW", "metadata": {"confidence": 0.99}})
+    index.update(changed)
+    assert index.query(regulation_id="NEW") == ["P3"]
+    assert "P3" in index.query(min_confidence=0.99)
+    index.remove("P3")
+    assert index.query(regulation_id="NEW") == []
+    assert "P3" not in index
+
+def test_kgm_query_uses_linked_role_ids():
+    kgm = KnowledgeGraphManager(
+        "backend/app/data/pillars.yaml",
+        "backend/app/data/nodes.yaml",
+        "backend/app/data/roles.yaml",
+        "backend/app/data/experts.yaml",
+    )
+    ids = [p.id for p in kgm.query_provisions(role_id="ROLE_KE")]
+    assert ids == ["USID:PL16:0002"]
+    assert [p.id for p in kgm.query_provisions(min_confidence=0.95)] == ["USID:PL16:0001"]
+    assert len(kgm.query_provisions()) == len(kgm.provisions)
@@ -0,0 +1,78 @@
+import pickle
+from backend.app.kg_manager import KnowledgeGraphManager
+from backend.app.models import Provision
+from backend.app.provision_store import COMPACT_MIN_DEAD, ColumnarProvisionStore
+
+def make_kgm(storage_backend, **kwargs):
+    return KnowledgeGraphManager(
+        "backend/app/data/pillars.yaml",
+        "backend/app/data/nodes.yaml",
+        "backend/app/data/roles.yaml",
+        "backend/app/data/experts.yaml",
+        regulation_hierarchy_path="backend/app/data/regulations.yaml",
+        storage_backend=storage_backend,
+        **kwargs
+    )
+
+def test_columnar_backend_matches_dict_backend():
+    plain = make_kgm("dict")
+    columnar = make_kgm("columnar")
+    assert isinstance(columnar.provisions, ColumnarProvisionStore)
+    assert list(columnar.provisions) == list(plain.provisions)
+    for pid, provision in plain.provisions.items():
+        assert columnar.get_provision_by_id(pid).model_dump() == provision.model_dump()
+    assert [p.id for p in columnar.query_provisions(role_id="ROLE_KE")] == [p.id for p in plain.query_provisions(role_id="ROLE_KE")]
+    assert [p.id for p in columnar.query_provisions(regulation_id="FAR")] == [p.id for p in plain.query_provisions(regulation_id="FAR")]
+
+def test_update_delete_and_field_access():
+    store = ColumnarProvisionStore()
+    p = Provision(id="P1", regulation_id="R", title="T", text="body", jurisdiction="US", tags=["a", "b"],
+                  hierarchy_level=2, metadata={"confidence": 0.9, "compliance": ["GDPR"], "nested": {"k": 1}})
+    store["P1"] = p
+    assert store["P1"] == p
+    assert store.field_value("P1", "tags") == ["a", "b"]
+    assert store.field_value("P1", "hierarchy_level") == 2
+
+    # Returned models are copies; changes are stored by assigning back
+    copy = store["P1"]
+    copy.tags.append("c")
+    copy.metadata["compliance"].append("HIPAA")
+    assert store["P1"].tags == ["a", "b"]
+    store["P1"] = copy
+    assert store["P1"].tags == ["a", "b", "c"]
+    assert store["P1"].metadata["compliance"] == ["GDPR", "HIPAA"]
+    assert len(store) == 1
+
+    store["P2"] = Provision(id="P2", regulation_id="R", title="T2", text="", jurisdiction="US")
+    del store["P1"]
+    assert list(store) == ["P2"] and "P1" not in store
+    assert store["P2"].metadata is None and store["P2"].hierarchy_level is None
+
+def test_repeated_updates_do_not_grow_the_columns():
+    store, expected = ColumnarProvisionStore(), {}
+    def put(pid, tags):
+        store[pid] = expected[pid] = Provision(id=pid, regulation_id="R", title="T", text="", jurisdiction="US", tags=tags)
+    for i in range(50):
+        put(f"P{i}", ["a", "b"])
+    for n in range(200):
+        # Alternately longer (appended) and shorter (in place) than the current run
+        tags = [f"tag{n}_{j}" for j in range(1 + n % 7)]
+        for i in range(0, 50, 3):
+            put(f"P{i}", tags)
+        # Deleted rows are reused by new ids
+        if n:
+            del store[f"Q{n - 1}"], expected[f"Q{n - 1}"]
+        put(f"Q{n}", ["x"] * 5)
+    assert len(store._ids) == 51 and dict(store.items()) == expected
+    assert len(store._list_values["tags"]) <= 2 * COMPACT_MIN_DEAD + 51 * 7
+
+def test_store_pickles_and_snapshot_converts_backends(tmp_path):
+    columnar = make_kgm("columnar")
+    restored = pickle.loads(pickle.dumps(columnar.provisions))
+    assert dict(restored.items()) == dict(columnar.provisions.items())
+
+    snapshot = str(tmp_path / "kg.bin")
+    make_kgm("dict", snapshot_path=snapshot)
+    from_snapshot = make_kgm("columnar", snapshot_path=snapshot)
+    assert isinstance(from_snapshot.provisions, ColumnarProvisionStore)
+    assert dict(from_snapshot.provisions.items()) == dict(columnar.provisions.items())
@@ -0,0 +1,108 @@
+import asyncio
+import time
+from backend.app.quad_persona.llm_client import AsyncLLMClient, set_async_llm_client
+from backend.app.quad_persona.pipeline import run_quad_persona_pipeline
+from backend.app.tests.conftest import default_responder
+
+def run_with_client(server, coro_factory, **client_kwargs):
+    async def runner():
+        client = AsyncLLMClient(base_url=server.base_url, api_key="test", max_retries=0, **client_kwargs)
+        set_async_llm_client(client)
+        try:
+            return await coro_factory()
+        finally:
+            set_async_llm_client(None)
+            await client.aclose()
+    return asyncio.run(runner())
+
+def test_pipeline_against_mock_endpoint(mock_llm_server):
+    trace = run_with_client(mock_llm_server, lambda: run_quad_persona_pipeline("What applies to drones?"))
+    names = [s.step_id.split("_")[0] for s in trace.steps]
+    assert names == ["planner", "ks", "ce", "synth"]
+    assert trace.final_response_summary == "Synthesized answer."
+    assert trace.errors_encountered == []
+    assert len(mock_llm_server.requests) == 4
+    assert all(r["model"] == "gpt-4.1" for r in mock_llm_server.requests)
+
+def test_many_concurrent_pipelines_share_the_client(mock_llm_server):
+    mock_llm_server.delay = 0.05
+    async def many():
+        return await asyncio.gather(*(run_quad_persona_pipeline(f"query {i}") for i in range(100)))
+    start = time.perf_counter()
+    traces = run_with_client(mock_llm_server, many, max_concurrency=200)
+    elapsed = time.perf_counter() - start
+    assert all(t.final_response_summary == "Synthesized answer." for t in traces)
+    assert len(mock_llm_server.requests) == 400
+    # 400 calls x 50 ms would take 20 s sequentially
+    assert elapsed < 5
+
+def test_per_call_timeout_produces_error_output(mock_llm_server):
+    mock_llm_server.delay = 1.0
+    start = time.perf_counter()
+    trace = run_with_client(mock_llm_server, lambda: run_quad_persona_pipeline("slow"), timeout=0.1)
+    assert time.perf_counter() - start < 1.0 + 0.5 # planner call times out, no plan -> synthesizer call times out
+    assert trace.steps[0].output_generated.startswith("Error: Could not get response from LLM.")
+    assert trace.steps[0].status == "error_parsing_plan"
+
+PARALLEL_PLAN = {
+    "reasoning_sequence": [
+        {"parallel": [
+            {"archetype": "KnowledgeExpert", "focus": "Define the key terms."},
+            {"archetype": "SectorExpert", "focus": "Describe the sector context."},
+            {"archetype": "RegulatoryExpert", "focus": "Identify the governing rules."},
+            {"archetype": "ComplianceExpert", "focus": "List the compliance obligations."},
+        ]}
+    ],
+    "overall_strategy_rationale": "All four analyses are independent."
+}
+
+def test_normalize_plan_groups():
+    from backend.app.quad_persona.pipeline import normalize_plan_groups
+    a, b, c = {"archetype": "A"}, {"archetype": "B"}, {"archetype": "C"}
+    assert normalize_plan_groups([a, {"parallel": [b, c]}, [a], "junk", {"parallel": []}]) == [[a], [b, c], [a]]
+    assert normalize_plan_groups(None) == []
+
+def test_parallel_group_runs_concurrently_and_merges_in_plan_order(mock_llm_server):
+    import json
+    mock_llm_server.delay = 0.3
+    mock_llm_server.responder = lambda body: (
+        json.dumps(PARALLEL_PLAN) if "strategic reasoning plan" in body["messages"][0]["content"]
+        else default_responder(body)
+    )
+    start = time.perf_counter()
+    trace = run_with_client(mock_llm_server, lambda: run_quad_persona_pipeline("parallel please"))
+    elapsed = time.perf_counter() - start
+    names = [s.step_id.split("_")[0] for s in trace.steps]
+    assert names == ["planner", "ks", "se", "re", "ce", "synth"]
+    assert trace.errors_encountered == []
+    # planner + one parallel round + synthesizer, rather than 6 sequential calls
+    assert elapsed < 5 * 0.3
+    # every expert in the group saw the same history (planner output only); it is in the system message
+    expert_prompts = [r["messages"][0]["content"] for r in mock_llm_server.requests[1:5]]
+    assert all("Analysis from" not in p for p in expert_prompts)
+    assert all("Planner (" in p and "All four analyses are independent." in p for p in expert_prompts)
+    synth_prompt = mock_llm_server.requests[-1]["messages"][1]["content"]
+    positions = [synth_prompt.index(f"({s.persona_profile_id}) Output") for s in trace.steps[1:5]]
+    assert positions == sorted(positions)
+
+def test_streamed_events_arrive_in_order_with_synthesizer_tokens(mock_llm_server):
+    from backend.app.quad_persona.pipeline import iter_quad_persona_events
+    mock_llm_server.responder = lambda body: (
+        "Synthesized answer across all experts." if "synthesize the information" in body["messages"][0]["content"]
+        else default_responder(body)
+    )
+    async def collect():
+        return [event async for event in iter_quad_persona_events("Stream it", stream_tokens=True)]
+    events = run_with_client(mock_llm_server, collect)
+    kinds = [e["event"] for e in events]
+    assert kinds[0] == "task_start" and kinds[-1] == "trace"
+    step_names = [e["step"].step_id.split("_")[0] for e in events if e["event"] == "step"]
+    assert step_names == ["planner", "ks", "ce", "synth"]
+    tokens = [e["delta"] for e in events if e["event"] == "token"]
+    assert len(tokens) > 1
+    assert "".join(tokens) == "Synthesized answer across all experts."
+    # tokens precede the completed synthesizer step
+    assert kinds.index("token") < len(kinds) - 2 and kinds[-2] == "step"
+    trace = events[-1]["trace"]
+    assert trace.final_response_summary == "Synthesized answer across all experts."
+    assert mock_llm_server.requests[-1]["stream"] is True
@@ -0,0 +1,174 @@
+import asyncio
+import sqlite3
+import time
+from backend.app.quad_persona.pipeline import run_quad_persona_pipeline
+from backend.app.quad_persona.schema.data_models import ReasoningStep
+from backend.app.reasoning_jobs import ReasoningJobQueue
+from backend.app.tests.conftest import default_responder
+from backend.app.tests.test_quad_persona_pipeline import run_with_client
+
+def wait_for_status(queue, job_id, statuses, timeout=10.0):
+    async def poll():
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            job = queue.get(job_id)
+            if job["status"] in statuses:
+                return job
+            await asyncio.sleep(0.02)
+        raise AssertionError(f"job {job_id} still {queue.get(job_id)['status']}")
+    return poll()
+
+def slow_first_compliance_call(server, delay=0.5):
+    calls = []
+    def responder(body):
+        if "compliance and risk management" in body["messages"][0]["content"] and not calls:
+            calls.append(body)
+            time.sleep(delay)
+        return default_responder(body)
+    server.responder = responder
+
+def test_job_runs_pipeline_and_stores_steps(mock_llm_server, tmp_path):
+    traces = []
+    async def scenario():
+        queue = ReasoningJobQueue(str(tmp_path / "jobs.sqlite3"), workers=2, trace_sink=traces.append)
+        await queue.start()
+        submitted = queue.submit("What applies to drones?")
+        assert submitted["status"] == "queued" and submitted["steps"] == []
+        job = await wait_for_status(queue, submitted["job_id"], ("completed", "failed"))
+        await queue.close()
+        return job
+    job = run_with_client(mock_llm_server, scenario)
+    assert job["status"] == "completed" and job["attempts"] == 0
+    assert [s["step_id"].split("_")[0] for s in job["steps"]] == ["planner", "ks", "ce", "synth"]
+    assert job["trace"]["task_id"] == job["job_id"] and job["trace"]["final_response_summary"] == "Synthesized answer."
+    assert "steps" not in job["trace"] and traces[0].task_id == job["job_id"] and len(traces[0].steps) == 4
+
+def test_llm_error_retries_with_backoff_and_resumes(mock_llm_server, tmp_path):
+    slow_first_compliance_call(mock_llm_server)
+    async def scenario():
+        queue = ReasoningJobQueue(str(tmp_path / "jobs.sqlite3"), workers=1, retry_backoff=0.2, poll_interval=0.05)
+        await queue.start()
+        submitted_at = time.time()
+        job_id = queue.submit("What applies to drones?")["job_id"]
+        retrying = await wait_for_status(queue, job_id, ("retrying",))
+        job = await wait_for_status(queue, job_id, ("completed", "failed"))
+        await queue.close()
+        return submitted_at, retrying, job
+    submitted_at, retrying, job = run_with_client(mock_llm_server, scenario, timeout=0.2)
+    assert retrying["steps_completed"] == 2 and "Could not get response" in retrying["last_error"]
+    assert retrying["next_attempt_at"] >= submitted_at + 0.2
+    assert job["status"] == "completed" and job["attempts"] == 1
+    # Planner and KnowledgeExpert were reused: the retry only called ComplianceExpert and the synthesizer
+    assert len(mock_llm_server.requests) == 5
+    assert [s["step_id"].split("_")[0] for s in job["steps"]] == ["planner", "ks", "ce", "synth"]
+    assert job["steps"][0] == retrying["steps"][0]
+
+def test_job_fails_after_max_attempts(mock_llm_server, tmp_path):
+    mock_llm_server.delay = 0.3
+    async def scenario():
+        queue = ReasoningJobQueue(str(tmp_path / "jobs.sqlite3"), workers=1, max_attempts=2, retry_backoff=0.01, poll_interval=0.05)
+        await queue.start()
+        job = await wait_for_status(queue, queue.submit("slow")["job_id"], ("completed", "failed"))
+        await queue.close()
+        return job
+    job = run_with_client(mock_llm_server, scenario, timeout=0.1)
+    assert job["status"] == "failed" and job["attempts"] == 2 and job["steps"] == [] and job["trace"] is None
+
+def test_interrupted_job_resumes_after_restart(mock_llm_server, llm_cache, tmp_path):
+    db_path = str(tmp_path / "jobs.sqlite3")
+    async def scenario():
+        planner_step = (await run_quad_persona_pipeline("What applies to drones?")).steps[0]
+        # Count the resumed run's LLM calls only (its expert prompts would be cache hits otherwise)
+        mock_llm_server.requests.clear()
+        llm_cache.clear()
+        # A process that stopped after storing the planner step
+        crashed = ReasoningJobQueue(db_path)
+        job_id = crashed.submit("What applies to drones?")["job_id"]
+        crashed._claim()
+        crashed._store_step(job_id, 0, planner_step)
+        assert crashed.get(job_id)["status"] == "running"
+        await crashed.close()
+
+        queue = ReasoningJobQueue(db_path, workers=1)
+        await queue.start()
+        job = await wait_for_status(queue, job_id, ("completed", "failed"))
+        await queue.close()
+        return planner_step, job
+    planner_step, job = run_with_client(mock_llm_server, scenario)
+    assert job["status"] == "completed" and job["steps"][0]["step_id"] == planner_step.step_id
+    assert len(mock_llm_server.requests) == 3
+
+def test_cancel_queued_and_running_jobs(mock_llm_server, tmp_path):
+    mock_llm_server.delay = 0.2
+    async def scenario():
+        queue = ReasoningJobQueue(str(tmp_path / "jobs.sqlite3"), workers=1)
+        queued = queue.submit("never runs")["job_id"]
+        assert queue.cancel(queued)["status"] == "cancelled"
+        await queue.start()
+        running = queue.submit("stopped mid-run")["job_id"]
+        await wait_for_status(queue, running, ("running",))
+        await asyncio.sleep(0.3) # planner done, first expert in flight
+        queue.cancel(running)
+        await asyncio.sleep(0.5)
+        jobs = queue.get(queued), queue.get(running)
+        assert queue.cancel("missing") is None
+        await queue.close()
+        return jobs
+    queued, running = run_with_client(mock_llm_server, scenario)
+    assert queued["status"] == "cancelled" and queued["started_at"] is None
+    assert running["status"] == "cancelled" and running["steps_completed"] == 1
+    assert len(mock_llm_server.requests) == 2
+
+def test_shared_database_claims_once_and_requeues_only_expired_leases(tmp_path):
+    db_path = str(tmp_path / "jobs.sqlite3")
+    async def scenario():
+        first = ReasoningJobQueue(db_path, lease_seconds=0.2)
+        second = ReasoningJobQueue(db_path)
+        job_id = first.submit("claimed once")["job_id"]
+        assert first._claim()["owner"] == first.owner
+        # A live lease is neither claimable nor requeued by another process
+        assert second._claim() is None and second.get(job_id)["status"] == "running"
+        step = ReasoningStep(step_id="planner_1", persona_profile_id="p", persona_display_name="Planner", output_generated="plan")
+        assert not second._store_step(job_id, 0, step) and first._store_step(job_id, 0, step)
+        await asyncio.sleep(0.3) # the first process stopped renewing its lease
+        taken = second._claim()
+        assert taken["job_id"] == job_id and taken["owner"] == second.owner
+        assert not first._renew_lease(job_id) and not first._store_step(job_id, 1, step)
+        assert second.get(job_id)["steps_completed"] == 1
+        await first.close()
+        assert second.get(job_id)["status"] == "running" # first no longer owned it, so close() left it alone
+        await second.close()
+        reopened = ReasoningJobQueue(db_path)
+        job = reopened.get(job_id)
+        await reopened.close()
+        return job
+    job = asyncio.run(scenario())
+    assert job["status"] == "queued" and job["owner"] is None
+
+def test_two_queues_on_one_database_run_each_job_once(mock_llm_server, tmp_path):
+    db_path = str(tmp_path / "jobs.sqlite3")
+    async def scenario():
+        queues = [ReasoningJobQueue(db_path, workers=2, poll_interval=0.02) for _ in range(2)]
+        job_ids = [queues[i % 2].submit(f"Question {i}?")["job_id"] for i in range(6)]
+        for queue in queues:
+            await queue.start()
+        jobs = [await wait_for_status(queues[0], job_id, ("completed", "failed")) for job_id in job_ids]
+        for queue in queues:
+            await queue.close()
+        return jobs
+    jobs = run_with_client(mock_llm_server, scenario)
+    assert all(job["status"] == "completed" and job["steps_completed"] == 4 for job in jobs)
+    assert len({job["owner"] for job in jobs}) <= 2
+    assert len(mock_llm_server.requests) == 4 * len(jobs)
+
+def test_database_without_lease_columns_is_migrated(tmp_path):
+    db_path = str(tmp_path / "jobs.sqlite3")
+    with sqlite3.connect(db_path) as db:
+        db.execute("CREATE TABLE reasoning_jobs (job_id TEXT PRIMARY KEY, query TEXT NOT NULL, provision_id TEXT, status TEXT NOT NULL, "
+                   "attempts INTEGER NOT NULL DEFAULT 0, next_attempt_at REAL NOT NULL DEFAULT 0, created_at REAL NOT NULL, "
+                   "started_at REAL, finished_at REAL, last_error TEXT, trace TEXT)")
+        db.execute("INSERT INTO reasoning_jobs (job_id, query, status, created_at) VALUES ('task_old', 'q', 'running', 0)")
+    queue = ReasoningJobQueue(db_path)
+    # Left running by a release without leases: treated as expired
+    assert queue._claim()["owner"] == queue.owner
+    asyncio.run(queue.close())
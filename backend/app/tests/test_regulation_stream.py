@@ -0,0 +1,68 @@
+import yaml
+from backend.app.models import Regulation, Provision
+from backend.app.regulation_stream import iter_regulation_hierarchy, CHILD_KEYS, _make_mapping_node
+from backend.app.kg_manager import KnowledgeGraphManager
+
+REGULATIONS_PATH = "backend/app/data/regulations.yaml"
+
+def reference_walk():
+    # Full-document walk used as the oracle for the streaming loader
+    data = yaml.safe_load(open(REGULATIONS_PATH))["4D_Database_Solution"]
+    expected = {}
+    def element_id(e):
+        return next(str(v) for k, v in e.items() if k.endswith("ID") and k != "UnifiedID" and v)
+    def walk(items, reg_id, parent_id, level):
+        for e in items if isinstance(items, list) else [items]:
+            eid = element_id(e)
+            expected[eid] = (reg_id, parent_id, level)
+            for key in CHILD_KEYS:
+                if key in e:
+                    walk(e[key], reg_id, eid, level + 1)
+    for pillar in data["Pillars"]:
+        for key in CHILD_KEYS:
+            if key in pillar:
+                walk(pillar[key], pillar["UnifiedID"], None, 1)
+    return [p["UnifiedID"] for p in data["Pillars"]], expected
+
+def test_stream_matches_full_parse():
+    regulation_ids, expected = reference_walk()
+    items = list(iter_regulation_hierarchy(REGULATIONS_PATH))
+    regulations = [i for i in items if isinstance(i, Regulation)]
+    provisions = [i for i in items if isinstance(i, Provision)]
+    assert [r.id for r in regulations] == regulation_ids
+    assert {p.id: (p.regulation_id, p.parent_id, p.hierarchy_level) for p in provisions} == expected
+
+def test_stream_yields_parents_first():
+    seen = set()
+    for item in iter_regulation_hierarchy(REGULATIONS_PATH):
+        if isinstance(item, Regulation):
+            seen.add(("reg", item.id))
+            continue
+        assert ("reg", item.regulation_id) in seen
+        if item.parent_id:
+            assert item.parent_id in seen
+        seen.add(item.id)
+
+def test_leaf_fields_are_kept():
+    node = next(i for i in iter_regulation_hierarchy(REGULATIONS_PATH) if isinstance(i, Provision) and i.id == "FAR-Part-1.1.1.1.1")
+    assert node.title == "Purpose of the FAR System"
+    assert node.metadata["RegulatoryReference"] == "FAR 1.101(a)"
+    assert node.metadata["Roles"][0]["RoleName"] == "Policy Analyst"
+
+def test_kgm_loads_hierarchy():
+    kgm = KnowledgeGraphManager(
+        "backend/app/data/pillars.yaml",
+        "backend/app/data/nodes.yaml",
+        "backend/app/data/roles.yaml",
+        "backend/app/data/experts.yaml",
+        regulation_hierarchy_path=REGULATIONS_PATH,
+    )
+    far = kgm.get_regulation_by_id("FAR")
+    assert far is not None and far.provisions
+    assert all(kgm.get_provision_by_id(pid).regulation_id == "FAR" for pid in far.provisions)
+    assert [p.id for p in kgm.query_provisions(regulation_id="PL16")] == ["USID:PL16:0001", "USID:PL16:0002"]
+
+def test_spiderweb_weight_defaults_only_when_missing():
+    fields = {"NodeID": "SW1", "Source": "A", "Target": "B"}
+    assert _make_mapping_node("SpiderWeb_Nodes", fields).weight == 1.0
+    assert _make_mapping_node("SpiderWeb_Nodes", dict(fields, Weight=0)).weight == 0.0
@@ -0,0 +1,117 @@
+import math
+import random
+import pytest
+from backend.app.kg_manager import KnowledgeGraphManager
+from backend.app.models import Provision, Regulation
+from backend.app.search_index import SearchIndex, parse_query, tokenize
+
+WORDS = "contract contractor subcontract award bid small business cyber security incident report cost price audit".split()
+
+def provision(pid, title, text, reg="FAR"):
+    return Provision(id=pid, regulation_id=reg, title=title, text=text, jurisdiction="US")
+
+def synthetic(seed=4, n=120):
+    rng = random.Random(seed)
+    return [provision(f"P{i}", " ".join(rng.choices(WORDS, k=3)), " ".join(rng.choices(WORDS + ["the", "of"], k=rng.randint(5, 30))),
+                      reg=rng.choice(["FAR", "DFARS"])) for i in range(n)]
+
+def reference_bm25(docs, terms, k1=1.2, b=0.75, title_weight=2.0):
+    """Plain BM25 over (title, text) pairs, title tokens counted title_weight times."""
+    tfs = {}
+    for pid, title, text in docs:
+        counts = {}
+        for _, token in tokenize(title):
+            counts[token] = counts.get(token, 0) + title_weight
+        for _, token in tokenize(text):
+            counts[token] = counts.get(token, 0) + 1
+        tfs[pid] = counts
+    lengths = {pid: int(sum(c.values())) for pid, c in tfs.items()}
+    average = sum(lengths.values()) / len(lengths)
+    scores = {}
+    for term in set(terms):
+        df = sum(term in c for c in tfs.values())
+        idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+        for pid, counts in tfs.items():
+            tf = counts.get(term, 0)
+            if tf:
+                scores[pid] = scores.get(pid, 0.0) + idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * lengths[pid] / average))
+    return scores
+
+def test_parse_query_terms_prefixes_and_phrases():
+    terms, prefixes, phrases = parse_query('cyber subcontract* "terms of the contract" FAR-52.204')
+    assert terms == ["cyber", "terms", "contract", "far", "52.204"]
+    assert prefixes == ["subcontract"]
+    assert phrases == [[(0, "terms"), (3, "contract")]]
+
+def test_bm25_ranking_matches_reference():
+    provisions = synthetic()
+    index = SearchIndex.build(provisions)
+    docs = [(p.id, p.title, p.text) for p in provisions]
+    expected = reference_bm25(docs, ["cyber", "incident"])
+    result = index.search("cyber incident", limit=len(provisions))
+    assert result["total"] == len(expected)
+    assert {hit["id"]: hit["score"] for hit in result["results"]} == pytest.approx(expected)
+    scores = [hit["score"] for hit in result["results"]]
+    assert scores == sorted(scores, reverse=True)
+    # Paging walks the same ranking
+    page = index.search("cyber incident", limit=5, offset=5)["results"]
+    assert [hit["id"] for hit in page] == [hit["id"] for hit in result["results"][5:10]]
+
+def test_prefix_phrase_and_filters():
+    index = SearchIndex.build(
+        [provision("A", "Subcontract reporting", "The contractor shall report the award."),
+         provision("B", "Award fees", "Report of the award to the contracting officer.", reg="DFARS"),
+         provision("C", "Cyber incident", "Rapidly report a cyber incident within 72 hours.", reg="DFARS")],
+        [Regulation(id="DFARS", title="Defense supplement", description="Defense contract award rules", jurisdiction="US", pillar="P1")],
+    )
+    assert {hit["id"] for hit in index.search("subcontract*")["results"]} == {"A"}
+    assert {hit["id"] for hit in index.search("contract*")["results"]} == {"A", "B", "DFARS"}
+    assert [hit["id"] for hit in index.search('"report a cyber incident"')["results"]] == ["C"]
+    # Stopword gaps count: "report of the award" is not "report the award"
+    assert [hit["id"] for hit in index.search('"report of the award"')["results"]] == ["B"]
+    assert index.search('"cyber reporting"')["total"] == 0
+    assert {hit["id"] for hit in index.search("award", regulation_id="DFARS")["results"]} == {"B", "DFARS"}
+    assert [hit["kind"] for hit in index.search("award", kinds=["regulation"])["results"]] == ["regulation"]
+    with pytest.raises(ValueError):
+        index.search("award", kinds=["section"])
+
+def test_incremental_updates_match_fresh_build():
+    provisions = synthetic()
+    index = SearchIndex.build(provisions[:80])
+    index.search('"small business"')  # cache position keys so the updates below patch them
+    for p in provisions[80:]:
+        index.add_provision(p)
+    changed = [provision(p.id, "cyber audit", p.text + " cyber", reg=p.regulation_id) for p in provisions[:10]]
+    for p in changed:
+        index.update_provision(p)
+    for p in provisions[10:20]:
+        index.remove("provision", p.id)
+    index.add_provision(provision("NEW", "zeta quasar", "zeta"))
+    current = changed + provisions[20:] + [provision("NEW", "zeta quasar", "zeta")]
+    fresh = SearchIndex.build(current)
+    assert index.vocabulary == fresh.vocabulary and len(index) == len(fresh)
+    for query in ["cyber", "audit* contract", '"small business"', "zeta"]:
+        got = {hit["id"]: hit["score"] for hit in index.search(query, limit=500)["results"]}
+        assert got == pytest.approx({hit["id"]: hit["score"] for hit in fresh.search(query, limit=500)["results"]}), query
+    assert ("provision", "P10") not in index and ("provision", "NEW") in index
+
+def test_kgm_search_and_update_provision():
+    kgm = KnowledgeGraphManager(
+        "backend/app/data/pillars.yaml",
+        "backend/app/data/nodes.yaml",
+        "backend/app/data/roles.yaml",
+        "backend/app/data/experts.yaml",
+        regulation_hierarchy_path="backend/app/data/regulations.yaml",
+    )
+    assert kgm.search("acquisition*")["total"] > 0
+    assert kgm.search("quasar")["total"] == 0
+    kgm.update_provision(provision("FAR.TEST", "Quasar clause", "Applies to quasar procurements.", reg="FAR"))
+    hits = kgm.search("quasar")["results"]
+    assert [hit["id"] for hit in hits] == ["FAR.TEST"]
+    assert kgm.query_provisions(regulation_id="FAR")[-1].id == "FAR.TEST"
+    assert kgm.compliance_gap("FAR")["expected"] > 0
+    restricted = provision("FAR.TEST", "Quasar clause", "Applies to quasar procurements.", reg="FAR")
+    restricted.crosswalks = ["HIPAA"]
+    kgm.update_provision(restricted)
+    assert kgm.search("quasar", user_compliance_tags=["GDPR"])["total"] == 0
+    assert kgm.search("quasar", user_compliance_tags=["HIPAA"])["total"] == 1
@@ -0,0 +1,126 @@
+import json
+import os
+import time
+import pytest
+from backend.app import simulation_jobs as jobs_module
+from backend.app.kg_manager import KnowledgeGraphManager
+from backend.app.simulation_jobs import SimulationJobManager, provision_to_node
+
+@pytest.fixture(scope="module")
+def kgm():
+    return KnowledgeGraphManager(
+        "backend/app/data/pillars.yaml",
+        "backend/app/data/nodes.yaml",
+        "backend/app/data/roles.yaml",
+        "backend/app/data/experts.yaml",
+        regulation_hierarchy_path="backend/app/data/regulations.yaml",
+    )
+
+def test_provision_to_node_adapter(kgm):
+    provision = kgm.query_provisions(regulation_id="FAR")[0]
+    node = provision_to_node(provision, kgm.get_regulation_by_id("FAR"))
+    assert node.node_id == provision.id and node.pillar_id == "FAR"
+    assert node.axes.axis1 == kgm.get_regulation_by_id("FAR").pillar and node.axes.axis9 == 1.0
+    assert kgm.get_node_by_id(provision.id).label == provision.title
+
+def test_bulk_job_over_a_regulation(kgm):
+    manager = SimulationJobManager(kgm, max_workers=4)
+    expected = [p.id for p in kgm.query_provisions(regulation_id="FAR")]
+    job = manager.submit(manager.select_provisions(regulation_id="FAR"), confidence_goal=0.995)
+    streamed = list(manager.iter_results(job.job_id, timeout=30))
+    assert manager.wait(job.job_id, timeout=30)
+    progress = job.progress()
+    assert progress["status"] == "completed" and progress["completed"] == progress["total"] == len(expected)
+    assert progress["errors"] == 0 and progress["provisions_per_second"] > 0
+    assert sorted(r["provision_id"] for r in streamed) == sorted(expected)
+    # Regulations count as pillars, so taxonomy_integrity passes for every provision
+    assert all(r["confidence"] <= 1.0 and r["passes"] >= 1 for r in streamed)
+    assert manager.results(job.job_id, offset=1, limit=2) == streamed[1:3]
+    with pytest.raises(ValueError):
+        manager.select_provisions()
+    manager.close()
+
+def test_checkpoint_resume_skips_finished_provisions(kgm, tmp_path, monkeypatch):
+    ids = [p.id for p in kgm.query_provisions(regulation_id="FAR")][:6]
+    done = [{"provision_id": pid, "status": "ok", "confidence": 0.5} for pid in ids[:4]]
+    (tmp_path / "simjob_crashed.json").write_text(json.dumps({
+        "job_id": "simjob_crashed", "provision_ids": ids, "confidence_goal": 0.995, "request": {},
+        "status": "running", "results": done, "created_at": time.time()}))
+    simulated = []
+    real = jobs_module.simulate_full_expert_reasoning
+    monkeypatch.setattr(jobs_module, "simulate_full_expert_reasoning",
+                        lambda node, context, confidence_goal: simulated.append(node.node_id) or real(node, context, confidence_goal))
+    manager = SimulationJobManager(kgm, max_workers=2, checkpoint_dir=str(tmp_path), checkpoint_every=1)
+    manager.start()
+    assert manager.wait("simjob_crashed", timeout=30)
+    assert sorted(simulated) == sorted(ids[4:])
+    job = manager.get("simjob_crashed")
+    assert job.status == "completed" and [r["provision_id"] for r in job.results][:4] == ids[:4]
+    saved = json.loads((tmp_path / "simjob_crashed.json").read_text())
+    assert saved["status"] == "completed" and len(saved["results"]) == 6
+    manager.close()
+
+def test_cancel_skips_pending_provisions(kgm, monkeypatch):
+    real = jobs_module.simulate_full_expert_reasoning
+    monkeypatch.setattr(jobs_module, "simulate_full_expert_reasoning",
+                        lambda node, context, confidence_goal: time.sleep(0.05) or real(node, context, confidence_goal))
+    manager = SimulationJobManager(kgm, max_workers=1)
+    job = manager.submit([p.id for p in kgm.query_provisions(regulation_id="FAR")])
+    time.sleep(0.08)
+    manager.cancel(job.job_id)
+    time.sleep(0.1)
+    assert job.status == "cancelled" and 0 < len(job.results) < len(job.provision_ids)
+    assert list(manager.iter_results(job.job_id)) == job.results
+    manager.close()
+
+class FakeMsvcrt:
+    """msvcrt.locking semantics (an exclusive byte lock that fails at once when held), to run the Windows path here."""
+    LK_UNLCK, LK_NBLCK = 0, 2
+
+    def __init__(self):
+        self.held = set()
+
+    def locking(self, fd, mode, nbytes):
+        key = os.fstat(fd).st_ino
+        if mode == self.LK_UNLCK:
+            self.held.remove(key)
+        elif key in self.held:
+            raise PermissionError(13, "Permission denied")
+        else:
+            self.held.add(key)
+
+@pytest.mark.parametrize("lock_module", ["fcntl", "msvcrt"])
+def test_checkpoint_is_resumed_by_one_manager_only(kgm, tmp_path, monkeypatch, lock_module):
+    if lock_module == "msvcrt":
+        fake = FakeMsvcrt()
+        monkeypatch.setattr(jobs_module, "fcntl", None)
+        monkeypatch.setattr(jobs_module, "msvcrt", fake)
+    ids = [p.id for p in kgm.query_provisions(regulation_id="FAR")][:6]
+    (tmp_path / "simjob_crashed.json").write_text(json.dumps({
+        "job_id": "simjob_crashed", "provision_ids": ids, "confidence_goal": 0.995, "request": {},
+        "status": "running", "results": [], "created_at": time.time()}))
+    simulated = []
+    real = jobs_module.simulate_full_expert_reasoning
+    monkeypatch.setattr(jobs_module, "simulate_full_expert_reasoning",
+                        lambda node, context, confidence_goal: time.sleep(0.05) or simulated.append(node.node_id) or real(node, context, confidence_goal))
+    first = SimulationJobManager(kgm, max_workers=1, checkpoint_dir=str(tmp_path), checkpoint_every=1)
+    assert first.get("simjob_crashed") is None # nothing resumes before start()
+    first.start()
+    # A second worker process sharing the directory leaves the held checkpoint alone
+    second = SimulationJobManager(kgm, max_workers=1, checkpoint_dir=str(tmp_path), checkpoint_every=1)
+    second.start()
+    assert second.get("simjob_crashed") is None
+    time.sleep(0.12)
+    first.close() # shutdown mid-job hands the checkpoint back
+    third = SimulationJobManager(kgm, max_workers=2, checkpoint_dir=str(tmp_path), checkpoint_every=1)
+    third.start()
+    assert third.wait("simjob_crashed", timeout=30)
+    time.sleep(0.1) # the provision first was running when it closed has finished by now
+    saved = json.loads((tmp_path / "simjob_crashed.json").read_text())
+    assert saved["status"] == "completed" and sorted(r["provision_id"] for r in saved["results"]) == sorted(ids)
+    assert not os.path.exists(tmp_path / "simjob_crashed.json.lock")
+    assert len(simulated) <= len(ids) + 1
+    second.close()
+    third.close()
+    if lock_module == "msvcrt":
+        assert fake.held == set()
@@ -0,0 +1,75 @@
+import time
+import tracemalloc
+from backend.app.simulation import knowledge_algorithms
+from backend.app.simulation.beam_search import beam_tree_of_thought_refinement
+from backend.app.simulation.tree_of_thought import tree_of_thought_refinement
+from backend.app.tests.conftest import Context, Node, mock_llm
+
+def test_iterative_refinement_records_history_once_and_handles_deep_runs(monkeypatch):
+    monkeypatch.setitem(knowledge_algorithms.KNOWLEDGE_ALGORITHMS, "gpt_4_1_expert_reasoning", mock_llm())
+    node, history = tree_of_thought_refinement(Node(["Knowledge Expert", "LLM Expert"]), Context(), max_depth=3)
+    assert [h["depth"] for h in history] == [0, 1, 2, 3]
+    assert node.metadata["refinement_history"] == history
+    # Far deeper than the recursion limit, with memory linear in the number of passes
+    tracemalloc.start()
+    node, history = tree_of_thought_refinement(Node(["Regulatory Expert"], tags=["SOX"]), Context(), max_depth=3000)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(history) == 3001 and len(node.metadata["refinement_history"]) == 3001
+    assert peak < 5_000_000
+    # Stops as soon as the goal is met
+    node, history = tree_of_thought_refinement(Node(["Knowledge Expert"]), Context(), max_depth=10)
+    assert len(history) == 1 and node.axes.axis9 == 1.0
+
+def test_beam_keeps_the_strongest_paths(monkeypatch):
+    monkeypatch.setitem(knowledge_algorithms.KNOWLEDGE_ALGORITHMS, "gpt_4_1_expert_reasoning", mock_llm())
+    roles = ["Regulatory Expert", "LLM Expert", "Knowledge Expert"]
+    # Compliance fails (SOX); the beam follows the Knowledge and LLM experts
+    node, history = beam_tree_of_thought_refinement(Node(roles, tags=["SOX"]), Context(), beam_width=2, max_depth=2,
+                                                    confidence_goal=1.01)
+    assert len(history) == 3
+    for entry in history:
+        assert len(entry["candidates"]) <= 2 * len(roles)
+        assert sum(c["kept"] for c in entry["candidates"]) == 2
+        kept = [c for c in entry["candidates"] if c["kept"]]
+        assert all("Regulatory Expert" not in c["path"] for c in kept)
+    assert history[0]["candidates"][0]["path"] == ["Knowledge Expert"]
+    # Candidates are scored by their latest pass, so a deeper path can score above its parent
+    assert [c["confidence"] for c in history[1]["candidates"] if c["kept"]] == [1.0, 0.97]
+    assert history[-1]["candidates"][0]["path"] == ["Knowledge Expert", "LLM Expert", "Knowledge Expert"]
+    assert node.axes.axis9 == 1.0 == history[-1]["candidates"][0]["confidence"]
+    assert node.metadata["refinement_history"] == history
+    # A deterministic role is never consulted twice in a row
+    assert all(c["path"][-2:] != ["Knowledge Expert"] * 2 for h in history for c in h["candidates"])
+
+    node, history = beam_tree_of_thought_refinement(Node(roles, tags=["SOX"]), Context(), beam_width=2, confidence_goal=0.99)
+    assert len(history) == 1 and node.axes.axis9 == 1.0
+
+def test_beam_children_see_their_own_parent_confidence(monkeypatch):
+    seen = []
+    def reasoning(node, context, prompt_template=None):
+        seen.append(node.axes.axis9)
+        time.sleep(0.05) # all children of a depth are in flight together
+        return {"validation": round(node.axes.axis9 - 0.1, 2), "explanation": "One notch below what it was shown"}
+    monkeypatch.setitem(knowledge_algorithms.KNOWLEDGE_ALGORITHMS, "gpt_4_1_expert_reasoning", reasoning)
+    node = Node(["LLM Expert", "Knowledge Expert"])
+    node.axes.axis9 = 0.9
+    node, history = beam_tree_of_thought_refinement(node, Context(), beam_width=2, max_depth=2, confidence_goal=1.01)
+    assert seen[0] == 0.9
+    # Each LLM child was shown its own parent's confidence, not a sibling's
+    for previous, entry in zip(history, history[1:]):
+        parents = {tuple(c["path"]): c["confidence"] for c in previous["candidates"] if c["kept"]}
+        llm_children = [c for c in entry["candidates"] if c["path"][-1] == "LLM Expert"]
+        assert len(llm_children) == 2
+        assert len({parents[tuple(c["path"][:-1])] for c in llm_children}) == 2
+        for child in llm_children:
+            assert child["confidence"] == round(parents[tuple(child["path"][:-1])] - 0.1, 2)
+
+def test_beam_runs_the_llm_calls_of_a_depth_concurrently(monkeypatch):
+    monkeypatch.setitem(knowledge_algorithms.KNOWLEDGE_ALGORITHMS, "gpt_4_1_expert_reasoning", mock_llm(delay=0.2))
+    start = time.perf_counter()
+    node, history = beam_tree_of_thought_refinement(Node(["LLM Expert", "Knowledge Expert"]), Context(), beam_width=4,
+                                                    max_depth=1, confidence_goal=1.01)
+    # depth 0: 1 LLM child, depth 1: 2-3 LLM children, each depth one round of 0.2 s
+    assert time.perf_counter() - start < 0.6
+    assert [len(h["candidates"]) for h in history] == [2, 3]
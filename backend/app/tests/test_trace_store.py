@@ -0,0 +1,124 @@
+import glob
+import multiprocessing
+import os
+import threading
+from datetime import datetime
+from backend.app.quad_persona.schema.data_models import ReasoningStep, ReasoningTrace
+from backend.app import trace_store
+from backend.app.trace_store import TraceStore
+
+def make_trace(i):
+    step = ReasoningStep(step_id=f"ks_{i}", description="step", persona_profile_id="p", persona_display_name="Expert", output_generated="x" * (i % 50))
+    return ReasoningTrace(task_id=f"task_{i}", request_timestamp=datetime(2025, 1, 1), original_query={"query": f"q{i}"},
+                          steps=[step], final_response_summary=f"summary {i}")
+
+def test_batches_rotate_and_read_back(tmp_path):
+    store = TraceStore(str(tmp_path), segment_max_bytes=4096, batch_size=50, flush_interval=0.05)
+    for i in range(300):
+        assert store.submit(make_trace(i))
+    store.flush()
+    segments = glob.glob(os.path.join(str(tmp_path), "traces-*.jsonl.gz"))
+    assert 1 < len(segments) < 300
+    assert len(store) == 300
+    for i in (0, 149, 299):
+        data = store.get(f"task_{i}")
+        assert data["final_response_summary"] == f"summary {i}"
+        assert ReasoningTrace.model_validate(data).steps[0].step_id == f"ks_{i}"
+    assert store.get("task_missing") is None
+    store.close()
+
+    # a new store (process restart) finds everything through the index
+    reopened = TraceStore(str(tmp_path), segment_max_bytes=4096)
+    assert reopened.get("task_77")["original_query"] == {"query": "q77"}
+    reopened.submit(make_trace(300))
+    reopened.close()
+    assert TraceStore(str(tmp_path)).get("task_300")["final_response_summary"] == "summary 300"
+
+def test_trace_is_readable_before_it_is_written(tmp_path):
+    store = TraceStore(str(tmp_path), flush_interval=10)
+    store.submit(make_trace(1))
+    assert "task_1" in store
+    assert store.get("task_1")["task_id"] == "task_1"
+    store.close()
+    assert TraceStore(str(tmp_path)).get("task_1")["task_id"] == "task_1"
+
+def test_full_queue_drops_instead_of_blocking(tmp_path):
+    store = TraceStore(str(tmp_path), max_queue=1, batch_size=1)
+    release = threading.Event()
+    write_batch = store._write_batch
+    store._write_batch = lambda traces: (release.wait(), write_batch(traces))
+    results = [store.submit(make_trace(i)) for i in range(20)]
+    # at most one trace in the (stalled) writer plus one in the queue
+    assert results[0] and store.dropped >= 18
+    release.set()
+    store.close()
+    assert store.get("task_0") is not None
+
+def write_traces(directory, start, count):
+    store = TraceStore(directory, segment_max_bytes=4096, batch_size=10, flush_interval=0.01)
+    for i in range(start, start + count):
+        store.submit(make_trace(i))
+    store.close()
+
+def test_processes_share_a_directory(tmp_path):
+    directory = str(tmp_path)
+    # Opened before the other processes write, as every uvicorn worker's store is
+    reader = TraceStore(directory)
+    context = multiprocessing.get_context("fork")
+    writers = [context.Process(target=write_traces, args=(directory, n * 100, 100)) for n in range(3)]
+    for process in writers:
+        process.start()
+    for process in writers:
+        process.join()
+    assert all(process.exitcode == 0 for process in writers)
+    segments = {os.path.basename(p).split("-")[1] for p in glob.glob(os.path.join(directory, "traces-*.jsonl.gz"))}
+    assert segments == {str(process.pid) for process in writers}
+    assert sorted(os.listdir(directory)) == sorted([os.path.basename(p) for p in glob.glob(os.path.join(directory, "traces-*"))]
+                                                   + [f"index-{process.pid}.tsv" for process in writers])
+    assert "task_250" in reader and len(reader) == 300
+    for i in range(300):
+        assert reader.get(f"task_{i}")["final_response_summary"] == f"summary {i}"
+    reader.close()
+
+def test_index_files_are_read_outside_the_request_lock(tmp_path, monkeypatch):
+    writer = TraceStore(str(tmp_path), flush_interval=0.01)
+    writer.submit(make_trace(1))
+    writer.close()
+    # Written by a store from before index files were per process
+    os.replace(glob.glob(os.path.join(str(tmp_path), "index-*.tsv"))[0], os.path.join(str(tmp_path), "index.tsv"))
+    reader = TraceStore(str(tmp_path))
+    opened = []
+    def checked_open(path, *args, **kwargs):
+        if path.endswith(".tsv") and "a" not in args[0]:
+            opened.append(path)
+            assert not reader._lock.locked(), "index read while holding the lock submit() takes"
+        return open(path, *args, **kwargs)
+    monkeypatch.setattr(trace_store, "open", checked_open, raising=False)
+    assert reader.get("task_1")["task_id"] == "task_1"
+    assert "task_2" not in reader and reader.get("task_2") is None and len(reader) == 1
+    assert opened
+    reader.close()
+
+def test_failed_write_is_retried_then_counted_as_dropped(tmp_path):
+    store = TraceStore(str(tmp_path), flush_interval=0.01, retry_delay=0.01)
+    write_batch = store._write_batch
+    failures = []
+    def flaky(traces):
+        if len(failures) < 2:
+            failures.append(traces)
+            raise OSError("disk full")
+        write_batch(traces)
+    store._write_batch = flaky
+    store.submit(make_trace(1))
+    store.flush()
+    # Retried until it landed, and readable the whole time
+    assert len(failures) == 2 and store.dropped == 0
+    assert TraceStore(str(tmp_path)).get("task_1")["task_id"] == "task_1"
+
+    def broken(traces):
+        raise OSError("disk gone")
+    store._write_batch = broken
+    store.submit(make_trace(2))
+    store.flush()
+    assert store.dropped == 1 and "task_2" not in store
+    store.close()
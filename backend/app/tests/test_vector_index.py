@@ -0,0 +1,101 @@
+import asyncio
+import random
+import numpy as np
+import pytest
+from backend.app.kg_manager import KnowledgeGraphManager
+from backend.app.models import Provision
+from backend.app.quad_persona.llm_client import AsyncLLMClient, set_async_llm_client
+from backend.app.quad_persona.pipeline import run_quad_persona_pipeline
+from backend.app.vector_index import HashedTfidfEncoder, ProvisionVectorIndex, provision_text
+
+TOPICS = {
+    "cyber": "cyber incident report network breach malware forensic",
+    "small": "small business set aside concern size standard",
+    "labor": "wage labor overtime employee hours davis bacon",
+    "travel": "travel per diem lodging airfare expense voucher",
+}
+
+def provision(pid, title, text):
+    return Provision(id=pid, regulation_id="FAR", title=title, text=text, jurisdiction="US")
+
+def synthetic(seed=5, per_topic=40):
+    rng = random.Random(seed)
+    provisions = []
+    for topic, words in TOPICS.items():
+        vocabulary = words.split()
+        for i in range(per_topic):
+            text = " ".join(rng.choice(vocabulary) if rng.random() < 0.6 else rng.choice(["contract", "officer", "clause"])
+                            for _ in range(30))
+            provisions.append(provision(f"{topic}-{i}", " ".join(rng.sample(vocabulary, 3)), text))
+    return provisions
+
+def test_encoder_is_normalised_and_deterministic():
+    texts = [provision_text(p) for p in synthetic()]
+    vectors = HashedTfidfEncoder(dim=64).fit_transform(texts)
+    assert vectors.shape == (len(texts), 64)
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0, atol=1e-5)
+    again = HashedTfidfEncoder(dim=64).fit(texts).encode(texts)
+    assert np.allclose(vectors, again, atol=1e-6)
+    assert not HashedTfidfEncoder().fit(texts).encode([""]).any()
+
+def test_exact_search_matches_brute_force_and_stays_on_topic():
+    provisions = synthetic()
+    index = ProvisionVectorIndex.build(provisions)
+    query = "report the malware breach"
+    scores = index.vectors[:len(index.ids)] @ index.encoder.encode([query])[0]
+    expected = [index.ids[i] for i in np.argsort(-scores, kind="stable")[:5]]
+    hits = index.search(query, k=5)
+    assert [hit["id"] for hit in hits] == expected
+    assert all(hit["id"].startswith("cyber-") for hit in hits)
+    assert [hit["score"] for hit in hits] == sorted((hit["score"] for hit in hits), reverse=True)
+    assert index.search(query, k=5, exclude_ids=[expected[0]])[0]["id"] == expected[1]
+    with pytest.raises(ValueError):
+        index.search(query, method="annoy")
+
+def test_ivf_recall_and_incremental_updates():
+    provisions = synthetic(per_topic=100)
+    index = ProvisionVectorIndex.build(provisions, lists=8)
+    queries = ["lodging voucher airfare", "overtime wage hours", "size standard set aside", "forensic network incident"]
+    for query in queries:
+        exact = {hit["id"] for hit in index.search(query, k=10)}
+        approx = {hit["id"] for hit in index.search(query, k=10, method="ivf", nprobe=3)}
+        assert len(exact & approx) >= 7
+        # Probing every list is exact
+        assert {hit["id"] for hit in index.search(query, k=10, method="ivf", nprobe=8)} == exact
+    new = provision("NEW", "quasar procurement", "quasar quasar procurement")
+    index.add(new)
+    index.update(provision("travel-0", "wage labor", "wage labor overtime"))
+    index.remove("cyber-0")
+    for method in ("exact", "ivf"):
+        # The new vector joined the list of its nearest centroid, which its own text probes first
+        assert index.search(provision_text(new), k=1, method=method, nprobe=1)[0]["id"] == "NEW"
+        assert "travel-0" in {hit["id"] for hit in index.search("wage labor overtime", k=20, method=method, nprobe=8)}
+        assert "cyber-0" not in {hit["id"] for hit in index.search("cyber incident", k=400, method=method, nprobe=8)}
+    assert len(index) == len(provisions) and "cyber-0" not in index
+    assert index.similar_to("cyber-1", k=3)[0]["id"].startswith("cyber-")
+    assert index.similar_to("cyber-0") is None
+
+def test_kgm_related_provisions_ground_the_planner(mock_llm_server):
+    kgm = KnowledgeGraphManager(
+        "backend/app/data/pillars.yaml",
+        "backend/app/data/nodes.yaml",
+        "backend/app/data/roles.yaml",
+        "backend/app/data/experts.yaml",
+        regulation_hierarchy_path="backend/app/data/regulations.yaml",
+    )
+    kgm.update_provision(provision("FAR.TEST", "Quasar clause", "Applies to quasar procurements."))
+    hits = kgm.related_provisions("quasar procurements", k=3)
+    assert hits[0]["id"] == "FAR.TEST" and hits[0]["title"] == "Quasar clause"
+
+    async def runner():
+        client = AsyncLLMClient(base_url=mock_llm_server.base_url, api_key="test", max_retries=0)
+        set_async_llm_client(client)
+        try:
+            return await run_quad_persona_pipeline("Which rules cover quasar procurements?", kgm=kgm)
+        finally:
+            set_async_llm_client(None)
+            await client.aclose()
+    trace = asyncio.run(runner())
+    planner_prompt = mock_llm_server.requests[0]["messages"][0]["content"]
+    assert 'FAR.TEST "Quasar clause"' in planner_prompt
+    assert trace.steps[0].input_context["related_provision_ids"][0] == "FAR.TEST"
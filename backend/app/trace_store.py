@@ -0,0 +1,253 @@
+import glob
+import gzip
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_PATTERN = "traces-{pid}-{number:06d}.jsonl.gz"
+INDEX_PATTERN = "index-{pid}.tsv"
+INDEX_FILE = "index.tsv" # single index written before stores could share a directory; still read
+_STOP = object()
+
+
+class TraceStore:
+    """
+    Asynchronous sink for reasoning traces.
+    submit() only enqueues; a background thread drains the queue in batches and appends each
+    batch to the current segment as one gzip member of JSONL lines. Segments rotate once they
+    reach segment_max_bytes. The index files map task_id -> (segment, member offset, line) so a
+    single trace can be read back by decompressing just its member.
+
+    Several processes (e.g. uvicorn workers) may share the directory: each writes its own
+    segments and its own index file (pid in the file names), so no file has two writers, and a
+    lookup that misses reads the index lines every process added since.
+    """
+
+    def __init__(self,
+                 directory: str,
+                 segment_max_bytes: int = 64 * 1024 * 1024,
+                 batch_size: int = 200,
+                 flush_interval: float = 1.0,
+                 max_queue: int = 10000,
+                 write_attempts: int = 3,
+                 retry_delay: float = 0.5):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.write_attempts = write_attempts
+        self.retry_delay = retry_delay
+        self.dropped = 0 # traces lost to a full queue or to writes that kept failing
+        os.makedirs(directory, exist_ok=True)
+
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Any] = {} # submitted but not yet on disk
+        self._index: Dict[str, Tuple[str, int, int]] = {}
+        # Index files are read outside _lock (which submit() takes on the event loop);
+        # this lock only keeps two readers from consuming the same lines
+        self._index_read_lock = threading.Lock()
+        self._index_offsets: Dict[str, int] = {} # bytes of each index file already read into _index
+        self._read_index()
+        self._segment_number = self._last_segment_number()
+
+        self._thread = threading.Thread(target=self._run, name="trace-store-writer", daemon=True)
+        self._thread.start()
+
+    # --- request path ---
+
+    def submit(self, trace: Any) -> bool:
+        """Queues a ReasoningTrace (or a dict with a task_id) for writing. Never blocks."""
+        task_id = trace["task_id"] if isinstance(trace, dict) else trace.task_id
+        with self._lock:
+            self._pending[task_id] = trace
+        try:
+            self._queue.put_nowait(trace)
+            return True
+        except queue.Full:
+            with self._lock:
+                self._pending.pop(task_id, None)
+                self.dropped += 1
+            logger.error(f"Trace queue full, dropping trace {task_id}")
+            return False
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Returns the stored trace as a dict, or None if the task_id is unknown."""
+        with self._lock:
+            pending = self._pending.get(task_id)
+            location = self._index.get(task_id)
+        if pending is None and location is None:
+            self._read_index() # possibly written by another process
+            with self._lock:
+                location = self._index.get(task_id)
+        if pending is not None:
+            return pending if isinstance(pending, dict) else json.loads(pending.model_dump_json())
+        if location is None:
+            return None
+        segment, offset, line = location
+        lines = self._read_member(os.path.join(self.directory, segment), offset)
+        return json.loads(lines[line])
+
+    def __contains__(self, task_id: str) -> bool:
+        with self._lock:
+            if task_id in self._pending or task_id in self._index:
+                return True
+        self._read_index()
+        with self._lock:
+            return task_id in self._index
+
+    def __len__(self) -> int:
+        self._read_index()
+        with self._lock:
+            return len(self._index) + sum(1 for task_id in self._pending if task_id not in self._index)
+
+    def flush(self):
+        """Blocks until everything submitted so far is on disk."""
+        self._queue.join()
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    # --- writer thread ---
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            try:
+                # Collect more traces for up to flush_interval so one member holds many of them
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.batch_size and batch[-1] is not _STOP:
+                    try:
+                        batch.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0)))
+                    except queue.Empty:
+                        break
+                traces = [t for t in batch if t is not _STOP]
+                if traces:
+                    self._write_with_retries(traces)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if batch[-1] is _STOP:
+                return
+
+    def _write_with_retries(self, traces: List[Any]):
+        # The traces stay readable from _pending while they are retried
+        for attempt in range(1, self.write_attempts + 1):
+            try:
+                self._write_batch(traces)
+                return
+            except Exception as e:
+                if attempt < self.write_attempts:
+                    logger.warning(f"Failed to write {len(traces)} traces (attempt {attempt}), retrying: {e}")
+                    time.sleep(self.retry_delay * attempt)
+                    continue
+                logger.error(f"Failed to write {len(traces)} traces after {attempt} attempts, dropping them: {e}", exc_info=True)
+        with self._lock:
+            for trace in traces:
+                task_id = trace["task_id"] if isinstance(trace, dict) else trace.task_id
+                if self._pending.get(task_id) is trace:
+                    del self._pending[task_id]
+            self.dropped += len(traces)
+
+    def _write_batch(self, traces: List[Any]):
+        task_ids = []
+        lines = []
+        for trace in traces:
+            if isinstance(trace, dict):
+                task_ids.append(trace["task_id"])
+                lines.append(json.dumps(trace, default=str))
+            else:
+                task_ids.append(trace.task_id)
+                lines.append(trace.model_dump_json())
+        member = gzip.compress(("\n".join(lines) + "\n").encode("utf-8"))
+
+        segment_path = self._current_segment_path(len(member))
+        segment = os.path.basename(segment_path)
+        with open(segment_path, "ab") as f:
+            offset = f.tell()
+            f.write(member)
+        entries = [(task_id, segment, offset, i) for i, task_id in enumerate(task_ids)]
+        index_path = os.path.join(self.directory, INDEX_PATTERN.format(pid=os.getpid()))
+        with open(index_path, "a+b") as f:
+            data = "".join(f"{t}\t{s}\t{o}\t{i}\n" for t, s, o, i in entries).encode("utf-8")
+            size = f.seek(0, os.SEEK_END)
+            if size:
+                f.seek(size - 1)
+                if f.read(1) != b"\n":
+                    data = b"\n" + data # end a line torn by a crash (a reused pid), so ours parse
+            f.write(data)
+
+        with self._lock:
+            for task_id, segment, offset, i in entries:
+                self._index[task_id] = (segment, offset, i)
+            for trace, task_id in zip(traces, task_ids):
+                if self._pending.get(task_id) is trace:
+                    del self._pending[task_id]
+
+    def _segment_path(self, number: int) -> str:
+        return os.path.join(self.directory, SEGMENT_PATTERN.format(pid=os.getpid(), number=number))
+
+    def _current_segment_path(self, incoming_bytes: int) -> str:
+        path = self._segment_path(self._segment_number)
+        if os.path.exists(path) and os.path.getsize(path) > 0 and os.path.getsize(path) + incoming_bytes > self.segment_max_bytes:
+            self._segment_number += 1
+            path = self._segment_path(self._segment_number)
+        return path
+
+    # --- startup / reading ---
+
+    def _last_segment_number(self) -> int:
+        # Only this process's segments; a restarted process that got the same pid appends to them
+        prefix = f"traces-{os.getpid()}-"
+        numbers = []
+        for path in glob.glob(os.path.join(self.directory, f"{prefix}*.jsonl.gz")):
+            try:
+                numbers.append(int(os.path.basename(path)[len(prefix):-len(".jsonl.gz")]))
+            except ValueError:
+                continue
+        return max(numbers) if numbers else 0
+
+    def _read_index(self):
+        """Adds the lines appended to any index file since the last read. Never called with _lock held."""
+        paths = [os.path.join(self.directory, INDEX_FILE)] + sorted(glob.glob(os.path.join(self.directory, "index-*.tsv")))
+        with self._index_read_lock:
+            entries = {}
+            for path in paths:
+                try:
+                    with open(path, "rb") as f:
+                        f.seek(self._index_offsets.get(path, 0))
+                        data = f.read()
+                except FileNotFoundError:
+                    continue
+                # A line its process is still appending is read next time
+                complete = data[:data.rfind(b"\n") + 1]
+                self._index_offsets[path] = self._index_offsets.get(path, 0) + len(complete)
+                for raw in complete.decode("utf-8").splitlines():
+                    parts = raw.split("\t")
+                    if len(parts) != 4: # torn line after a crash
+                        continue
+                    task_id, segment, offset, line = parts
+                    entries[task_id] = (segment, int(offset), int(line))
+            with self._lock:
+                self._index.update(entries)
+
+    @staticmethod
+    def _read_member(path: str, offset: int) -> List[str]:
+        decompressor = zlib.decompressobj(wbits=31) # gzip framing, stops at the end of the member
+        chunks = []
+        with open(path, "rb") as f:
+            f.seek(offset)
+            while not decompressor.eof:
+                data = f.read(64 * 1024)
+                if not data:
+                    break
+                chunks.append(decompressor.decompress(data))
+        return b"".join(chunks).decode("utf-8").splitlines()
@@ -0,0 +1,275 @@
+import math
+import zlib
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Protocol, Sequence, Tuple
+
+import numpy as np
+
+from .models import Provision
+from .search_index import tokenize
+
+DEFAULT_DIM = 256
+KMEANS_ITERATIONS = 8
+KMEANS_SAMPLE = 20000
+PROBE_FRACTION = 0.1
+METHODS = ("exact", "ivf")
+
+
+class TextEncoder(Protocol):
+    """Anything that turns texts into an (n, dim) array; a local sentence-embedding model's
+       encode() fits here as well as HashedTfidfEncoder."""
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray: ...
+
+
+def text_features(text: Optional[str]) -> List[str]:
+    """Unigrams plus adjacent-token bigrams (stopwords dropped, see search_index.tokenize)."""
+    tokens = [token for _, token in tokenize(text)]
+    return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+
+class HashedTfidfEncoder:
+    """
+    Dense TF-IDF embeddings without a vocabulary matrix: every unigram/bigram is hashed to one
+    of `dim` dimensions with a ±1 sign (signed feature hashing), weighted by (1 + log tf) · idf
+    and the vector is L2-normalised, so a dot product is a cosine similarity. Collisions cancel
+    out on average thanks to the signs. IDF comes from fit(); features first seen later get the
+    largest IDF of the fitted corpus.
+    """
+
+    def __init__(self, dim: int = DEFAULT_DIM):
+        self.dim = dim
+        self.idf: Dict[str, float] = {}
+        self.default_idf = 1.0
+        self._entries: Dict[str, Tuple[int, float]] = {}
+
+    def fit(self, texts: Iterable[str]) -> "HashedTfidfEncoder":
+        self._fit([Counter(text_features(text)) for text in texts])
+        return self
+
+    def fit_transform(self, texts: Sequence[str]) -> np.ndarray:
+        """fit() then encode() the same texts, tokenizing them once."""
+        counts = [Counter(text_features(text)) for text in texts]
+        self._fit(counts)
+        return self._vectors(counts)
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        return self._vectors([Counter(text_features(text)) for text in texts])
+
+    def entry(self, feature: str) -> Tuple[int, float]:
+        """(dimension, ±idf) of a feature; crc32 keeps the hash stable across processes, unlike hash()."""
+        entry = self._entries.get(feature)
+        if entry is None:
+            h = zlib.crc32(feature.encode("utf-8"))
+            sign = 1.0 if (h >> 31) & 1 else -1.0
+            entry = self._entries[feature] = (h % self.dim, sign * self.idf.get(feature, self.default_idf))
+        return entry
+
+    def _fit(self, counts: List[Counter]):
+        df: Counter = Counter()
+        for document in counts:
+            df.update(document.keys())
+        n = len(counts)
+        self.idf = {feature: math.log((1 + n) / (1 + count)) + 1.0 for feature, count in df.items()}
+        self.default_idf = math.log(1 + n) + 1.0
+        self._entries = {}
+
+    def _vectors(self, counts: List[Counter]) -> np.ndarray:
+        entries = self._entries
+        sizes = np.fromiter((len(document) for document in counts), dtype=np.int64, count=len(counts))
+        looked_up = [entries[f] if f in entries else self.entry(f) for document in counts for f in document]
+        tf = np.fromiter((c for document in counts for c in document.values()), dtype=np.float64, count=int(sizes.sum()))
+        cols = np.fromiter((col for col, _ in looked_up), dtype=np.int64, count=len(looked_up))
+        weights = np.fromiter((w for _, w in looked_up), dtype=np.float64, count=len(looked_up))
+        flat = np.repeat(np.arange(len(counts), dtype=np.int64), sizes) * self.dim + cols
+        vectors = np.bincount(flat, weights=weights * (1.0 + np.log(tf)), minlength=len(counts) * self.dim)
+        return normalize(vectors.astype(np.float32).reshape(len(counts), self.dim))
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+def provision_text(provision: Provision) -> str:
+    return f"{provision.title}\n{provision.text}"
+
+
+class ProvisionVectorIndex:
+    """
+    CPU-only semantic retrieval over provisions: one normalised vector per provision in an
+    (N, dim) float32 matrix.
+    - exact: brute-force cosine (one matrix-vector product) + argpartition for the top k
+    - ivf: inverted-file index; spherical k-means splits the vectors into ~sqrt(N) lists and
+      a query ranks only the lists of its `nprobe` closest centroids (PROBE_FRACTION of the
+      lists by default). Trades a little recall for touching a small share of the rows.
+    Provisions can be added, replaced and removed; new vectors join their nearest list and
+    removed rows stay as dead slots. train() re-clusters after large changes.
+    """
+
+    def __init__(self, encoder: TextEncoder, lists: Optional[int] = None, seed: int = 0):
+        self.encoder = encoder
+        self.lists = lists
+        self.seed = seed
+        self.ids: List[str] = []
+        self.position: Dict[str, int] = {}
+        self.vectors: Optional[np.ndarray] = None
+        self.alive = np.zeros(0, dtype=bool)
+        self.centroids: Optional[np.ndarray] = None
+        self.assignment = np.zeros(0, dtype=np.int64)
+        self.inverted_lists: List[List[int]] = []
+
+    @classmethod
+    def build(cls, provisions: Iterable[Provision], encoder: Optional[TextEncoder] = None, **options) -> "ProvisionVectorIndex":
+        provisions = list(provisions)
+        texts = [provision_text(p) for p in provisions]
+        if encoder is None:
+            encoder = HashedTfidfEncoder()
+            vectors = encoder.fit_transform(texts)
+        else:
+            vectors = encoder.encode(texts) if texts else None
+        index = cls(encoder, **options)
+        if texts:
+            index._add_rows([p.id for p in provisions], vectors)
+            index.train()
+        return index
+
+    def __len__(self) -> int:
+        return int(self.alive[:len(self.ids)].sum())
+
+    def __contains__(self, provision_id: str) -> bool:
+        row = self.position.get(provision_id)
+        return row is not None and bool(self.alive[row])
+
+    # --- maintenance ---
+
+    def add(self, provision: Provision):
+        """Indexes a provision; re-adding an indexed ID replaces its vector."""
+        self._add_rows([provision.id], self.encoder.encode([provision_text(provision)]))
+
+    update = add
+
+    def remove(self, provision_id: str):
+        row = self.position.get(provision_id)
+        if row is not None and self.alive[row]:
+            self.alive[row] = False
+            self._unlist(row)
+
+    def train(self, iterations: int = KMEANS_ITERATIONS):
+        """(Re)clusters the live vectors with spherical k-means and rebuilds the inverted lists."""
+        rows = np.nonzero(self.alive[:len(self.ids)])[0]
+        if not len(rows):
+            self.centroids, self.inverted_lists = None, []
+            return
+        rng = np.random.default_rng(self.seed)
+        count = self.lists or max(1, int(round(math.sqrt(len(rows)))))
+        sample = self.vectors[rng.choice(rows, size=min(len(rows), max(KMEANS_SAMPLE, count)), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=min(count, len(sample)), replace=False)]
+        for _ in range(iterations):
+            nearest = np.argmax(sample @ centroids.T, axis=1)
+            members = np.zeros((len(sample), len(centroids)), dtype=np.float32)
+            members[np.arange(len(sample)), nearest] = 1.0
+            sums = members.T @ sample
+            # A centroid that lost all its points keeps its old position
+            empty = ~np.bincount(nearest, minlength=len(centroids)).astype(bool)
+            sums[empty] = centroids[empty]
+            centroids = normalize(sums)
+        self.centroids = centroids
+        self.assignment[rows] = np.argmax(self.vectors[rows] @ centroids.T, axis=1)
+        self.inverted_lists = [[] for _ in range(len(centroids))]
+        for row, cluster in zip(rows.tolist(), self.assignment[rows].tolist()):
+            self.inverted_lists[cluster].append(row)
+
+    def _add_rows(self, provision_ids: List[str], vectors: np.ndarray):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.vectors is None:
+            self.vectors = np.zeros((0, vectors.shape[1]), dtype=np.float32)
+        rows = []
+        for provision_id in provision_ids:
+            row = self.position.get(provision_id)
+            if row is None:
+                row = self.position[provision_id] = len(self.ids)
+                self.ids.append(provision_id)
+            elif self.alive[row]:
+                self._unlist(row)
+            rows.append(row)
+        self._reserve(len(self.ids))
+        rows = np.array(rows, dtype=np.int64)
+        self.vectors[rows] = vectors
+        self.alive[rows] = True
+        if self.centroids is not None:
+            clusters = np.argmax(vectors @ self.centroids.T, axis=1)
+            self.assignment[rows] = clusters
+            for row, cluster in zip(rows.tolist(), clusters.tolist()):
+                self.inverted_lists[cluster].append(row)
+
+    def _unlist(self, row: int):
+        if self.centroids is not None:
+            self.inverted_lists[int(self.assignment[row])].remove(row)
+
+    def _reserve(self, rows: int):
+        # Grow geometrically so single adds do not copy the matrix each time
+        if rows > self.vectors.shape[0]:
+            capacity = max(rows, 2 * self.vectors.shape[0])
+            vectors = np.zeros((capacity, self.vectors.shape[1]), dtype=np.float32)
+            vectors[:self.vectors.shape[0]] = self.vectors
+            alive = np.zeros(capacity, dtype=bool)
+            alive[:len(self.alive)] = self.alive
+            assignment = np.zeros(capacity, dtype=np.int64)
+            assignment[:len(self.assignment)] = self.assignment
+            self.vectors, self.alive, self.assignment = vectors, alive, assignment
+
+    # --- queries ---
+
+    def search(self,
+               query: str,
+               k: int = 5,
+               method: str = "exact",
+               exclude_ids: Optional[Sequence[str]] = None,
+               nprobe: Optional[int] = None,
+               min_score: float = 0.0
+              ) -> List[Dict[str, Any]]:
+        """Top-k provisions by cosine similarity to the query text: [{"id", "score"}], best first."""
+        if method not in METHODS:
+            raise ValueError(f"Unknown retrieval method '{method}', expected one of {', '.join(METHODS)}")
+        if self.vectors is None:
+            return []
+        return self.search_vector(self.encoder.encode([query])[0], k=k, method=method, exclude_ids=exclude_ids,
+                                  nprobe=nprobe, min_score=min_score)
+
+    def similar_to(self, provision_id: str, k: int = 5, method: str = "exact") -> Optional[List[Dict[str, Any]]]:
+        """Nearest neighbours of an indexed provision (itself excluded); None if it is not indexed."""
+        if provision_id not in self:
+            return None
+        return self.search_vector(self.vectors[self.position[provision_id]], k=k, method=method, exclude_ids=[provision_id])
+
+    def search_vector(self, vector: np.ndarray, k: int = 5, method: str = "exact",
+                      exclude_ids: Optional[Sequence[str]] = None, nprobe: Optional[int] = None,
+                      min_score: float = 0.0) -> List[Dict[str, Any]]:
+        vector = np.asarray(vector, dtype=np.float32)
+        if method == "ivf" and self.centroids is not None:
+            rows = self._candidates(vector, nprobe)
+            scores = self.vectors[rows] @ vector
+            keep = scores > min_score
+        else:
+            # Score the whole matrix in place; gathering the live rows first would copy it
+            rows = np.arange(len(self.ids))
+            scores = self.vectors[:len(self.ids)] @ vector
+            keep = self.alive[:len(self.ids)] & (scores > min_score)
+        if exclude_ids:
+            excluded = [self.position[pid] for pid in exclude_ids if pid in self.position]
+            keep &= ~np.isin(rows, excluded)
+        rows, scores = rows[keep], scores[keep]
+        if len(rows) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            rows, scores = rows[top], scores[top]
+        order = np.lexsort((rows, -scores))
+        return [{"id": self.ids[row], "score": float(score)} for row, score in zip(rows[order].tolist(), scores[order].tolist())]
+
+    def _candidates(self, vector: np.ndarray, nprobe: Optional[int]) -> np.ndarray:
+        lists = len(self.centroids)
+        nprobe = min(lists, nprobe or max(1, math.ceil(PROBE_FRACTION * lists)))
+        closest = np.argpartition(-(self.centroids @ vector), nprobe - 1)[:nprobe]
+        members = [self.inverted_lists[cluster] for cluster in closest.tolist()]
+        total = sum(len(rows) for rows in members)
+        return np.sort(np.fromiter((row for rows in members for row in rows), dtype=np.int64, count=total))
@@ -0,0 +1,14 @@
+import yaml
+from typing import Any
+
+# Prefer the LibYAML-backed C loader; fall back to the pure-Python one when PyYAML was built without it.
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+HAS_LIBYAML = SafeLoader is not yaml.SafeLoader
+
+
+def load_yaml_file(file_path: str) -> Any:
+    """Parses a whole YAML file with the fastest available safe loader.
+       Module-level so it can be sent to ProcessPoolExecutor workers.
+    """
+    with open(file_path, 'r') as f:
+        return yaml.load(f, Loader=SafeLoader)
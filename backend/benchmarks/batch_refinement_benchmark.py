@@ -0,0 +1,88 @@
+"""
+Tree-of-Thought revalidation of a pillar: tree_of_thought_refinement node by node vs.
+batch_tree_of_thought_refinement (memoized pure algorithms, LLM algorithms on a thread pool).
+
+    cd backend && python -m benchmarks.batch_refinement_benchmark [--nodes 200] [--latency 0.02] [--workers 16]
+
+The LLM algorithm is replaced by a stub that sleeps for --latency seconds, and the pure algorithms by
+versions that spend --pure-cost seconds of CPU, so no credentials are needed. Every node runs all
+max_depth + 1 passes (the confidence goal is out of reach), the worst case for repeated work.
+"""
+import argparse
+import copy
+import time
+
+from app.simulation import knowledge_algorithms
+from app.simulation.batch_refinement import PURE_ALGORITHMS, AlgorithmMemo, batch_tree_of_thought_refinement
+from app.simulation.tree_of_thought import tree_of_thought_refinement
+
+
+class Axes:
+    def __init__(self):
+        self.axis8 = ["GDPR"]
+        self.axis9 = 1.0
+
+
+class Node:
+    def __init__(self, i: int):
+        self.node_id = f"PL01:{i:05d}"
+        self.label = f"Node {i}"
+        self.links = [f"PL01:{i + 1:05d}"]
+        self.pillar_id = "PL01"
+        self.axes = Axes()
+        self.simulation_roles = ["Knowledge Expert", "Regulatory Expert", "LLM Expert"]
+        self.metadata = {}
+
+
+class Context:
+    pillars = {"PL01": "Pillar 1"}
+
+
+def install_stubs(latency: float, pure_cost: float):
+    def llm(node, context, prompt_template=None):
+        time.sleep(latency)
+        return {"validation": 0.95, "explanation": "stub"}
+
+    def costly(func):
+        def run(node, context):
+            deadline = time.perf_counter() + pure_cost
+            while time.perf_counter() < deadline:
+                pass
+            return func(node, context)
+        return run
+
+    knowledge_algorithms.KNOWLEDGE_ALGORITHMS["gpt_4_1_expert_reasoning"] = llm
+    for name in PURE_ALGORITHMS:
+        knowledge_algorithms.KNOWLEDGE_ALGORITHMS[name] = costly(getattr(knowledge_algorithms, name))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--pure-cost", type=float, default=0.001)
+    parser.add_argument("--workers", type=int, default=16)
+    args = parser.parse_args()
+
+    install_stubs(args.latency, args.pure_cost)
+    nodes = [Node(i) for i in range(args.nodes)]
+
+    sequential_nodes = copy.deepcopy(nodes)
+    start = time.perf_counter()
+    for node in sequential_nodes:
+        tree_of_thought_refinement(node, Context())
+    sequential_s = time.perf_counter() - start
+
+    memo = AlgorithmMemo()
+    start = time.perf_counter()
+    batch_tree_of_thought_refinement(nodes, Context(), max_workers=args.workers, memo=memo)
+    batch_s = time.perf_counter() - start
+
+    print(f"{args.nodes} nodes x 4 depths, LLM latency {args.latency * 1000:.0f} ms, pure algorithm cost {args.pure_cost * 1000:.1f} ms")
+    print(f"  node by node: {sequential_s:7.2f} s")
+    print(f"  batch ({args.workers} workers): {batch_s:7.2f} s  ({sequential_s / batch_s:.1f}x); "
+          f"pure algorithm memo {memo.hits} hits / {memo.misses} misses")
+
+
+if __name__ == "__main__":
+    main()
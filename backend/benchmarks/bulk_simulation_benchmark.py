@@ -0,0 +1,62 @@
+"""
+Bulk provision revalidation: one simulate_full_expert_reasoning call at a time (what a client looping
+over /simulate/provision/{id} gets) vs. a SimulationJobManager job, in provisions per second.
+
+    cd backend && python -m benchmarks.bulk_simulation_benchmark [--provisions 400] [--latency 0.01] [--workers 16]
+
+Synthetic provisions are added to the bundled knowledge graph with the Knowledge and LLM Expert
+roles; the LLM is a stub sleeping --latency seconds and returning a validation below the goal, so
+every provision runs all refinement passes.
+"""
+import argparse
+import tempfile
+import time
+
+from app.kg_manager import KnowledgeGraphManager
+from app.models import Provision
+from app.simulation import knowledge_algorithms
+from app.simulation.simulation_manager import simulate_full_expert_reasoning
+from app.simulation_jobs import RegulationContext, SimulationJobManager, provision_to_node
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--provisions", type=int, default=400)
+    parser.add_argument("--latency", type=float, default=0.01)
+    parser.add_argument("--workers", type=int, default=16)
+    args = parser.parse_args()
+
+    knowledge_algorithms.KNOWLEDGE_ALGORITHMS["gpt_4_1_expert_reasoning"] = \
+        lambda node, context, prompt_template=None: time.sleep(args.latency) or {"validation": 0.97, "explanation": "stub"}
+    kgm = KnowledgeGraphManager("app/data/pillars.yaml", "app/data/nodes.yaml", "app/data/roles.yaml", "app/data/experts.yaml",
+                                regulation_hierarchy_path="app/data/regulations.yaml")
+    ids = []
+    for i in range(args.provisions):
+        provision = Provision(id=f"BENCH.{i}", regulation_id="FAR", title=f"Benchmark clause {i}", text="Synthetic clause.",
+                              jurisdiction="US", spiderweb_links=["FAR-Base"],
+                              metadata={"simulation_roles": ["Knowledge Expert", "LLM Expert"]})
+        kgm.update_provision(provision)
+        ids.append(provision.id)
+
+    context = RegulationContext(kgm)
+    start = time.perf_counter()
+    for pid in ids:
+        provision = kgm.get_provision_by_id(pid)
+        simulate_full_expert_reasoning(provision_to_node(provision, kgm.get_regulation_by_id("FAR")), context)
+    sequential_s = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as checkpoints:
+        manager = SimulationJobManager(kgm, max_workers=args.workers, checkpoint_dir=checkpoints)
+        job = manager.submit(manager.select_provisions(provision_ids=ids))
+        manager.wait(job.job_id)
+        progress = job.progress()
+        manager.close()
+
+    print(f"{args.provisions} provisions, 4 refinement passes each, LLM latency {args.latency * 1000:.0f} ms")
+    print(f"  one at a time:          {sequential_s:7.2f} s  {args.provisions / sequential_s:8.1f} provisions/s")
+    print(f"  job, {args.workers:3} workers:       {progress['elapsed_s']:7.2f} s  {progress['provisions_per_second']:8.1f} provisions/s"
+          f"  ({progress['errors']} errors, checkpointed every 50)")
+
+
+if __name__ == "__main__":
+    main()
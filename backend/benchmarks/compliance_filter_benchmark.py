@@ -0,0 +1,60 @@
+"""
+Compliance visibility filtering: the original per-node tag scan vs. precomputed bitmasks.
+
+    cd backend && python -m benchmarks.compliance_filter_benchmark [--count 200000]
+"""
+import argparse
+import random
+import time
+
+from app.compliance import ComplianceMaskIndex
+from app.models import Provision
+
+TAGS = ["GDPR", "HIPAA", "SOX", "FERPA", "CCPA", "PCI-DSS", "ITAR", "CMMC", "FedRAMP", "None"]
+
+
+def scan(provisions, user_tags):
+    visible = []
+    for p in provisions:
+        if not p.crosswalks or any(tag in user_tags for tag in p.crosswalks):
+            visible.append(p.id)
+    return visible
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=200000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    provisions = [Provision.model_construct(id=f"P{i}", crosswalks=rng.sample(TAGS, rng.choice([0, 0, 1, 2])))
+                  for i in range(args.count)]
+    ids = [p.id for p in provisions]
+    user_tags = ["HIPAA", "CMMC", "FedRAMP"]
+
+    start = time.perf_counter()
+    index = ComplianceMaskIndex.build(provisions)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    expected = scan(provisions, user_tags)
+    scan_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    keep = index.visible_mask(ids, user_tags)
+    mask_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    visible = index.filter(ids, user_tags)
+    filter_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    everything = index.visible_ids(user_tags)
+    all_ms = (time.perf_counter() - start) * 1000
+    assert visible == expected == everything
+
+    print(f"{args.count} provisions, {len(index.tag_pool)} tags; masks built in {build_ms:.0f} ms")
+    print(f"  tag scan: {scan_ms:7.1f} ms")
+    print(f"  bitmask:  {mask_ms:7.1f} ms (boolean mask), {filter_ms:.1f} ms (ID list), {int(keep.sum())} visible")
+    print(f"  bitmask over all rows (no other filter): {all_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Prompt history tokens: the whole ''.join(history) in every prompt vs. HistoryContext budgeted windows.
+
+    cd backend && python -m benchmarks.context_budget_benchmark [--steps 4 8] [--output-tokens 600]
+
+Replays the pipeline's history bookkeeping for sequential plans of N expert steps, each producing
+an output of ~output-tokens (estimated) tokens, and sums the history tokens every expert prompt plus
+the synthesizer prompt would carry. No LLM calls are made.
+"""
+import argparse
+import random
+import time
+
+from app.quad_persona.context_budget import EXPERT_HISTORY_BUDGET, SYNTHESIZER_HISTORY_BUDGET, HistoryContext
+
+WORDS = ("provision contractor shall report incident within hours agency officer clause applies small business "
+         "subcontract award price data security compliance obligation requirement").split()
+
+
+def expert_output(rng: random.Random, tokens: int) -> str:
+    sentences = []
+    while sum(len(s) for s in sentences) < tokens * 4:
+        sentences.append(" ".join(rng.choices(WORDS, k=rng.randint(8, 20))).capitalize() + ".")
+    return " ".join(sentences)
+
+
+def replay(steps: int, output_tokens: int, budgeted: bool, seed: int = 0):
+    rng = random.Random(seed)
+    context = HistoryContext()
+    context.add(f"Planner (planner) Rationale: {expert_output(rng, 80)}\nOutput:\n{expert_output(rng, 200)}\n")
+    sent = []
+    for i in range(steps):
+        _, stats = context.window(EXPERT_HISTORY_BUDGET if budgeted else None)
+        sent.append(stats["sent_tokens"])
+        context.add(f"Expert {i} (expert_{i}) Output:\n{expert_output(rng, output_tokens)}\nConfidence: 0.8\n")
+    _, stats = context.window(SYNTHESIZER_HISTORY_BUDGET if budgeted else None)
+    sent.append(stats["sent_tokens"])
+    return sent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, nargs="+", default=[4, 8])
+    parser.add_argument("--output-tokens", type=int, default=600)
+    args = parser.parse_args()
+
+    print(f"budgets: expert {EXPERT_HISTORY_BUDGET}, synthesizer {SYNTHESIZER_HISTORY_BUDGET} tokens; "
+          f"expert outputs ~{args.output_tokens} tokens")
+    for steps in args.steps:
+        full = replay(steps, args.output_tokens, budgeted=False)
+        start = time.perf_counter()
+        budgeted = replay(steps, args.output_tokens, budgeted=True)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        saved = 1 - sum(budgeted) / sum(full)
+        print(f"  {steps}-step plan: full history {sum(full):7} tokens  budgeted {sum(budgeted):7} tokens  "
+              f"saved {saved:6.1%}  (largest prompt history {max(full)} -> {max(budgeted)}; bookkeeping {elapsed_ms:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Replays a recorded prompt set through the LLM response cache.
+
+    cd backend && python -m benchmarks.llm_cache_benchmark [--db /tmp/llm_cache.sqlite] [--scale 0.01]
+
+Each recorded call carries the latency observed against the real endpoint; misses sleep for
+that latency (times --scale) to stand in for the LLM, hits are served by the cache.
+Run twice with the same --db to see the on-disk tier survive a restart.
+"""
+import argparse
+import json
+import os
+import time
+
+from app.quad_persona.llm_cache import LLMResponseCache, make_cache_key
+
+DEFAULT_PROMPT_SET = os.path.join(os.path.dirname(__file__), "data", "recorded_prompts.json")
+
+
+def replay(cache: LLMResponseCache, recorded: dict, scale: float) -> dict:
+    prompts = recorded["prompts"]
+    uncached_seconds = 0.0
+    start = time.perf_counter()
+    for index in recorded["replay"]:
+        call = prompts[index]
+        latency = call["latency_ms"] / 1000.0 * scale
+        uncached_seconds += latency
+        key = None
+        if cache.accepts(call["temperature"]):
+            key = make_cache_key(call["model"], call["system"], call["prompt"], temperature=call["temperature"], max_tokens=2048, top_p=0.95)
+            if cache.get(key) is not None:
+                continue
+        time.sleep(latency) # stand-in for the LLM round trip
+        if key is not None:
+            cache.set(key, call["response"])
+    return {"calls": len(recorded["replay"]), "elapsed_s": time.perf_counter() - start, "uncached_s": uncached_seconds}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--prompts", default=DEFAULT_PROMPT_SET)
+    parser.add_argument("--db", default=None, help="SQLite file for the on-disk tier")
+    parser.add_argument("--max-entries", type=int, default=1024)
+    parser.add_argument("--scale", type=float, default=0.01, help="multiplier applied to recorded latencies")
+    args = parser.parse_args()
+
+    with open(args.prompts, "r", encoding="utf-8") as f:
+        recorded = json.load(f)
+
+    cache = LLMResponseCache(max_entries=args.max_entries, db_path=args.db)
+    result = replay(cache, recorded, args.scale)
+    stats = cache.stats()
+    cache.close()
+
+    print(f"calls:          {result['calls']}")
+    print(f"hits / misses:  {stats['hits']} / {stats['misses']} (disk hits {stats['disk_hits']}, skipped {stats['skips']})")
+    print(f"hit rate:       {stats['hit_rate']:.1%}")
+    print(f"elapsed:        {result['elapsed_s']:.3f}s (uncached {result['uncached_s']:.3f}s)")
+
+
+if __name__ == "__main__":
+    main()
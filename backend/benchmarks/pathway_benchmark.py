@@ -0,0 +1,103 @@
+"""
+Latency of compliance-pathway queries on a synthetic provision graph.
+
+    cd backend && python -m benchmarks.pathway_benchmark [--vertices 500000] [--degree 4] [--queries 50]
+
+The graph imitates the mapping network: provisions are grouped into regulations, most Spiderweb
+links stay within a regulation (nearby ids), a small share are cross-jurisdiction links, and
+Octopus hubs tie together provisions of one domain. It is built straight from edge arrays with
+ProvisionGraph.from_edges, so millions of edges load in seconds.
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from app.pathway import PathwayFinder
+from app.provision_graph import AXIS_BITS, EXTERNAL_VERTEX, HUB_VERTEX, OCTOPUS, PROVISION_VERTEX, SPIDERWEB, ProvisionGraph
+from app.models import RegulatoryAxis
+
+REGULATION_SIZE = 2000
+LOCAL_SPAN = 50        # local links stay within this many ids
+CROSS_SHARE = 0.02     # share of links between regulations
+HUB_MEMBERS = 40
+
+
+def synthetic_graph(vertices: int, degree: int, seed: int = 0) -> ProvisionGraph:
+    rng = np.random.default_rng(seed)
+    links = vertices * degree // 2
+    src = rng.integers(0, vertices, links)
+    offset = rng.integers(1, LOCAL_SPAN, links)
+    dst = np.minimum(src - src % REGULATION_SIZE + (src % REGULATION_SIZE + offset) % REGULATION_SIZE, vertices - 1)
+    cross = rng.random(links) < CROSS_SHARE
+    dst[cross] = rng.integers(0, vertices, int(cross.sum()))
+    weight = rng.uniform(0.3, 1.0, links)
+    risk = np.where(rng.random(links) < 0.5, rng.uniform(0.0, 1.0, links), np.nan)
+    axes = np.where(cross, AXIS_BITS[RegulatoryAxis.JURISDICTION], AXIS_BITS[RegulatoryAxis.SPIDERWEB])
+
+    hubs = max(vertices // 5000, 1)
+    hub_src = np.repeat(np.arange(vertices, vertices + hubs), HUB_MEMBERS)
+    hub_dst = rng.integers(0, vertices, hubs * HUB_MEMBERS)
+
+    vertex_ids = [f"P{i}" for i in range(vertices)] + [f"ON{i}" for i in range(hubs)]
+    kinds = np.concatenate([np.full(vertices, PROVISION_VERTEX), np.full(hubs, HUB_VERTEX)])
+    kinds[vertices - 1] = EXTERNAL_VERTEX
+    return ProvisionGraph.from_edges(
+        vertex_ids, kinds,
+        np.concatenate([src, hub_src]), np.concatenate([dst, hub_dst]),
+        np.concatenate([np.full(links, SPIDERWEB), np.full(hubs * HUB_MEMBERS, OCTOPUS)]),
+        np.concatenate([weight, np.ones(hubs * HUB_MEMBERS)]),
+        np.concatenate([risk, np.full(hubs * HUB_MEMBERS, np.nan)]),
+        np.concatenate([axes, np.full(hubs * HUB_MEMBERS, AXIS_BITS[RegulatoryAxis.OCTOPUS])]),
+        np.concatenate([np.arange(links), np.repeat(np.arange(links, links + hubs), HUB_MEMBERS)]),
+        [f"SW{i}" for i in range(links)] + [f"ON{i}" for i in range(hubs)],
+    )
+
+
+def time_queries(label: str, run, pairs) -> None:
+    samples = []
+    for source, target in pairs:
+        start = time.perf_counter()
+        run(source, target)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    p95 = samples[min(int(len(samples) * 0.95), len(samples) - 1)]
+    print(f"{label:>36}: median {statistics.median(samples):7.2f} ms, p95 {p95:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vertices", type=int, default=500000)
+    parser.add_argument("--degree", type=int, default=4, help="average links per provision")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--landmarks", type=int, default=8)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    graph = synthetic_graph(args.vertices, args.degree)
+    finder = PathwayFinder(graph)
+    print(f"{graph.num_vertices} vertices, {graph.num_edges} directed edges, built in {time.perf_counter() - start:.1f}s")
+    start = time.perf_counter()
+    finder.prepare_landmarks(args.landmarks)
+    print(f"{args.landmarks} landmarks in {time.perf_counter() - start:.1f}s")
+
+    rng = np.random.default_rng(1)
+    # Same-regulation pairs (the common query) and arbitrary pairs across jurisdictions
+    local = [(f"P{s}", f"P{min(s - s % REGULATION_SIZE + rng.integers(REGULATION_SIZE), args.vertices - 1)}")
+             for s in rng.integers(0, args.vertices, args.queries)]
+    remote = [(f"P{s}", f"P{t}") for s, t in rng.integers(0, args.vertices, (args.queries, 2))]
+    for name, pairs in (("same regulation", local), ("cross-jurisdiction", remote)):
+        print(name)
+        # Plain Dijkstra settles a large share of the graph; a few samples are enough as the baseline
+        time_queries("dijkstra", lambda s, t: finder.shortest_path(s, t, method="dijkstra"), pairs[:5])
+        time_queries("bidirectional", lambda s, t: finder.shortest_path(s, t, method="bidirectional"), pairs)
+        time_queries("astar", lambda s, t: finder.shortest_path(s, t, method="astar"), pairs[:10])
+        for method in ("bidirectional", "astar"):
+            time_queries(f"{method}, spiderweb axis only",
+                         lambda s, t: finder.shortest_path(s, t, method=method, axes=[RegulatoryAxis.SPIDERWEB]), pairs[:10])
+        time_queries("top-3 (Yen, bidirectional)", lambda s, t: finder.k_shortest_paths(s, t, k=3), pairs[:10])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Compares the memory held by the two provision storage backends.
+
+    cd backend && python -m benchmarks.provision_memory_benchmark [--count 200000]
+
+Synthetic provisions are shaped like the ones streamed from regulations.yaml (hierarchy metadata,
+role/tag lists, repeated regulation and jurisdiction values). Each backend is filled from a
+generator, so only what the backend itself retains is measured (tracemalloc, after gc).
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+from app.models import Provision
+from app.provision_store import make_provision_store
+
+REGULATIONS = ["FAR", "DFARS", "HHSAR", "NASA_FAR", "GSAR", "CA_PCC", "TX_GOV", "NY_STF", "FL_STAT"]
+JURISDICTIONS = ["US-Federal", "US-CA", "US-TX", "US-NY", "US-FL"]
+ROLES = ["ROLE_CO", "ROLE_KE", "ROLE_PM", "ROLE_QA", "ROLE_LEGAL"]
+TAGS = ["procurement", "cyber", "small-business", "labor", "safety", "audit"]
+
+
+def synthetic_provisions(count: int):
+    for i in range(count):
+        reg = REGULATIONS[i % len(REGULATIONS)]
+        yield Provision(
+            id=f"{reg}-{i:08d}",
+            regulation_id=reg,
+            section=f"{i % 53}.{i % 7}",
+            title=f"{reg} clause {i}",
+            text=f"The contractor shall comply with requirement {i} of {reg} and retain records for audit.",
+            hierarchy_level=i % 6,
+            parent_id=f"{reg}-{max(i - 1 - i % 5, 0):08d}",
+            jurisdiction=JURISDICTIONS[i % len(JURISDICTIONS)],
+            roles_responsible=[ROLES[i % len(ROLES)], ROLES[(i + 2) % len(ROLES)]],
+            crosswalks=[f"XW-{i % 97}"],
+            octopus_refs=[],
+            tags=[TAGS[i % len(TAGS)], TAGS[(i * 3) % len(TAGS)]],
+            metadata={
+                "UnifiedID": reg,
+                "SAMName": f"{reg} Regulation",
+                "RegulatoryReference": f"{reg} {i % 53}.{i % 7}",
+                "AssociatedCodes": [f"NAICS-{i % 40}"],
+                "Roles": ["Contracting Officer"],
+                "OwnerAgency": "GSA",
+            },
+        )
+
+
+def measure(backend: str, count: int) -> dict:
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    store = make_provision_store(backend)
+    for provision in synthetic_provisions(count):
+        store[provision.id] = provision
+    load_seconds = time.perf_counter() - start
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    sample = list(store)[:10000]
+    start = time.perf_counter()
+    for provision_id in sample:
+        store[provision_id]
+    lookup_us = (time.perf_counter() - start) / len(sample) * 1e6
+    return {"backend": backend, "bytes": current, "load_s": load_seconds, "lookup_us": lookup_us, "store": store}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=200000)
+    args = parser.parse_args()
+
+    results = []
+    for backend in ("dict", "columnar"):
+        result = measure(backend, args.count)
+        del result["store"]
+        results.append(result)
+        gc.collect()
+
+    print(f"{args.count} provisions")
+    for r in results:
+        print(f"{r['backend']:>9}: {r['bytes'] / 2**20:8.1f} MiB ({r['bytes'] / args.count:6.0f} B/provision), "
+              f"load {r['load_s']:.2f}s, get {r['lookup_us']:.1f} us")
+    print(f"columnar / dict memory: {results[1]['bytes'] / results[0]['bytes']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Full-text /search: BM25 inverted index vs. a substring scan over every provision.
+
+    cd backend && python -m benchmarks.search_benchmark [--provisions 60000] [--length 120]
+
+The corpus is synthetic but sized like FAR + DFARS together (tens of thousands of sections of
+~100 words), with a Zipf-like vocabulary (the top term is ~1% of all tokens) so common terms have long
+postings lists.
+"""
+import argparse
+import itertools
+import random
+import statistics
+import time
+
+from app.models import Provision
+from app.search_index import SearchIndex
+
+QUERIES = ["contract", "cyber incident report", "subcontract*", '"small business concern"', "proc* award price",
+           "rare7 contract"]
+COMMON = ["contract", "contractor", "subcontract", "award", "price", "cost", "small", "business", "concern", "cyber",
+          "incident", "report", "officer", "clause", "procurement", "proposal", "agency", "government", "data", "security"]
+
+
+def synthetic(provisions: int, length: int, seed: int = 0):
+    rng = random.Random(seed)
+    vocabulary = COMMON + [f"rare{i}" for i in range(20000)]
+    cumulative = list(itertools.accumulate(1.0 / (rank + 10) for rank in range(len(vocabulary))))
+    corpus = []
+    for i in range(provisions):
+        words = rng.choices(vocabulary, cum_weights=cumulative, k=length)
+        if i % 50 == 0:
+            words[10:13] = ["small", "business", "concern"]
+        corpus.append(Provision.model_construct(id=f"FAR.{i}", regulation_id="FAR" if i % 2 else "DFARS",
+                                                title=" ".join(rng.choices(COMMON, k=4)), text=" ".join(words)))
+    return corpus
+
+
+def scan(provisions, query):
+    needles = query.replace('"', "").replace("*", "").lower().split()
+    return [p.id for p in provisions if any(n in p.title.lower() or n in p.text.lower() for n in needles)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--provisions", type=int, default=60000)
+    parser.add_argument("--length", type=int, default=120)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    provisions = synthetic(args.provisions, args.length)
+    start = time.perf_counter()
+    index = SearchIndex.build(provisions)
+    build_s = time.perf_counter() - start
+    print(f"{args.provisions} provisions, {len(index.vocabulary)} terms; index built in {build_s:.1f} s")
+
+    start = time.perf_counter()
+    scan(provisions, "cyber incident report")
+    print(f"  substring scan (no ranking): {(time.perf_counter() - start) * 1000:8.1f} ms")
+    for query in QUERIES:
+        start = time.perf_counter()
+        result = index.search(query)
+        cold_ms = (time.perf_counter() - start) * 1000
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            index.search(query)
+            timings.append((time.perf_counter() - start) * 1000)
+        print(f"  {query!r:28} {result['total']:6} hits  cold {cold_ms:6.1f} ms  median {statistics.median(timings):6.1f} ms"
+              f"  max {max(timings):6.1f} ms")
+
+    updates = provisions[:1000]
+    start = time.perf_counter()
+    for provision in updates:
+        index.update_provision(provision)
+    update_us = (time.perf_counter() - start) / len(updates) * 1e6
+    start = time.perf_counter()
+    index.search("contract")
+    term_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    index.search('"small business concern"')
+    phrase_ms = (time.perf_counter() - start) * 1000
+    print(f"  update: {update_us:.0f} us per provision; after 1000 updates: term query {term_ms:.1f} ms, phrase {phrase_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Tree-of-Thought engine scaling: time, peak memory and recorded history against refinement depth
+(iterative engine) and beam width (beam search).
+
+    cd backend && python -m benchmarks.tot_engine_benchmark [--depths 10 100 1000] [--widths 1 3 5]
+
+The node never reaches its confidence goal, so every run goes to max_depth. The recursive engine
+this replaced stored (depth + 1)^2 history entries in node.metadata (each frame extended it with
+the whole shared list again) and hit the recursion limit near depth 1000; its entry count is
+printed for comparison. The LLM is a stub returning a fixed validation.
+"""
+import argparse
+import time
+import tracemalloc
+
+from app.simulation import knowledge_algorithms
+from app.simulation.beam_search import beam_tree_of_thought_refinement
+from app.simulation.tree_of_thought import tree_of_thought_refinement
+
+
+class Axes:
+    def __init__(self):
+        self.axis8 = ["GDPR"]
+        self.axis9 = 1.0
+
+
+class Node:
+    def __init__(self):
+        self.node_id = "PL01:00001"
+        self.label = "Node"
+        self.links = ["PL01:00002"]
+        self.pillar_id = "PL01"
+        self.axes = Axes()
+        self.simulation_roles = ["Knowledge Expert", "Regulatory Expert", "LLM Expert"]
+        self.metadata = {}
+
+
+class Context:
+    pillars = {"PL01": "Pillar 1"}
+
+
+def measure(run):
+    tracemalloc.start()
+    start = time.perf_counter()
+    node, history = run()
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return node, history, elapsed_ms, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--depths", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--widths", type=int, nargs="+", default=[1, 3, 5])
+    parser.add_argument("--beam-depth", type=int, default=10)
+    args = parser.parse_args()
+
+    knowledge_algorithms.KNOWLEDGE_ALGORITHMS["gpt_4_1_expert_reasoning"] = \
+        lambda node, context, prompt_template=None: {"validation": 0.97, "explanation": "stub"}
+
+    print("iterative engine (goal out of reach)")
+    for depth in args.depths:
+        node, history, elapsed_ms, peak_kb = measure(lambda: tree_of_thought_refinement(Node(), Context(), max_depth=depth))
+        recursive_entries = (depth + 1) ** 2
+        print(f"  depth {depth:5}: {elapsed_ms:8.1f} ms  peak {peak_kb:8.0f} KiB  "
+              f"{len(node.metadata['refinement_history']):6} history entries (recursive engine: {recursive_entries})")
+
+    print(f"beam search, depth {args.beam_depth}")
+    for width in args.widths:
+        node, history, elapsed_ms, peak_kb = measure(
+            lambda: beam_tree_of_thought_refinement(Node(), Context(), beam_width=width, max_depth=args.beam_depth,
+                                                    confidence_goal=1.01))
+        candidates = sum(len(entry["candidates"]) for entry in history)
+        print(f"  width {width}: {elapsed_ms:8.1f} ms  peak {peak_kb:8.0f} KiB  {candidates:5} candidates evaluated  "
+              f"best {history[-1]['candidates'][0]['path'][:4]}... confidence {node.axes.axis9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Semantic provision retrieval: brute-force cosine vs. the IVF (k-means lists) index, with recall
+of the approximate top-k against the exact one.
+
+    cd backend && python -m benchmarks.vector_index_benchmark [--provisions 60000] [--k 10]
+
+The corpus is synthetic and FAR/DFARS-sized: each provision mixes words from one of TOPICS
+subject vocabularies with common regulatory words, so (like real parts and subparts) provisions
+form topical neighbourhoods. Queries are short word sequences taken from random provisions.
+"""
+import argparse
+import random
+import statistics
+import time
+
+from app.models import Provision
+from app.vector_index import ProvisionVectorIndex
+
+from .search_benchmark import COMMON
+
+TOPICS = 300
+TOPIC_WORDS = 60
+
+
+def synthetic(provisions: int, length: int, seed: int = 0):
+    rng = random.Random(seed)
+    topics = [[f"t{t}w{w}" for w in range(TOPIC_WORDS)] for t in range(TOPICS)]
+    corpus = []
+    for i in range(provisions):
+        topic = topics[rng.randrange(TOPICS)]
+        words = [rng.choice(topic) if rng.random() < 0.5 else rng.choice(COMMON) for _ in range(length)]
+        corpus.append(Provision.model_construct(id=f"FAR.{i}", regulation_id="FAR", title=" ".join(rng.sample(topic, 3)),
+                                                text=" ".join(words)))
+    return corpus
+
+
+def timed(fn, queries):
+    results, timings = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(fn(query))
+        timings.append((time.perf_counter() - start) * 1000)
+    return results, statistics.median(timings), max(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--provisions", type=int, default=60000)
+    parser.add_argument("--length", type=int, default=120)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    provisions = synthetic(args.provisions, args.length)
+    start = time.perf_counter()
+    index = ProvisionVectorIndex.build(provisions)
+    print(f"{args.provisions} provisions, dim {index.vectors.shape[1]}, {len(index.centroids)} IVF lists; "
+          f"built in {time.perf_counter() - start:.1f} s")
+
+    rng = random.Random(1)
+    queries = []
+    for _ in range(args.queries):
+        words = rng.choice(provisions).text.split()
+        offset = rng.randrange(len(words) - 8)
+        queries.append(" ".join(words[offset:offset + 8]))
+
+    exact, exact_median, exact_max = timed(lambda q: index.search(q, k=args.k), queries)
+    print(f"  exact:        median {exact_median:6.2f} ms  max {exact_max:6.2f} ms")
+    for nprobe in (None, 4 * len(index.centroids) // 10):
+        approx, median, worst = timed(lambda q: index.search(q, k=args.k, method="ivf", nprobe=nprobe), queries)
+        recall = sum(len({h["id"] for h in a} & {h["id"] for h in e}) for a, e in zip(approx, exact)) / sum(len(e) for e in exact)
+        label = f"ivf nprobe={nprobe or 'default'}"
+        print(f"  {label:18} median {median:6.2f} ms  max {worst:6.2f} ms  recall@{args.k} {recall:.3f}")
+
+
+if __name__ == "__main__":
+    main()